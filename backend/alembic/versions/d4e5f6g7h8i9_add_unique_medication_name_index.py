@@ -0,0 +1,61 @@
+"""add unique (user_id, lower(name)) index to medications
+
+Revision ID: d4e5f6g7h8i9
+Revises: c3d4e5f6g7h8
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4e5f6g7h8i9'
+down_revision: Union[str, Sequence[str], None] = 'c3d4e5f6g7h8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Merge case-insensitive duplicate medications, then enforce uniqueness per user."""
+    op.execute("""
+    -- Keep the oldest row of each (user_id, lower(name)) group and fold the others into it
+    CREATE TEMPORARY TABLE medication_duplicates ON COMMIT DROP AS
+    SELECT id,
+           FIRST_VALUE(id) OVER (PARTITION BY user_id, LOWER(name) ORDER BY id) AS keep_id
+    FROM medications;
+
+    DELETE FROM medication_duplicates WHERE id = keep_id;
+
+    UPDATE medications m
+    SET quantity = m.quantity + d.extra_quantity,
+        updated_at = CURRENT_TIMESTAMP
+    FROM (
+        SELECT d.keep_id, SUM(dup.quantity) AS extra_quantity
+        FROM medication_duplicates d
+        JOIN medications dup ON dup.id = d.id
+        GROUP BY d.keep_id
+    ) d
+    WHERE m.id = d.keep_id;
+
+    UPDATE medication_usage mu
+    SET medication_id = d.keep_id
+    FROM medication_duplicates d
+    WHERE mu.medication_id = d.id;
+
+    DELETE FROM medications m
+    USING medication_duplicates d
+    WHERE m.id = d.id;
+
+    CREATE UNIQUE INDEX idx_medications_user_id_lower_name
+        ON medications (user_id, LOWER(name));
+    """)
+
+
+def downgrade() -> None:
+    """Drop the unique medication name index (merged duplicates are not restored)."""
+    op.execute("""
+    DROP INDEX IF EXISTS idx_medications_user_id_lower_name;
+    """)
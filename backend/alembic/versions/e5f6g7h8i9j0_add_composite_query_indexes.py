@@ -0,0 +1,70 @@
+"""add composite indexes matching list query shapes
+
+Revision ID: e5f6g7h8i9j0
+Revises: d4e5f6g7h8i9
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f6g7h8i9j0'
+down_revision: Union[str, Sequence[str], None] = 'd4e5f6g7h8i9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Replace single-column FK indexes with (owner, sort key, id) indexes used by the list queries."""
+    op.execute("""
+    -- Usage history per family member, newest first (keyset on used_at, id)
+    CREATE INDEX idx_medication_usage_family_member_used_at
+        ON medication_usage (family_member_id, used_at DESC, id DESC);
+    DROP INDEX IF EXISTS idx_medication_usage_family_member_id;
+
+    -- Illness history per family member, newest first (keyset on start_date, id)
+    CREATE INDEX idx_illness_logs_family_member_start_date
+        ON illness_logs (family_member_id, start_date DESC, id DESC);
+    DROP INDEX IF EXISTS idx_illness_logs_family_member_id;
+
+    -- Medication inventory per user, by name (keyset on name, id)
+    CREATE INDEX idx_medications_user_id_name
+        ON medications (user_id, name, id);
+    DROP INDEX IF EXISTS idx_medications_user_id;
+
+    -- Family members per user, newest first (keyset on created_at, id)
+    CREATE INDEX idx_family_members_user_id_created_at
+        ON family_members (user_id, created_at DESC, id DESC);
+    DROP INDEX IF EXISTS idx_family_members_user_id;
+
+    -- n8n chat memory loads a session's messages in insertion order
+    CREATE INDEX idx_n8n_chat_histories_session_id
+        ON n8n_chat_histories (session_id, id);
+    """)
+
+
+def downgrade() -> None:
+    """Restore the original single-column indexes."""
+    op.execute("""
+    DROP INDEX IF EXISTS idx_n8n_chat_histories_session_id;
+
+    CREATE INDEX idx_family_members_user_id
+        ON family_members (user_id);
+    DROP INDEX IF EXISTS idx_family_members_user_id_created_at;
+
+    CREATE INDEX idx_medications_user_id
+        ON medications (user_id);
+    DROP INDEX IF EXISTS idx_medications_user_id_name;
+
+    CREATE INDEX idx_illness_logs_family_member_id
+        ON illness_logs (family_member_id);
+    DROP INDEX IF EXISTS idx_illness_logs_family_member_start_date;
+
+    CREATE INDEX idx_medication_usage_family_member_id
+        ON medication_usage (family_member_id);
+    DROP INDEX IF EXISTS idx_medication_usage_family_member_used_at;
+    """)
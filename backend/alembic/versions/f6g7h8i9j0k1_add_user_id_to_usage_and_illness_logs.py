@@ -0,0 +1,68 @@
+"""add owner user_id to medication_usage and illness_logs
+
+Revision ID: f6g7h8i9j0k1
+Revises: e5f6g7h8i9j0
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6g7h8i9j0k1'
+down_revision: Union[str, Sequence[str], None] = 'e5f6g7h8i9j0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Denormalize the owning user onto usage and illness logs so ownership checks need no join."""
+    op.execute("""
+    -- Target for the composite foreign keys below: a row's user_id must match its family member's
+    ALTER TABLE family_members
+        ADD CONSTRAINT uq_family_members_id_user_id UNIQUE (id, user_id);
+
+    ALTER TABLE medication_usage ADD COLUMN user_id INTEGER;
+    UPDATE medication_usage mu
+    SET user_id = fm.user_id
+    FROM family_members fm
+    WHERE fm.id = mu.family_member_id;
+    ALTER TABLE medication_usage ALTER COLUMN user_id SET NOT NULL;
+    ALTER TABLE medication_usage
+        ADD CONSTRAINT fk_medication_usage_family_member_owner
+        FOREIGN KEY (family_member_id, user_id) REFERENCES family_members (id, user_id)
+        ON DELETE CASCADE ON UPDATE CASCADE;
+    CREATE INDEX idx_medication_usage_user_id_used_at
+        ON medication_usage (user_id, used_at DESC, id DESC);
+
+    ALTER TABLE illness_logs ADD COLUMN user_id INTEGER;
+    UPDATE illness_logs il
+    SET user_id = fm.user_id
+    FROM family_members fm
+    WHERE fm.id = il.family_member_id;
+    ALTER TABLE illness_logs ALTER COLUMN user_id SET NOT NULL;
+    ALTER TABLE illness_logs
+        ADD CONSTRAINT fk_illness_logs_family_member_owner
+        FOREIGN KEY (family_member_id, user_id) REFERENCES family_members (id, user_id)
+        ON DELETE CASCADE ON UPDATE CASCADE;
+    CREATE INDEX idx_illness_logs_user_id_start_date
+        ON illness_logs (user_id, start_date DESC, id DESC);
+    """)
+
+
+def downgrade() -> None:
+    """Drop the denormalized user_id columns."""
+    op.execute("""
+    DROP INDEX IF EXISTS idx_illness_logs_user_id_start_date;
+    ALTER TABLE illness_logs DROP CONSTRAINT IF EXISTS fk_illness_logs_family_member_owner;
+    ALTER TABLE illness_logs DROP COLUMN IF EXISTS user_id;
+
+    DROP INDEX IF EXISTS idx_medication_usage_user_id_used_at;
+    ALTER TABLE medication_usage DROP CONSTRAINT IF EXISTS fk_medication_usage_family_member_owner;
+    ALTER TABLE medication_usage DROP COLUMN IF EXISTS user_id;
+
+    ALTER TABLE family_members DROP CONSTRAINT IF EXISTS uq_family_members_id_user_id;
+    """)
@@ -0,0 +1,28 @@
+"""add lifeline_calendar_id to users
+
+Revision ID: g7h8i9j0k1l2
+Revises: f6g7h8i9j0k1
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'g7h8i9j0k1l2'
+down_revision: Union[str, Sequence[str], None] = 'f6g7h8i9j0k1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Store the id of each user's LIFELINE Google calendar, like drive_folder_id."""
+    op.add_column('users', sa.Column('lifeline_calendar_id', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Remove lifeline_calendar_id column from users table."""
+    op.drop_column('users', 'lifeline_calendar_id')
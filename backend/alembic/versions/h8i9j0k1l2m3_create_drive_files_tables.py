@@ -0,0 +1,63 @@
+"""create drive_files and drive_sync_state tables
+
+Revision ID: h8i9j0k1l2m3
+Revises: g7h8i9j0k1l2
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'h8i9j0k1l2m3'
+down_revision: Union[str, Sequence[str], None] = 'g7h8i9j0k1l2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Keep a local copy of each user's 'LifeLine Records' listing, synced with the Drive Changes API."""
+    op.execute("""
+    CREATE TABLE drive_files (
+        id              SERIAL PRIMARY KEY,
+        user_id         INTEGER NOT NULL
+            REFERENCES users
+                ON DELETE CASCADE,
+        file_id         VARCHAR NOT NULL,
+        name            VARCHAR NOT NULL,
+        mime_type       VARCHAR(255) NOT NULL,
+        size            BIGINT,
+        created_time    TIMESTAMP NOT NULL,
+        modified_time   TIMESTAMP NOT NULL,
+        synced_at       TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        CONSTRAINT uq_drive_files_user_id_file_id UNIQUE (user_id, file_id)
+    );
+
+    -- One index per listing order (keyset on sort key, id)
+    CREATE INDEX idx_drive_files_user_id_modified_time
+        ON drive_files (user_id, modified_time DESC, id DESC);
+    CREATE INDEX idx_drive_files_user_id_created_time
+        ON drive_files (user_id, created_time DESC, id DESC);
+    CREATE INDEX idx_drive_files_user_id_name
+        ON drive_files (user_id, name, id);
+
+    -- Drive Changes API position per user
+    CREATE TABLE drive_sync_state (
+        user_id         INTEGER PRIMARY KEY
+            REFERENCES users
+                ON DELETE CASCADE,
+        page_token      VARCHAR NOT NULL,
+        synced_at       TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """)
+
+
+def downgrade() -> None:
+    """Drop drive_files and drive_sync_state tables."""
+    op.execute("""
+    DROP TABLE IF EXISTS drive_sync_state;
+    DROP TABLE IF EXISTS drive_files;
+    """)
@@ -0,0 +1,44 @@
+"""create drive_upload_sessions table
+
+Revision ID: i9j0k1l2m3n4
+Revises: h8i9j0k1l2m3
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'i9j0k1l2m3n4'
+down_revision: Union[str, Sequence[str], None] = 'h8i9j0k1l2m3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Track Drive resumable upload sessions the browser uploads to directly."""
+    op.execute("""
+    CREATE TABLE drive_upload_sessions (
+        id              SERIAL PRIMARY KEY,
+        user_id         INTEGER NOT NULL
+            REFERENCES users
+                ON DELETE CASCADE,
+        session_uri     TEXT NOT NULL,
+        file_name       VARCHAR NOT NULL,
+        mime_type       VARCHAR(255) NOT NULL,
+        size            BIGINT NOT NULL,
+        file_id         VARCHAR,
+        created_at      TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        completed_at    TIMESTAMP
+    );
+    """)
+
+
+def downgrade() -> None:
+    """Drop drive_upload_sessions table."""
+    op.execute("""
+    DROP TABLE IF EXISTS drive_upload_sessions;
+    """)
@@ -0,0 +1,53 @@
+"""create n8n_outbox table
+
+Revision ID: j0k1l2m3n4o5
+Revises: i9j0k1l2m3n4
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'j0k1l2m3n4o5'
+down_revision: Union[str, Sequence[str], None] = 'i9j0k1l2m3n4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Queue n8n file summaries so a background dispatcher delivers (and retries) them."""
+    op.execute("""
+    CREATE TABLE n8n_outbox (
+        id              SERIAL PRIMARY KEY,
+        user_id         INTEGER NOT NULL
+            REFERENCES users
+                ON DELETE CASCADE,
+        file_id         VARCHAR NOT NULL,
+        file_name       VARCHAR NOT NULL,
+        mime_type       VARCHAR(255) NOT NULL,
+        size            BIGINT NOT NULL,
+        status          VARCHAR(16) NOT NULL DEFAULT 'pending'
+            CHECK (status IN ('pending', 'sent', 'dead')),
+        attempts        INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        last_error      TEXT,
+        created_at      TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        sent_at         TIMESTAMP
+    );
+
+    -- Only undelivered entries are claimed, in the order they are due
+    CREATE INDEX idx_n8n_outbox_pending_next_attempt_at
+        ON n8n_outbox (next_attempt_at, id)
+        WHERE status = 'pending';
+    """)
+
+
+def downgrade() -> None:
+    """Drop n8n_outbox table."""
+    op.execute("""
+    DROP TABLE IF EXISTS n8n_outbox;
+    """)
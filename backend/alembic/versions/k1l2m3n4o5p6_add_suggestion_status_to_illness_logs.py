@@ -0,0 +1,47 @@
+"""add suggestion_status to illness_logs
+
+Revision ID: k1l2m3n4o5p6
+Revises: j0k1l2m3n4o5
+Create Date: 2026-10-17 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'k1l2m3n4o5p6'
+down_revision: Union[str, Sequence[str], None] = 'j0k1l2m3n4o5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Track AI suggestions generated in the background after the illness log is created."""
+    op.execute("""
+    ALTER TABLE illness_logs
+        ADD COLUMN suggestion_status VARCHAR(16) NOT NULL DEFAULT 'none'
+            CHECK (suggestion_status IN ('none', 'pending', 'ready', 'failed')),
+        ADD COLUMN suggestion_attempts INTEGER NOT NULL DEFAULT 0,
+        ADD COLUMN suggestion_next_attempt_at TIMESTAMP;
+
+    UPDATE illness_logs SET suggestion_status = 'ready' WHERE ai_suggestion IS NOT NULL;
+
+    -- Only logs still waiting for a suggestion are claimed, in the order they are due
+    CREATE INDEX idx_illness_logs_pending_suggestion
+        ON illness_logs (suggestion_next_attempt_at, id)
+        WHERE suggestion_status = 'pending';
+    """)
+
+
+def downgrade() -> None:
+    """Remove the suggestion status columns from illness_logs."""
+    op.execute("""
+    DROP INDEX IF EXISTS idx_illness_logs_pending_suggestion;
+    ALTER TABLE illness_logs
+        DROP COLUMN suggestion_next_attempt_at,
+        DROP COLUMN suggestion_attempts,
+        DROP COLUMN suggestion_status;
+    """)
@@ -0,0 +1,32 @@
+"""add content_path to n8n_outbox
+
+Revision ID: l2m3n4o5p6q7
+Revises: k1l2m3n4o5p6
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'l2m3n4o5p6q7'
+down_revision: Union[str, Sequence[str], None] = 'k1l2m3n4o5p6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Keep a local copy of an uploaded file with its outbox entry until the summary is delivered."""
+    op.execute("""
+    ALTER TABLE n8n_outbox ADD COLUMN content_path VARCHAR;
+    """)
+
+
+def downgrade() -> None:
+    """Remove content_path from n8n_outbox."""
+    op.execute("""
+    ALTER TABLE n8n_outbox DROP COLUMN content_path;
+    """)
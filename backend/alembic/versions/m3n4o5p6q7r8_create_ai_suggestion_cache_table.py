@@ -0,0 +1,39 @@
+"""create ai_suggestion_cache table
+
+Revision ID: m3n4o5p6q7r8
+Revises: l2m3n4o5p6q7
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'm3n4o5p6q7r8'
+down_revision: Union[str, Sequence[str], None] = 'l2m3n4o5p6q7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Cache AI home-remedy suggestions by normalized illness and notes, per model and prompt."""
+    op.execute("""
+    CREATE TABLE ai_suggestion_cache (
+        illness_name VARCHAR(255) NOT NULL,
+        notes_digest VARCHAR(64) NOT NULL,
+        model VARCHAR(255) NOT NULL,
+        prompt_version INTEGER NOT NULL,
+        suggestion TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        expires_at TIMESTAMP NOT NULL,
+        PRIMARY KEY (illness_name, notes_digest, model, prompt_version)
+    );
+    """)
+
+
+def downgrade() -> None:
+    """Drop the ai_suggestion_cache table."""
+    op.execute("DROP TABLE IF EXISTS ai_suggestion_cache;")
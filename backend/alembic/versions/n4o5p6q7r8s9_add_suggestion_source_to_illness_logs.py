@@ -0,0 +1,32 @@
+"""add suggestion_source to illness_logs
+
+Revision ID: n4o5p6q7r8s9
+Revises: m3n4o5p6q7r8
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'n4o5p6q7r8s9'
+down_revision: Union[str, Sequence[str], None] = 'm3n4o5p6q7r8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Record where each illness log's AI suggestion came from (NULL for suggestions stored before this)."""
+    op.execute("""
+    ALTER TABLE illness_logs
+        ADD COLUMN suggestion_source VARCHAR(16)
+            CHECK (suggestion_source IN ('model', 'cache', 'fallback', 'user'));
+    """)
+
+
+def downgrade() -> None:
+    """Remove suggestion_source from illness_logs."""
+    op.execute("ALTER TABLE illness_logs DROP COLUMN suggestion_source;")
@@ -0,0 +1,59 @@
+"""create refresh_tokens table
+
+Revision ID: o5p6q7r8s9t0
+Revises: n4o5p6q7r8s9
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'o5p6q7r8s9t0'
+down_revision: Union[str, Sequence[str], None] = 'n4o5p6q7r8s9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Store rotating refresh tokens (SHA-256 hashes only), grouped in families per login."""
+    op.execute("""
+    CREATE TABLE refresh_tokens (
+        id          SERIAL PRIMARY KEY,
+        user_id     INTEGER NOT NULL
+            REFERENCES users
+                ON DELETE CASCADE,
+        token_hash  VARCHAR(64) NOT NULL,
+        family_id   UUID NOT NULL,
+        created_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        expires_at  TIMESTAMP NOT NULL,
+        rotated_at  TIMESTAMP,
+        revoked_at  TIMESTAMP
+    );
+    """)
+
+    # /auth/refresh looks a token up by its hash
+    op.execute("""
+    CREATE UNIQUE INDEX idx_refresh_tokens_token_hash
+    ON refresh_tokens (token_hash);
+    """)
+
+    # Reuse of a rotated token revokes its whole family
+    op.execute("""
+    CREATE INDEX idx_refresh_tokens_family_id
+    ON refresh_tokens (family_id);
+    """)
+
+    # Expired tokens are deleted per user at login (and with the user)
+    op.execute("""
+    CREATE INDEX idx_refresh_tokens_user_id
+    ON refresh_tokens (user_id);
+    """)
+
+
+def downgrade() -> None:
+    """Drop the refresh_tokens table."""
+    op.execute("DROP TABLE IF EXISTS refresh_tokens;")
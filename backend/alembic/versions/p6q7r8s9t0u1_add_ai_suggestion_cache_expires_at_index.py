@@ -0,0 +1,31 @@
+"""add expires_at index to ai_suggestion_cache
+
+Revision ID: p6q7r8s9t0u1
+Revises: o5p6q7r8s9t0
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'p6q7r8s9t0u1'
+down_revision: Union[str, Sequence[str], None] = 'o5p6q7r8s9t0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Index ai_suggestion_cache by expiry so expired rows can be found and deleted cheaply."""
+    op.execute("""
+    CREATE INDEX idx_ai_suggestion_cache_expires_at
+        ON ai_suggestion_cache (expires_at);
+    """)
+
+
+def downgrade() -> None:
+    """Drop the ai_suggestion_cache expiry index."""
+    op.execute("DROP INDEX IF EXISTS idx_ai_suggestion_cache_expires_at;")
@@ -0,0 +1,76 @@
+"""Provisioning of a user's Google resources (Drive folder, LIFELINE calendar) off the login request."""
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from google.oauth2.credentials import Credentials
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AccountProvisioner:
+    """Finds or creates a user's Drive folder and LIFELINE calendar in a bounded thread pool.
+
+    - The OAuth callback returns the JWT as soon as the user row is written and
+      hands the user's jobs to provision(); the folder and the calendar are set
+      up concurrently, at most `max_workers` jobs at a time per worker
+    - Each job is idempotent: serialized per user with an advisory lock and a
+      no-op once the ID is stored. A job lost on restart, or run twice by
+      concurrent logins, is harmless, and a request that needs the folder or the
+      calendar before its job finished finds or creates it itself
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="account-provisioning")
+            return self._executor
+
+    def provision(self, user_id: int, credentials: Credentials,
+                  jobs: Dict[str, Callable[[int, Credentials], str]]) -> List[Future]:
+        """Start each `job(user_id, credentials)` (a resource name -> its find-or-create); returns the futures."""
+        with self._lock:
+            self.submitted += len(jobs)
+        return [self._pool().submit(self._run, name, job, user_id, credentials) for name, job in jobs.items()]
+
+    def _run(self, name: str, job: Callable[[int, Credentials], str], user_id: int, credentials: Credentials):
+        try:
+            resource_id = job(user_id, credentials)
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            logger.warning(f"Could not set up the {name} for user {user_id}: {e}")
+            return None
+        with self._lock:
+            self.completed += 1
+        logger.info(f"Ensured the {name} exists for user {user_id}: {resource_id}")
+        return resource_id
+
+    def shutdown(self):
+        """Drop jobs that have not started and wait for running ones (from the app lifespan)."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return job counters for this worker."""
+        return {
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+# Global account provisioner instance
+account_provisioner = AccountProvisioner(max_workers=settings.account_provisioning_threads)
@@ -0,0 +1,179 @@
+"""In-process caches shared across requests within a worker."""
+import threading
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+from cachetools import LRUCache, TTLCache
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class UserCache:
+    """Bounded, TTL-based cache of authenticated users keyed by user id.
+
+    Only the fields handlers read are cached (never OAuth tokens). Entries are
+    invalidated when a UserDAO update that changes them commits; the TTL bounds staleness
+    for changes made by other workers.
+    """
+
+    FIELDS = ("id", "email", "name", "drive_folder_id", "lifeline_calendar_id")
+
+    def __init__(self, max_size: int, ttl: float):
+        self._cache = TTLCache(maxsize=max_size, ttl=ttl)
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a load racing with an update is not cached
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, user_id: int, loader: Callable[[int], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """Return the cached user, calling `loader(user_id)` on a miss."""
+        with self._lock:
+            user = self._cache.get(user_id)
+            if user is not None:
+                self.hits += 1
+                return dict(user)
+            self.misses += 1
+            version = self._version
+
+        user = loader(user_id)
+        if user is None:
+            return None
+
+        user = {field: user.get(field) for field in self.FIELDS}
+        with self._lock:
+            if self._version == version:
+                self._cache[user_id] = user
+        return dict(user)
+
+    def invalidate(self, user_id: int):
+        """Drop a user from the cache."""
+        with self._lock:
+            self._cache.pop(user_id, None)
+            self._version += 1
+        logger.debug(f"Invalidated cached user {user_id}")
+
+    def clear(self):
+        """Drop all cached users and reset the counters."""
+        with self._lock:
+            self._cache.clear()
+            self._version += 1
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._cache),
+                "max_size": self._cache.maxsize,
+            }
+
+
+class GoogleCredentialsCache:
+    """Bounded cache of users' Google OAuth credentials keyed by user id.
+
+    An entry is served until its access token is within `refresh_margin` seconds
+    of expiring, instead of for a fixed TTL. Loads are single-flight per user: one
+    thread runs the loader (which may refresh the token) while the others wait for
+    its result. Entries are invalidated when a GoogleCredentialsDAO write that
+    replaces or deletes credentials commits.
+    """
+
+    # Per-user refresh locks are striped so memory stays bounded
+    LOCK_STRIPES = 64
+
+    def __init__(self, max_size: int, refresh_margin: float):
+        self._cache = LRUCache(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._load_locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+        self.refresh_margin = refresh_margin
+        # Bumped on every invalidation so a load racing with an update is not cached
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def is_fresh(self, credentials: Dict[str, Any]) -> bool:
+        """Return True if the access token is valid for longer than the refresh margin.
+
+        `token_expiry` is naive UTC, as stored in user_google_credentials.
+        """
+        expiry = credentials.get("token_expiry")
+        if expiry is None:
+            return False
+        return (expiry - datetime.utcnow()).total_seconds() > self.refresh_margin
+
+    def _get_fresh(self, user_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            credentials = self._cache.get(user_id)
+            if credentials is not None and self.is_fresh(credentials):
+                self.hits += 1
+                return dict(credentials)
+            return None
+
+    def get_or_load(self, user_id: int, loader: Callable[[int], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """Return fresh cached credentials, calling `loader(user_id)` at most once at a time per user."""
+        credentials = self._get_fresh(user_id)
+        if credentials is not None:
+            return credentials
+
+        with self._load_locks[hash(user_id) % self.LOCK_STRIPES]:
+            # Another thread may have loaded (and refreshed) while we waited
+            credentials = self._get_fresh(user_id)
+            if credentials is not None:
+                return credentials
+            with self._lock:
+                self.misses += 1
+                version = self._version
+
+            credentials = loader(user_id)
+            if credentials is None:
+                return None
+
+            credentials = dict(credentials)
+            with self._lock:
+                if self._version == version:
+                    self._cache[user_id] = credentials
+            return dict(credentials)
+
+    def invalidate(self, user_id: int):
+        """Drop a user's credentials from the cache."""
+        with self._lock:
+            self._cache.pop(user_id, None)
+            self._version += 1
+        logger.debug(f"Invalidated cached Google credentials for user {user_id}")
+
+    def clear(self):
+        """Drop all cached credentials and reset the counters."""
+        with self._lock:
+            self._cache.clear()
+            self._version += 1
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._cache),
+                "max_size": self._cache.maxsize,
+            }
+
+
+# Global user cache instance
+user_cache = UserCache(max_size=settings.user_cache_max_size, ttl=settings.user_cache_ttl_seconds)
+
+# Global Google credentials cache instance
+google_credentials_cache = GoogleCredentialsCache(
+    max_size=settings.google_credentials_cache_max_size,
+    refresh_margin=settings.google_credentials_refresh_margin_seconds,
+)
@@ -1,4 +1,6 @@
 """Configuration settings for the LifeLine backend application."""
+import os
+import tempfile
 from pydantic_settings import BaseSettings
 from typing import Optional
 
@@ -8,19 +10,94 @@ class Settings(BaseSettings):
     
     # Database
     database_url: str
+    # Connection pool (per gunicorn worker process)
+    db_pool_min_size: int = 1
+    db_pool_max_size: int = 10
+    db_pool_timeout: float = 30.0  # seconds to wait for a free connection
+    db_pool_max_lifetime: float = 1800.0  # seconds before a connection is recycled
+    db_pool_health_check_interval: float = 30.0  # idle seconds before a connection is pinged on checkout
     
+    # Authenticated user cache (per worker)
+    user_cache_max_size: int = 1024
+    user_cache_ttl_seconds: float = 60.0
+    
+    # List endpoints (keyset pagination)
+    pagination_default_limit: int = 50
+    pagination_max_limit: int = 200
+    # Batch write endpoints
+    batch_max_items: int = 100
+
     # Google OAuth
     google_client_id: str
     google_client_secret: str
     google_redirect_uri: str
+    # Google credentials cache (per worker)
+    google_credentials_cache_max_size: int = 1024
+    google_credentials_refresh_margin_seconds: float = 300.0  # refresh tokens this close to expiry
+    # Pooled Google API clients (per worker)
+    google_client_cache_max_size: int = 256  # (user, API) pools kept, least recently used evicted
+    google_client_pool_size: int = 4  # idle clients kept per (user, API)
+    google_http_timeout: float = 30.0  # seconds
+    # A new login's Drive folder and LIFELINE calendar are set up in the background (threads per worker)
+    account_provisioning_threads: int = 4
+    # Drive file listing (local copy kept current with the Changes API)
+    drive_sync_interval_seconds: float = 30.0  # poll Drive for changes at most this often per user
+    # Drive uploads (bodies are spooled to disk by Starlette past 1 MB)
+    upload_max_size_bytes: int = 50 * 1024 * 1024  # larger /drive/upload requests get 413
+    drive_upload_chunk_size: int = 5 * 1024 * 1024  # resumable upload chunk, a multiple of 256 KiB
+    drive_download_chunk_size: int = 4 * 1024 * 1024  # bytes fetched per ranged request when streaming a download
+    google_drive_upload_url: str = "https://www.googleapis.com/upload/drive/v3/files"  # resumable sessions start here
 
     # N8N
     n8n_url: str
     n8n_api_key: str
     n8n_webhook_auth_key: str
+    # File summary outbox (delivered in the background by each worker)
+    n8n_outbox_concurrency: int = 4  # deliveries in flight per worker
+    n8n_outbox_max_attempts: int = 8  # then the entry is dead-lettered
+    n8n_outbox_backoff_seconds: float = 10.0  # first retry delay, doubled per attempt
+    n8n_outbox_max_backoff_seconds: float = 3600.0
+    n8n_outbox_poll_interval_seconds: float = 5.0  # queue poll when not woken by a new entry
+    n8n_outbox_lease_seconds: float = 300.0  # a claimed entry is retried after this if never reported back
+    n8n_http_timeout: float = 60.0  # seconds (the n8n pool has one connection per outbox delivery slot)
+    # Uploaded bytes are kept here until their summary is delivered (instead of fetched back from Drive)
+    n8n_outbox_spool_dir: str = os.path.join(tempfile.gettempdir(), "lifeline-n8n-outbox")
     
     # AI (Hugging Face - optional, works without key but with rate limits)
     huggingface_api_key: Optional[str] = None
+    # Illness log suggestions are generated in the background by each worker
+    ai_suggestion_concurrency: int = 4  # suggestions generated at once per worker
+    ai_suggestion_max_attempts: int = 3  # then the log's suggestion_status is 'failed'
+    ai_suggestion_backoff_seconds: float = 30.0  # first retry delay, doubled per attempt
+    ai_suggestion_max_backoff_seconds: float = 600.0
+    ai_suggestion_poll_interval_seconds: float = 5.0  # queue poll when not woken by a new log
+    ai_suggestion_lease_seconds: float = 120.0  # a claimed log is retried after this if never reported back
+    ai_suggestion_events_timeout_seconds: float = 60.0  # the events stream gives up waiting after this
+    ai_suggestion_events_poll_seconds: float = 10.0  # re-read in case another worker process filled it
+    # New logs wait this long for a client's token stream to claim them before the worker generates them
+    ai_suggestion_stream_grace_seconds: float = 2.0
+    # Suggestions are cached by normalized illness name and notes (in-process LRU, then the shared table)
+    ai_suggestion_cache_max_size: int = 1024
+    ai_suggestion_cache_ttl_seconds: float = 30 * 24 * 3600.0
+    # Latency budget per suggestion, token streams included (keep it below the lease); past it (or after the
+    # last attempt) the curated fallback table answers
+    ai_suggestion_deadline_seconds: float = 15.0
+    ai_suggestion_fallback_enabled: bool = True
+    # A second, hedged request goes to this model (and endpoint, default the HF router) once the first has
+    # taken longer than the HuggingFace client's p95, or this long until there is latency history
+    ai_suggestion_hedge_model: Optional[str] = "meta-llama/Llama-3.1-8B-Instruct"  # empty disables hedging
+    ai_suggestion_hedge_url: Optional[str] = None
+    ai_suggestion_hedge_after_seconds: float = 5.0
+    
+    # Outbound HTTP: one pooled client per upstream per worker, opened by the app lifespan
+    http2_enabled: bool = True  # used when the h2 package is installed
+    http_connect_timeout: float = 5.0  # seconds
+    http_keepalive_expiry_seconds: float = 60.0  # idle connections are closed after this
+    http_retry_budget_ratio: float = 0.1  # retries earned per request, per upstream
+    http_retry_budget_max: float = 10.0  # retries that can be banked, per upstream
+    huggingface_http_timeout: float = 30.0  # seconds
+    huggingface_max_connections: int = 8
+    huggingface_max_retries: int = 2  # per request, on connect errors, 429 and 502-504
     
     # Feature Toggles - AI Features
     feature_ai_chat_enabled: bool = True
@@ -31,9 +108,17 @@ class Settings(BaseSettings):
     jwt_secret_key: str
     jwt_algorithm: str = "HS256"
     jwt_access_token_expire_minutes: int = 30
+    # Rotating refresh tokens (POST /auth/refresh); each rotation restarts the lifetime
+    jwt_refresh_token_expire_days: int = 30
+    # A rotated refresh token presented again within this many seconds is a concurrent refresh, not reuse
+    jwt_refresh_token_reuse_grace_seconds: float = 5.0
     
     # Server
     backend_port: int = 8080
+    # GET /metrics answers only requests sending this key in X-Metrics-Key; unset, the endpoint is off (404)
+    metrics_api_key: Optional[str] = None
+    # Threads per worker for sync endpoints/DAO calls (FastAPI's threadpool)
+    worker_threadpool_size: int = 40
     frontend_url: str = "http://localhost:4200"
     
     # Environment
@@ -2,7 +2,7 @@
 import logging
 from fastapi import APIRouter, HTTPException, status, Query
 from pydantic import BaseModel
-from app.services.auth_service import AuthService
+from app.services.auth_service import AuthService, InvalidRefreshTokenError
 from app.models.auth import Token
 from app.config import settings
 
@@ -16,6 +16,11 @@ class CallbackRequest(BaseModel):
     code: str
 
 
+class RefreshRequest(BaseModel):
+    """Request model for token refresh."""
+    refresh_token: str
+
+
 @router.get("/google-login")
 async def google_login():
     """Initiate Google OAuth login flow."""
@@ -27,14 +32,24 @@ async def google_login():
 
 
 @router.post("/callback")
-async def google_callback_post(request: CallbackRequest):
+def google_callback_post(request: CallbackRequest):
     """Handle Google OAuth callback via POST (from frontend)."""
     try:
         result = AuthService.handle_google_callback(request.code)
         return {
             "access_token": result["access_token"],
+            "refresh_token": result["refresh_token"],
             "token_type": "bearer",
             "user": result["user"],
         }
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/refresh")
+def refresh_token(request: RefreshRequest):
+    """Trade a refresh token for a new access token and refresh token, without Google."""
+    try:
+        return AuthService.refresh_access_token(request.refresh_token)
+    except InvalidRefreshTokenError as e:
+        raise HTTPException(status_code=401, detail=str(e))
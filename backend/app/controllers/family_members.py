@@ -1,37 +1,63 @@
 """Family members controller."""
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from typing import Optional
 from app.services.family_member_service import FamilyMemberService
-from app.models.family_member import FamilyMemberCreate, FamilyMemberUpdate, FamilyMemberResponse
-from app.utils.dependencies import get_current_user
+from app.models.family_member import FamilyMemberCreate, FamilyMemberBatchCreate, FamilyMemberUpdate, FamilyMemberResponse
+from app.models.pagination import Page
+from app.models.batch import BatchResult
+from app.config import settings
+from app.database import UnitOfWork
+from app.utils.dependencies import get_current_user, get_unit_of_work
 
 router = APIRouter()
 
 
-@router.get("", response_model=List[FamilyMemberResponse])
-async def get_family_members(current_user: dict = Depends(get_current_user)):
-    """Get all family members for the current user."""
-    members = FamilyMemberService.get_family_members(current_user["id"])
-    return members
+@router.get("", response_model=Page[FamilyMemberResponse])
+def get_family_members(
+    limit: int = Query(settings.pagination_default_limit, ge=1, le=settings.pagination_max_limit, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
+):
+    """Get family members for the current user, newest first, one page at a time."""
+    try:
+        return FamilyMemberService.get_family_members(current_user["id"], limit, cursor, connection=uow.connection)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
 
 
 @router.post("", response_model=FamilyMemberResponse, status_code=status.HTTP_201_CREATED)
-async def create_family_member(
+def create_family_member(
     member_data: FamilyMemberCreate,
     current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
 ):
     """Create a new family member."""
-    member = FamilyMemberService.create_family_member(current_user["id"], member_data)
+    member = FamilyMemberService.create_family_member(current_user["id"], member_data, connection=uow.connection)
     return member
 
 
+@router.post("/batch", response_model=BatchResult[FamilyMemberResponse])
+def create_family_members(
+    batch: FamilyMemberBatchCreate,
+    current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
+):
+    """Create several family members in one transaction (e.g. household onboarding)."""
+    return FamilyMemberService.create_family_members(current_user["id"], batch.items, connection=uow.connection)
+
+
 @router.get("/{member_id}", response_model=FamilyMemberResponse)
-async def get_family_member(
+def get_family_member(
     member_id: int,
     current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
 ):
     """Get a specific family member."""
-    member = FamilyMemberService.get_family_member(current_user["id"], member_id)
+    member = FamilyMemberService.get_family_member(current_user["id"], member_id, connection=uow.connection)
     if not member:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -41,13 +67,14 @@ async def get_family_member(
 
 
 @router.put("/{member_id}", response_model=FamilyMemberResponse)
-async def update_family_member(
+def update_family_member(
     member_id: int,
     member_data: FamilyMemberUpdate,
     current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
 ):
     """Update a family member."""
-    member = FamilyMemberService.update_family_member(current_user["id"], member_id, member_data)
+    member = FamilyMemberService.update_family_member(current_user["id"], member_id, member_data, connection=uow.connection)
     if not member:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -57,12 +84,13 @@ async def update_family_member(
 
 
 @router.delete("/{member_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_family_member(
+def delete_family_member(
     member_id: int,
     current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
 ):
     """Delete a family member."""
-    success = FamilyMemberService.delete_family_member(current_user["id"], member_id)
+    success = FamilyMemberService.delete_family_member(current_user["id"], member_id, connection=uow.connection)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
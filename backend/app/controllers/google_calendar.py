@@ -4,7 +4,8 @@ from pydantic import BaseModel
 from datetime import datetime
 from typing import Dict, List, Any
 from app.services.google_calendar_service import GoogleCalendarService
-from app.utils.dependencies import get_current_user
+from app.database import UnitOfWork
+from app.utils.dependencies import get_current_user, get_unit_of_work
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,13 +22,16 @@ class CalendarEventCreate(BaseModel):
 
 
 @router.get("/upcoming")
-async def get_upcoming_events(
+def get_upcoming_events(
     current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
 ) -> Dict[str, Any]:
     """
     Get upcoming events from the LIFELINE calendar for the next 7 days.
     Returns events grouped by date, with a maximum of 3 events per day.
     """
+    # Don't hold the request's pooled connection across Google API calls
+    uow.release()
     try:
         events = GoogleCalendarService.get_upcoming_events(
             user_id=current_user["id"],
@@ -50,9 +54,10 @@ async def get_upcoming_events(
 
 
 @router.post("/events")
-async def create_calendar_event(
+def create_calendar_event(
     event_data: CalendarEventCreate,
     current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
 ):
     """
     Create a calendar event.
@@ -60,6 +65,8 @@ async def create_calendar_event(
     TODO: Future MCP integration - This will connect to MCP server for intelligent scheduling.
     TODO: Future N8N integration - Trigger N8N workflows for automated scheduling.
     """
+    # Don't hold the request's pooled connection across Google API calls
+    uow.release()
     try:
         event = GoogleCalendarService.create_event(
             user_id=current_user["id"],
@@ -1,28 +1,59 @@
 """Google Drive controller."""
-from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File
-from typing import List, Dict, Any
-from app.services.n8n_service import N8NService
+from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File, Query, Header
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, Literal, Optional
+from datetime import date
+from urllib.parse import quote
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
 from app.services.google_drive_service import GoogleDriveService
-from app.utils.dependencies import get_current_user
+from app.database import UnitOfWork
+from app.n8n_outbox import n8n_outbox
+from app.models.drive_upload import DriveUploadSessionCreate, DriveUploadSessionResponse
+from app.models.drive_file import DriveFilePage
+from app.utils.dependencies import get_current_user, get_unit_of_work
+from app.utils.ranges import parse_range_header, RangeNotSatisfiable
 
 router = APIRouter()
 
 
-@router.get("/files")
-async def list_drive_files(current_user: dict = Depends(get_current_user)):
+@router.get("/files", response_model=DriveFilePage)
+def list_drive_files(
+    limit: int = Query(settings.pagination_default_limit, ge=1, le=settings.pagination_max_limit, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    sort: Literal["modified_time", "created_time", "name"] = Query(
+        "modified_time", description="Newest modified/created first, or by name"
+    ),
+    mime_type: Optional[str] = Query(None, description="Only include files of this MIME type"),
+    start_date: Optional[date] = Query(None, description="Only include files modified on or after this date"),
+    end_date: Optional[date] = Query(None, description="Only include files modified on or before this date"),
+    current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
+):
     """
-    List files from the user's 'LifeLine Records' folder in Google Drive.
+    List files from the user's 'LifeLine Records' folder in Google Drive, one page at a time.
     
     Returns empty list if credentials not set up.
     """
     import logging
     logger = logging.getLogger(__name__)
     try:
-        files = GoogleDriveService.list_files(current_user["id"])
-        return {"files": files, "connected": True}
+        after = GoogleDriveService.parse_cursor(cursor, sort) if cursor else None
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    # Don't hold the request's pooled connection across Google API calls
+    uow.release()
+    try:
+        page = GoogleDriveService.list_files(
+            current_user["id"], limit, after, sort, mime_type, start_date, end_date
+        )
+        return {"items": page["items"], "next_cursor": page["next_cursor"], "connected": True}
     except ValueError as e:
         # Credentials not found
-        return {"files": [], "connected": False, "message": str(e)}
+        return {"items": [], "next_cursor": None, "connected": False, "message": str(e)}
     except Exception as e:
         logger.exception(f"Error listing drive files for user {current_user['id']}")
         raise HTTPException(
@@ -35,34 +66,98 @@ async def list_drive_files(current_user: dict = Depends(get_current_user)):
 async def upload_file_to_drive(
     file: UploadFile = File(...),
     current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
 ):
     """
     Upload a file to the user's 'LifeLine Records' folder in Google Drive.
+
+    The body is spooled to disk by Starlette past 1 MB and capped at
+    UPLOAD_MAX_SIZE_BYTES; Drive streams from that spooled file. The n8n summary
+    is queued with the file record and delivered in the background.
     """
+    # Don't hold the request's pooled connection across Google API calls
+    await run_in_threadpool(uow.release)
     try:
-        # Read file content before uploading
-        file_content = await file.read()
-        
-        uploaded_file = GoogleDriveService.upload_file(
+        # Drive and DB clients are blocking, run them in the worker threadpool
+        await file.seek(0)
+        uploaded_file = await run_in_threadpool(
+            GoogleDriveService.upload_file,
             user_id=current_user["id"],
             file=file.file,
             file_name=file.filename,
             mimetype=file.content_type
         )
+        n8n_outbox.wake()
 
-        # Try to decode as text, fallback to base64 for binary files
-        await file.seek(0)
-        file_bytes = await file.read()
+        return {"file": uploaded_file, "message": "File uploaded successfully, summary queued"}
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error uploading file: {str(e)}",
+        )
 
-        N8NService.trigger_file_summary(
-            user_email=current_user["email"],
-            user_id=current_user["id"],
-            file_name=file.filename,
-            file_bytes=file_bytes,  # Send raw bytes, not text
-            mimetype=file.content_type
+
+@router.post("/upload-sessions", response_model=DriveUploadSessionResponse, status_code=status.HTTP_201_CREATED)
+def create_upload_session(
+    upload: DriveUploadSessionCreate,
+    origin: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
+):
+    """
+    Open a resumable upload session in the user's 'LifeLine Records' folder.
+
+    The browser PUTs the file to `upload_url` itself (the bytes never pass through
+    the API), then calls /upload-sessions/{id}/complete.
+    """
+    # Don't hold the request's pooled connection across Google API calls
+    uow.release()
+    try:
+        return GoogleDriveService.create_upload_session(
+            current_user["id"], upload.file_name, upload.mime_type, upload.size, origin=origin
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
         )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error creating upload session: {str(e)}",
+        )
+
 
-        return {"file": uploaded_file, "message": "File uploaded and processed successfully"}
+@router.post("/upload-sessions/{session_id}/complete")
+def complete_upload_session(
+    session_id: int,
+    current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
+):
+    """
+    Record a file the browser uploaded through an upload session and queue its summary.
+
+    Completing a session again returns the file without queueing another summary.
+    """
+    # Don't hold the request's pooled connection across Google API calls
+    uow.release()
+    try:
+        uploaded_file = GoogleDriveService.complete_upload_session(current_user["id"], session_id)
+        if uploaded_file is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Upload session not found",
+            )
+        n8n_outbox.wake()
+
+        return {"file": uploaded_file, "message": "File uploaded successfully, summary queued"}
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -71,15 +166,21 @@ async def upload_file_to_drive(
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error uploading file: {str(e)}",
+            detail=f"Error completing upload: {str(e)}",
         )
 
 
 @router.delete("/files/{file_id}")
-async def delete_drive_file(file_id: str, current_user: dict = Depends(get_current_user)):
+def delete_drive_file(
+    file_id: str,
+    current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
+):
     """
     Delete a file from the user's 'LifeLine Records' folder in Google Drive.
     """
+    # Don't hold the request's pooled connection across Google API calls
+    uow.release()
     try:
         GoogleDriveService.delete_file(user_id=current_user["id"], file_id=file_id)
         return {"message": "File deleted successfully"}
@@ -94,3 +195,70 @@ async def delete_drive_file(file_id: str, current_user: dict = Depends(get_curre
             detail=f"Error deleting file: {str(e)}",
         )
 
+
+@router.get("/files/{file_id}/content")
+def download_drive_file(
+    file_id: str,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_range: Optional[str] = Header(None, alias="If-Range"),
+    current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
+):
+    """
+    Stream a file from the user's 'LifeLine Records' folder in Google Drive.
+
+    Supports a single byte range (206) and If-Range; chunks are passed on as they
+    arrive from Drive, so the file is never buffered whole.
+    """
+    # Don't hold the request's pooled connection across Google API calls
+    uow.release()
+    try:
+        file = GoogleDriveService.get_file_metadata(current_user["id"], file_id)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error downloading file: {str(e)}",
+        )
+    if file is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found",
+        )
+
+    size = file["size"]
+    etag = f'"{file.get("md5Checksum") or file["modifiedTime"]}"'
+    quoted_name = quote(file["name"])
+    if quoted_name != file["name"]:
+        disposition = f"inline; filename*=utf-8''{quoted_name}"
+    else:
+        disposition = f'inline; filename="{file["name"]}"'
+    headers = {"Accept-Ranges": "bytes", "ETag": etag, "Content-Disposition": disposition}
+
+    byte_range = None
+    # A range only applies to the version the client already has part of
+    if if_range is None or if_range == etag:
+        try:
+            byte_range = parse_range_header(range_header, size)
+        except RangeNotSatisfiable:
+            raise HTTPException(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                detail="Requested range not satisfiable",
+                headers={"Content-Range": f"bytes */{size}"},
+            )
+
+    start, end = byte_range or (0, size - 1)
+    headers["Content-Length"] = str(end - start + 1)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    return StreamingResponse(
+        GoogleDriveService.iter_file_content(current_user["id"], file_id, start, end),
+        status_code=status.HTTP_206_PARTIAL_CONTENT if byte_range else status.HTTP_200_OK,
+        media_type=file["mimeType"],
+        headers=headers,
+    )
@@ -1,46 +1,76 @@
 """Illness logs controller."""
 from fastapi import APIRouter, HTTPException, status, Depends, Query
-from typing import List, Optional
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from datetime import date
 from app.services.illness_log_service import IllnessLogService
 from app.models.illness_log import IllnessLogCreate, IllnessLogUpdate, IllnessLogResponse
-from app.utils.dependencies import get_current_user
+from app.models.pagination import Page
+from app.config import settings
+from app.database import UnitOfWork
+from app.suggestion_worker import suggestion_worker
+from app.utils.dependencies import get_current_user, get_unit_of_work
 
 router = APIRouter()
 
 
-@router.get("", response_model=List[IllnessLogResponse])
-async def get_illness_logs(
+@router.get("", response_model=Page[IllnessLogResponse])
+def get_illness_logs(
     family_member_id: Optional[int] = Query(None, description="Filter by family member ID"),
+    limit: int = Query(settings.pagination_default_limit, ge=1, le=settings.pagination_max_limit, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    start_date: Optional[date] = Query(None, description="Only include illnesses that started on or after this date"),
+    end_date: Optional[date] = Query(None, description="Only include illnesses that started on or before this date"),
     current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
 ):
-    """Get all illness logs for the current user, optionally filtered by family member."""
-    logs = IllnessLogService.get_illness_logs(current_user["id"], family_member_id)
-    return logs
+    """Get illness logs for the current user, newest first, optionally filtered by family member."""
+    try:
+        return IllnessLogService.get_illness_logs(
+            current_user["id"], family_member_id, limit, cursor, start_date, end_date, connection=uow.connection
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
 
 
 @router.post("", response_model=IllnessLogResponse, status_code=status.HTTP_201_CREATED)
-async def create_illness_log(
+def create_illness_log(
     log_data: IllnessLogCreate,
     current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
 ):
-    """Create a new illness log."""
+    """
+    Create a new illness log.
+
+    Returns right away; with suggestion_status 'pending' the AI suggestion follows
+    in the background (poll the log, GET /{log_id}/suggestion/events, or stream it
+    with GET /{log_id}/suggestion/stream).
+    """
     try:
-        log = await IllnessLogService.create_illness_log(current_user["id"], log_data)
-        return log
+        log = IllnessLogService.create_illness_log(current_user["id"], log_data, connection=uow.connection)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e),
         )
+    if log["suggestion_status"] == "pending":
+        # Commit first, so the suggestion worker can claim the new log once a streaming client had its chance
+        uow.release()
+        suggestion_worker.wake(settings.ai_suggestion_stream_grace_seconds)
+    return log
 
 
 @router.get("/{log_id}", response_model=IllnessLogResponse)
-async def get_illness_log(
+def get_illness_log(
     log_id: int,
     current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
 ):
     """Get a specific illness log."""
-    log = IllnessLogService.get_illness_log(current_user["id"], log_id)
+    log = IllnessLogService.get_illness_log(current_user["id"], log_id, connection=uow.connection)
     if not log:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -49,14 +79,71 @@ async def get_illness_log(
     return log
 
 
+@router.get("/{log_id}/suggestion/events")
+def stream_suggestion_events(
+    log_id: int,
+    current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
+):
+    """
+    Server-sent events for the log's AI suggestion.
+
+    Sends one `suggestion` event ({id, suggestion_status, suggestion_source, ai_suggestion}) as soon as
+    the suggestion is no longer pending, or after AI_SUGGESTION_EVENTS_TIMEOUT_SECONDS.
+    """
+    log = IllnessLogService.get_illness_log(current_user["id"], log_id, connection=uow.connection)
+    if not log:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Illness log not found",
+        )
+    # Don't hold the request's pooled connection while the stream waits
+    uow.release()
+    return StreamingResponse(
+        IllnessLogService.suggestion_events(current_user["id"], log),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{log_id}/suggestion/stream")
+def stream_suggestion(
+    log_id: int,
+    current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
+):
+    """
+    Server-sent events streaming the log's AI suggestion token by token.
+
+    Sends `token` events ({text}) while the model writes the suggestion, then one
+    `suggestion` event as GET /{log_id}/suggestion/events does; its ai_suggestion
+    is the stored text. A log already being generated elsewhere gets only the
+    `suggestion` event.
+    """
+    log = IllnessLogService.get_illness_log(current_user["id"], log_id, connection=uow.connection)
+    if not log:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Illness log not found",
+        )
+    # Don't hold the request's pooled connection while the stream runs
+    uow.release()
+    return StreamingResponse(
+        IllnessLogService.stream_suggestion(current_user["id"], log),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.put("/{log_id}", response_model=IllnessLogResponse)
-async def update_illness_log(
+def update_illness_log(
     log_id: int,
     log_data: IllnessLogUpdate,
     current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
 ):
     """Update an illness log."""
-    log = IllnessLogService.update_illness_log(current_user["id"], log_id, log_data)
+    log = IllnessLogService.update_illness_log(current_user["id"], log_id, log_data, connection=uow.connection)
     if not log:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -66,12 +153,13 @@ async def update_illness_log(
 
 
 @router.delete("/{log_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_illness_log(
+def delete_illness_log(
     log_id: int,
     current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
 ):
     """Delete an illness log."""
-    success = IllnessLogService.delete_illness_log(current_user["id"], log_id)
+    success = IllnessLogService.delete_illness_log(current_user["id"], log_id, connection=uow.connection)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -1,21 +1,27 @@
 """Medication usage controller."""
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from typing import Optional
+from datetime import date
 from app.services.medication_usage_service import MedicationUsageService
-from app.models.medication_usage import MedicationUsageCreate, MedicationUsageResponse
-from app.utils.dependencies import get_current_user
+from app.models.medication_usage import MedicationUsageCreate, MedicationUsageBatchCreate, MedicationUsageResponse
+from app.models.pagination import Page
+from app.models.batch import BatchResult
+from app.config import settings
+from app.database import UnitOfWork
+from app.utils.dependencies import get_current_user, get_unit_of_work
 
 router = APIRouter()
 
 
 @router.post("", response_model=MedicationUsageResponse, status_code=status.HTTP_201_CREATED)
-async def log_medication_usage(
+def log_medication_usage(
     usage_data: MedicationUsageCreate,
     current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
 ):
     """Log medication usage by a family member."""
     try:
-        usage_log = MedicationUsageService.log_usage(current_user["id"], usage_data)
+        usage_log = MedicationUsageService.log_usage(current_user["id"], usage_data, connection=uow.connection)
         return usage_log
     except ValueError as e:
         raise HTTPException(
@@ -24,9 +30,33 @@ async def log_medication_usage(
         )
 
 
-@router.get("", response_model=List[MedicationUsageResponse])
-async def get_usage_logs(current_user: dict = Depends(get_current_user)):
-    """Get all medication usage logs for the current user."""
-    logs = MedicationUsageService.get_usage_logs(current_user["id"])
-    return logs
+@router.post("/batch", response_model=BatchResult[MedicationUsageResponse])
+def log_medication_usage_batch(
+    batch: MedicationUsageBatchCreate,
+    current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
+):
+    """Log several medication usages in one transaction; items that fail validation are reported per item."""
+    return MedicationUsageService.log_usage_batch(current_user["id"], batch.items, connection=uow.connection)
+
+
+@router.get("", response_model=Page[MedicationUsageResponse])
+def get_usage_logs(
+    limit: int = Query(settings.pagination_default_limit, ge=1, le=settings.pagination_max_limit, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    start_date: Optional[date] = Query(None, description="Only include entries on or after this date"),
+    end_date: Optional[date] = Query(None, description="Only include entries on or before this date"),
+    current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
+):
+    """Get medication usage logs for the current user, newest first, one page at a time."""
+    try:
+        return MedicationUsageService.get_usage_logs(
+            current_user["id"], limit, cursor, start_date, end_date, connection=uow.connection
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
 
@@ -1,37 +1,63 @@
 """Medications controller."""
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from typing import Optional
 from app.services.medication_service import MedicationService
-from app.models.medication import MedicationCreate, MedicationUpdate, MedicationResponse
-from app.utils.dependencies import get_current_user
+from app.models.medication import MedicationCreate, MedicationBatchCreate, MedicationUpdate, MedicationResponse
+from app.models.pagination import Page
+from app.models.batch import BatchResult
+from app.config import settings
+from app.database import UnitOfWork
+from app.utils.dependencies import get_current_user, get_unit_of_work
 
 router = APIRouter()
 
 
-@router.get("", response_model=List[MedicationResponse])
-async def get_medications(current_user: dict = Depends(get_current_user)):
-    """Get all medications for the current user."""
-    medications = MedicationService.get_medications(current_user["id"])
-    return medications
+@router.get("", response_model=Page[MedicationResponse])
+def get_medications(
+    limit: int = Query(settings.pagination_default_limit, ge=1, le=settings.pagination_max_limit, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
+):
+    """Get medications for the current user, ordered by name, one page at a time."""
+    try:
+        return MedicationService.get_medications(current_user["id"], limit, cursor, connection=uow.connection)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
 
 
 @router.post("", response_model=MedicationResponse, status_code=status.HTTP_201_CREATED)
-async def create_or_update_medication(
+def create_or_update_medication(
     medication_data: MedicationCreate,
     current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
 ):
     """Create a new medication or update quantity if it exists."""
-    medication = MedicationService.create_or_update_medication(current_user["id"], medication_data)
+    medication = MedicationService.create_or_update_medication(current_user["id"], medication_data, connection=uow.connection)
     return medication
 
 
+@router.post("/batch", response_model=BatchResult[MedicationResponse])
+def create_or_update_medications(
+    batch: MedicationBatchCreate,
+    current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
+):
+    """Create or update several medications in one transaction (e.g. a pharmacy receipt)."""
+    return MedicationService.create_or_update_medications(current_user["id"], batch.items, connection=uow.connection)
+
+
 @router.get("/{medication_id}", response_model=MedicationResponse)
-async def get_medication(
+def get_medication(
     medication_id: int,
     current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
 ):
     """Get a specific medication."""
-    medication = MedicationService.get_medication(current_user["id"], medication_id)
+    medication = MedicationService.get_medication(current_user["id"], medication_id, connection=uow.connection)
     if not medication:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -41,13 +67,20 @@ async def get_medication(
 
 
 @router.put("/{medication_id}", response_model=MedicationResponse)
-async def update_medication(
+def update_medication(
     medication_id: int,
     medication_data: MedicationUpdate,
     current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
 ):
     """Update a medication."""
-    medication = MedicationService.update_medication(current_user["id"], medication_id, medication_data)
+    try:
+        medication = MedicationService.update_medication(current_user["id"], medication_id, medication_data, connection=uow.connection)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
     if not medication:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -57,12 +90,13 @@ async def update_medication(
 
 
 @router.delete("/{medication_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_medication(
+def delete_medication(
     medication_id: int,
     current_user: dict = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
 ):
     """Delete a medication."""
-    success = MedicationService.delete_medication(current_user["id"], medication_id)
+    success = MedicationService.delete_medication(current_user["id"], medication_id, connection=uow.connection)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -4,6 +4,11 @@ from .family_member_dao import FamilyMemberDAO
 from .medication_dao import MedicationDAO
 from .medication_usage_dao import MedicationUsageDAO
 from .google_credentials_dao import GoogleCredentialsDAO
+from .drive_file_dao import DriveFileDAO
+from .drive_upload_session_dao import DriveUploadSessionDAO
+from .n8n_outbox_dao import N8NOutboxDAO
+from .ai_suggestion_cache_dao import AISuggestionCacheDAO
+from .refresh_token_dao import RefreshTokenDAO
 
 __all__ = [
     "UserDAO",
@@ -11,5 +16,10 @@ __all__ = [
     "MedicationDAO",
     "MedicationUsageDAO",
     "GoogleCredentialsDAO",
+    "DriveFileDAO",
+    "DriveUploadSessionDAO",
+    "N8NOutboxDAO",
+    "AISuggestionCacheDAO",
+    "RefreshTokenDAO",
 ]
 
@@ -0,0 +1,55 @@
+"""AI Suggestion Cache Data Access Object."""
+from typing import Dict, Any, Optional
+from app.database import db
+
+
+class AISuggestionCacheDAO:
+    """Data access operations for cached AI home-remedy suggestions."""
+
+    # Expired rows deleted per write, so a backlog is worked off without one long DELETE
+    PURGE_BATCH_SIZE = 100
+
+    @staticmethod
+    def get_suggestion(illness_name: str, notes_digest: str, model: str, prompt_version: int,
+                       connection=None) -> Optional[Dict[str, Any]]:
+        """Get an unexpired cached suggestion, with the seconds it has left."""
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute("""
+                SELECT suggestion, EXTRACT(EPOCH FROM expires_at - NOW())::float AS ttl_seconds
+                FROM ai_suggestion_cache
+                WHERE illness_name = %s AND notes_digest = %s AND model = %s AND prompt_version = %s
+                  AND expires_at > NOW()
+            """, (illness_name, notes_digest, model, prompt_version))
+            result = cursor.fetchone()
+            return dict(result) if result else None
+
+    @staticmethod
+    def put_suggestion(illness_name: str, notes_digest: str, model: str, prompt_version: int, suggestion: str,
+                       ttl_seconds: float, connection=None) -> None:
+        """Store a suggestion for `ttl_seconds`, replacing any cached one for the same key.
+
+        Also deletes up to PURGE_BATCH_SIZE expired rows: keys for an old model or
+        prompt version are never written again, so nothing else would remove them.
+        """
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute("""
+                INSERT INTO ai_suggestion_cache (illness_name, notes_digest, model, prompt_version, suggestion,
+                                                 expires_at)
+                VALUES (%s, %s, %s, %s, %s, NOW() + %s * INTERVAL '1 second')
+                ON CONFLICT (illness_name, notes_digest, model, prompt_version)
+                DO UPDATE SET suggestion = EXCLUDED.suggestion,
+                              created_at = CURRENT_TIMESTAMP,
+                              expires_at = EXCLUDED.expires_at
+            """, (illness_name, notes_digest, model, prompt_version, suggestion, ttl_seconds))
+            # SKIP LOCKED: rows another writer is replacing or purging are left to it
+            cursor.execute("""
+                DELETE FROM ai_suggestion_cache
+                WHERE (illness_name, notes_digest, model, prompt_version) IN (
+                    SELECT illness_name, notes_digest, model, prompt_version
+                    FROM ai_suggestion_cache
+                    WHERE expires_at <= NOW()
+                    ORDER BY expires_at
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+            """, (AISuggestionCacheDAO.PURGE_BATCH_SIZE,))
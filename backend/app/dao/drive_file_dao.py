@@ -0,0 +1,146 @@
+"""Drive File Data Access Object."""
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import date
+from psycopg2.extras import execute_values
+from app.database import db
+
+# Listing orders: sort key -> (column, direction). Each has a matching (user_id, column, id) index.
+SORT_ORDERS = {
+    "modified_time": ("modified_time", "DESC"),
+    "created_time": ("created_time", "DESC"),
+    "name": ("name", "ASC"),
+}
+
+
+class DriveFileDAO:
+    """Data access operations for the local copy of users' Drive file listings."""
+
+    @staticmethod
+    def upsert_files(user_id: int, files: List[Dict[str, Any]], connection=None):
+        """Insert or update file metadata rows with one multi-row INSERT ... ON CONFLICT.
+
+        File IDs must be unique within `files` (a row cannot be upserted twice in one statement).
+        """
+        if not files:
+            return
+        values = [
+            (user_id, file["file_id"], file["name"], file["mime_type"], file.get("size"),
+             file["created_time"], file["modified_time"])
+            for file in files
+        ]
+        with db.get_cursor(connection=connection) as cursor:
+            execute_values(cursor, """
+                INSERT INTO drive_files (user_id, file_id, name, mime_type, size, created_time, modified_time)
+                VALUES %s
+                ON CONFLICT (user_id, file_id)
+                DO UPDATE SET
+                    name = EXCLUDED.name,
+                    mime_type = EXCLUDED.mime_type,
+                    size = EXCLUDED.size,
+                    created_time = EXCLUDED.created_time,
+                    modified_time = EXCLUDED.modified_time,
+                    synced_at = CURRENT_TIMESTAMP
+            """, values, template="(%s, %s, %s, %s, %s::bigint, %s::timestamp, %s::timestamp)", page_size=len(values))
+
+    @staticmethod
+    def delete_files(user_id: int, file_ids: List[str], connection=None):
+        """Delete the rows of the given Drive file IDs."""
+        if not file_ids:
+            return
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute("""
+                DELETE FROM drive_files
+                WHERE user_id = %s AND file_id = ANY(%s)
+            """, (user_id, list(file_ids)))
+
+    @staticmethod
+    def delete_files_except(user_id: int, file_ids: List[str], connection=None):
+        """Delete every row of the user except the given Drive file IDs (after a full listing)."""
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute("""
+                DELETE FROM drive_files
+                WHERE user_id = %s AND NOT (file_id = ANY(%s))
+            """, (user_id, list(file_ids)))
+
+    @staticmethod
+    def get_files_by_user_id(
+        user_id: int,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[Any, int]] = None,
+        sort: str = "modified_time",
+        mime_type: Optional[str] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        connection=None
+    ) -> List[Dict[str, Any]]:
+        """Get a user's files in one of the SORT_ORDERS.
+
+        Keyset pagination: `after` is the (sort key, id) of the last row already seen.
+        `start_date`/`end_date` are inclusive calendar days of modified_time.
+        """
+        column, direction = SORT_ORDERS[sort]
+        conditions = ["user_id = %s"]
+        values = [user_id]
+
+        if after is not None:
+            conditions.append(f"({column}, id) {'<' if direction == 'DESC' else '>'} (%s, %s)")
+            values.extend(after)
+        if mime_type is not None:
+            conditions.append("mime_type = %s")
+            values.append(mime_type)
+        if start_date is not None:
+            conditions.append("modified_time >= %s")
+            values.append(start_date)
+        if end_date is not None:
+            conditions.append("modified_time < %s::date + 1")
+            values.append(end_date)
+
+        limit_clause = ""
+        if limit is not None:
+            limit_clause = "LIMIT %s"
+            values.append(limit)
+
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute(f"""
+                SELECT id, file_id, name, mime_type, size, created_time, modified_time, synced_at
+                FROM drive_files
+                WHERE {' AND '.join(conditions)}
+                ORDER BY {column} {direction}, id {direction}
+                {limit_clause}
+            """, values)
+            return [dict(row) for row in cursor.fetchall()]
+
+    @staticmethod
+    def get_sync_state(user_id: int, connection=None) -> Optional[Dict[str, Any]]:
+        """Get the user's Changes API page token and how many seconds ago it was stored."""
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute("""
+                SELECT user_id, page_token, synced_at,
+                       EXTRACT(EPOCH FROM CURRENT_TIMESTAMP - synced_at)::float AS age_seconds
+                FROM drive_sync_state
+                WHERE user_id = %s
+            """, (user_id,))
+            result = cursor.fetchone()
+            return dict(result) if result else None
+
+    @staticmethod
+    def advance_page_token(user_id: int, old_token: Optional[str], new_token: str, connection=None) -> bool:
+        """Move the user's page token from `old_token` (None: no token yet) to `new_token`.
+
+        Returns False if another request moved it first; the changes that request
+        fetched are the same ones, so the caller drops its own.
+        """
+        with db.get_cursor(connection=connection) as cursor:
+            if old_token is None:
+                cursor.execute("""
+                    INSERT INTO drive_sync_state (user_id, page_token)
+                    VALUES (%s, %s)
+                    ON CONFLICT (user_id) DO NOTHING
+                """, (user_id, new_token))
+            else:
+                cursor.execute("""
+                    UPDATE drive_sync_state
+                    SET page_token = %s, synced_at = CURRENT_TIMESTAMP
+                    WHERE user_id = %s AND page_token = %s
+                """, (new_token, user_id, old_token))
+            return cursor.rowcount == 1
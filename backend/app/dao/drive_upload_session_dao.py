@@ -0,0 +1,49 @@
+"""Drive Upload Session Data Access Object."""
+from typing import Dict, Any, Optional
+from app.database import db
+
+SESSION_COLUMNS = "id, user_id, session_uri, file_name, mime_type, size, file_id, created_at, completed_at"
+
+
+class DriveUploadSessionDAO:
+    """Data access operations for Drive resumable upload sessions."""
+
+    @staticmethod
+    def create_session(user_id: int, session_uri: str, file_name: str, mime_type: str, size: int,
+                       connection=None) -> Dict[str, Any]:
+        """Record a resumable upload session opened for the browser."""
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute(f"""
+                INSERT INTO drive_upload_sessions (user_id, session_uri, file_name, mime_type, size)
+                VALUES (%s, %s, %s, %s, %s)
+                RETURNING {SESSION_COLUMNS}
+            """, (user_id, session_uri, file_name, mime_type, size))
+            return dict(cursor.fetchone())
+
+    @staticmethod
+    def get_session(session_id: int, user_id: int, connection=None) -> Optional[Dict[str, Any]]:
+        """Get an upload session by ID for a specific user."""
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute(f"""
+                SELECT {SESSION_COLUMNS}
+                FROM drive_upload_sessions
+                WHERE id = %s AND user_id = %s
+            """, (session_id, user_id))
+            result = cursor.fetchone()
+            return dict(result) if result else None
+
+    @staticmethod
+    def complete_session(session_id: int, user_id: int, file_id: str, connection=None) -> Optional[Dict[str, Any]]:
+        """Mark a session completed with the uploaded file's ID.
+
+        Returns None if it was already completed, so only one caller acts on the upload.
+        """
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute(f"""
+                UPDATE drive_upload_sessions
+                SET file_id = %s, completed_at = CURRENT_TIMESTAMP
+                WHERE id = %s AND user_id = %s AND completed_at IS NULL
+                RETURNING {SESSION_COLUMNS}
+            """, (file_id, session_id, user_id))
+            result = cursor.fetchone()
+            return dict(result) if result else None
@@ -1,6 +1,7 @@
 """Family Member Data Access Object."""
-from typing import List, Dict, Any, Optional
-from datetime import date
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import date, datetime
+from psycopg2.extras import execute_values
 from app.database import db
 
 
@@ -21,15 +22,50 @@ class FamilyMemberDAO:
             return dict(cursor.fetchone())
     
     @staticmethod
-    def get_family_members_by_user_id(user_id: int, connection=None) -> List[Dict[str, Any]]:
-        """Get all family members for a user."""
+    def create_family_members(user_id: int, members: List[Dict[str, Any]], connection=None) -> List[Dict[str, Any]]:
+        """Create several family members with one multi-row INSERT; rows are returned in input order."""
+        if not members:
+            return []
+        values = [
+            (position, user_id, member["name"], member.get("date_of_birth"), member.get("gender"),
+             member.get("profession"), member.get("health_notes"))
+            for position, member in enumerate(members)
+        ]
         with db.get_cursor(connection=connection) as cursor:
-            cursor.execute("""
+            # Ids are assigned in ORDER BY position, so sorting by id restores input order
+            rows = execute_values(cursor, """
+                INSERT INTO family_members (user_id, name, date_of_birth, gender, profession, health_notes)
+                SELECT user_id, name, date_of_birth, gender, profession, health_notes
+                FROM (VALUES %s) AS v (position, user_id, name, date_of_birth, gender, profession, health_notes)
+                ORDER BY position
+                RETURNING id, user_id, name, date_of_birth, gender, profession, health_notes, created_at, updated_at
+            """, values, template="(%s, %s, %s, %s::date, %s, %s, %s)", page_size=len(values), fetch=True)
+            return sorted((dict(row) for row in rows), key=lambda row: row["id"])
+    
+    @staticmethod
+    def get_family_members_by_user_id(user_id: int, limit: Optional[int] = None, after: Optional[Tuple[datetime, int]] = None,
+                                      connection=None) -> List[Dict[str, Any]]:
+        """Get family members for a user, newest first (keyset pagination: `after` is the last (created_at, id) seen)."""
+        conditions = ["user_id = %s"]
+        values = [user_id]
+        
+        if after is not None:
+            conditions.append("(created_at, id) < (%s, %s)")
+            values.extend(after)
+        
+        limit_clause = ""
+        if limit is not None:
+            limit_clause = "LIMIT %s"
+            values.append(limit)
+        
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute(f"""
                 SELECT id, user_id, name, date_of_birth, gender, profession, health_notes, created_at, updated_at
                 FROM family_members
-                WHERE user_id = %s
-                ORDER BY created_at DESC
-            """, (user_id,))
+                WHERE {' AND '.join(conditions)}
+                ORDER BY created_at DESC, id DESC
+                {limit_clause}
+            """, values)
             return [dict(row) for row in cursor.fetchall()]
     
     @staticmethod
@@ -3,6 +3,7 @@ from typing import Optional, Dict, Any
 from datetime import datetime
 import logging
 from app.database import db
+from app.cache import google_credentials_cache
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +28,38 @@ class GoogleCredentialsDAO:
                 RETURNING id, user_id, access_token, refresh_token, token_expiry, created_at, updated_at
             """, (user_id, access_token, refresh_token, token_expiry))
             result = dict(cursor.fetchone())
-            return result
+        db.after_commit(connection, lambda: google_credentials_cache.invalidate(user_id))
+        return result
+    
+    @staticmethod
+    def update_refreshed_token(user_id: int, access_token: str, refresh_token: str,
+                               token_expiry: datetime, connection=None) -> Optional[Dict[str, Any]]:
+        """Store a refreshed access token.
+
+        Unlike create_or_update_credentials this does not invalidate the credentials
+        cache: the caller caches the refreshed credentials it gets back.
+        """
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute("""
+                UPDATE user_google_credentials
+                SET access_token = %s, refresh_token = %s, token_expiry = %s, updated_at = CURRENT_TIMESTAMP
+                WHERE user_id = %s
+                RETURNING id, user_id, access_token, refresh_token, token_expiry, created_at, updated_at
+            """, (access_token, refresh_token, token_expiry, user_id))
+            result = cursor.fetchone()
+            if result:
+                return dict(result)
+            else:
+                return None
+    
+    @staticmethod
+    def lock_for_refresh(user_id: int, connection) -> None:
+        """Serialize token refreshes for a user across workers until the transaction ends."""
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute(
+                "SELECT pg_advisory_xact_lock(hashtext('user_google_credentials'), %s)",
+                (user_id,),
+            )
     
     @staticmethod
     def get_credentials_by_user_id(user_id: int, connection=None) -> Optional[Dict[str, Any]]:
@@ -53,4 +85,5 @@ class GoogleCredentialsDAO:
                 WHERE user_id = %s
             """, (user_id,))
             success = cursor.rowcount > 0
-            return success
\ No newline at end of file
+        db.after_commit(connection, lambda: google_credentials_cache.invalidate(user_id))
+        return success
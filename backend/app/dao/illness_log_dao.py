@@ -1,5 +1,5 @@
 """Illness Log Data Access Object."""
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import date
 from app.database import db
 
@@ -9,47 +9,79 @@ class IllnessLogDAO:
     
     @staticmethod
     def create_illness_log(
+        user_id: int,
         family_member_id: int,
         illness_name: str,
         start_date: date,
         end_date: Optional[date] = None,
         notes: Optional[str] = None,
         ai_suggestion: Optional[str] = None,
+        suggestion_status: str = "none",
+        suggestion_source: Optional[str] = None,
+        suggestion_delay_seconds: float = 0,
         connection=None
     ) -> Dict[str, Any]:
-        """Create a new illness log."""
+        """Create a new illness log; a 'pending' suggestion is due for the suggestion worker after `suggestion_delay_seconds`."""
         with db.get_cursor(connection=connection) as cursor:
             cursor.execute("""
-                INSERT INTO illness_logs (family_member_id, illness_name, start_date, end_date, notes, ai_suggestion)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                RETURNING id, family_member_id, illness_name, start_date, end_date, notes, ai_suggestion, created_at, updated_at
-            """, (family_member_id, illness_name, start_date, end_date, notes, ai_suggestion))
+                INSERT INTO illness_logs (user_id, family_member_id, illness_name, start_date, end_date, notes,
+                                          ai_suggestion, suggestion_status, suggestion_source,
+                                          suggestion_next_attempt_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s,
+                        CASE WHEN %s = 'pending' THEN NOW() + %s * INTERVAL '1 second' END)
+                RETURNING id, family_member_id, illness_name, start_date, end_date, notes, ai_suggestion,
+                          suggestion_status, suggestion_source, created_at, updated_at
+            """, (user_id, family_member_id, illness_name, start_date, end_date, notes, ai_suggestion,
+                  suggestion_status, suggestion_source, suggestion_status, suggestion_delay_seconds))
             return dict(cursor.fetchone())
     
     @staticmethod
-    def get_illness_logs_by_user_id(user_id: int, family_member_id: Optional[int] = None, connection=None) -> List[Dict[str, Any]]:
-        """Get all illness logs for a user's family members, optionally filtered by family member."""
+    def get_illness_logs_by_user_id(
+        user_id: int,
+        family_member_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[date, int]] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        connection=None
+    ) -> List[Dict[str, Any]]:
+        """Get illness logs for a user's family members, newest first, optionally filtered by family member.
+
+        Keyset pagination: `after` is the (start_date, id) of the last row already seen.
+        `start_date`/`end_date` bound the illness start date (inclusive).
+        """
+        conditions = ["il.user_id = %s"]
+        values = [user_id]
+        
+        if family_member_id:
+            conditions.append("il.family_member_id = %s")
+            values.append(family_member_id)
+        if after is not None:
+            conditions.append("(il.start_date, il.id) < (%s, %s)")
+            values.extend(after)
+        if start_date is not None:
+            conditions.append("il.start_date >= %s")
+            values.append(start_date)
+        if end_date is not None:
+            conditions.append("il.start_date <= %s")
+            values.append(end_date)
+        
+        limit_clause = ""
+        if limit is not None:
+            limit_clause = "LIMIT %s"
+            values.append(limit)
+        
         with db.get_cursor(connection=connection) as cursor:
-            if family_member_id:
-                cursor.execute("""
-                    SELECT il.id, il.family_member_id, fm.name as family_member_name,
-                           il.illness_name, il.start_date, il.end_date, il.notes, il.ai_suggestion,
-                           il.created_at, il.updated_at
-                    FROM illness_logs il
-                    JOIN family_members fm ON il.family_member_id = fm.id
-                    WHERE fm.user_id = %s AND il.family_member_id = %s
-                    ORDER BY il.start_date DESC
-                """, (user_id, family_member_id))
-            else:
-                cursor.execute("""
-                    SELECT il.id, il.family_member_id, fm.name as family_member_name,
-                           il.illness_name, il.start_date, il.end_date, il.notes, il.ai_suggestion,
-                           il.created_at, il.updated_at
-                    FROM illness_logs il
-                    JOIN family_members fm ON il.family_member_id = fm.id
-                    WHERE fm.user_id = %s
-                    ORDER BY il.start_date DESC
-                """, (user_id,))
+            cursor.execute(f"""
+                SELECT il.id, il.family_member_id, fm.name as family_member_name,
+                       il.illness_name, il.start_date, il.end_date, il.notes, il.ai_suggestion,
+                       il.suggestion_status, il.suggestion_source, il.created_at, il.updated_at
+                FROM illness_logs il
+                JOIN family_members fm ON il.family_member_id = fm.id
+                WHERE {' AND '.join(conditions)}
+                ORDER BY il.start_date DESC, il.id DESC
+                {limit_clause}
+            """, values)
             return [dict(row) for row in cursor.fetchall()]
     
     @staticmethod
@@ -59,10 +91,10 @@ class IllnessLogDAO:
             cursor.execute("""
                 SELECT il.id, il.family_member_id, fm.name as family_member_name,
                        il.illness_name, il.start_date, il.end_date, il.notes, il.ai_suggestion,
-                       il.created_at, il.updated_at
+                       il.suggestion_status, il.suggestion_source, il.created_at, il.updated_at
                 FROM illness_logs il
                 JOIN family_members fm ON il.family_member_id = fm.id
-                WHERE il.id = %s AND fm.user_id = %s
+                WHERE il.id = %s AND il.user_id = %s
             """, (illness_log_id, user_id))
             result = cursor.fetchone()
             return dict(result) if result else None
@@ -95,7 +127,10 @@ class IllnessLogDAO:
             updates.append("notes = %s")
             values.append(notes)
         if ai_suggestion is not None:
+            # An edited suggestion replaces the one still being generated
             updates.append("ai_suggestion = %s")
+            updates.append("suggestion_status = 'ready'")
+            updates.append("suggestion_source = 'user'")
             values.append(ai_suggestion)
         
         if not updates:
@@ -109,23 +144,102 @@ class IllnessLogDAO:
                 UPDATE illness_logs il
                 SET {', '.join(updates)}
                 FROM family_members fm
-                WHERE il.id = %s AND il.family_member_id = fm.id AND fm.user_id = %s
-                RETURNING il.id, il.family_member_id, il.illness_name, il.start_date, 
-                          il.end_date, il.notes, il.created_at, il.updated_at
+                WHERE il.id = %s AND il.user_id = %s AND fm.id = il.family_member_id
+                RETURNING il.id, il.family_member_id, fm.name as family_member_name,
+                          il.illness_name, il.start_date, il.end_date, il.notes, il.ai_suggestion,
+                          il.suggestion_status, il.suggestion_source, il.created_at, il.updated_at
             """, values)
             result = cursor.fetchone()
-            if result:
-                # Fetch with family member name
-                return IllnessLogDAO.get_illness_log_by_id(illness_log_id, user_id, connection=connection)
-            return None
+            return dict(result) if result else None
     
+    @staticmethod
+    def claim_pending_suggestions(limit: int, lease_seconds: float, connection=None) -> List[Dict[str, Any]]:
+        """
+        Claim up to `limit` illness logs whose AI suggestion is due, oldest due first.
+
+        Claiming counts an attempt and pushes suggestion_next_attempt_at out by the
+        lease, so other workers skip the logs and they come due again if this worker
+        never reports back.
+        """
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute("""
+                WITH due AS (
+                    SELECT id
+                    FROM illness_logs
+                    WHERE suggestion_status = 'pending' AND suggestion_next_attempt_at <= NOW()
+                    ORDER BY suggestion_next_attempt_at, id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                UPDATE illness_logs il
+                SET suggestion_attempts = il.suggestion_attempts + 1,
+                    suggestion_next_attempt_at = NOW() + %s * INTERVAL '1 second'
+                FROM due
+                WHERE il.id = due.id
+                RETURNING il.id, il.user_id, il.illness_name, il.notes, il.suggestion_attempts
+            """, (limit, lease_seconds))
+            return [dict(row) for row in cursor.fetchall()]
+
+    @staticmethod
+    def claim_suggestion(illness_log_id: int, user_id: int, lease_seconds: float,
+                         connection=None) -> Optional[Dict[str, Any]]:
+        """
+        Claim one of the user's pending logs for a client streaming its suggestion.
+
+        A log no worker has claimed yet can be taken before it is due; a log a worker
+        (or another stream) holds is not, until its lease runs out. Claims like
+        claim_pending_suggestions, so the workers skip it.
+        """
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute("""
+                UPDATE illness_logs
+                SET suggestion_attempts = suggestion_attempts + 1,
+                    suggestion_next_attempt_at = NOW() + %s * INTERVAL '1 second'
+                WHERE id = %s AND user_id = %s AND suggestion_status = 'pending'
+                  AND (suggestion_attempts = 0 OR suggestion_next_attempt_at <= NOW())
+                RETURNING id, user_id, illness_name, notes, suggestion_attempts
+            """, (lease_seconds, illness_log_id, user_id))
+            result = cursor.fetchone()
+            return dict(result) if result else None
+
+    @staticmethod
+    def fill_suggestion(illness_log_id: int, ai_suggestion: str, suggestion_source: str, connection=None) -> bool:
+        """Store a generated suggestion and its source, unless the log was edited or deleted meanwhile."""
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute("""
+                UPDATE illness_logs
+                SET ai_suggestion = %s, suggestion_source = %s, suggestion_status = 'ready',
+                    suggestion_next_attempt_at = NULL
+                WHERE id = %s AND suggestion_status = 'pending'
+            """, (ai_suggestion, suggestion_source, illness_log_id))
+            return cursor.rowcount > 0
+
+    @staticmethod
+    def schedule_suggestion_retry(illness_log_id: int, delay_seconds: float, connection=None) -> None:
+        """Make a log's suggestion due again after `delay_seconds`."""
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute("""
+                UPDATE illness_logs
+                SET suggestion_next_attempt_at = NOW() + %s * INTERVAL '1 second'
+                WHERE id = %s AND suggestion_status = 'pending'
+            """, (delay_seconds, illness_log_id))
+
+    @staticmethod
+    def fail_suggestion(illness_log_id: int, connection=None) -> None:
+        """Give up on a log's suggestion."""
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute("""
+                UPDATE illness_logs
+                SET suggestion_status = 'failed', suggestion_next_attempt_at = NULL
+                WHERE id = %s AND suggestion_status = 'pending'
+            """, (illness_log_id,))
+
     @staticmethod
     def delete_illness_log(illness_log_id: int, user_id: int, connection=None) -> bool:
         """Delete an illness log."""
         with db.get_cursor(connection=connection) as cursor:
             cursor.execute("""
-                DELETE FROM illness_logs il
-                USING family_members fm
-                WHERE il.id = %s AND il.family_member_id = fm.id AND fm.user_id = %s
+                DELETE FROM illness_logs
+                WHERE id = %s AND user_id = %s
             """, (illness_log_id, user_id))
             return cursor.rowcount > 0
@@ -1,6 +1,7 @@
 """Medication Data Access Object."""
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import date
+from psycopg2.extras import execute_values
 from app.database import db
 
 
@@ -19,15 +20,82 @@ class MedicationDAO:
             return dict(cursor.fetchone())
     
     @staticmethod
-    def get_medications_by_user_id(user_id: int, connection=None) -> List[Dict[str, Any]]:
-        """Get all medications for a user."""
+    def upsert_medication(user_id: int, name: str, quantity: int, expiration_date: Optional[date] = None, connection=None) -> Dict[str, Any]:
+        """Create a medication, or add to its quantity if the user already has one with the same name (case-insensitive)."""
         with db.get_cursor(connection=connection) as cursor:
             cursor.execute("""
+                INSERT INTO medications (user_id, name, quantity, expiration_date)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (user_id, LOWER(name))
+                DO UPDATE SET
+                    quantity = medications.quantity + EXCLUDED.quantity,
+                    updated_at = CURRENT_TIMESTAMP
+                RETURNING id, user_id, name, quantity, expiration_date, created_at, updated_at
+            """, (user_id, name, quantity, expiration_date))
+            return dict(cursor.fetchone())
+    
+    @staticmethod
+    def upsert_medications(user_id: int, medications: List[Dict[str, Any]], connection=None) -> List[Dict[str, Any]]:
+        """Upsert several medications with one multi-row INSERT ... ON CONFLICT.
+
+        Items naming the same medication (same LOWER(name), as the unique index sees it)
+        are combined first: a row cannot be upserted twice in one statement. Returns one
+        row per item, the medication it ended up in, with the item's `ordinal` (its
+        position in `medications`); rows are not in input order.
+        """
+        if not medications:
+            return []
+        values = [
+            (ordinal, user_id, medication["name"], medication["quantity"], medication.get("expiration_date"))
+            for ordinal, medication in enumerate(medications)
+        ]
+        with db.get_cursor(connection=connection) as cursor:
+            rows = execute_values(cursor, """
+                WITH items AS (
+                    SELECT * FROM (VALUES %s) AS v (ordinal, user_id, name, quantity, expiration_date)
+                ),
+                upserted AS (
+                    INSERT INTO medications (user_id, name, quantity, expiration_date)
+                    SELECT DISTINCT ON (LOWER(name))
+                           user_id, name, SUM(quantity) OVER (PARTITION BY LOWER(name)), expiration_date
+                    FROM items
+                    ORDER BY LOWER(name), ordinal
+                    ON CONFLICT (user_id, LOWER(name))
+                    DO UPDATE SET
+                        quantity = medications.quantity + EXCLUDED.quantity,
+                        updated_at = CURRENT_TIMESTAMP
+                    RETURNING id, user_id, name, quantity, expiration_date, created_at, updated_at
+                )
+                SELECT items.ordinal, upserted.*
+                FROM items
+                JOIN upserted ON LOWER(upserted.name) = LOWER(items.name)
+            """, values, template="(%s::integer, %s, %s, %s::integer, %s::date)", page_size=len(values), fetch=True)
+            return [dict(row) for row in rows]
+    
+    @staticmethod
+    def get_medications_by_user_id(user_id: int, limit: Optional[int] = None, after: Optional[Tuple[str, int]] = None,
+                                   connection=None) -> List[Dict[str, Any]]:
+        """Get medications for a user ordered by name (keyset pagination: `after` is the last (name, id) seen)."""
+        conditions = ["user_id = %s"]
+        values = [user_id]
+        
+        if after is not None:
+            conditions.append("(name, id) > (%s, %s)")
+            values.extend(after)
+        
+        limit_clause = ""
+        if limit is not None:
+            limit_clause = "LIMIT %s"
+            values.append(limit)
+        
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute(f"""
                 SELECT id, user_id, name, quantity, expiration_date, created_at, updated_at
                 FROM medications
-                WHERE user_id = %s
-                ORDER BY name ASC
-            """, (user_id,))
+                WHERE {' AND '.join(conditions)}
+                ORDER BY name ASC, id ASC
+                {limit_clause}
+            """, values)
             return [dict(row) for row in cursor.fetchall()]
     
     @staticmethod
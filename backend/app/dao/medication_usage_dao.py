@@ -1,6 +1,7 @@
 """Medication Usage Data Access Object."""
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import date, datetime
+from psycopg2.extras import execute_values
 from app.database import db
 
 
@@ -9,28 +10,175 @@ class MedicationUsageDAO:
     
     @staticmethod
     def create_usage_log(family_member_id: int, medication_id: int, quantity_used: int, connection=None) -> Dict[str, Any]:
-        """Create a new medication usage log."""
+        """Create a new medication usage log (owned by the family member's user)."""
         with db.get_cursor(connection=connection) as cursor:
             cursor.execute("""
-                INSERT INTO medication_usage (family_member_id, medication_id, quantity_used)
-                VALUES (%s, %s, %s)
+                INSERT INTO medication_usage (user_id, family_member_id, medication_id, quantity_used)
+                SELECT user_id, id, %s, %s
+                FROM family_members
+                WHERE id = %s
                 RETURNING id, family_member_id, medication_id, used_at, quantity_used, created_at, updated_at
-            """, (family_member_id, medication_id, quantity_used))
+            """, (medication_id, quantity_used, family_member_id))
             return dict(cursor.fetchone())
     
     @staticmethod
-    def get_usage_logs_by_user_id(user_id: int, connection=None) -> List[Dict[str, Any]]:
-        """Get all usage logs for a user (via family members)."""
+    def create_usage_log_and_decrement(user_id: int, family_member_id: int, medication_id: int,
+                                       quantity_used: int, connection=None) -> Optional[Dict[str, Any]]:
+        """Log usage and decrement inventory in one atomic statement.
+
+        Ownership of both the family member and the medication is checked, and the
+        decrement only applies while `quantity >= quantity_used`. Concurrent usages
+        serialize on the medication row lock and re-check the quantity, so no
+        decrement is lost. Returns None if nothing was logged (see get_usage_preconditions).
+        """
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute("""
+                WITH fm AS (
+                    SELECT id, name
+                    FROM family_members
+                    WHERE id = %(family_member_id)s AND user_id = %(user_id)s
+                ),
+                med AS (
+                    UPDATE medications
+                    SET quantity = quantity - %(quantity_used)s, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = %(medication_id)s AND user_id = %(user_id)s
+                      AND quantity >= %(quantity_used)s
+                      AND EXISTS (SELECT 1 FROM fm)
+                    RETURNING id, name
+                ),
+                usage AS (
+                    INSERT INTO medication_usage (user_id, family_member_id, medication_id, quantity_used)
+                    SELECT %(user_id)s, fm.id, med.id, %(quantity_used)s
+                    FROM fm, med
+                    RETURNING id, family_member_id, medication_id, used_at, quantity_used, created_at, updated_at
+                )
+                SELECT usage.id, usage.family_member_id, usage.medication_id, usage.used_at, usage.quantity_used,
+                       usage.created_at, usage.updated_at,
+                       fm.name as family_member_name, med.name as medication_name
+                FROM usage, fm, med
+            """, {
+                "user_id": user_id,
+                "family_member_id": family_member_id,
+                "medication_id": medication_id,
+                "quantity_used": quantity_used,
+            })
+            result = cursor.fetchone()
+            return dict(result) if result else None
+    
+    @staticmethod
+    def get_usage_preconditions(user_id: int, family_member_id: int, medication_id: int, connection=None) -> Dict[str, Any]:
+        """Explain why a usage could not be logged (ownership and available quantity)."""
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute("""
+                SELECT EXISTS (
+                           SELECT 1 FROM family_members WHERE id = %s AND user_id = %s
+                       ) as family_member_found,
+                       (SELECT quantity FROM medications WHERE id = %s AND user_id = %s) as available_quantity
+            """, (family_member_id, user_id, medication_id, user_id))
+            return dict(cursor.fetchone())
+    
+    @staticmethod
+    def lock_usage_batch_targets(user_id: int, family_member_ids: List[int], medication_ids: List[int],
+                                 connection=None) -> Dict[str, Dict[int, Dict[str, Any]]]:
+        """Fetch the user's family members and medications referenced by a usage batch.
+
+        The medication rows are locked (FOR UPDATE, in id order so concurrent batches
+        cannot deadlock) until the transaction ends, so quantities checked by the caller
+        stay valid for create_usage_logs_and_decrement on the same connection.
+        """
         with db.get_cursor(connection=connection) as cursor:
             cursor.execute("""
+                SELECT id, name
+                FROM family_members
+                WHERE user_id = %s AND id = ANY(%s)
+            """, (user_id, list(family_member_ids)))
+            family_members = {row["id"]: dict(row) for row in cursor.fetchall()}
+            cursor.execute("""
+                SELECT id, name, quantity
+                FROM medications
+                WHERE user_id = %s AND id = ANY(%s)
+                ORDER BY id
+                FOR UPDATE
+            """, (user_id, list(medication_ids)))
+            medications = {row["id"]: dict(row) for row in cursor.fetchall()}
+            return {"family_members": family_members, "medications": medications}
+    
+    @staticmethod
+    def create_usage_logs_and_decrement(user_id: int, usages: List[Dict[str, Any]], connection=None) -> List[Dict[str, Any]]:
+        """Insert several usage logs and decrement inventory with one multi-row statement each.
+
+        Callers must have validated the usages against rows locked by
+        lock_usage_batch_targets on the same connection. Rows are returned in input order.
+        """
+        if not usages:
+            return []
+        totals = {}
+        for usage in usages:
+            totals[usage["medication_id"]] = totals.get(usage["medication_id"], 0) + usage["quantity_used"]
+        with db.get_cursor(connection=connection) as cursor:
+            execute_values(cursor, """
+                UPDATE medications m
+                SET quantity = m.quantity - v.quantity_used, updated_at = CURRENT_TIMESTAMP
+                FROM (VALUES %s) AS v (id, user_id, quantity_used)
+                WHERE m.id = v.id AND m.user_id = v.user_id
+            """, [(medication_id, user_id, total) for medication_id, total in totals.items()],
+                template="(%s::integer, %s::integer, %s::integer)", page_size=len(totals))
+            # Ids are assigned in ORDER BY position, so sorting by id restores input order
+            rows = execute_values(cursor, """
+                INSERT INTO medication_usage (user_id, family_member_id, medication_id, quantity_used)
+                SELECT user_id, family_member_id, medication_id, quantity_used
+                FROM (VALUES %s) AS v (position, user_id, family_member_id, medication_id, quantity_used)
+                ORDER BY position
+                RETURNING id, family_member_id, medication_id, used_at, quantity_used, created_at, updated_at
+            """, [
+                (position, user_id, usage["family_member_id"], usage["medication_id"], usage["quantity_used"])
+                for position, usage in enumerate(usages)
+            ], template="(%s, %s, %s, %s, %s::integer)", page_size=len(usages), fetch=True)
+            return sorted((dict(row) for row in rows), key=lambda row: row["id"])
+    
+    @staticmethod
+    def get_usage_logs_by_user_id(
+        user_id: int,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[datetime, int]] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        connection=None
+    ) -> List[Dict[str, Any]]:
+        """Get usage logs for a user, newest first.
+
+        Keyset pagination: `after` is the (used_at, id) of the last row already seen.
+        `start_date`/`end_date` are inclusive calendar days.
+        """
+        conditions = ["mu.user_id = %s"]
+        values = [user_id]
+        
+        if after is not None:
+            conditions.append("(mu.used_at, mu.id) < (%s, %s)")
+            values.extend(after)
+        if start_date is not None:
+            conditions.append("mu.used_at >= %s")
+            values.append(start_date)
+        if end_date is not None:
+            conditions.append("mu.used_at < %s::date + 1")
+            values.append(end_date)
+        
+        limit_clause = ""
+        if limit is not None:
+            limit_clause = "LIMIT %s"
+            values.append(limit)
+        
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute(f"""
                 SELECT mu.id, mu.family_member_id, mu.medication_id, mu.used_at, mu.quantity_used, mu.created_at, mu.updated_at,
                        fm.name as family_member_name, m.name as medication_name
                 FROM medication_usage mu
                 JOIN family_members fm ON mu.family_member_id = fm.id
                 JOIN medications m ON mu.medication_id = m.id
-                WHERE fm.user_id = %s
-                ORDER BY mu.used_at DESC
-            """, (user_id,))
+                WHERE {' AND '.join(conditions)}
+                ORDER BY mu.used_at DESC, mu.id DESC
+                {limit_clause}
+            """, values)
             return [dict(row) for row in cursor.fetchall()]
     
     @staticmethod
@@ -38,10 +186,9 @@ class MedicationUsageDAO:
         """Get a usage log by ID (with user_id check for security)."""
         with db.get_cursor(connection=connection) as cursor:
             cursor.execute("""
-                SELECT mu.id, mu.family_member_id, mu.medication_id, mu.used_at, mu.quantity_used, mu.created_at, mu.updated_at
-                FROM medication_usage mu
-                JOIN family_members fm ON mu.family_member_id = fm.id
-                WHERE mu.id = %s AND fm.user_id = %s
+                SELECT id, family_member_id, medication_id, used_at, quantity_used, created_at, updated_at
+                FROM medication_usage
+                WHERE id = %s AND user_id = %s
             """, (usage_id, user_id))
             result = cursor.fetchone()
             return dict(result) if result else None
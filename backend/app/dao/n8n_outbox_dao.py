@@ -0,0 +1,82 @@
+"""N8N Outbox Data Access Object."""
+from typing import Dict, Any, List, Optional
+from app.database import db
+
+
+class N8NOutboxDAO:
+    """Data access operations for queued n8n file summaries."""
+
+    @staticmethod
+    def enqueue_file_summary(user_id: int, file_id: str, file_name: str, mime_type: str, size: int,
+                             content_path: Optional[str] = None, connection=None) -> Dict[str, Any]:
+        """Queue a Drive file for the n8n summary workflow, due immediately.
+
+        `content_path` is a local copy of the file's bytes, if the upload kept one.
+        """
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute("""
+                INSERT INTO n8n_outbox (user_id, file_id, file_name, mime_type, size, content_path)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                RETURNING id, user_id, file_id, file_name, mime_type, size, content_path, status, attempts,
+                          next_attempt_at
+            """, (user_id, file_id, file_name, mime_type, size, content_path))
+            return dict(cursor.fetchone())
+
+    @staticmethod
+    def claim_due(limit: int, lease_seconds: float, connection=None) -> List[Dict[str, Any]]:
+        """
+        Claim up to `limit` due entries for delivery, oldest due first.
+
+        Claiming counts an attempt and pushes next_attempt_at out by the lease, so
+        other workers skip the entries (SKIP LOCKED while this runs, the lease after)
+        and they come due again if this worker never reports back.
+        """
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute("""
+                WITH due AS (
+                    SELECT id
+                    FROM n8n_outbox
+                    WHERE status = 'pending' AND next_attempt_at <= NOW()
+                    ORDER BY next_attempt_at, id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                UPDATE n8n_outbox o
+                SET attempts = o.attempts + 1,
+                    next_attempt_at = NOW() + %s * INTERVAL '1 second'
+                FROM due, users u
+                WHERE o.id = due.id AND u.id = o.user_id
+                RETURNING o.id, o.user_id, u.email AS user_email, o.file_id, o.file_name,
+                          o.mime_type, o.size, o.content_path, o.attempts
+            """, (limit, lease_seconds))
+            return [dict(row) for row in sorted(cursor.fetchall(), key=lambda row: row["id"])]
+
+    @staticmethod
+    def mark_sent(entry_id: int, connection=None) -> None:
+        """Record a successful delivery."""
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute("""
+                UPDATE n8n_outbox
+                SET status = 'sent', sent_at = NOW(), last_error = NULL
+                WHERE id = %s
+            """, (entry_id,))
+
+    @staticmethod
+    def schedule_retry(entry_id: int, error: str, delay_seconds: float, connection=None) -> None:
+        """Record a failed delivery and make the entry due again after `delay_seconds`."""
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute("""
+                UPDATE n8n_outbox
+                SET next_attempt_at = NOW() + %s * INTERVAL '1 second', last_error = %s
+                WHERE id = %s
+            """, (delay_seconds, error, entry_id))
+
+    @staticmethod
+    def mark_dead(entry_id: int, error: str, connection=None) -> None:
+        """Dead-letter an entry that failed on every attempt; it is kept for inspection and never retried."""
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute("""
+                UPDATE n8n_outbox
+                SET status = 'dead', last_error = %s
+                WHERE id = %s
+            """, (error, entry_id))
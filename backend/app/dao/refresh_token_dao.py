@@ -0,0 +1,70 @@
+"""Refresh Token Data Access Object."""
+from typing import Dict, Any, Optional
+from app.database import db
+
+
+class RefreshTokenDAO:
+    """Data access operations for rotating refresh tokens (stored as SHA-256 hashes)."""
+
+    @staticmethod
+    def create_token(user_id: int, token_hash: str, family_id: str, ttl_seconds: float, connection=None) -> None:
+        """Store a refresh token of `family_id` that expires in `ttl_seconds`."""
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute("""
+                INSERT INTO refresh_tokens (user_id, token_hash, family_id, expires_at)
+                VALUES (%s, %s, %s, NOW() + %s * INTERVAL '1 second')
+            """, (user_id, token_hash, family_id, ttl_seconds))
+
+    @staticmethod
+    def rotate_token(token_hash: str, grace_seconds: float, connection=None) -> Optional[Dict[str, Any]]:
+        """Mark a live token rotated and return its user_id and family_id.
+
+        A token rotated less than `grace_seconds` ago is returned again (concurrent
+        refreshes from one client); it keeps its first rotated_at. Returns None if the
+        token is unknown, expired, revoked or was rotated before that.
+        """
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute("""
+                UPDATE refresh_tokens
+                SET rotated_at = COALESCE(rotated_at, NOW())
+                WHERE token_hash = %s
+                  AND revoked_at IS NULL
+                  AND expires_at > NOW()
+                  AND (rotated_at IS NULL OR rotated_at > NOW() - %s * INTERVAL '1 second')
+                RETURNING user_id, family_id::text
+            """, (token_hash, grace_seconds))
+            result = cursor.fetchone()
+            return dict(result) if result else None
+
+    @staticmethod
+    def get_token(token_hash: str, connection=None) -> Optional[Dict[str, Any]]:
+        """Get a token by its hash, whatever its state."""
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute("""
+                SELECT id, user_id, family_id::text, created_at, expires_at, rotated_at, revoked_at
+                FROM refresh_tokens
+                WHERE token_hash = %s
+            """, (token_hash,))
+            result = cursor.fetchone()
+            return dict(result) if result else None
+
+    @staticmethod
+    def revoke_family(family_id: str, connection=None) -> int:
+        """Revoke every token of a family; returns the number of tokens revoked."""
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute("""
+                UPDATE refresh_tokens
+                SET revoked_at = NOW()
+                WHERE family_id = %s AND revoked_at IS NULL
+            """, (family_id,))
+            return cursor.rowcount
+
+    @staticmethod
+    def delete_expired_tokens(user_id: int, connection=None) -> int:
+        """Delete a user's expired tokens; returns the number deleted."""
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute("""
+                DELETE FROM refresh_tokens
+                WHERE user_id = %s AND expires_at <= NOW()
+            """, (user_id,))
+            return cursor.rowcount
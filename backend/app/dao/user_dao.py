@@ -2,6 +2,7 @@
 from typing import Optional, Dict, Any
 import logging
 from app.database import db
+from app.cache import user_cache
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +20,7 @@ class UserDAO:
             cursor.execute("""
                 INSERT INTO users (email, name, google_id, google_oauth_token, google_refresh_token, drive_folder_id)
                 VALUES (%s, %s, %s, %s, %s, %s)
-                RETURNING id, email, name, google_id, drive_folder_id, created_at, updated_at
+                RETURNING id, email, name, google_id, drive_folder_id, lifeline_calendar_id, created_at, updated_at
             """, (email, name, google_id, google_oauth_token, google_refresh_token, drive_folder_id))
             result = dict(cursor.fetchone())
             return result
@@ -29,7 +30,7 @@ class UserDAO:
         """Get user by email."""
         with db.get_cursor(connection=connection) as cursor:
             cursor.execute("""
-                SELECT id, email, name, google_id, google_oauth_token, google_refresh_token, drive_folder_id, created_at, updated_at
+                SELECT id, email, name, google_id, google_oauth_token, google_refresh_token, drive_folder_id, lifeline_calendar_id, created_at, updated_at
                 FROM users
                 WHERE email = %s
             """, (email,))
@@ -44,7 +45,7 @@ class UserDAO:
         """Get user by ID."""
         with db.get_cursor(connection=connection) as cursor:
             cursor.execute("""
-                SELECT id, email, name, google_id, google_oauth_token, google_refresh_token, drive_folder_id, created_at, updated_at
+                SELECT id, email, name, google_id, google_oauth_token, google_refresh_token, drive_folder_id, lifeline_calendar_id, created_at, updated_at
                 FROM users
                 WHERE id = %s
             """, (user_id,))
@@ -54,12 +55,24 @@ class UserDAO:
             else:
                 return None
     
+    @staticmethod
+    def get_auth_user_by_id(user_id: int, connection=None) -> Optional[Dict[str, Any]]:
+        """Get the fields request handlers need for the authenticated user (no OAuth tokens)."""
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute("""
+                SELECT id, email, name, drive_folder_id, lifeline_calendar_id
+                FROM users
+                WHERE id = %s
+            """, (user_id,))
+            result = cursor.fetchone()
+            return dict(result) if result else None
+    
     @staticmethod
     def get_user_by_google_id(google_id: str, connection=None) -> Optional[Dict[str, Any]]:
         """Get user by Google ID."""
         with db.get_cursor(connection=connection) as cursor:
             cursor.execute("""
-                SELECT id, email, name, google_id, google_oauth_token, google_refresh_token, drive_folder_id, created_at, updated_at
+                SELECT id, email, name, google_id, google_oauth_token, google_refresh_token, drive_folder_id, lifeline_calendar_id, created_at, updated_at
                 FROM users
                 WHERE google_id = %s
             """, (google_id,))
@@ -87,7 +100,8 @@ class UserDAO:
                 logger.info(f"Google tokens updated successfully for user ID: {user_id}")
             else:
                 logger.error(f"Failed to update Google tokens for user ID: {user_id} (user not found)")
-            return success
+        db.after_commit(connection, lambda: user_cache.invalidate(user_id))
+        return success
 
 
     @staticmethod
@@ -105,7 +119,57 @@ class UserDAO:
                 logger.info(f"drive_folder_id updated successfully for user ID: {user_id}")
             else:
                 logger.error(f"Failed to update drive_folder_id for user ID: {user_id} (user not found)")
-            return success
+        db.after_commit(connection, lambda: user_cache.invalidate(user_id))
+        return success
+    
+    @staticmethod
+    def update_lifeline_calendar_id(user_id: int, lifeline_calendar_id: str, connection=None) -> bool:
+        """Update user's LIFELINE Google Calendar ID."""
+        logger.info(f"Updating lifeline_calendar_id for user ID: {user_id}")
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute("""
+                UPDATE users
+                SET lifeline_calendar_id = %s, updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+            """, (lifeline_calendar_id, user_id))
+            success = cursor.rowcount > 0
+            if success:
+                logger.info(f"lifeline_calendar_id updated successfully for user ID: {user_id}")
+            else:
+                logger.error(f"Failed to update lifeline_calendar_id for user ID: {user_id} (user not found)")
+        db.after_commit(connection, lambda: user_cache.invalidate(user_id))
+        return success
+    
+    @staticmethod
+    def clear_lifeline_calendar_id(user_id: int, lifeline_calendar_id: str, connection=None) -> bool:
+        """Forget a LIFELINE calendar ID that no longer exists, unless it was already replaced."""
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute("""
+                UPDATE users
+                SET lifeline_calendar_id = NULL, updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s AND lifeline_calendar_id = %s
+            """, (user_id, lifeline_calendar_id))
+            cleared = cursor.rowcount > 0
+        db.after_commit(connection, lambda: user_cache.invalidate(user_id))
+        return cleared
+    
+    @staticmethod
+    def lock_drive_folder(user_id: int, connection) -> None:
+        """Serialize finding/creating a user's Drive folder across workers until the transaction ends."""
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute(
+                "SELECT pg_advisory_xact_lock(hashtext('drive_folder'), %s)",
+                (user_id,),
+            )
+    
+    @staticmethod
+    def lock_lifeline_calendar(user_id: int, connection) -> None:
+        """Serialize finding/creating a user's LIFELINE calendar across workers until the transaction ends."""
+        with db.get_cursor(connection=connection) as cursor:
+            cursor.execute(
+                "SELECT pg_advisory_xact_lock(hashtext('lifeline_calendar'), %s)",
+                (user_id,),
+            )
     
     @staticmethod
     def update_api_key(user_id: int, api_key: str, connection=None) -> bool:
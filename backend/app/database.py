@@ -1,6 +1,11 @@
 """Database connection and session management."""
+import os
+import time
+import threading
 import psycopg2
 import logging
+from collections import deque
+from psycopg2 import extensions
 from psycopg2.extras import RealDictCursor
 from contextlib import contextmanager
 from app.config import settings
@@ -9,22 +14,250 @@ from app.config import settings
 logger = logging.getLogger(__name__)
 
 
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available within the wait timeout."""
+
+
+class HookedConnection(extensions.connection):
+    """psycopg2 connection that runs callbacks registered with `Database.after_commit` once it commits.
+
+    Callbacks registered in a transaction that is rolled back are dropped.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.after_commit_hooks = []
+
+    def commit(self):
+        super().commit()
+        hooks, self.after_commit_hooks = self.after_commit_hooks, []
+        for hook in hooks:
+            try:
+                hook()
+            except Exception:
+                logger.exception("Error in after-commit hook")
+
+    def rollback(self):
+        super().rollback()
+        self.after_commit_hooks = []
+
+
+class ConnectionPool:
+    """Thread-safe PostgreSQL connection pool.
+
+    Connections are checked out LIFO so the warmest connection is reused first.
+    On checkout a connection is verified (closed, too old or idle for too long
+    and failing a ping) and replaced transparently if it is no longer usable.
+    """
+
+    def __init__(self, dsn: str, min_size: int = 1, max_size: int = 10, timeout: float = 30.0,
+                 max_lifetime: float = 1800.0, health_check_interval: float = 30.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min_size={min_size}, max_size={max_size}")
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._size = 0
+        self._created_at = {}
+        self._last_used = {}
+        self._closed = False
+
+        for _ in range(min_size):
+            with self._cond:
+                self._size += 1
+            conn = self._connect()
+            self._release_idle(conn)
+
+    def _connect(self):
+        """Open a new physical connection (caller has already reserved a slot)."""
+        try:
+            conn = psycopg2.connect(self.dsn, connection_factory=HookedConnection, cursor_factory=RealDictCursor)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        now = time.monotonic()
+        self._created_at[id(conn)] = now
+        self._last_used[id(conn)] = now
+        logger.debug("Opened new pooled database connection")
+        return conn
+
+    def _discard(self, conn):
+        """Close a connection and free its slot in the pool."""
+        self._created_at.pop(id(conn), None)
+        self._last_used.pop(id(conn), None)
+        try:
+            if not conn.closed:
+                conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+        logger.debug("Discarded pooled database connection")
+
+    def _release_idle(self, conn):
+        """Return a healthy connection to the idle stack."""
+        self._last_used[id(conn)] = time.monotonic()
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def _is_expired(self, conn) -> bool:
+        created_at = self._created_at.get(id(conn))
+        if created_at is None:
+            return True
+        return self.max_lifetime > 0 and time.monotonic() - created_at > self.max_lifetime
+
+    def _is_usable(self, conn) -> bool:
+        """Check a connection on checkout, pinging it if it has been idle for a while."""
+        if conn.closed or self._is_expired(conn):
+            return False
+        idle_for = time.monotonic() - self._last_used.get(id(conn), 0)
+        if idle_for < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception as e:
+            logger.warning(f"Pooled connection failed health check: {str(e)}")
+            return False
+
+    def getconn(self):
+        """Check out a connection, waiting up to `timeout` seconds for a free slot."""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Connection pool is closed")
+                    if self._idle:
+                        conn = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        conn = None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeoutError(
+                            f"Timed out after {self.timeout}s waiting for a database connection "
+                            f"(pool max_size={self.max_size})"
+                        )
+                    self._cond.wait(remaining)
+
+            if conn is None:
+                return self._connect()
+            if self._is_usable(conn):
+                return conn
+            self._discard(conn)
+
+    def putconn(self, conn, discard: bool = False):
+        """Return a connection to the pool, closing it if it is broken, expired or unwanted."""
+        if discard or self._closed or conn.closed or self._is_expired(conn):
+            self._discard(conn)
+            return
+        try:
+            if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+        self._release_idle(conn)
+
+    def close(self):
+        """Close all idle connections; checked-out connections are closed when returned."""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self) -> dict:
+        """Return current pool occupancy."""
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "max_size": self.max_size,
+            }
+
+
 class Database:
     """Database connection manager."""
-    
+
     def __init__(self):
         self.connection_string = settings.database_url
-    
+        self._pool = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def pool(self) -> ConnectionPool:
+        """Lazily create the connection pool (once per process, so each gunicorn worker owns its own)."""
+        pid = os.getpid()
+        if self._pool is None or self._pool_pid != pid:
+            with self._pool_lock:
+                if self._pool is None or self._pool_pid != pid:
+                    logger.info(
+                        f"Creating database connection pool (min={settings.db_pool_min_size}, "
+                        f"max={settings.db_pool_max_size}) for process {pid}"
+                    )
+                    self._pool = ConnectionPool(
+                        self.connection_string,
+                        min_size=settings.db_pool_min_size,
+                        max_size=settings.db_pool_max_size,
+                        timeout=settings.db_pool_timeout,
+                        max_lifetime=settings.db_pool_max_lifetime,
+                        health_check_interval=settings.db_pool_health_check_interval,
+                    )
+                    self._pool_pid = pid
+        return self._pool
+
+    def stats(self) -> dict:
+        """Return this process's pool occupancy (empty until the pool is first used)."""
+        with self._pool_lock:
+            pool = self._pool if self._pool_pid == os.getpid() else None
+        return pool.stats() if pool is not None else {}
+
+    def close(self):
+        """Close the connection pool owned by this process."""
+        with self._pool_lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.close()
+            self._pool = None
+            self._pool_pid = None
+
     @contextmanager
-    def get_connection(self):
-        """Get a database connection with automatic cleanup."""
+    def get_connection(self, connection=None):
+        """Get a pooled database connection with automatic commit/rollback and release.
+
+        If connection is provided (e.g. the request's unit of work), it is used as-is
+        and its owner is responsible for committing and releasing it.
+        """
+        if connection is not None:
+            logger.debug("Reusing provided database connection")
+            yield connection
+            return
+
         logger.debug("Acquiring database connection")
-        conn = psycopg2.connect(
-            self.connection_string,
-            cursor_factory=RealDictCursor
-        )
+        pool = self.pool
+        conn = pool.getconn()
+        broken = False
         try:
-            logger.debug("Database connection established")
+            logger.debug("Database connection acquired from pool")
             yield conn
             logger.debug("Committing transaction")
             conn.commit()
@@ -32,18 +265,35 @@ class Database:
         except Exception as e:
             logger.error(f"Database error occurred: {str(e)}", exc_info=True)
             logger.warning("Rolling back transaction")
-            conn.rollback()
+            broken = isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
             raise
         finally:
-            conn.close()
-            logger.debug("Database connection closed")
-    
+            pool.putconn(conn, discard=broken)
+            logger.debug("Database connection returned to pool")
+
+    @staticmethod
+    def after_commit(connection, callback):
+        """Run `callback` once `connection`'s transaction commits.
+
+        Without a connection (the DAO borrowed and already committed its own), or on a
+        connection that is not from the pool, `callback` runs right away.
+        """
+        hooks = getattr(connection, "after_commit_hooks", None)
+        if hooks is None:
+            callback()
+        else:
+            hooks.append(callback)
+
     @contextmanager
     def get_cursor(self, connection=None):
         """Get a database cursor with automatic cleanup.
-        
+
         If connection is provided, use it (for transaction-based operations).
-        Otherwise, create a new connection.
+        Otherwise, borrow a pooled connection for the single operation.
         """
         if connection:
             # Use provided connection (don't close it - caller manages lifecycle)
@@ -55,8 +305,8 @@ class Database:
                 cursor.close()
                 logger.debug("Cursor closed")
         else:
-            # Create a new connection for single operations
-            logger.debug("Creating new connection for single operation")
+            # Borrow a pooled connection for single operations
+            logger.debug("Borrowing pooled connection for single operation")
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 try:
@@ -66,6 +316,52 @@ class Database:
                     logger.debug("Cursor closed")
 
 
+class UnitOfWork:
+    """A connection and transaction shared by everything that runs within one request.
+
+    The connection is borrowed from the pool on first use, so requests that never
+    touch the database never occupy a pool slot. `release()` commits and returns it
+    early; a later access borrows a fresh one.
+    """
+
+    def __init__(self, database: "Database"):
+        self._database = database
+        self._pool = None
+        self._connection = None
+
+    @property
+    def connection(self):
+        """The request's connection, acquired lazily."""
+        if self._connection is None:
+            self._pool = self._database.pool
+            self._connection = self._pool.getconn()
+            logger.debug("Unit of work acquired a pooled connection")
+        return self._connection
+
+    def release(self, error: Exception = None):
+        """Commit (or roll back if `error` is given) and return the connection to the pool."""
+        if self._connection is None:
+            return
+        conn, pool = self._connection, self._pool
+        self._connection = None
+        broken = False
+        try:
+            if error is None:
+                conn.commit()
+            else:
+                logger.debug(f"Rolling back unit of work after {type(error).__name__}")
+                conn.rollback()
+        except Exception as e:
+            logger.error(f"Database error while ending unit of work: {str(e)}", exc_info=True)
+            broken = isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+            raise
+        finally:
+            pool.putconn(conn, discard=broken)
+
+
 # Global database instance
 db = Database()
-
@@ -0,0 +1,182 @@
+"""Reusable Google API service objects shared across requests within a worker."""
+import json
+import threading
+import logging
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+import httplib2
+from cachetools import LRUCache
+from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.errors import HttpError
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class _ClientLRU(LRUCache):
+    """LRUCache that closes the connections of evicted clients."""
+
+    def popitem(self):
+        key, clients = super().popitem()
+        for _, authorized_http in clients:
+            authorized_http.http.close()
+        logger.debug(f"Evicted idle Google API clients for {key}")
+        return key, clients
+
+
+class _PooledService:
+    """Service object wrapper that creates each top-level resource (files(), events(), ...) once.
+
+    googleapiclient builds a resource and all of its methods on every call such as
+    `service.files()`; a pooled client reuses the first one.
+    """
+
+    def __init__(self, service, resource_names):
+        self._service = service
+        self._resource_names = set(resource_names)
+        self._resources = {}
+
+    def __getattr__(self, name):
+        attr = getattr(self._service, name)
+        if name not in self._resource_names:
+            return attr
+
+        def resource():
+            if name not in self._resources:
+                self._resources[name] = attr()
+            return self._resources[name]
+        return resource
+
+
+class GoogleClientFactory:
+    """Hands out Google API service objects without rebuilding them per call.
+
+    - Discovery documents are read once per process from the copies bundled with
+      google-api-python-client (no discovery HTTP request, no per-call file read).
+    - Each service object owns an authorized httplib2 connection that stays open
+      (keep-alive) between uses. httplib2 is not thread-safe, so a client is checked
+      out by one caller at a time and pooled per (user, API) when returned. Pooled
+      clients also keep the resource objects they create.
+    - Idle pools are kept in an LRU; evicted pools have their connections closed.
+    """
+
+    def __init__(self, max_size: int, pool_size: int, timeout: float):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._documents: Dict[Tuple[str, str], str] = {}
+        self._idle = _ClientLRU(maxsize=max_size)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def discovery_document(self, api: str, version: str) -> Dict[str, Any]:
+        """Return a freshly parsed copy of the bundled discovery document for an API.
+
+        The file is read once per process. Each client gets its own parsed copy
+        because build_from_document writes into the method descriptions.
+        """
+        key = (api, version)
+        content = self._documents.get(key)
+        if content is None:
+            content = get_static_doc(api, version)
+            if content is None:
+                raise ValueError(f"No bundled discovery document for {api} {version}")
+            with self._lock:
+                content = self._documents.setdefault(key, content)
+        return json.loads(content)
+
+    def _build(self, api: str, version: str, credentials: Credentials):
+        document = self.discovery_document(api, version)
+        authorized_http = AuthorizedHttp(credentials, http=httplib2.Http(timeout=self.timeout))
+        service = build_from_document(document, http=authorized_http)
+        return _PooledService(service, document.get("resources", {})), authorized_http
+
+    @contextmanager
+    def service(self, api: str, version: str, credentials: Credentials, user_id: Optional[int] = None):
+        """Check out a service object for `user_id`, returning it to the pool afterwards.
+
+        Without a user_id (e.g. during login, before the user exists) the client is
+        built from the cached discovery document but not pooled.
+        """
+        if user_id is None:
+            service, authorized_http = self._build(api, version, credentials)
+            try:
+                yield service
+            finally:
+                authorized_http.http.close()
+            return
+
+        key = (user_id, api, version)
+        with self._lock:
+            clients = self._idle.get(key)
+            client = clients.pop() if clients else None
+            if client is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if client is None:
+            client = self._build(api, version, credentials)
+        service, authorized_http = client
+        # Pooled clients keep the credentials they were built with; use the current token
+        authorized_http.credentials = credentials
+
+        reusable = True
+        try:
+            yield service
+        except HttpError:
+            # An API error response leaves the connection usable
+            raise
+        except Exception:
+            # Don't reuse a connection that may be in an unknown state
+            reusable = False
+            raise
+        finally:
+            if reusable:
+                self._release(key, client)
+            else:
+                authorized_http.http.close()
+
+    def _release(self, key: Tuple[int, str, str], client):
+        """Return a client to its pool, closing it if the pool is full."""
+        with self._lock:
+            clients = self._idle.get(key)
+            if clients is None:
+                clients = deque()
+                self._idle[key] = clients
+            if len(clients) < self.pool_size:
+                clients.append(client)
+                return
+        client[1].http.close()
+
+    def clear(self):
+        """Close and drop all pooled clients and reset the counters."""
+        with self._lock:
+            while self._idle:
+                self._idle.popitem()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return reuse counters and current pool occupancy."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "pooled_keys": len(self._idle),
+                "idle_clients": sum(len(clients) for clients in self._idle.values()),
+                "max_size": self._idle.maxsize,
+            }
+
+
+# Global Google client factory instance
+google_clients = GoogleClientFactory(
+    max_size=settings.google_client_cache_max_size,
+    pool_size=settings.google_client_pool_size,
+    timeout=settings.google_http_timeout,
+)
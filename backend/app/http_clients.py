@@ -0,0 +1,240 @@
+"""Pooled async HTTP clients for the upstreams the API calls (HuggingFace, n8n)."""
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from importlib.util import find_spec
+from typing import Any, AsyncIterator, Dict, Optional, Sequence
+import httpx
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the optional h2 package (httpx[http2])
+HTTP2_AVAILABLE = find_spec("h2") is not None
+
+
+class RetryBudget:
+    """Caps retries at a fraction of requests, so retries cannot multiply load on a failing upstream.
+
+    Every request earns `ratio` of a retry, up to `max_retries` banked; a retry spends one.
+    """
+
+    def __init__(self, ratio: float, max_retries: float):
+        self.ratio = ratio
+        self.max_retries = max_retries
+        self._balance = max_retries
+
+    def deposit(self):
+        self._balance = min(self._balance + self.ratio, self.max_retries)
+
+    def withdraw(self) -> bool:
+        if self._balance < 1:
+            return False
+        self._balance -= 1
+        return True
+
+
+class UpstreamClient:
+    """One pooled httpx.AsyncClient for an upstream, shared by every request in a worker.
+
+    - Connections are kept alive between requests (HTTP/2 when h2 is installed),
+      so a request does not pay a new TCP and TLS handshake
+    - Connections, connect/read timeouts and retries are configured per upstream
+    - Requests that never reached the upstream (connect errors) are retried, and
+      responses in `retry_statuses` too, at most `max_retries` times per request
+      and within the upstream's retry budget
+    - Latency and connection reuse are counted for stats()
+    """
+
+    # Base delay before a retry, doubled per retry and jittered
+    RETRY_BACKOFF_SECONDS = 0.2
+    # Recent request latencies kept for percentiles
+    LATENCY_WINDOW = 512
+
+    def __init__(self, name: str, timeout: float, connect_timeout: float, max_connections: int,
+                 keepalive_expiry: float, max_retries: int, retry_budget: RetryBudget,
+                 retry_statuses: Sequence[int] = (), http2: bool = True):
+        self.name = name
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections,
+                                   keepalive_expiry=keepalive_expiry)
+        self.max_retries = max_retries
+        self.retry_budget = retry_budget
+        self.retry_statuses = frozenset(retry_statuses)
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self._client: Optional[httpx.AsyncClient] = None
+        self._latencies = deque(maxlen=self.LATENCY_WINDOW)
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.retries_denied = 0
+        self.connections_opened = 0
+
+    async def start(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        """Open the connection pool (from the app lifespan); `transport` replaces the network in tests."""
+        self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits, http2=self.http2,
+                                         transport=transport)
+
+    async def stop(self):
+        """Close the pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError(f"The {self.name} HTTP client is not started")
+        return self._client
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]):
+        if event_name == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+
+    def _record(self, started: float):
+        self.requests += 1
+        self.retry_budget.deposit()
+        self._latencies.append(time.monotonic() - started)
+
+    async def _may_retry(self, attempt: int) -> bool:
+        if attempt >= self.max_retries:
+            return False
+        if not self.retry_budget.withdraw():
+            self.retries_denied += 1
+            return False
+        self.retries += 1
+        await asyncio.sleep(self.RETRY_BACKOFF_SECONDS * 2 ** attempt * random.uniform(0.5, 1.0))
+        return True
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request and read the response, retrying as configured."""
+        kwargs["extensions"] = {**kwargs.get("extensions", {}), "trace": self._trace}
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                self._record(started)
+                self.errors += 1
+                if await self._may_retry(attempt):
+                    attempt += 1
+                    continue
+                raise
+            except httpx.HTTPError:
+                self._record(started)
+                self.errors += 1
+                raise
+            self._record(started)
+            if response.status_code in self.retry_statuses and await self._may_retry(attempt):
+                attempt += 1
+                continue
+            return response
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        """Send a request and stream the response body; connect errors are retried as in request()."""
+        kwargs["extensions"] = {**kwargs.get("extensions", {}), "trace": self._trace}
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            try:
+                request = self.client.build_request(method, url, **kwargs)
+                response = await self.client.send(request, stream=True)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                self._record(started)
+                self.errors += 1
+                if await self._may_retry(attempt):
+                    attempt += 1
+                    continue
+                raise
+            except httpx.HTTPError:
+                self._record(started)
+                self.errors += 1
+                raise
+            # Latency to the response headers; the body is read by the caller
+            self._record(started)
+            try:
+                yield response
+            finally:
+                await response.aclose()
+            return
+
+    def latency_percentile(self, percentile: float, min_samples: int = 1) -> Optional[float]:
+        """Seconds under which `percentile`% of recent requests got their response.
+
+        None until at least `min_samples` requests were made.
+        """
+        if len(self._latencies) < max(min_samples, 1):
+            return None
+        latencies = sorted(self._latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percentile / 100))]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return request, retry, latency and connection reuse counters."""
+        p50, p95 = self.latency_percentile(50), self.latency_percentile(95)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "retries_denied": self.retries_denied,
+            "connections_opened": self.connections_opened,
+            "connection_reuse_rate": (1 - self.connections_opened / self.requests) if self.requests else 0.0,
+            "latency_p50_ms": p50 * 1000 if p50 is not None else None,
+            "latency_p95_ms": p95 * 1000 if p95 is not None else None,
+            "http2": self.http2,
+        }
+
+
+class HTTPClients:
+    """The upstream clients of a worker, opened and closed together by the app lifespan."""
+
+    def __init__(self, huggingface: UpstreamClient, n8n: UpstreamClient):
+        self.huggingface = huggingface
+        self.n8n = n8n
+        self._upstreams = {"huggingface": huggingface, "n8n": n8n}
+
+    async def start(self):
+        """Open every upstream's connection pool."""
+        for upstream in self._upstreams.values():
+            await upstream.start()
+
+    async def stop(self):
+        """Close every upstream's connections."""
+        for upstream in self._upstreams.values():
+            await upstream.stop()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return each upstream's counters."""
+        return {name: upstream.stats() for name, upstream in self._upstreams.items()}
+
+
+# Global upstream clients (one pool per upstream per worker)
+http_clients = HTTPClients(
+    huggingface=UpstreamClient(
+        "HuggingFace",
+        timeout=settings.huggingface_http_timeout,
+        connect_timeout=settings.http_connect_timeout,
+        max_connections=settings.huggingface_max_connections,
+        keepalive_expiry=settings.http_keepalive_expiry_seconds,
+        max_retries=settings.huggingface_max_retries,
+        retry_budget=RetryBudget(settings.http_retry_budget_ratio, settings.http_retry_budget_max),
+        # Rate limited or the router's upstream is briefly unavailable
+        retry_statuses=(429, 502, 503, 504),
+        http2=settings.http2_enabled,
+    ),
+    # The outbox retries failed deliveries itself; only requests n8n never received are retried here
+    n8n=UpstreamClient(
+        "n8n",
+        timeout=settings.n8n_http_timeout,
+        connect_timeout=settings.http_connect_timeout,
+        max_connections=settings.n8n_outbox_concurrency,
+        keepalive_expiry=settings.http_keepalive_expiry_seconds,
+        max_retries=1,
+        retry_budget=RetryBudget(settings.http_retry_budget_ratio, settings.http_retry_budget_max),
+        http2=settings.http2_enabled,
+    ),
+)
@@ -1,9 +1,24 @@
 """Main FastAPI application entry point."""
+import os
 import logging
 import sys
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from anyio import to_thread
+from fastapi import Depends, FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from app.config import settings
+from app.database import db, PoolTimeoutError
+from app.account_provisioning import account_provisioner
+from app.cache import user_cache, google_credentials_cache
+from app.google_clients import google_clients
+from app.http_clients import http_clients
+from app.n8n_outbox import n8n_outbox
+from app.suggestion_worker import suggestion_worker
+from app.suggestion_cache import suggestion_cache
+from app.suggestion_engine import suggestion_engine
+from app.utils.uploads import UploadSizeLimitMiddleware
+from app.utils.dependencies import verify_metrics_key
 from app.controllers import auth, family_members, medications, medication_usage, google_drive, google_calendar, n8n_controller, illness_logs, features
 
 
@@ -16,16 +31,56 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup/shutdown hooks."""
+    # Sync endpoints and blocking DAO calls run in this threadpool, off the event loop
+    to_thread.current_default_thread_limiter().total_tokens = settings.worker_threadpool_size
+    # Pooled HTTP clients for HuggingFace and n8n, shared by requests and background workers
+    await http_clients.start()
+    # Deliver queued n8n file summaries in the background
+    await n8n_outbox.start()
+    # Generate AI suggestions for new illness logs in the background
+    await suggestion_worker.start()
+    yield
+    logger.info("LifeLine API is shutting down, closing database pool...")
+    await n8n_outbox.stop()
+    await suggestion_worker.stop()
+    await http_clients.stop()
+    # Before the Google clients and the pool close: running provisioning jobs still use them
+    account_provisioner.shutdown()
+    logger.info(f"Account provisioning stats: {account_provisioner.stats()}")
+    logger.info(f"n8n outbox stats: {n8n_outbox.stats()}")
+    logger.info(f"AI suggestion worker stats: {suggestion_worker.stats()}")
+    logger.info(f"AI suggestion cache stats: {suggestion_cache.stats()}")
+    logger.info(f"AI suggestion engine stats: {suggestion_engine.stats()}")
+    logger.info(f"User cache stats: {user_cache.stats()}")
+    logger.info(f"Google credentials cache stats: {google_credentials_cache.stats()}")
+    logger.info(f"Google API client stats: {google_clients.stats()}")
+    logger.info(f"Upstream HTTP client stats: {http_clients.stats()}")
+    google_clients.clear()
+    db.close()
+
+
 app = FastAPI(
     title="LifeLine API",
     description="Family Health Tracking Application API",
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 logger.info("LifeLine API is starting up...")
 
+# Reject oversized uploads before they are spooled (added first so CORS headers still apply to the 413)
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_size=settings.upload_max_size_bytes,
+    paths=["/drive/upload"],
+)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -35,6 +90,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    """Return 503 when the worker's connection pool is exhausted instead of a generic 500."""
+    logger.error(f"Database pool exhausted on {request.url.path}: {str(exc)}")
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Service temporarily unavailable, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(family_members.router, prefix="/family-members", tags=["Family Members"])
@@ -59,3 +126,21 @@ async def health_check():
     """Health check endpoint."""
     return {"status": "healthy"}
 
+
+@app.get("/metrics", dependencies=[Depends(verify_metrics_key)])
+def metrics():
+    """Runtime counters of the worker process that answers (pools, caches, upstreams, background jobs)."""
+    return {
+        "pid": os.getpid(),
+        "database_pool": db.stats(),
+        "upstream_http": http_clients.stats(),
+        "user_cache": user_cache.stats(),
+        "google_credentials_cache": google_credentials_cache.stats(),
+        "google_clients": google_clients.stats(),
+        "suggestion_cache": suggestion_cache.stats(),
+        "suggestion_engine": suggestion_engine.stats(),
+        "suggestion_worker": suggestion_worker.stats(),
+        "n8n_outbox": n8n_outbox.stats(),
+        "account_provisioning": account_provisioner.stats(),
+    }
+
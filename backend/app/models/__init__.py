@@ -4,6 +4,10 @@ from .family_member import FamilyMemberCreate, FamilyMemberUpdate, FamilyMemberR
 from .medication import MedicationCreate, MedicationUpdate, MedicationResponse
 from .medication_usage import MedicationUsageCreate, MedicationUsageResponse
 from .auth import Token, GoogleAuthRequest
+from .pagination import Page
+from .batch import BatchItemResult, BatchResult
+from .drive_upload import DriveUploadSessionCreate, DriveUploadSessionResponse
+from .drive_file import DriveFileResponse, DriveFilePage
 
 __all__ = [
     "UserCreate",
@@ -19,5 +23,12 @@ __all__ = [
     "MedicationUsageResponse",
     "Token",
     "GoogleAuthRequest",
+    "Page",
+    "BatchItemResult",
+    "BatchResult",
+    "DriveUploadSessionCreate",
+    "DriveUploadSessionResponse",
+    "DriveFileResponse",
+    "DriveFilePage",
 ]
 
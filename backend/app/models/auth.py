@@ -1,10 +1,12 @@
 """Authentication DTOs."""
+from typing import Optional
 from pydantic import BaseModel
 
 
 class Token(BaseModel):
     """DTO for JWT token response."""
     access_token: str
+    refresh_token: Optional[str] = None
     token_type: str = "bearer"
 
 
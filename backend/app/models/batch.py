@@ -0,0 +1,20 @@
+"""Batch write DTOs."""
+from pydantic import BaseModel
+from typing import Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class BatchItemResult(BaseModel, Generic[T]):
+    """DTO for the outcome of one item of a batch request."""
+    index: int
+    success: bool
+    item: Optional[T] = None
+    error: Optional[str] = None
+
+
+class BatchResult(BaseModel, Generic[T]):
+    """DTO for a batch write response: one result per request item, in request order."""
+    succeeded: int
+    failed: int
+    results: List[BatchItemResult[T]]
@@ -0,0 +1,20 @@
+"""Drive file listing DTOs."""
+from pydantic import BaseModel
+from typing import Optional
+from app.models.pagination import Page
+
+
+class DriveFileResponse(BaseModel):
+    """DTO for a file in the user's 'LifeLine Records' folder, in Drive's own field names."""
+    id: str
+    name: str
+    mimeType: str
+    size: Optional[int] = None
+    createdTime: str
+    modifiedTime: str
+
+
+class DriveFilePage(Page[DriveFileResponse]):
+    """DTO for one page of the Drive listing; `connected` is false (and the page empty) without Google credentials."""
+    connected: bool = True
+    message: Optional[str] = None
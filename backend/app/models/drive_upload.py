@@ -0,0 +1,21 @@
+"""Drive upload session DTOs."""
+from pydantic import BaseModel, Field
+from datetime import datetime
+from app.config import settings
+
+
+class DriveUploadSessionCreate(BaseModel):
+    """DTO for opening a direct-to-Drive upload of one file."""
+    file_name: str = Field(min_length=1, max_length=255)
+    mime_type: str = "application/octet-stream"
+    size: int = Field(gt=0, le=settings.upload_max_size_bytes)
+
+
+class DriveUploadSessionResponse(BaseModel):
+    """DTO for an upload session: PUT the file's bytes to `upload_url`, then complete the session."""
+    id: int
+    upload_url: str
+    file_name: str
+    mime_type: str
+    size: int
+    created_at: datetime
@@ -1,7 +1,8 @@
 """Family member DTOs."""
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Any, List, Optional
 from datetime import datetime, date
+from app.config import settings
 
 
 class FamilyMemberCreate(BaseModel):
@@ -13,6 +14,13 @@ class FamilyMemberCreate(BaseModel):
     health_notes: Optional[str] = None
 
 
+class FamilyMemberBatchCreate(BaseModel):
+    """DTO for creating several family members in one request."""
+    # Raw items: each is validated as a FamilyMemberCreate on its own, so one malformed
+    # item is reported at its index instead of rejecting the whole batch
+    items: List[Any] = Field(min_length=1, max_length=settings.batch_max_items)
+
+
 class FamilyMemberUpdate(BaseModel):
     """DTO for updating a family member."""
     name: Optional[str] = None
@@ -33,6 +33,8 @@ class IllnessLogResponse(BaseModel):
     end_date: Optional[date]
     notes: Optional[str]
     ai_suggestion: Optional[str] = None
+    suggestion_status: str = "none"  # none / pending (being generated) / ready / failed
+    suggestion_source: Optional[str] = None  # model / cache / fallback / user
     created_at: datetime
     updated_at: datetime
     
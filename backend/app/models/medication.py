@@ -1,7 +1,8 @@
 """Medication DTOs."""
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Any, List, Optional
 from datetime import datetime, date
+from app.config import settings
 
 
 class MedicationCreate(BaseModel):
@@ -11,6 +12,13 @@ class MedicationCreate(BaseModel):
     expiration_date: Optional[date] = None
 
 
+class MedicationBatchCreate(BaseModel):
+    """DTO for adding several medications in one request."""
+    # Raw items: each is validated as a MedicationCreate on its own, so one malformed
+    # item is reported at its index instead of rejecting the whole batch
+    items: List[Any] = Field(min_length=1, max_length=settings.batch_max_items)
+
+
 class MedicationUpdate(BaseModel):
     """DTO for updating medication."""
     name: Optional[str] = None
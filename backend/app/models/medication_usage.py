@@ -1,7 +1,8 @@
 """Medication usage DTOs."""
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import Any, List, Optional
+from app.config import settings
 
 
 class MedicationUsageCreate(BaseModel):
@@ -11,6 +12,13 @@ class MedicationUsageCreate(BaseModel):
     quantity_used: int = 1
 
 
+class MedicationUsageBatchCreate(BaseModel):
+    """DTO for logging several medication usages in one request."""
+    # Raw items: each is validated as a MedicationUsageCreate on its own, so one malformed
+    # item is reported at its index instead of rejecting the whole batch
+    items: List[Any] = Field(min_length=1, max_length=settings.batch_max_items)
+
+
 class MedicationUsageResponse(BaseModel):
     """DTO for medication usage response."""
     id: int
@@ -0,0 +1,14 @@
+"""Pagination DTOs."""
+from pydantic import BaseModel
+from typing import Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    """DTO for one page of a list endpoint.
+
+    Pass `next_cursor` back as `cursor` to get the following page; it is null on the last page.
+    """
+    items: List[T]
+    next_cursor: Optional[str] = None
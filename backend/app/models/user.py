@@ -23,6 +23,7 @@ class UserResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
     drive_folder_id: Optional[str] = None
+    lifeline_calendar_id: Optional[str] = None
     api_key: Optional[str] = None
 
 
@@ -0,0 +1,124 @@
+"""Background delivery of queued n8n file summaries (the n8n_outbox table)."""
+import logging
+from typing import Any, BinaryIO, Dict, List, Optional
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.dao.n8n_outbox_dao import N8NOutboxDAO
+from app.http_clients import UpstreamClient, http_clients
+from app.services.google_drive_service import GoogleDriveService
+from app.services.n8n_service import N8NService
+from app.utils.background import ClaimingWorker
+
+logger = logging.getLogger(__name__)
+
+
+class N8NOutboxDispatcher(ClaimingWorker):
+    """Delivers outbox entries to the n8n summary webhook, off the request path.
+
+    - Entries are written by the upload request, so a summary survives n8n being
+      down or the worker restarting; the upload never waits on n8n
+    - Each worker claims due entries itself (FOR UPDATE SKIP LOCKED, then a lease),
+      so no entry is delivered by two workers at once and entries claimed by a
+      worker that died come due again when the lease runs out
+    - At most `concurrency` deliveries are in flight, over the shared n8n client
+    - Failed deliveries are retried with exponential backoff (jittered, capped);
+      after `max_attempts` the entry is dead-lettered (status 'dead') and kept
+    - Files uploaded through the API are sent from the local copy the upload left
+      in N8N_OUTBOX_SPOOL_DIR, which is deleted once the entry is sent or dead.
+      Direct browser uploads never pass through the API, and an entry claimed on
+      another host has no local copy; those files are fetched back from Drive
+    """
+
+    name = "n8n outbox dispatcher"
+
+    def __init__(self, concurrency: int, max_attempts: int, backoff_seconds: float, max_backoff_seconds: float,
+                 poll_interval: float, lease_seconds: float):
+        super().__init__(concurrency, poll_interval, backoff_seconds, max_backoff_seconds)
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self._client: Optional[UpstreamClient] = None
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+
+    async def start(self, client: Optional[UpstreamClient] = None):
+        """Start dispatching on the running event loop (from the app lifespan, after http_clients)."""
+        self._client = client or http_clients.n8n
+        await super().start()
+
+    async def stop(self):
+        """Stop dispatching; deliveries cut short are retried when their lease runs out."""
+        await super().stop()
+        self._client = None
+
+    def claim(self, limit: int) -> List[Dict[str, Any]]:
+        return N8NOutboxDAO.claim_due(limit, self.lease_seconds)
+
+    async def process(self, entry: Dict[str, Any]):
+        try:
+            await self._send(entry)
+        except Exception as e:
+            error = f"{type(e).__name__}: {str(e)}"
+            if entry["attempts"] >= self.max_attempts:
+                await run_in_threadpool(N8NOutboxDAO.mark_dead, entry["id"], error)
+                await self._discard_content(entry)
+                self.dead += 1
+                logger.error(f"n8n summary of file {entry['file_id']} dead-lettered after "
+                             f"{entry['attempts']} attempts: {error}")
+            else:
+                delay = self.backoff(entry["attempts"])
+                await run_in_threadpool(N8NOutboxDAO.schedule_retry, entry["id"], error, delay)
+                self.retried += 1
+                logger.warning(f"n8n summary of file {entry['file_id']} failed "
+                               f"(attempt {entry['attempts']}), retrying in {delay:.0f}s: {error}")
+            return
+
+        await run_in_threadpool(N8NOutboxDAO.mark_sent, entry["id"])
+        await self._discard_content(entry)
+        self.sent += 1
+
+    @staticmethod
+    def _open_content(entry: Dict[str, Any]) -> BinaryIO:
+        if entry["content_path"]:
+            try:
+                return open(entry["content_path"], "rb")
+            except FileNotFoundError:
+                pass
+        return GoogleDriveService.spool_file_content(entry["user_id"], entry["file_id"], entry["size"])
+
+    async def _discard_content(self, entry: Dict[str, Any]):
+        if entry["content_path"]:
+            await run_in_threadpool(N8NService.discard_content, entry["content_path"])
+
+    async def _send(self, entry: Dict[str, Any]):
+        # Files and Drive are blocking, open the content in the worker threadpool
+        content = await run_in_threadpool(self._open_content, entry)
+        with content:
+            await N8NService.send_file_summary(
+                self._client,
+                user_email=entry["user_email"],
+                user_id=entry["user_id"],
+                file_name=entry["file_name"],
+                file=content,
+                mimetype=entry["mime_type"],
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """Return delivery counters for this worker."""
+        return {
+            "sent": self.sent,
+            "retried": self.retried,
+            "dead": self.dead,
+            "in_flight": len(self._in_flight),
+        }
+
+
+# Global n8n outbox dispatcher instance
+n8n_outbox = N8NOutboxDispatcher(
+    concurrency=settings.n8n_outbox_concurrency,
+    max_attempts=settings.n8n_outbox_max_attempts,
+    backoff_seconds=settings.n8n_outbox_backoff_seconds,
+    max_backoff_seconds=settings.n8n_outbox_max_backoff_seconds,
+    poll_interval=settings.n8n_outbox_poll_interval_seconds,
+    lease_seconds=settings.n8n_outbox_lease_seconds,
+)
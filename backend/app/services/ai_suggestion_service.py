@@ -1,7 +1,49 @@
 """AI Suggestion Service for home remedies."""
-import httpx
-from typing import Optional
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
 from app.config import settings
+from app.http_clients import http_clients
+from app.suggestion_cache import SuggestionCache, SuggestionKey
+
+logger = logging.getLogger(__name__)
+
+
+class AISuggestionError(Exception):
+    """The model did not give a (complete) suggestion."""
+
+
+class SuggestionCleaner:
+    """Removes think tags and markdown asterisks from a suggestion as it streams in.
+
+    A piece may end partway through a marker ("</thi"), so text that could still
+    become one is held back until the next piece shows whether it does.
+    """
+
+    MARKERS = ("<think>", "</think>", "**")
+
+    def __init__(self):
+        self._held = ""
+        self._started = False
+
+    def feed(self, piece: str) -> str:
+        """Return the cleaned text of `piece` that is safe to show."""
+        text = self._held + piece
+        for marker in self.MARKERS:
+            text = text.replace(marker, "")
+        hold = max((size for marker in self.MARKERS for size in range(1, len(marker))
+                    if text.endswith(marker[:size])), default=0)
+        text, self._held = text[:len(text) - hold], text[len(text) - hold:]
+        if not self._started:
+            # Like .strip() on a whole answer: no leading whitespace
+            text = text.lstrip()
+            self._started = bool(text)
+        return text
+
+    def flush(self) -> str:
+        """Return the held-back text once the answer is complete."""
+        text, self._held = self._held, ""
+        return text if self._started else text.lstrip()
 
 
 class AISuggestionService:
@@ -11,18 +53,26 @@ class AISuggestionService:
     HUGGINGFACE_API_URL = "https://router.huggingface.co/v1/chat/completions"
     # Default model - a supported chat model on HF Inference
     DEFAULT_MODEL = "HuggingFaceTB/SmolLM3-3B:hf-inference"
+    # Bump when the prompts change, so suggestions cached for the old ones are not served
+    PROMPT_VERSION = 1
+
+    @staticmethod
+    def cache_key(illness_name: str, notes: Optional[str] = None, model: Optional[str] = None) -> SuggestionKey:
+        """Suggestion cache key for `model` (default DEFAULT_MODEL) and the current prompt."""
+        return SuggestionCache.key(
+            illness_name, notes, model or AISuggestionService.DEFAULT_MODEL, AISuggestionService.PROMPT_VERSION
+        )
     
     @staticmethod
-    async def get_home_remedies(illness_name: str, notes: Optional[str] = None) -> Optional[str]:
-        """Get home remedy suggestions for an illness using Hugging Face API."""
-        try:
-            description = illness_name
-            if notes:
-                description += f". Additional details: {notes}"
-            
-            system_prompt = "You are a helpful health assistant. Provide safe, practical home remedies. Always recommend consulting a doctor for serious symptoms."
-            
-            user_prompt = f"""A person is experiencing: {description}
+    def _request(illness_name: str, notes: Optional[str], model: Optional[str]) -> Tuple[Dict[str, str], Dict[str, Any]]:
+        """Headers and chat completion body asking `model` for home remedies."""
+        description = illness_name
+        if notes:
+            description += f". Additional details: {notes}"
+
+        system_prompt = "You are a helpful health assistant. Provide safe, practical home remedies. Always recommend consulting a doctor for serious symptoms."
+
+        user_prompt = f"""A person is experiencing: {description}
 
 Please provide 3-5 simple home remedies or tips that could help. Keep it brief and practical. Only suggest safe, common remedies like rest, hydration, etc.
 
@@ -30,43 +80,94 @@ Also, don't write the response as If you are thinking: write it in the style as
 
 Format your response as a simple numbered list."""
 
-            headers = {
-                "Content-Type": "application/json",
-            }
-            
-            # Add API key if configured
-            if settings.huggingface_api_key:
-                headers["Authorization"] = f"Bearer {settings.huggingface_api_key}"
-            
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    AISuggestionService.HUGGINGFACE_API_URL,
-                    headers=headers,
-                    json={
-                        "model": AISuggestionService.DEFAULT_MODEL,
-                        "messages": [
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": user_prompt}
-                        ],
-                        "max_tokens": 300,
-                        "temperature": 0.7
-                    }
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    if result and "choices" in result and len(result["choices"]) > 0:
-                        content = result["choices"][0]["message"]["content"].strip()
-                        # Remove thinking tags and markdown asterisks
-                        content = content.replace("<think>", "").replace("</think>", "")
-                        content = content.replace("**", "")
-                        return content
-                
-                # Log error but don't fail the illness creation
-                print(f"AI suggestion API error: {response.status_code} - {response.text}")
-                return None
-                
+        headers = {
+            "Content-Type": "application/json",
+        }
+
+        # Add API key if configured
+        if settings.huggingface_api_key:
+            headers["Authorization"] = f"Bearer {settings.huggingface_api_key}"
+
+        body = {
+            "model": model or AISuggestionService.DEFAULT_MODEL,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            "max_tokens": 300,
+            "temperature": 0.7
+        }
+        return headers, body
+
+    @staticmethod
+    async def get_home_remedies(illness_name: str, notes: Optional[str] = None, model: Optional[str] = None,
+                                url: Optional[str] = None) -> Optional[str]:
+        """
+        Get home remedy suggestions for an illness using Hugging Face API (over the shared pooled client).
+
+        `model` and `url` default to DEFAULT_MODEL on the HuggingFace router; hedged
+        requests pass an alternate model or OpenAI-compatible endpoint.
+        """
+        try:
+            headers, body = AISuggestionService._request(illness_name, notes, model)
+            response = await http_clients.huggingface.request(
+                "POST",
+                url or AISuggestionService.HUGGINGFACE_API_URL,
+                headers=headers,
+                json=body,
+            )
+
+            if response.status_code == 200:
+                result = response.json()
+                if result and "choices" in result and len(result["choices"]) > 0:
+                    content = result["choices"][0]["message"]["content"].strip()
+                    # Remove thinking tags and markdown asterisks
+                    content = content.replace("<think>", "").replace("</think>", "")
+                    content = content.replace("**", "")
+                    return content
+
+            # Log error but don't fail the illness creation
+            logger.warning(f"AI suggestion API error: {response.status_code} - {response.text}")
+            return None
+
         except Exception as e:
             # Log error but don't fail the illness creation
-            print(f"AI suggestion error: {str(e)}")
+            logger.warning(f"AI suggestion error: {str(e)}")
             return None
+
+    @staticmethod
+    async def stream_home_remedies(illness_name: str, notes: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Stream home remedy suggestions as the model generates them (`stream: true`).
+
+        Yields the text in pieces, with think tags and markdown asterisks removed as
+        they arrive. Raises AISuggestionError (or httpx.HTTPError) if the model
+        does not answer or the stream ends before the model finished.
+        """
+        headers, body = AISuggestionService._request(illness_name, notes, None)
+        async with http_clients.huggingface.stream(
+            "POST",
+            AISuggestionService.HUGGINGFACE_API_URL,
+            headers=headers,
+            json={**body, "stream": True},
+        ) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise AISuggestionError(f"AI suggestion API error: {response.status_code} - {response.text}")
+            cleaner = SuggestionCleaner()
+            async for line in response.aiter_lines():
+                # Server-sent events: one "data: <chunk JSON>" line per chunk, then "data: [DONE]"
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    rest = cleaner.flush()
+                    if rest:
+                        yield rest
+                    return
+                choices = json.loads(data).get("choices") or []
+                content = (choices[0].get("delta") or {}).get("content") if choices else None
+                text = cleaner.feed(content or "")
+                if text:
+                    yield text
+        raise AISuggestionError("AI suggestion stream ended early")
@@ -3,20 +3,28 @@ from typing import Dict, Any, Optional
 from datetime import timedelta, timezone, datetime
 import logging
 import secrets
+import uuid
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
+from app.account_provisioning import account_provisioner
 from app.config import settings
+from app.database import db
+from app.google_clients import google_clients
 from app.dao.user_dao import UserDAO
 from app.dao.google_credentials_dao import GoogleCredentialsDAO
+from app.dao.refresh_token_dao import RefreshTokenDAO
 from app.services.google_drive_service import GoogleDriveService
 from app.services.google_calendar_service import GoogleCalendarService
-from app.utils.jwt import create_access_token
+from app.utils.jwt import create_access_token, create_refresh_token, hash_refresh_token
 from app.models.user import UserResponse
 
 logger = logging.getLogger(__name__)
 
 
+class InvalidRefreshTokenError(Exception):
+    """The refresh token is unknown, expired, revoked or was already used."""
+
+
 class AuthService:
     """Business logic for authentication."""
     
@@ -47,7 +55,13 @@ class AuthService:
     
     @staticmethod
     def handle_google_callback(code: str) -> Dict[str, Any]:
-        """Handle Google OAuth callback and create/login user."""
+        """
+        Handle Google OAuth callback and create/login user.
+
+        Returns the JWT and a refresh token (starting a new token family) as soon as the
+        user and their Google credentials are stored; the Drive folder and LIFELINE
+        calendar are provisioned in the background.
+        """
         try:
             flow = Flow.from_client_config(
                 {
@@ -73,15 +87,15 @@ class AuthService:
             
             credentials = flow.credentials
             
-            user_info_service = build("oauth2", "v2", credentials=credentials)
-            user_info = user_info_service.userinfo().get().execute()
+            # The user does not exist yet, so this client is not pooled
+            with google_clients.service("oauth2", "v2", credentials) as user_info_service:
+                user_info = user_info_service.userinfo().get().execute()
             
             email = user_info.get("email")
             name = user_info.get("name")
             google_id = user_info.get("id")
             
-            from app.database import db
-            
+            # Only the DB writes run in the transaction; Google calls stay outside it
             with db.get_connection() as conn:
                 user = UserDAO.get_user_by_email(email, connection=conn)
                 
@@ -115,27 +129,75 @@ class AuthService:
                     connection=conn,
                 )
 
-                # Find or create the Google Drive folder
-                folder_id = GoogleDriveService.find_or_create_app_folder(user["id"], credentials, connection=conn)
-                logger.info(f"Ensured Drive folder exists for user {user['id']} with folder ID {folder_id}")
-
-                # Find or create the LIFELINE calendar
-                try:
-                    lifeline_calendar_id = GoogleCalendarService.find_or_create_lifeline_calendar(user["id"], credentials)
-                    logger.info(f"Ensured LIFELINE calendar exists for user {user['id']} with calendar ID {lifeline_calendar_id}")
-                except Exception as e:
-                    logger.warning(f"Could not create LIFELINE calendar for user {user['id']}: {e}")
-
-                # Re-fetch the user to get the updated drive_folder_id
                 user = UserDAO.get_user_by_id(user["id"], connection=conn)
+                refresh_token = AuthService._issue_refresh_token(user["id"], str(uuid.uuid4()), connection=conn)
+
+            # Find or create the Google Drive folder and the LIFELINE calendar in the background,
+            # once the credentials are committed; requests that need them first do it themselves
+            account_provisioner.provision(user["id"], credentials, {
+                "Drive folder": GoogleDriveService.find_or_create_app_folder,
+                "LIFELINE calendar": GoogleCalendarService.find_or_create_lifeline_calendar,
+            })
             
             access_token = create_access_token(data={"sub": str(user["id"])})
             
             return {
                 "access_token": access_token,
+                "refresh_token": refresh_token,
                 "token_type": "bearer",
                 "user": user,
             }
         except Exception as e:
             raise
 
+    @staticmethod
+    def _issue_refresh_token(user_id: int, family_id: str, connection) -> str:
+        """Store a new refresh token of `family_id` and return it; the user's expired tokens are dropped."""
+        refresh_token = create_refresh_token()
+        RefreshTokenDAO.delete_expired_tokens(user_id, connection=connection)
+        RefreshTokenDAO.create_token(
+            user_id=user_id,
+            token_hash=hash_refresh_token(refresh_token),
+            family_id=family_id,
+            ttl_seconds=settings.jwt_refresh_token_expire_days * 86400,
+            connection=connection,
+        )
+        return refresh_token
+
+    @staticmethod
+    def refresh_access_token(refresh_token: str) -> Dict[str, Any]:
+        """
+        Trade a refresh token for a new access token and a new refresh token.
+
+        One indexed lookup by the token's hash, no Google calls. The presented token is
+        rotated: it cannot be used again. Within JWT_REFRESH_TOKEN_REUSE_GRACE_SECONDS of
+        its rotation it still can, once per concurrent request (tabs or requests that
+        refreshed together), each getting its own new token of the family. Later, an
+        already rotated token means it leaked (or the client replayed it), so its whole
+        family - that login's current tokens included - is revoked and the user has to
+        sign in with Google again.
+        """
+        token_hash = hash_refresh_token(refresh_token)
+        with db.get_connection() as conn:
+            rotated = RefreshTokenDAO.rotate_token(
+                token_hash, settings.jwt_refresh_token_reuse_grace_seconds, connection=conn)
+            if rotated:
+                new_refresh_token = AuthService._issue_refresh_token(
+                    rotated["user_id"], rotated["family_id"], connection=conn)
+            else:
+                # Committed before raising, so the revocation sticks
+                token = RefreshTokenDAO.get_token(token_hash, connection=conn)
+                if token and token["rotated_at"] and not token["revoked_at"]:
+                    revoked = RefreshTokenDAO.revoke_family(token["family_id"], connection=conn)
+                    logger.warning(f"Refresh token reuse for user {token['user_id']}: "
+                                   f"revoked {revoked} token(s) of family {token['family_id']}")
+
+        if not rotated:
+            raise InvalidRefreshTokenError("Invalid or expired refresh token")
+
+        return {
+            "access_token": create_access_token(data={"sub": str(rotated["user_id"])}),
+            "refresh_token": new_refresh_token,
+            "token_type": "bearer",
+        }
+
@@ -1,15 +1,18 @@
 """Family member service."""
 from typing import List, Dict, Any, Optional
-from datetime import date
+from datetime import date, datetime
 from app.dao.family_member_dao import FamilyMemberDAO
 from app.models.family_member import FamilyMemberCreate, FamilyMemberUpdate, FamilyMemberResponse
+from app.utils.batch import batch_result, validate_items
+from app.utils.pagination import decode_cursor, build_page
+from app.config import settings
 
 
 class FamilyMemberService:
     """Business logic for family members."""
     
     @staticmethod
-    def create_family_member(user_id: int, member_data: FamilyMemberCreate) -> Dict[str, Any]:
+    def create_family_member(user_id: int, member_data: FamilyMemberCreate, connection=None) -> Dict[str, Any]:
         """Create a new family member."""
         return FamilyMemberDAO.create_family_member(
             user_id=user_id,
@@ -18,20 +21,41 @@ class FamilyMemberService:
             gender=member_data.gender,
             profession=member_data.profession,
             health_notes=member_data.health_notes,
+            connection=connection,
         )
     
     @staticmethod
-    def get_family_members(user_id: int) -> List[Dict[str, Any]]:
-        """Get all family members for a user."""
-        return FamilyMemberDAO.get_family_members_by_user_id(user_id)
+    def create_family_members(user_id: int, members: List[Any], connection=None) -> Dict[str, Any]:
+        """Create several family members with a single multi-row INSERT.
+
+        Items that fail FamilyMemberCreate validation are reported and skipped.
+        """
+        valid, results = validate_items(FamilyMemberCreate, members)
+        rows = FamilyMemberDAO.create_family_members(
+            user_id, [member.model_dump() for _, member in valid], connection=connection
+        )
+        results.extend(
+            {"index": index, "success": True, "item": row}
+            for (index, _), row in zip(valid, rows)
+        )
+        return batch_result(results)
+    
+    @staticmethod
+    def get_family_members(user_id: int, limit: Optional[int] = None, cursor: Optional[str] = None,
+                           connection=None) -> Dict[str, Any]:
+        """Get one page of family members for a user, newest first."""
+        limit = limit or settings.pagination_default_limit
+        after = decode_cursor(cursor, datetime.fromisoformat) if cursor else None
+        rows = FamilyMemberDAO.get_family_members_by_user_id(user_id, limit=limit + 1, after=after, connection=connection)
+        return build_page(rows, limit, "created_at")
     
     @staticmethod
-    def get_family_member(user_id: int, member_id: int) -> Optional[Dict[str, Any]]:
+    def get_family_member(user_id: int, member_id: int, connection=None) -> Optional[Dict[str, Any]]:
         """Get a specific family member."""
-        return FamilyMemberDAO.get_family_member_by_id(member_id, user_id)
+        return FamilyMemberDAO.get_family_member_by_id(member_id, user_id, connection=connection)
     
     @staticmethod
-    def update_family_member(user_id: int, member_id: int, member_data: FamilyMemberUpdate) -> Optional[Dict[str, Any]]:
+    def update_family_member(user_id: int, member_id: int, member_data: FamilyMemberUpdate, connection=None) -> Optional[Dict[str, Any]]:
         """Update a family member."""
         return FamilyMemberDAO.update_family_member(
             family_member_id=member_id,
@@ -41,10 +65,11 @@ class FamilyMemberService:
             gender=member_data.gender,
             profession=member_data.profession,
             health_notes=member_data.health_notes,
+            connection=connection,
         )
     
     @staticmethod
-    def delete_family_member(user_id: int, member_id: int) -> bool:
+    def delete_family_member(user_id: int, member_id: int, connection=None) -> bool:
         """Delete a family member."""
-        return FamilyMemberDAO.delete_family_member(member_id, user_id)
+        return FamilyMemberDAO.delete_family_member(member_id, user_id, connection=connection)
 
@@ -1,11 +1,12 @@
 """Google Calendar service."""
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Callable, List, Optional
 from datetime import datetime, timedelta, timezone
-from app.dao.google_credentials_dao import GoogleCredentialsDAO
-from app.config import settings
+from app.cache import user_cache
+from app.dao.user_dao import UserDAO
+from app.database import db
+from app.google_clients import google_clients
+from app.services.google_credentials_service import GoogleCredentialsService
 from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 import logging
 
@@ -25,106 +26,91 @@ class GoogleCalendarService:
     4. Support recurring events for medication schedules
     """
     
-    @staticmethod
-    def _ensure_naive_utc(dt: Optional[datetime]) -> Optional[datetime]:
-        """Ensure datetime is naive UTC (Google auth library expects naive UTC)."""
-        if dt is None:
-            return None
-        if dt.tzinfo is not None:
-            # Convert to UTC and remove timezone info
-            return dt.astimezone(timezone.utc).replace(tzinfo=None)
-        return dt
-    
     @staticmethod
     def get_credentials(user_id: int) -> Credentials:
-        """Get Google credentials for a user."""
-        creds_data = GoogleCredentialsDAO.get_credentials_by_user_id(user_id)
-        if not creds_data:
+        """Get valid (refreshed if needed) Google credentials for a user."""
+        credentials = GoogleCredentialsService.get_credentials(user_id)
+        if not credentials:
             raise ValueError("Google credentials not found. Please authenticate first.")
-        
-        # Google auth library expects naive UTC datetime for expiry
-        token_expiry = GoogleCalendarService._ensure_naive_utc(creds_data["token_expiry"])
-        
-        return Credentials(
-            token=creds_data["access_token"],
-            refresh_token=creds_data["refresh_token"],
-            token_uri="https://oauth2.googleapis.com/token",
-            client_id=settings.google_client_id,
-            client_secret=settings.google_client_secret,
-            scopes=[
-                "https://www.googleapis.com/auth/calendar",
-            ],
-            expiry=token_expiry,
-        )
+        return credentials
     
     @staticmethod
-    def _refresh_credentials_if_needed(credentials: Credentials, user_id: int) -> Credentials:
-        """Refresh credentials if expired or expiring soon (within 5 minutes)."""
-        if not credentials.refresh_token:
-            logger.warning(f"No refresh token available for user {user_id}")
-            return credentials
-        
-        needs_refresh = False
-        now = datetime.utcnow()  # Use naive UTC to match Google's internal comparison
-        
-        # Check if expired or expiring soon
-        if credentials.expiry:
-            time_until_expiry = credentials.expiry - now
-            if time_until_expiry.total_seconds() < 300:  # Less than 5 minutes
-                needs_refresh = True
-                if time_until_expiry.total_seconds() <= 0:
-                    logger.info(f"Credentials expired for user {user_id}, refreshing...")
-                else:
-                    logger.info(f"Credentials expiring soon for user {user_id}, refreshing...")
-        elif credentials.expired:
-            needs_refresh = True
-            logger.info(f"Credentials marked as expired for user {user_id}, refreshing...")
-        
-        if needs_refresh:
-            try:
-                credentials.refresh(Request())
-                # Store expiry as-is (naive UTC) since that's what Google returns
-                GoogleCredentialsDAO.create_or_update_credentials(
-                    user_id=user_id,
-                    access_token=credentials.token,
-                    refresh_token=credentials.refresh_token or credentials._refresh_token,
-                    token_expiry=credentials.expiry if credentials.expiry else datetime.utcnow() + timedelta(hours=1),
-                )
-                logger.info(f"Successfully refreshed credentials for user {user_id}")
-            except Exception as e:
-                logger.error(f"Failed to refresh credentials for user {user_id}: {e}")
-                raise
-        
-        return credentials
+    def _search_or_create_calendar(user_id: int, credentials: Credentials) -> str:
+        """Look through the user's calendar list for LIFELINE, creating it if it is missing."""
+        with google_clients.service("calendar", "v3", credentials, user_id=user_id) as service:
+            # Search for existing LIFELINE calendar
+            request = service.calendarList().list()
+            while request is not None:
+                calendar_list = request.execute()
+                for calendar in calendar_list.get("items", []):
+                    if calendar.get("summary") == LIFELINE_CALENDAR_NAME:
+                        logger.info(f"Found existing LIFELINE calendar for user {user_id}: {calendar['id']}")
+                        return calendar["id"]
+                request = service.calendarList().list_next(request, calendar_list)
+            
+            # Create new LIFELINE calendar
+            new_calendar = {
+                "summary": LIFELINE_CALENDAR_NAME,
+                "description": "Medical appointments and medication reminders managed by Life-Line app",
+                "timeZone": "UTC",
+            }
+            created_calendar = service.calendars().insert(body=new_calendar).execute()
+        logger.info(f"Created new LIFELINE calendar for user {user_id}: {created_calendar['id']}")
+        return created_calendar["id"]
     
     @staticmethod
-    def find_or_create_lifeline_calendar(user_id: int, credentials: Optional[Credentials] = None) -> str:
+    def find_or_create_lifeline_calendar(user_id: int, credentials: Optional[Credentials] = None,
+                                         connection=None) -> str:
         """
-        Find or create the LIFELINE calendar for the user.
+        Find or create the LIFELINE calendar for the user and store its ID on the user.
         Returns the calendar ID.
+        
+        Serialized per user across workers, so concurrent first-time calls don't
+        create duplicate calendars.
         """
         if credentials is None:
             credentials = GoogleCalendarService.get_credentials(user_id)
         
-        credentials = GoogleCalendarService._refresh_credentials_if_needed(credentials, user_id)
-        service = build("calendar", "v3", credentials=credentials)
+        # The advisory lock is held until commit, i.e. until the calendar ID is stored
+        with db.get_connection(connection) as conn:
+            UserDAO.lock_lifeline_calendar(user_id, connection=conn)
+            # Another request may have stored it while we waited for the lock
+            user = UserDAO.get_auth_user_by_id(user_id, connection=conn)
+            if user and user.get("lifeline_calendar_id"):
+                return user["lifeline_calendar_id"]
+            
+            calendar_id = GoogleCalendarService._search_or_create_calendar(user_id, credentials)
+            UserDAO.update_lifeline_calendar_id(user_id, calendar_id, connection=conn)
+            return calendar_id
+    
+    @staticmethod
+    def get_lifeline_calendar_id(user_id: int, credentials: Credentials) -> str:
+        """Get the user's LIFELINE calendar ID from the user cache/DB, finding or creating it only if unknown."""
+        user = user_cache.get_or_load(user_id, UserDAO.get_auth_user_by_id)
+        if user and user.get("lifeline_calendar_id"):
+            return user["lifeline_calendar_id"]
+        return GoogleCalendarService.find_or_create_lifeline_calendar(user_id, credentials)
+    
+    @staticmethod
+    def _call_lifeline_calendar(user_id: int, credentials: Credentials, call: Callable[[Any, str], Any]) -> Any:
+        """Run `call(service, calendar_id)` against the LIFELINE calendar.
         
-        # Search for existing LIFELINE calendar
-        calendar_list = service.calendarList().list().execute()
-        for calendar in calendar_list.get("items", []):
-            if calendar.get("summary") == LIFELINE_CALENDAR_NAME:
-                logger.info(f"Found existing LIFELINE calendar for user {user_id}: {calendar['id']}")
-                return calendar["id"]
+        If the stored calendar no longer exists (404), it is forgotten, found or
+        created again, and the call is retried once.
+        """
+        calendar_id = GoogleCalendarService.get_lifeline_calendar_id(user_id, credentials)
+        try:
+            with google_clients.service("calendar", "v3", credentials, user_id=user_id) as service:
+                return call(service, calendar_id)
+        except HttpError as e:
+            if e.resp.status != 404:
+                raise
         
-        # Create new LIFELINE calendar
-        new_calendar = {
-            "summary": LIFELINE_CALENDAR_NAME,
-            "description": "Medical appointments and medication reminders managed by Life-Line app",
-            "timeZone": "UTC",
-        }
-        created_calendar = service.calendars().insert(body=new_calendar).execute()
-        logger.info(f"Created new LIFELINE calendar for user {user_id}: {created_calendar['id']}")
-        return created_calendar["id"]
+        logger.warning(f"LIFELINE calendar {calendar_id} of user {user_id} not found, rediscovering")
+        UserDAO.clear_lifeline_calendar_id(user_id, calendar_id)
+        calendar_id = GoogleCalendarService.find_or_create_lifeline_calendar(user_id, credentials)
+        with google_clients.service("calendar", "v3", credentials, user_id=user_id) as service:
+            return call(service, calendar_id)
     
     @staticmethod
     def get_upcoming_events(user_id: int, days: int = 7, max_per_day: int = 3) -> Dict[str, List[Dict[str, Any]]]:
@@ -134,11 +120,6 @@ class GoogleCalendarService:
         Maximum of max_per_day events per day.
         """
         credentials = GoogleCalendarService.get_credentials(user_id)
-        credentials = GoogleCalendarService._refresh_credentials_if_needed(credentials, user_id)
-        service = build("calendar", "v3", credentials=credentials)
-        
-        # Find LIFELINE calendar
-        lifeline_calendar_id = GoogleCalendarService.find_or_create_lifeline_calendar(user_id, credentials)
         
         # Calculate time range
         now = datetime.now(timezone.utc)
@@ -146,13 +127,17 @@ class GoogleCalendarService:
         time_max = (now + timedelta(days=days)).isoformat()
         
         # Fetch events
-        events_result = service.events().list(
-            calendarId=lifeline_calendar_id,
-            timeMin=time_min,
-            timeMax=time_max,
-            singleEvents=True,
-            orderBy="startTime",
-        ).execute()
+        events_result = GoogleCalendarService._call_lifeline_calendar(
+            user_id,
+            credentials,
+            lambda service, calendar_id: service.events().list(
+                calendarId=calendar_id,
+                timeMin=time_min,
+                timeMax=time_max,
+                singleEvents=True,
+                orderBy="startTime",
+            ).execute(),
+        )
         
         events = events_result.get("items", [])
         
@@ -195,12 +180,6 @@ class GoogleCalendarService:
         - Automated medication reminders
         """
         credentials = GoogleCalendarService.get_credentials(user_id)
-        credentials = GoogleCalendarService._refresh_credentials_if_needed(credentials, user_id)
-        
-        service = build("calendar", "v3", credentials=credentials)
-        
-        # Get or create LIFELINE calendar
-        lifeline_calendar_id = GoogleCalendarService.find_or_create_lifeline_calendar(user_id, credentials)
         
         event = {
             "summary": summary,
@@ -215,6 +194,10 @@ class GoogleCalendarService:
             },
         }
         
-        created_event = service.events().insert(calendarId=lifeline_calendar_id, body=event).execute()
+        created_event = GoogleCalendarService._call_lifeline_calendar(
+            user_id,
+            credentials,
+            lambda service, calendar_id: service.events().insert(calendarId=calendar_id, body=event).execute(),
+        )
         return created_event
 
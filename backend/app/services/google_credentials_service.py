@@ -0,0 +1,111 @@
+"""Google OAuth credentials service."""
+from typing import Dict, Any, Optional
+from datetime import datetime, timezone, timedelta
+from google.oauth2.credentials import Credentials
+from google.auth.transport.requests import Request
+from app.config import settings
+from app.cache import google_credentials_cache
+from app.dao.google_credentials_dao import GoogleCredentialsDAO
+from app.database import db
+import logging
+
+logger = logging.getLogger(__name__)
+
+TOKEN_URI = "https://oauth2.googleapis.com/token"
+
+GOOGLE_SCOPES = [
+    "https://www.googleapis.com/auth/drive",
+    "https://www.googleapis.com/auth/calendar",
+]
+
+
+class GoogleCredentialsService:
+    """Cached, refreshed Google credentials shared by the Drive and Calendar services.
+
+    Credentials are cached per worker until their access token is about to expire.
+    An expiring token is refreshed once: threads of the same worker wait on the
+    cache's per-user lock, and other workers wait on a Postgres advisory lock and
+    then pick up the token the first one stored.
+    """
+
+    @staticmethod
+    def _ensure_naive_utc(dt: Optional[datetime]) -> Optional[datetime]:
+        """Ensure datetime is naive UTC (Google auth library expects naive UTC)."""
+        if dt is None:
+            return None
+        if dt.tzinfo is not None:
+            # Convert to UTC and remove timezone info
+            return dt.astimezone(timezone.utc).replace(tzinfo=None)
+        return dt
+
+    @staticmethod
+    def get_credentials(user_id: int) -> Optional[Credentials]:
+        """Get valid Google credentials for a user, or None if they never authenticated."""
+        creds_data = google_credentials_cache.get_or_load(user_id, GoogleCredentialsService._load_credentials)
+        if not creds_data:
+            return None
+
+        return GoogleCredentialsService._build_credentials(creds_data)
+
+    @staticmethod
+    def _build_credentials(creds_data: Dict[str, Any]) -> Credentials:
+        return Credentials(
+            token=creds_data["access_token"],
+            refresh_token=creds_data["refresh_token"],
+            token_uri=TOKEN_URI,
+            client_id=settings.google_client_id,
+            client_secret=settings.google_client_secret,
+            scopes=GOOGLE_SCOPES,
+            expiry=creds_data["token_expiry"],
+        )
+
+    @staticmethod
+    def _needs_refresh(creds_data: Dict[str, Any]) -> bool:
+        return bool(creds_data["refresh_token"]) and not google_credentials_cache.is_fresh(creds_data)
+
+    @staticmethod
+    def _load_credentials(user_id: int) -> Optional[Dict[str, Any]]:
+        """Load credentials from the database, refreshing them if they are about to expire."""
+        creds_data = GoogleCredentialsDAO.get_credentials_by_user_id(user_id)
+        if not creds_data:
+            return None
+        creds_data["token_expiry"] = GoogleCredentialsService._ensure_naive_utc(creds_data["token_expiry"])
+        if not creds_data["refresh_token"]:
+            logger.warning(f"No refresh token available for user {user_id}")
+        if not GoogleCredentialsService._needs_refresh(creds_data):
+            return creds_data
+
+        # The advisory lock is held until commit, i.e. until the refreshed token is stored
+        with db.get_connection() as conn:
+            GoogleCredentialsDAO.lock_for_refresh(user_id, connection=conn)
+            # Another worker may have refreshed while we waited for the lock
+            creds_data = GoogleCredentialsDAO.get_credentials_by_user_id(user_id, connection=conn)
+            if not creds_data:
+                return None
+            creds_data["token_expiry"] = GoogleCredentialsService._ensure_naive_utc(creds_data["token_expiry"])
+            if not GoogleCredentialsService._needs_refresh(creds_data):
+                logger.info(f"Using credentials refreshed by another worker for user {user_id}")
+                return creds_data
+            return GoogleCredentialsService._refresh(user_id, creds_data, connection=conn)
+
+    @staticmethod
+    def _refresh(user_id: int, creds_data: Dict[str, Any], connection) -> Dict[str, Any]:
+        """Exchange the refresh token for a new access token and store it."""
+        logger.info(f"Credentials for user {user_id} expired or expiring soon, refreshing...")
+        credentials = GoogleCredentialsService._build_credentials(creds_data)
+        try:
+            credentials.refresh(Request())
+        except Exception as e:
+            logger.error(f"Failed to refresh credentials for user {user_id}: {e}")
+            raise
+
+        # Store expiry as-is (naive UTC) since that's what Google returns
+        refreshed = GoogleCredentialsDAO.update_refreshed_token(
+            user_id=user_id,
+            access_token=credentials.token,
+            refresh_token=credentials.refresh_token or creds_data["refresh_token"],
+            token_expiry=credentials.expiry if credentials.expiry else datetime.utcnow() + timedelta(hours=1),
+            connection=connection,
+        )
+        logger.info(f"Successfully refreshed credentials for user {user_id}")
+        return refreshed
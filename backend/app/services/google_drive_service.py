@@ -1,177 +1,376 @@
 """Google Drive service."""
-from typing import List, Dict, Any, Optional
+from typing import BinaryIO, Dict, Any, Iterator, Optional, Tuple
+from datetime import date, datetime, timezone
+from google.auth.transport.requests import AuthorizedSession
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload, MediaIoBaseDownload
-from google.auth.transport.requests import Request
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaIoBaseUpload
+from app.cache import user_cache
 from app.config import settings
-from app.dao.google_credentials_dao import GoogleCredentialsDAO
+from app.dao.drive_file_dao import DriveFileDAO
+from app.dao.drive_upload_session_dao import DriveUploadSessionDAO
 from app.dao.user_dao import UserDAO
-from datetime import datetime, timezone, timedelta
-import io
+from app.database import db
+from app.google_clients import google_clients
+from app.services.n8n_service import N8NService
+from app.services.google_credentials_service import GoogleCredentialsService
+from app.utils.pagination import decode_cursor, build_page
+import requests
+import tempfile
 import logging
 
 logger = logging.getLogger(__name__)
 
+FILE_FIELDS = "id, name, mimeType, size, createdTime, modifiedTime"
+DOWNLOAD_FIELDS = "id, name, mimeType, size, md5Checksum, modifiedTime, parents, trashed"
+CHANGE_FIELDS = (
+    "nextPageToken, newStartPageToken, "
+    "changes(fileId, removed, file(id, name, mimeType, size, createdTime, modifiedTime, parents, trashed))"
+)
+
 
 class GoogleDriveService:
     """Business logic for Google Drive integration."""
     
-    @staticmethod
-    def _ensure_naive_utc(dt: Optional[datetime]) -> Optional[datetime]:
-        """Ensure datetime is naive UTC (Google auth library expects naive UTC)."""
-        if dt is None:
-            return None
-        if dt.tzinfo is not None:
-            # Convert to UTC and remove timezone info
-            return dt.astimezone(timezone.utc).replace(tzinfo=None)
-        return dt
-    
     @staticmethod
     def get_credentials(user_id: int) -> Optional[Credentials]:
-        """Get Google credentials for a user."""
-        creds_data = GoogleCredentialsDAO.get_credentials_by_user_id(user_id)
-        if not creds_data:
-            return None
-        
-        # Google auth library expects naive UTC datetime for expiry
-        token_expiry = GoogleDriveService._ensure_naive_utc(creds_data["token_expiry"])
-        
-        return Credentials(
-            token=creds_data["access_token"],
-            refresh_token=creds_data["refresh_token"],
-            token_uri="https://oauth2.googleapis.com/token",
-            client_id=settings.google_client_id,
-            client_secret=settings.google_client_secret,
-            scopes=[
-                "https://www.googleapis.com/auth/drive",
-                "https://www.googleapis.com/auth/calendar",
-            ],
-            expiry=token_expiry,
-        )
-    
-    @staticmethod
-    def _refresh_credentials_if_needed(credentials: Credentials, user_id: int) -> Credentials:
-        """Refresh credentials if expired or expiring soon (within 5 minutes)."""
-        if not credentials.refresh_token:
-            logger.warning(f"No refresh token available for user {user_id}")
-            return credentials
-        
-        needs_refresh = False
-        now = datetime.utcnow()  # Use naive UTC to match Google's internal comparison
-        
-        # Check if expired or expiring soon
-        if credentials.expiry:
-            time_until_expiry = credentials.expiry - now
-            if time_until_expiry.total_seconds() < 300:  # Less than 5 minutes
-                needs_refresh = True
-                if time_until_expiry.total_seconds() <= 0:
-                    logger.info(f"Credentials expired for user {user_id}, refreshing...")
-                else:
-                    logger.info(f"Credentials expiring soon for user {user_id}, refreshing...")
-        elif credentials.expired:
-            needs_refresh = True
-            logger.info(f"Credentials marked as expired for user {user_id}, refreshing...")
-        
-        if needs_refresh:
-            try:
-                credentials.refresh(Request())
-                # Store expiry as-is (naive UTC) since that's what Google returns
-                GoogleCredentialsDAO.create_or_update_credentials(
-                    user_id=user_id,
-                    access_token=credentials.token,
-                    refresh_token=credentials.refresh_token or credentials._refresh_token,
-                    token_expiry=credentials.expiry if credentials.expiry else datetime.utcnow() + timedelta(hours=1),
-                )
-                logger.info(f"Successfully refreshed credentials for user {user_id}")
-            except Exception as e:
-                logger.error(f"Failed to refresh credentials for user {user_id}: {e}")
-                raise
-        
-        return credentials
+        """Get valid (refreshed if needed) Google credentials for a user."""
+        return GoogleCredentialsService.get_credentials(user_id)
 
     @staticmethod
-    def find_or_create_app_folder(user_id: int, credentials: Optional[Credentials], connection=None) -> str:
-        """Find or create the 'LifeLine Records' folder and return its ID."""
+    def find_or_create_app_folder(user_id: int, credentials: Optional[Credentials] = None, connection=None) -> str:
+        """
+        Find or create the 'LifeLine Records' folder, store its ID on the user and return it.
+
+        Serialized per user across workers, and a no-op once the ID is stored, so
+        the login's background provisioning and a request that needs the folder
+        first don't create two folders.
+        """
+        if credentials is None:
+            credentials = GoogleDriveService.get_credentials(user_id)
         if not credentials:
             raise ValueError("Google credentials not found. Please authenticate first.")
 
-        service = build("drive", "v3", credentials=credentials)
-        
-        # Search for the folder
-        query = "name='LifeLine Records' and mimeType='application/vnd.google-apps.folder' and trashed=false"
-        results = service.files().list(q=query, spaces="drive", fields="files(id, name)").execute()
-        files = results.get("files", [])
-        
-        if files:
-            # Folder exists
-            folder_id = files[0].get("id")
-            UserDAO.update_drive_folder_id(user_id, folder_id, connection=connection)
-            return folder_id
-        else:
-            # Folder does not exist, create it
-            file_metadata = {
-                "name": "LifeLine Records",
-                "mimeType": "application/vnd.google-apps.folder"
-            }
-            folder = service.files().create(body=file_metadata, fields="id").execute()
-            folder_id = folder.get("id")
-            UserDAO.update_drive_folder_id(user_id, folder_id, connection=connection)
+        # The advisory lock is held until commit, i.e. until the folder ID is stored
+        with db.get_connection(connection) as conn:
+            UserDAO.lock_drive_folder(user_id, connection=conn)
+            # Another request may have stored it while we waited for the lock
+            user = UserDAO.get_auth_user_by_id(user_id, connection=conn)
+            if user and user.get("drive_folder_id"):
+                return user["drive_folder_id"]
+
+            folder_id = GoogleDriveService._search_or_create_folder(user_id, credentials)
+            UserDAO.update_drive_folder_id(user_id, folder_id, connection=conn)
             return folder_id
 
+    @staticmethod
+    def _search_or_create_folder(user_id: int, credentials: Credentials) -> str:
+        """Look for the 'LifeLine Records' folder in the user's Drive, creating it if it is missing."""
+        with google_clients.service("drive", "v3", credentials, user_id=user_id) as service:
+            # Search for the folder
+            query = "name='LifeLine Records' and mimeType='application/vnd.google-apps.folder' and trashed=false"
+            results = service.files().list(q=query, spaces="drive", fields="files(id, name)").execute()
+            files = results.get("files", [])
+            
+            if files:
+                # Folder exists
+                folder_id = files[0].get("id")
+            else:
+                # Folder does not exist, create it
+                file_metadata = {
+                    "name": "LifeLine Records",
+                    "mimeType": "application/vnd.google-apps.folder"
+                }
+                folder = service.files().create(body=file_metadata, fields="id").execute()
+                folder_id = folder.get("id")
+        return folder_id
+
     
     @staticmethod
-    def list_files(user_id: int) -> List[Dict[str, Any]]:
+    def _get_drive_folder_id(user_id: int) -> str:
+        user = user_cache.get_or_load(user_id, UserDAO.get_auth_user_by_id)
+        if not user:
+            raise ValueError("Drive folder ID not found for user.")
+        if not user.get("drive_folder_id"):
+            # Provisioned in the background at login; this request got here first
+            return GoogleDriveService.find_or_create_app_folder(user_id)
+        return user["drive_folder_id"]
+
+    @staticmethod
+    def _parse_drive_time(value: str) -> datetime:
+        """Parse an RFC 3339 Drive timestamp into naive UTC."""
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone(timezone.utc).replace(tzinfo=None)
+
+    @staticmethod
+    def _to_row(file: Dict[str, Any]) -> Dict[str, Any]:
+        """Drive file resource -> drive_files row."""
+        return {
+            "file_id": file["id"],
+            "name": file["name"],
+            "mime_type": file["mimeType"],
+            "size": int(file["size"]) if file.get("size") is not None else None,
+            "created_time": GoogleDriveService._parse_drive_time(file["createdTime"]),
+            "modified_time": GoogleDriveService._parse_drive_time(file["modifiedTime"]),
+        }
+
+    @staticmethod
+    def _to_file(row: Dict[str, Any]) -> Dict[str, Any]:
+        """drive_files row -> the file shape Drive returns (and the frontend expects)."""
+        return {
+            "id": row["file_id"],
+            "name": row["name"],
+            "mimeType": row["mime_type"],
+            "size": row["size"],
+            "createdTime": row["created_time"].isoformat(timespec="milliseconds") + "Z",
+            "modifiedTime": row["modified_time"].isoformat(timespec="milliseconds") + "Z",
+        }
+
+    @staticmethod
+    def parse_cursor(cursor: str, sort: str) -> Tuple[Any, int]:
+        """Decode a list_files cursor issued for the same `sort`."""
+        return decode_cursor(cursor, str if sort == "name" else datetime.fromisoformat)
+
+    @staticmethod
+    def list_files(
+        user_id: int,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[Any, int]] = None,
+        sort: str = "modified_time",
+        mime_type: Optional[str] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> Dict[str, Any]:
         """
-        List files from the user's 'LifeLine Records' folder in Google Drive.
+        List one page of files from the user's 'LifeLine Records' folder.
+
+        Files are served from drive_files. A first page brings the table up to date
+        with Drive first (at most once per drive_sync_interval_seconds); following
+        pages do not call Google at all.
         """
         credentials = GoogleDriveService.get_credentials(user_id)
         if not credentials:
             raise ValueError("Google credentials not found. Please authenticate first.")
+        drive_folder_id = GoogleDriveService._get_drive_folder_id(user_id)
 
-        user = UserDAO.get_user_by_id(user_id)
-        if not user or not user.get("drive_folder_id"):
-            # This should ideally not happen if the login flow is correct
-            raise ValueError("Drive folder ID not found for user.")
+        if after is None:
+            state = DriveFileDAO.get_sync_state(user_id)
+            if state is None or state["age_seconds"] >= settings.drive_sync_interval_seconds:
+                try:
+                    GoogleDriveService.sync_files(user_id, credentials, drive_folder_id, state)
+                except HttpError:
+                    if state is None:
+                        raise
+                    logger.exception(f"Drive sync failed for user {user_id}, serving the last synced listing")
+
+        limit = limit or settings.pagination_default_limit
+        rows = DriveFileDAO.get_files_by_user_id(
+            user_id,
+            limit=limit + 1,
+            after=after,
+            sort=sort,
+            mime_type=mime_type,
+            start_date=start_date,
+            end_date=end_date,
+        )
+        page = build_page(rows, limit, sort)
+        page["items"] = [GoogleDriveService._to_file(row) for row in page["items"]]
+        return page
 
-        drive_folder_id = user["drive_folder_id"]
+    @staticmethod
+    def sync_files(user_id: int, credentials: Credentials, drive_folder_id: str, state: Optional[Dict[str, Any]]):
+        """Bring drive_files up to date with the user's folder.
 
-        # Refresh token if needed
-        credentials = GoogleDriveService._refresh_credentials_if_needed(credentials, user_id)
-        
-        service = build("drive", "v3", credentials=credentials)
+        With a stored page token only the changes since then are fetched (usually one
+        cheap request). Without one, or if Google no longer accepts it, the folder is
+        listed in full.
+        """
+        if state is not None:
+            try:
+                GoogleDriveService._apply_changes(user_id, credentials, drive_folder_id, state["page_token"])
+                return
+            except HttpError as e:
+                if e.resp.status not in (400, 404, 410):
+                    raise
+                logger.warning(f"Drive page token for user {user_id} is no longer valid, listing the folder again")
+        GoogleDriveService._full_sync(
+            user_id, credentials, drive_folder_id, state["page_token"] if state else None
+        )
+
+    @staticmethod
+    def _apply_changes(user_id: int, credentials: Credentials, drive_folder_id: str, page_token: str):
+        """Fetch the changes since `page_token` and apply those touching the folder."""
+        upserts: Dict[str, Dict[str, Any]] = {}
+        deletes = set()
+        token = page_token
+        with google_clients.service("drive", "v3", credentials, user_id=user_id) as service:
+            while True:
+                response = service.changes().list(
+                    pageToken=token, spaces="drive", pageSize=1000, includeRemoved=True, fields=CHANGE_FIELDS
+                ).execute()
+                for change in response.get("changes", []):
+                    file_id = change.get("fileId")
+                    if not file_id:
+                        continue
+                    file = change.get("file")
+                    # Removed, trashed or moved out of the folder: no longer listed
+                    if change.get("removed") or not file or file.get("trashed") \
+                            or drive_folder_id not in file.get("parents", []):
+                        upserts.pop(file_id, None)
+                        deletes.add(file_id)
+                    else:
+                        deletes.discard(file_id)
+                        upserts[file_id] = GoogleDriveService._to_row(file)
+                if "newStartPageToken" in response:
+                    new_token = response["newStartPageToken"]
+                    break
+                token = response["nextPageToken"]
+
+        # No Google calls below; the page token update decides which concurrent sync applies its changes
+        with db.get_connection() as conn:
+            if not DriveFileDAO.advance_page_token(user_id, page_token, new_token, connection=conn):
+                logger.info(f"Drive changes for user {user_id} were already applied by another request")
+                return
+            DriveFileDAO.delete_files(user_id, list(deletes), connection=conn)
+            DriveFileDAO.upsert_files(user_id, list(upserts.values()), connection=conn)
+
+    @staticmethod
+    def _full_sync(user_id: int, credentials: Credentials, drive_folder_id: str, old_token: Optional[str]):
+        """List the whole folder (following nextPageToken) and replace the user's rows."""
         query = f"'{drive_folder_id}' in parents and trashed=false"
-        results = service.files().list(q=query, pageSize=100, fields="files(id, name, mimeType, createdTime, modifiedTime)").execute()
-        files = results.get("files", [])
-        
-        return files
-    
+        rows: Dict[str, Dict[str, Any]] = {}
+        with google_clients.service("drive", "v3", credentials, user_id=user_id) as service:
+            # Take the token first: changes made while listing are picked up by the next poll
+            new_token = service.changes().getStartPageToken().execute()["startPageToken"]
+            request = service.files().list(q=query, pageSize=1000, fields=f"nextPageToken, files({FILE_FIELDS})")
+            while request is not None:
+                response = request.execute()
+                for file in response.get("files", []):
+                    rows[file["id"]] = GoogleDriveService._to_row(file)
+                request = service.files().list_next(request, response)
+
+        with db.get_connection() as conn:
+            if not DriveFileDAO.advance_page_token(user_id, old_token, new_token, connection=conn):
+                logger.info(f"Drive folder for user {user_id} was already listed by another request")
+                return
+            DriveFileDAO.delete_files_except(user_id, list(rows), connection=conn)
+            DriveFileDAO.upsert_files(user_id, list(rows.values()), connection=conn)
+        logger.info(f"Listed {len(rows)} Drive files for user {user_id}")
+
     @staticmethod
     def upload_file(user_id: int, file: Any, file_name: str, mimetype: str) -> Dict[str, Any]:
         """
         Upload a file to the user's 'LifeLine Records' folder in Google Drive.
+
+        `file` is read from its current position to the end with a resumable upload.
+        The file is recorded in drive_files and its n8n summary queued (with a copy of
+        `file` to send from) in one transaction.
         """
         credentials = GoogleDriveService.get_credentials(user_id)
         if not credentials:
             raise ValueError("Google credentials not found. Please authenticate first.")
 
-        user = UserDAO.get_user_by_id(user_id)
-        if not user or not user.get("drive_folder_id"):
-            raise ValueError("Drive folder ID not found for user.")
-
-        drive_folder_id = user["drive_folder_id"]
-        
-        # Refresh token if needed
-        credentials = GoogleDriveService._refresh_credentials_if_needed(credentials, user_id)
+        drive_folder_id = GoogleDriveService._get_drive_folder_id(user_id)
         
-        service = build("drive", "v3", credentials=credentials)
         file_metadata = {"name": file_name, "parents": [drive_folder_id]}
-        media = MediaIoBaseUpload(file, mimetype=mimetype, resumable=True)
+        # Sent in fixed-size chunks; only one chunk of the file is in memory at a time
+        media = MediaIoBaseUpload(file, mimetype=mimetype, chunksize=settings.drive_upload_chunk_size, resumable=True)
         
-        file = service.files().create(body=file_metadata, media_body=media, fields="id, name, mimeType").execute()
+        with google_clients.service("drive", "v3", credentials, user_id=user_id) as service:
+            uploaded = service.files().create(body=file_metadata, media_body=media, fields=FILE_FIELDS).execute()
+        with db.get_connection() as conn:
+            # Write through so the next listing shows the file without waiting for a changes poll
+            DriveFileDAO.upsert_files(user_id, [GoogleDriveService._to_row(uploaded)], connection=conn)
+            N8NService.enqueue_file_summary(user_id, uploaded, content=file, connection=conn)
+        return uploaded
+
+    @staticmethod
+    def create_upload_session(user_id: int, file_name: str, mime_type: str, size: int,
+                              origin: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Open a Drive resumable upload session in the user's 'LifeLine Records' folder
+        for the browser to PUT the file to directly.
+
+        `origin` is the browser's origin; Drive only answers the browser's PUT with
+        CORS headers for the origin the session was opened with.
+        """
+        credentials = GoogleDriveService.get_credentials(user_id)
+        if not credentials:
+            raise ValueError("Google credentials not found. Please authenticate first.")
+        drive_folder_id = GoogleDriveService._get_drive_folder_id(user_id)
+
+        headers = {"X-Upload-Content-Type": mime_type, "X-Upload-Content-Length": str(size)}
+        if origin:
+            headers["Origin"] = origin
+        with AuthorizedSession(credentials) as session:
+            response = session.post(
+                settings.google_drive_upload_url,
+                params={"uploadType": "resumable", "fields": FILE_FIELDS},
+                json={"name": file_name, "mimeType": mime_type, "parents": [drive_folder_id]},
+                headers=headers,
+                timeout=settings.google_http_timeout,
+            )
+        response.raise_for_status()
+
+        upload_session = DriveUploadSessionDAO.create_session(
+            user_id, response.headers["Location"], file_name, mime_type, size
+        )
+        upload_session["upload_url"] = upload_session["session_uri"]
+        return upload_session
+
+    @staticmethod
+    def complete_upload_session(user_id: int, session_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Confirm with Drive that the browser finished uploading, record the file and
+        queue its n8n summary.
+
+        Returns the uploaded file, or None for an unknown session. The summary is
+        queued in the same transaction that completes the session, so it is queued
+        exactly once however often the session is completed.
+        """
+        upload_session = DriveUploadSessionDAO.get_session(session_id, user_id)
+        if not upload_session:
+            return None
+        if upload_session["file_id"]:
+            return GoogleDriveService._session_file(upload_session)
+
+        # An empty PUT asks Drive for the upload status; the session URI is its own credential
+        response = requests.put(
+            upload_session["session_uri"],
+            headers={"Content-Range": f"bytes */{upload_session['size']}"},
+            timeout=settings.google_http_timeout,
+        )
+        if response.status_code == 308:
+            raise ValueError("Upload is not complete yet.")
+        if response.status_code in (404, 410):
+            raise ValueError("Upload session expired, please upload the file again.")
+        response.raise_for_status()
+        file = response.json()
+
+        with db.get_connection() as conn:
+            if DriveUploadSessionDAO.complete_session(session_id, user_id, file["id"], connection=conn):
+                N8NService.enqueue_file_summary(user_id, file, connection=conn)
+            DriveFileDAO.upsert_files(user_id, [GoogleDriveService._to_row(file)], connection=conn)
         return file
 
+    @staticmethod
+    def _session_file(upload_session: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": upload_session["file_id"],
+            "name": upload_session["file_name"],
+            "mimeType": upload_session["mime_type"],
+            "size": str(upload_session["size"]),
+        }
+
+    @staticmethod
+    def spool_file_content(user_id: int, file_id: str, size: int) -> BinaryIO:
+        """Copy a Drive file into a temporary file (on disk past 1 MB), read from the start."""
+        spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+        for chunk in GoogleDriveService.iter_file_content(user_id, file_id, 0, size - 1):
+            spool.write(chunk)
+        spool.seek(0)
+        return spool
+
     @staticmethod
     def delete_file(user_id: int, file_id: str):
         """Delete a file from Google Drive."""
@@ -179,29 +378,55 @@ class GoogleDriveService:
         if not credentials:
             raise ValueError("Google credentials not found. Please authenticate first.")
 
-        # Refresh token if needed
-        credentials = GoogleDriveService._refresh_credentials_if_needed(credentials, user_id)
-
-        service = build("drive", "v3", credentials=credentials)
-        service.files().delete(fileId=file_id).execute()
+        with google_clients.service("drive", "v3", credentials, user_id=user_id) as service:
+            service.files().delete(fileId=file_id).execute()
+        DriveFileDAO.delete_files(user_id, [file_id])
 
     @staticmethod
-    async def download_file(user_id: int, file_id: str) -> bytes:
-        """Download a file from Google Drive."""
+    def get_file_metadata(user_id: int, file_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get what a download needs (name, type, size, checksum) for a file in the
+        user's 'LifeLine Records' folder, or None if there is no such file.
+        """
         credentials = GoogleDriveService.get_credentials(user_id)
         if not credentials:
             raise ValueError("Google credentials not found. Please authenticate first.")
+        drive_folder_id = GoogleDriveService._get_drive_folder_id(user_id)
 
-        # Refresh token if needed
-        credentials = GoogleDriveService._refresh_credentials_if_needed(credentials, user_id)
+        try:
+            with google_clients.service("drive", "v3", credentials, user_id=user_id) as service:
+                file = service.files().get(fileId=file_id, fields=DOWNLOAD_FIELDS).execute()
+        except HttpError as e:
+            if e.resp.status == 404:
+                return None
+            raise
+        if file.get("trashed") or drive_folder_id not in file.get("parents", []):
+            return None
+        if file.get("size") is None:
+            # Google Docs/Sheets/... have no binary content to download
+            raise ValueError("This file type cannot be downloaded directly.")
+        file["size"] = int(file["size"])
+        return file
 
-        service = build("drive", "v3", credentials=credentials)
-        request = service.files().get_media(fileId=file_id)
-        file_data = io.BytesIO()
-        downloader = MediaIoBaseDownload(file_data, request)
-        done = False
-        while done is False:
-            status, done = downloader.next_chunk()
-            logger.debug(f"Download {int(status.progress() * 100)}%")
-        return file_data.getvalue()
+    @staticmethod
+    def iter_file_content(user_id: int, file_id: str, start: int, end: int) -> Iterator[bytes]:
+        """
+        Yield bytes `start`..`end` (inclusive) of a Drive file, one ranged request per
+        drive_download_chunk_size, so at most one chunk is in memory at a time.
+        """
+        credentials = GoogleDriveService.get_credentials(user_id)
+        if not credentials:
+            raise ValueError("Google credentials not found. Please authenticate first.")
 
+        with google_clients.service("drive", "v3", credentials, user_id=user_id) as service:
+            offset = start
+            while offset <= end:
+                chunk_end = min(offset + settings.drive_download_chunk_size - 1, end)
+                request = service.files().get_media(fileId=file_id)
+                request.headers["range"] = f"bytes={offset}-{chunk_end}"
+                chunk = request.execute()
+                if not chunk:
+                    logger.warning(f"Drive file {file_id} ended at byte {offset}, expected {end + 1}")
+                    return
+                yield chunk
+                offset += len(chunk)
@@ -1,9 +1,14 @@
 """Illness log service."""
-from typing import List, Dict, Any, Optional
+import json
+import time
+from typing import AsyncIterator, List, Dict, Any, Optional
+from datetime import date
+from starlette.concurrency import run_in_threadpool
 from app.dao.illness_log_dao import IllnessLogDAO
 from app.dao.family_member_dao import FamilyMemberDAO
 from app.models.illness_log import IllnessLogCreate, IllnessLogUpdate
-from app.services.ai_suggestion_service import AISuggestionService
+from app.suggestion_worker import suggestion_worker
+from app.utils.pagination import decode_cursor, build_page
 from app.config import settings
 
 
@@ -11,45 +16,129 @@ class IllnessLogService:
     """Business logic for illness logs."""
     
     @staticmethod
-    async def create_illness_log(user_id: int, log_data: IllnessLogCreate) -> Dict[str, Any]:
-        """Create a new illness log with AI suggestions."""
+    def create_illness_log(user_id: int, log_data: IllnessLogCreate, connection=None) -> Dict[str, Any]:
+        """
+        Create a new illness log.
+
+        The AI suggestion (if the feature is enabled) is generated afterwards, by the
+        suggestion worker or a client's token stream; until then the log's
+        suggestion_status is 'pending'.
+        """
         # Verify the family member belongs to the user
-        family_member = FamilyMemberDAO.get_family_member_by_id(log_data.family_member_id, user_id)
+        family_member = FamilyMemberDAO.get_family_member_by_id(
+            log_data.family_member_id, user_id, connection=connection
+        )
         if not family_member:
             raise ValueError("Family member not found or does not belong to user")
-        
-        # Get AI suggestion for home remedies (if feature is enabled)
-        ai_suggestion = None
-        if settings.feature_ai_illness_suggestions_enabled:
-            ai_suggestion = await AISuggestionService.get_home_remedies(
-                illness_name=log_data.illness_name,
-                notes=log_data.notes
-            )
-        
+
+        if log_data.ai_suggestion:
+            suggestion_status = "ready"
+        elif settings.feature_ai_illness_suggestions_enabled:
+            suggestion_status = "pending"
+        else:
+            suggestion_status = "none"
+
         result = IllnessLogDAO.create_illness_log(
+            user_id=user_id,
             family_member_id=log_data.family_member_id,
             illness_name=log_data.illness_name,
             start_date=log_data.start_date,
             end_date=log_data.end_date,
             notes=log_data.notes,
-            ai_suggestion=ai_suggestion,
+            ai_suggestion=log_data.ai_suggestion,
+            suggestion_status=suggestion_status,
+            suggestion_source="user" if log_data.ai_suggestion else None,
+            # Leave a client time to stream the suggestion before the worker takes it
+            suggestion_delay_seconds=settings.ai_suggestion_stream_grace_seconds,
+            connection=connection,
         )
         # Add family member name to response
         result["family_member_name"] = family_member["name"]
         return result
-    
+
     @staticmethod
-    def get_illness_logs(user_id: int, family_member_id: Optional[int] = None) -> List[Dict[str, Any]]:
-        """Get all illness logs for a user, optionally filtered by family member."""
-        return IllnessLogDAO.get_illness_logs_by_user_id(user_id, family_member_id)
+    async def suggestion_events(user_id: int, log: Dict[str, Any]) -> AsyncIterator[str]:
+        """
+        Server-sent events for a log's AI suggestion: one `suggestion` event once it is
+        no longer pending, or when AI_SUGGESTION_EVENTS_TIMEOUT_SECONDS run out, then
+        the stream ends.
+
+        The stream waits for this worker's suggestion worker to report the log done.
+        Another worker process may claim it instead, so without that signal the log is
+        re-read every AI_SUGGESTION_EVENTS_POLL_SECONDS.
+        """
+        deadline = time.monotonic() + settings.ai_suggestion_events_timeout_seconds
+        while log["suggestion_status"] == "pending":
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Comment lines keep proxies from closing an idle stream
+            yield ": waiting\n\n"
+            await suggestion_worker.wait(log["id"], min(settings.ai_suggestion_events_poll_seconds, remaining))
+            # DAO calls are blocking, keep them off the event loop
+            log = await run_in_threadpool(IllnessLogDAO.get_illness_log_by_id, log["id"], user_id)
+            if log is None:
+                return
+        data = {key: log[key] for key in ("id", "suggestion_status", "suggestion_source", "ai_suggestion")}
+        yield f"event: suggestion\ndata: {json.dumps(data)}\n\n"
+
+    @staticmethod
+    async def stream_suggestion(user_id: int, log: Dict[str, Any]) -> AsyncIterator[str]:
+        """
+        Server-sent events streaming a log's AI suggestion as the model writes it.
+
+        If the log is pending and no worker has it yet, it is claimed and generated
+        for this stream: `token` events ({text}) carry the suggestion piece by piece.
+        Then, as from suggestion_events(), one `suggestion` event carries the stored
+        suggestion, which replaces the tokens (a failed stream is retried by the
+        worker, or answered from the fallback table). A log a worker already has is
+        only waited for.
+        """
+        if log["suggestion_status"] == "pending":
+            # DAO calls are blocking, keep them off the event loop
+            claimed = await run_in_threadpool(
+                IllnessLogDAO.claim_suggestion, log["id"], user_id, settings.ai_suggestion_lease_seconds
+            )
+            if claimed:
+                async for text in suggestion_worker.stream(claimed):
+                    yield f"event: token\ndata: {json.dumps({'text': text})}\n\n"
+                log = await run_in_threadpool(IllnessLogDAO.get_illness_log_by_id, log["id"], user_id)
+                if log is None:
+                    return
+        async for event in IllnessLogService.suggestion_events(user_id, log):
+            yield event
+
+    @staticmethod
+    def get_illness_logs(
+        user_id: int,
+        family_member_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        connection=None
+    ) -> Dict[str, Any]:
+        """Get one page of illness logs for a user, optionally filtered by family member."""
+        limit = limit or settings.pagination_default_limit
+        after = decode_cursor(cursor, date.fromisoformat) if cursor else None
+        rows = IllnessLogDAO.get_illness_logs_by_user_id(
+            user_id,
+            family_member_id,
+            limit=limit + 1,
+            after=after,
+            start_date=start_date,
+            end_date=end_date,
+            connection=connection,
+        )
+        return build_page(rows, limit, "start_date")
     
     @staticmethod
-    def get_illness_log(user_id: int, log_id: int) -> Optional[Dict[str, Any]]:
+    def get_illness_log(user_id: int, log_id: int, connection=None) -> Optional[Dict[str, Any]]:
         """Get a specific illness log."""
-        return IllnessLogDAO.get_illness_log_by_id(log_id, user_id)
+        return IllnessLogDAO.get_illness_log_by_id(log_id, user_id, connection=connection)
     
     @staticmethod
-    def update_illness_log(user_id: int, log_id: int, log_data: IllnessLogUpdate) -> Optional[Dict[str, Any]]:
+    def update_illness_log(user_id: int, log_id: int, log_data: IllnessLogUpdate, connection=None) -> Optional[Dict[str, Any]]:
         """Update an illness log."""
         return IllnessLogDAO.update_illness_log(
             illness_log_id=log_id,
@@ -59,9 +148,10 @@ class IllnessLogService:
             end_date=log_data.end_date,
             notes=log_data.notes,
             ai_suggestion=log_data.ai_suggestion,
+            connection=connection,
         )
     
     @staticmethod
-    def delete_illness_log(user_id: int, log_id: int) -> bool:
+    def delete_illness_log(user_id: int, log_id: int, connection=None) -> bool:
         """Delete an illness log."""
-        return IllnessLogDAO.delete_illness_log(log_id, user_id)
+        return IllnessLogDAO.delete_illness_log(log_id, user_id, connection=connection)
@@ -1,61 +1,78 @@
 """Medication service."""
 from typing import List, Dict, Any, Optional
 from app.dao.medication_dao import MedicationDAO
+from psycopg2 import errors
 from app.models.medication import MedicationCreate, MedicationUpdate
-from app.database import db
+from app.utils.batch import batch_result, validate_items
+from app.utils.pagination import decode_cursor, build_page
+from app.config import settings
 
 
 class MedicationService:
     """Business logic for medications."""
     
     @staticmethod
-    def create_or_update_medication(user_id: int, medication_data: MedicationCreate) -> Dict[str, Any]:
-        """Create a new medication or update quantity if it exists in a single transaction."""
-        with db.get_connection() as conn:
-            # Check if medication with same name exists
-            existing = MedicationDAO.get_medication_by_name(user_id, medication_data.name, connection=conn)
-            
-            if existing:
-                # Update quantity (increment)
-                return MedicationDAO.increment_medication_quantity(
-                    medication_id=existing["id"],
-                    user_id=user_id,
-                    quantity_to_add=medication_data.quantity,
-                    connection=conn,
-                )
-            else:
-                # Create new medication
-                return MedicationDAO.create_medication(
-                    user_id=user_id,
-                    name=medication_data.name,
-                    quantity=medication_data.quantity,
-                    expiration_date=medication_data.expiration_date,
-                    connection=conn,
-                )
+    def create_or_update_medication(user_id: int, medication_data: MedicationCreate, connection=None) -> Dict[str, Any]:
+        """Create a new medication or increment its quantity if it exists, in a single upsert."""
+        return MedicationDAO.upsert_medication(
+            user_id=user_id,
+            name=medication_data.name,
+            quantity=medication_data.quantity,
+            expiration_date=medication_data.expiration_date,
+            connection=connection,
+        )
     
     @staticmethod
-    def get_medications(user_id: int) -> List[Dict[str, Any]]:
-        """Get all medications for a user."""
-        return MedicationDAO.get_medications_by_user_id(user_id)
+    def create_or_update_medications(user_id: int, medications: List[Any], connection=None) -> Dict[str, Any]:
+        """Create or increment several medications with a single multi-row upsert.
+
+        Items naming the same medication (case-insensitively, as PostgreSQL's LOWER
+        compares names) are combined; each of them reports the resulting medication.
+        Items that fail MedicationCreate validation are reported and skipped.
+        """
+        valid, results = validate_items(MedicationCreate, medications)
+        rows = MedicationDAO.upsert_medications(
+            user_id, [medication.model_dump() for _, medication in valid], connection=connection
+        )
+        # A row's ordinal is its position among the valid items, not in the request
+        by_ordinal = {row.pop("ordinal"): row for row in rows}
+        results.extend(
+            {"index": index, "success": True, "item": by_ordinal[ordinal]}
+            for ordinal, (index, _) in enumerate(valid)
+        )
+        return batch_result(results)
     
     @staticmethod
-    def get_medication(user_id: int, medication_id: int) -> Optional[Dict[str, Any]]:
+    def get_medications(user_id: int, limit: Optional[int] = None, cursor: Optional[str] = None,
+                        connection=None) -> Dict[str, Any]:
+        """Get one page of medications for a user, ordered by name."""
+        limit = limit or settings.pagination_default_limit
+        after = decode_cursor(cursor, str) if cursor else None
+        rows = MedicationDAO.get_medications_by_user_id(user_id, limit=limit + 1, after=after, connection=connection)
+        return build_page(rows, limit, "name")
+    
+    @staticmethod
+    def get_medication(user_id: int, medication_id: int, connection=None) -> Optional[Dict[str, Any]]:
         """Get a specific medication."""
-        return MedicationDAO.get_medication_by_id(medication_id, user_id)
+        return MedicationDAO.get_medication_by_id(medication_id, user_id, connection=connection)
     
     @staticmethod
-    def update_medication(user_id: int, medication_id: int, medication_data: MedicationUpdate) -> Optional[Dict[str, Any]]:
+    def update_medication(user_id: int, medication_id: int, medication_data: MedicationUpdate, connection=None) -> Optional[Dict[str, Any]]:
         """Update a medication."""
-        return MedicationDAO.update_medication(
-            medication_id=medication_id,
-            user_id=user_id,
-            name=medication_data.name,
-            quantity=medication_data.quantity,
-            expiration_date=medication_data.expiration_date,
-        )
+        try:
+            return MedicationDAO.update_medication(
+                medication_id=medication_id,
+                user_id=user_id,
+                name=medication_data.name,
+                quantity=medication_data.quantity,
+                expiration_date=medication_data.expiration_date,
+                connection=connection,
+            )
+        except errors.UniqueViolation:
+            raise ValueError(f"A medication named '{medication_data.name}' already exists")
     
     @staticmethod
-    def delete_medication(user_id: int, medication_id: int) -> bool:
+    def delete_medication(user_id: int, medication_id: int, connection=None) -> bool:
         """Delete a medication."""
-        return MedicationDAO.delete_medication(medication_id, user_id)
+        return MedicationDAO.delete_medication(medication_id, user_id, connection=connection)
 
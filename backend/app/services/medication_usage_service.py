@@ -1,57 +1,106 @@
 """Medication usage service."""
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from datetime import date, datetime
 from app.dao.medication_usage_dao import MedicationUsageDAO
-from app.dao.medication_dao import MedicationDAO
-from app.models.medication_usage import MedicationUsageCreate
 from app.database import db
+from app.utils.batch import batch_result, validate_items
+from app.utils.pagination import decode_cursor, build_page
+from app.config import settings
+from app.models.medication_usage import MedicationUsageCreate
 
 
 class MedicationUsageService:
     """Business logic for medication usage logs."""
     
     @staticmethod
-    def log_usage(user_id: int, usage_data: MedicationUsageCreate) -> Dict[str, Any]:
-        """Log medication usage and decrease inventory in a single transaction."""
-        # Use a single transaction for all database operations
-        with db.get_connection() as conn:
-            # Verify that the family member belongs to the user
-            from app.dao.family_member_dao import FamilyMemberDAO
-            family_member = FamilyMemberDAO.get_family_member_by_id(usage_data.family_member_id, user_id, connection=conn)
-            if not family_member:
-                raise ValueError("Family member not found or does not belong to user")
-            
-            # Verify that the medication belongs to the user
-            medication = MedicationDAO.get_medication_by_id(usage_data.medication_id, user_id, connection=conn)
-            if not medication:
-                raise ValueError("Medication not found or does not belong to user")
-            
-            # Check if quantity is sufficient
-            if medication["quantity"] < usage_data.quantity_used:
-                raise ValueError(f"Insufficient quantity. Available: {medication['quantity']}, Requested: {usage_data.quantity_used}")
-            
-            # Create usage log
-            usage_log = MedicationUsageDAO.create_usage_log(
-                family_member_id=usage_data.family_member_id,
-                medication_id=usage_data.medication_id,
-                quantity_used=usage_data.quantity_used,
+    def log_usage(user_id: int, usage_data: MedicationUsageCreate, connection=None) -> Dict[str, Any]:
+        """Log medication usage and decrease inventory atomically in a single round trip."""
+        usage_log = MedicationUsageDAO.create_usage_log_and_decrement(
+            user_id=user_id,
+            family_member_id=usage_data.family_member_id,
+            medication_id=usage_data.medication_id,
+            quantity_used=usage_data.quantity_used,
+            connection=connection,
+        )
+        if usage_log:
+            return usage_log
+        
+        # Nothing was logged - find out why (only on the failure path)
+        preconditions = MedicationUsageDAO.get_usage_preconditions(
+            user_id=user_id,
+            family_member_id=usage_data.family_member_id,
+            medication_id=usage_data.medication_id,
+            connection=connection,
+        )
+        if not preconditions["family_member_found"]:
+            raise ValueError("Family member not found or does not belong to user")
+        if preconditions["available_quantity"] is None:
+            raise ValueError("Medication not found or does not belong to user")
+        raise ValueError(
+            f"Insufficient quantity. Available: {preconditions['available_quantity']}, Requested: {usage_data.quantity_used}"
+        )
+    
+    @staticmethod
+    def log_usage_batch(user_id: int, usages: List[Any], connection=None) -> Dict[str, Any]:
+        """Log several usages in one transaction, in order, with the same checks as log_usage.
+
+        Each usage is checked against the inventory left by the usages before it; failing
+        items (including ones that fail MedicationUsageCreate validation) are reported
+        and skipped, the rest are written with multi-row statements.
+        """
+        valid, results = validate_items(MedicationUsageCreate, usages)
+        with db.get_connection(connection) as conn:
+            targets = MedicationUsageDAO.lock_usage_batch_targets(
+                user_id,
+                family_member_ids={usage.family_member_id for _, usage in valid},
+                medication_ids={usage.medication_id for _, usage in valid},
                 connection=conn,
             )
+            family_members = targets["family_members"]
+            available = {medication_id: medication["quantity"] for medication_id, medication in targets["medications"].items()}
             
-            # Decrease medication quantity
-            updated_med = MedicationDAO.update_medication(
-                medication_id=usage_data.medication_id,
-                user_id=user_id,
-                quantity=medication["quantity"] - usage_data.quantity_used,
-                connection=conn,
-            )
+            accepted = []
+            for index, usage in valid:
+                if usage.family_member_id not in family_members:
+                    error = "Family member not found or does not belong to user"
+                elif usage.medication_id not in available:
+                    error = "Medication not found or does not belong to user"
+                elif available[usage.medication_id] < usage.quantity_used:
+                    error = f"Insufficient quantity. Available: {available[usage.medication_id]}, Requested: {usage.quantity_used}"
+                else:
+                    available[usage.medication_id] -= usage.quantity_used
+                    accepted.append((index, usage))
+                    continue
+                results.append({"index": index, "success": False, "error": error})
             
-            if not updated_med:
-                raise Exception("Failed to update medication quantity")
+            usage_logs = MedicationUsageDAO.create_usage_logs_and_decrement(
+                user_id, [usage.model_dump() for _, usage in accepted], connection=conn
+            )
         
-        return usage_log
+        for (index, usage), usage_log in zip(accepted, usage_logs):
+            usage_log["family_member_name"] = family_members[usage.family_member_id]["name"]
+            usage_log["medication_name"] = targets["medications"][usage.medication_id]["name"]
+            results.append({"index": index, "success": True, "item": usage_log})
+        return batch_result(results)
     
     @staticmethod
-    def get_usage_logs(user_id: int) -> List[Dict[str, Any]]:
-        """Get all usage logs for a user."""
-        return MedicationUsageDAO.get_usage_logs_by_user_id(user_id)
-
+    def get_usage_logs(
+        user_id: int,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        connection=None
+    ) -> Dict[str, Any]:
+        """Get one page of usage logs for a user, newest first."""
+        limit = limit or settings.pagination_default_limit
+        after = decode_cursor(cursor, datetime.fromisoformat) if cursor else None
+        rows = MedicationUsageDAO.get_usage_logs_by_user_id(
+            user_id,
+            limit=limit + 1,
+            after=after,
+            start_date=start_date,
+            end_date=end_date,
+            connection=connection,
+        )
+        return build_page(rows, limit, "used_at")
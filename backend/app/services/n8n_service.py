@@ -1,34 +1,135 @@
-import requests
+import io
+import os
+import uuid
+import shutil
 import logging
+import tempfile
+from typing import Any, BinaryIO, Dict, Optional
+from starlette.concurrency import run_in_threadpool
+from urllib3.fields import format_multipart_header_param
 from app.config import settings
+from app.dao.n8n_outbox_dao import N8NOutboxDAO
+from app.http_clients import UpstreamClient
 
 logger = logging.getLogger(__name__)
 
+
+class _MultipartFileBody:
+    """multipart/form-data body whose file part is read from the file while it is sent.
+
+    HTTP clients build the whole body in memory for `files=`; this has a length
+    (so Content-Length is still set) and is sent in CHUNK_SIZE reads. Reads block
+    on the file, so async senders run them in the threadpool.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, fields: Dict[str, str], field_name: str, file_name: str, file: BinaryIO, mimetype: str):
+        self.boundary = uuid.uuid4().hex
+        head = b"".join(
+            f"--{self.boundary}\r\n"
+            f"Content-Disposition: form-data; {format_multipart_header_param('name', name)}\r\n\r\n"
+            f"{value}\r\n".encode()
+            for name, value in fields.items()
+        )
+        head += (
+            f"--{self.boundary}\r\n"
+            f"Content-Disposition: form-data; {format_multipart_header_param('name', field_name)}; "
+            f"{format_multipart_header_param('filename', file_name)}\r\n"
+            f"Content-Type: {mimetype or 'application/octet-stream'}\r\n\r\n"
+        ).encode()
+        tail = f"\r\n--{self.boundary}--\r\n".encode()
+
+        file.seek(0, os.SEEK_END)
+        self._length = len(head) + file.tell() + len(tail)
+        file.seek(0)
+        self._parts = [io.BytesIO(head), file, io.BytesIO(tail)]
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return self._length
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            return b"".join(part.read() for part in self._parts)
+        chunks = []
+        while size > 0 and self._parts:
+            chunk = self._parts[0].read(size)
+            if not chunk:
+                self._parts.pop(0)
+                continue
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+
 class N8NService:
     @staticmethod
-    def trigger_file_summary(user_email: str, user_id: int, file_name: str, file_bytes: bytes, mimetype: str):
+    def enqueue_file_summary(user_id: int, file: Dict[str, Any], content: Optional[BinaryIO] = None,
+                             connection=None) -> Dict[str, Any]:
+        """
+        Queue an uploaded Drive file (a Drive file resource) for the n8n summary workflow.
+
+        The request only writes the outbox entry; the n8n_outbox dispatcher delivers it.
+        If the upload passed through the API, `content` (its spooled bytes) is copied to
+        N8N_OUTBOX_SPOOL_DIR, so the dispatcher does not download the file back from Drive.
+        """
+        content_path = N8NService._spool_content(content) if content is not None else None
         try:
-            webhook_url = f"{settings.n8n_url}/webhook/summarize"
-            
-            # Non-file data goes here
-            data = {
-                "user_id": str(user_id),
-                "user_email": user_email,
-            }
-            
-            # The actual file goes here
-            files = {
-                "file": (file_name, file_bytes, mimetype)
-            }
-            
-            headers = {
-                "Authorization": f"Bearer {settings.n8n_webhook_auth_key}"
-            }
-            
-            # Use 'data=' for JSON-like fields and 'files=' for the binary file
-            response = requests.post(webhook_url, data=data, files=files, headers=headers, timeout=10)
-            response.raise_for_status()
-            return True
-        except Exception as e:
-            logger.error(f"Failed to trigger n8n: {str(e)}")
-            return False
\ No newline at end of file
+            return N8NOutboxDAO.enqueue_file_summary(
+                user_id, file["id"], file["name"], file["mimeType"], int(file["size"]),
+                content_path=content_path, connection=connection,
+            )
+        except Exception:
+            if content_path:
+                N8NService.discard_content(content_path)
+            raise
+
+    @staticmethod
+    def _spool_content(content: BinaryIO) -> str:
+        os.makedirs(settings.n8n_outbox_spool_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix="summary-", dir=settings.n8n_outbox_spool_dir)
+        with os.fdopen(fd, "wb") as spool:
+            content.seek(0)
+            shutil.copyfileobj(content, spool, _MultipartFileBody.CHUNK_SIZE)
+        return path
+
+    @staticmethod
+    def discard_content(content_path: str):
+        """Delete the local copy of a queued file once it is no longer needed."""
+        try:
+            os.remove(content_path)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    async def send_file_summary(client: UpstreamClient, user_email: str, user_id: int, file_name: str,
+                                file: BinaryIO, mimetype: str) -> None:
+        """Send a file to the n8n summary workflow, streaming it from `file`; raises if n8n does not accept it."""
+        webhook_url = f"{settings.n8n_url}/webhook/summarize"
+
+        # Non-file data goes here
+        data = {
+            "user_id": str(user_id),
+            "user_email": user_email,
+        }
+
+        # The actual file goes here
+        body = _MultipartFileBody(data, "file", file_name, file, mimetype)
+
+        headers = {
+            "Authorization": f"Bearer {settings.n8n_webhook_auth_key}",
+            "Content-Type": body.content_type,
+            "Content-Length": str(len(body)),
+        }
+
+        async def content():
+            # Reading the file blocks, keep it off the event loop
+            while chunk := await run_in_threadpool(body.read, body.CHUNK_SIZE):
+                yield chunk
+
+        response = await client.request("POST", webhook_url, content=content(), headers=headers)
+        response.raise_for_status()
@@ -0,0 +1,113 @@
+"""Cache of AI home-remedy suggestions shared by every worker."""
+import time
+import hashlib
+import threading
+import logging
+from typing import Any, Dict, NamedTuple, Optional
+from cachetools import LRUCache
+from app.config import settings
+from app.dao.ai_suggestion_cache_dao import AISuggestionCacheDAO
+
+logger = logging.getLogger(__name__)
+
+
+class SuggestionKey(NamedTuple):
+    """What an AI suggestion depends on: the normalized illness and notes, the model and the prompt."""
+
+    illness_name: str
+    notes_digest: str
+    model: str
+    prompt_version: int
+
+
+class SuggestionCache:
+    """Two-tier cache of AI home-remedy suggestions.
+
+    A bounded in-process LRU sits in front of the ai_suggestion_cache table, which
+    every worker shares. Entries live for `ttl` seconds in both tiers. The model
+    and prompt version are part of the key, so changing either misses instead of
+    serving suggestions written for the old one.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self._cache = LRUCache(maxsize=max_size)
+        self._lock = threading.Lock()
+        self.ttl = ttl
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(text: Optional[str]) -> str:
+        """Casefold, collapse whitespace and drop surrounding punctuation ("Flu. " == "flu")."""
+        return " ".join((text or "").casefold().split()).strip(" .,;:!?")
+
+    @staticmethod
+    def key(illness_name: str, notes: Optional[str], model: str, prompt_version: int) -> SuggestionKey:
+        """Build the cache key for a suggestion request; logs without notes share an empty digest."""
+        notes = SuggestionCache.normalize(notes)
+        notes_digest = hashlib.sha256(notes.encode()).hexdigest() if notes else ""
+        return SuggestionKey(SuggestionCache.normalize(illness_name), notes_digest, model, prompt_version)
+
+    def get(self, key: SuggestionKey) -> Optional[str]:
+        """Return the cached suggestion, reading the table on an in-process miss.
+
+        A failing table read is logged and treated as a miss.
+        """
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0]
+
+        try:
+            row = AISuggestionCacheDAO.get_suggestion(*key)
+        except Exception as e:
+            logger.warning(f"Suggestion cache read failed: {str(e)}")
+            row = None
+
+        with self._lock:
+            if row is None:
+                self._cache.pop(key, None)
+                self.misses += 1
+                return None
+            self.db_hits += 1
+            self._cache[key] = (row["suggestion"], time.monotonic() + row["ttl_seconds"])
+            return row["suggestion"]
+
+    def put(self, key: SuggestionKey, suggestion: str):
+        """Cache a suggestion in both tiers; a failing table write is logged."""
+        with self._lock:
+            self._cache[key] = (suggestion, time.monotonic() + self.ttl)
+        try:
+            AISuggestionCacheDAO.put_suggestion(*key, suggestion, self.ttl)
+        except Exception as e:
+            logger.warning(f"Suggestion cache write failed: {str(e)}")
+
+    def clear(self):
+        """Drop the in-process entries and reset the counters (the table is kept)."""
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.db_hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters per tier and current size."""
+        with self._lock:
+            total = self.hits + self.db_hits + self.misses
+            return {
+                "hits": self.hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.db_hits) / total if total else 0.0,
+                "size": len(self._cache),
+                "max_size": self._cache.maxsize,
+            }
+
+
+# Global AI suggestion cache instance
+suggestion_cache = SuggestionCache(
+    max_size=settings.ai_suggestion_cache_max_size,
+    ttl=settings.ai_suggestion_cache_ttl_seconds,
+)
@@ -0,0 +1,145 @@
+"""Where an illness log's AI suggestion comes from: the cache, the model (hedged) or the fallback table."""
+import asyncio
+import logging
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.http_clients import http_clients
+from app.services.ai_suggestion_service import AISuggestionService
+from app.suggestion_cache import SuggestionCache, suggestion_cache
+from app.utils.remedies import fallback_remedies
+
+logger = logging.getLogger(__name__)
+
+
+class Suggestion(NamedTuple):
+    """A suggestion and where it came from: 'model', 'cache' or 'fallback'."""
+
+    text: str
+    source: str
+
+
+class SuggestionEngine:
+    """Answers a suggestion request within a latency budget.
+
+    - The suggestion cache is asked first; a hit makes no model call
+    - Otherwise the model is asked. If it has not answered once the request takes
+      longer than the HuggingFace client's p95 (or fails first), a hedged second
+      request goes to `hedge_model` / `hedge_url`; the first answer wins and the
+      other request is cancelled. Model answers are cached under the model that
+      gave them, so a hedge answer is never served as the primary model's
+    - When `deadline` runs out, the curated fallback table answers instead. So does
+      a failed model call, if the caller says it is the last attempt
+    """
+
+    # Requests the HuggingFace client must have seen before its p95 replaces `hedge_after`
+    MIN_LATENCY_SAMPLES = 20
+
+    def __init__(self, deadline: float, hedge_after: float, hedge_model: Optional[str] = None,
+                 hedge_url: Optional[str] = None, fallback_enabled: bool = True):
+        self.deadline = deadline
+        self.hedge_after = hedge_after
+        self.hedge_model = hedge_model
+        self.hedge_url = hedge_url
+        self.fallback_enabled = fallback_enabled
+        self.sources = {"model": 0, "cache": 0, "fallback": 0}
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.deadlines_exceeded = 0
+
+    async def suggest(self, illness_name: str, notes: Optional[str] = None,
+                      fallback_on_error: bool = False) -> Optional[Suggestion]:
+        """Return a suggestion, or None if the model failed and the fallback is not used."""
+        key = AISuggestionService.cache_key(illness_name, notes)
+        # The cache may read the database, keep it off the event loop
+        cached = await run_in_threadpool(suggestion_cache.get, key)
+        if cached is not None:
+            return self._answer(cached, "cache")
+
+        text, model, timed_out = await self._ask_model(illness_name, notes)
+        if text:
+            if model is not None:
+                key = AISuggestionService.cache_key(illness_name, notes, model)
+            await run_in_threadpool(suggestion_cache.put, key, text)
+            return self._answer(text, "model")
+        if timed_out:
+            return self.deadline_exceeded(illness_name)
+        if fallback_on_error:
+            return self.fallback(illness_name)
+        return None
+
+    def fallback(self, illness_name: str) -> Optional[Suggestion]:
+        """The curated table's suggestion, or None if the fallback is disabled."""
+        if not self.fallback_enabled:
+            return None
+        return self._answer(fallback_remedies(SuggestionCache.normalize(illness_name)), "fallback")
+
+    def deadline_exceeded(self, illness_name: str) -> Optional[Suggestion]:
+        """Count a suggestion that ran out of time; the curated table answers (None if the fallback is disabled)."""
+        self.deadlines_exceeded += 1
+        logger.warning(f"No AI suggestion for '{illness_name}' within {self.deadline}s")
+        return self.fallback(illness_name)
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait for the first request before hedging."""
+        p95 = http_clients.huggingface.latency_percentile(95, min_samples=self.MIN_LATENCY_SAMPLES)
+        return p95 if p95 is not None else self.hedge_after
+
+    def _answer(self, text: str, source: str) -> Suggestion:
+        self.sources[source] += 1
+        return Suggestion(text, source)
+
+    async def _ask_model(self, illness_name: str, notes: Optional[str]) -> Tuple[Optional[str], Optional[str], bool]:
+        """Return (the first suggestion, the hedge model if it gave it, whether the deadline ran out first)."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        hedge_at = loop.time() + self.hedge_delay() if self.hedge_model else None
+        hedge = None
+        pending = {asyncio.create_task(AISuggestionService.get_home_remedies(illness_name=illness_name, notes=notes))}
+        try:
+            while pending or hedge_at is not None:
+                now = loop.time()
+                if now >= deadline:
+                    return None, None, True
+                if hedge_at is not None and (now >= hedge_at or not pending):
+                    hedge = asyncio.create_task(AISuggestionService.get_home_remedies(
+                        illness_name=illness_name, notes=notes, model=self.hedge_model, url=self.hedge_url,
+                    ))
+                    pending.add(hedge)
+                    hedge_at = None
+                    self.hedged += 1
+                    continue
+                until = deadline if hedge_at is None else min(deadline, hedge_at)
+                done, pending = await asyncio.wait(pending, timeout=until - now,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    # get_home_remedies returns None instead of raising
+                    text = task.result()
+                    if text:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                            return text, self.hedge_model, False
+                        return text, None, False
+            return None, None, False
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return suggestions per source and hedging counters."""
+        return {
+            **self.sources,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "deadlines_exceeded": self.deadlines_exceeded,
+        }
+
+
+# Global suggestion engine instance
+suggestion_engine = SuggestionEngine(
+    deadline=settings.ai_suggestion_deadline_seconds,
+    hedge_after=settings.ai_suggestion_hedge_after_seconds,
+    hedge_model=settings.ai_suggestion_hedge_model or None,
+    hedge_url=settings.ai_suggestion_hedge_url or None,
+    fallback_enabled=settings.ai_suggestion_fallback_enabled,
+)
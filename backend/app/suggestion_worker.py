@@ -0,0 +1,158 @@
+"""Background generation of AI home-remedy suggestions for new illness logs."""
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+import httpx
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.dao.illness_log_dao import IllnessLogDAO
+from app.services.ai_suggestion_service import AISuggestionError, AISuggestionService
+from app.suggestion_cache import suggestion_cache
+from app.suggestion_engine import Suggestion, suggestion_engine
+from app.utils.background import ClaimingWorker
+
+logger = logging.getLogger(__name__)
+
+
+class SuggestionWorker(ClaimingWorker):
+    """Fills in `ai_suggestion` for illness logs created with suggestion_status 'pending'.
+
+    - POST /illness-logs only inserts the log; each worker claims pending logs
+      (FOR UPDATE SKIP LOCKED, then a lease) and asks the suggestion engine (cache,
+      hedged model, fallback table), storing the suggestion and its source
+    - Failed attempts are retried with backoff; the last attempt falls back to the
+      curated table, or marks the log's suggestion_status 'failed' if the fallback
+      is disabled
+    - Clients poll the log or wait on GET /illness-logs/{id}/suggestion/events;
+      waiters in this worker are woken as soon as the suggestion is stored
+    - GET /illness-logs/{id}/suggestion/stream claims a log itself and has it
+      generated here token by token (stream())
+    """
+
+    name = "AI suggestion worker"
+
+    def __init__(self, concurrency: int, max_attempts: int, backoff_seconds: float, max_backoff_seconds: float,
+                 poll_interval: float, lease_seconds: float):
+        super().__init__(concurrency, poll_interval, backoff_seconds, max_backoff_seconds)
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self._waiters: Dict[int, Set[asyncio.Event]] = {}
+        self.generated = 0
+        self.streamed = 0
+        self.retried = 0
+        self.failed = 0
+
+    def claim(self, limit: int) -> List[Dict[str, Any]]:
+        return IllnessLogDAO.claim_pending_suggestions(limit, self.lease_seconds)
+
+    async def process(self, log: Dict[str, Any]):
+        suggestion = await suggestion_engine.suggest(
+            log["illness_name"], log["notes"], fallback_on_error=log["suggestion_attempts"] >= self.max_attempts,
+        )
+        await self._finish(log, suggestion)
+
+    async def stream(self, log: Dict[str, Any]) -> AsyncIterator[str]:
+        """
+        Generate a log claimed by a client's token stream, yielding the suggestion as it arrives.
+
+        A cached suggestion is yielded whole. The generation runs as one of this
+        worker's tasks, so the suggestion is stored (or retried) even if the
+        client disconnects; a failed stream is finished like a failed attempt.
+        The model gets the engine's deadline for the whole stream (not per read),
+        so a trickling stream cannot outlive the claim's lease; past it the
+        fallback table answers, as it does for the engine.
+        """
+        pieces: asyncio.Queue = asyncio.Queue()
+        task = asyncio.create_task(self._stream(log, pieces.put_nowait))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+        while True:
+            piece = await pieces.get()
+            if piece is None:
+                return
+            yield piece
+
+    async def _stream(self, log: Dict[str, Any], emit):
+        suggestion = None
+        try:
+            key = AISuggestionService.cache_key(log["illness_name"], log["notes"])
+            cached = await run_in_threadpool(suggestion_cache.get, key)
+            if cached is not None:
+                emit(cached)
+                suggestion = Suggestion(cached, "cache")
+            else:
+                text = ""
+                try:
+                    async with asyncio.timeout(suggestion_engine.deadline):
+                        async for piece in AISuggestionService.stream_home_remedies(log["illness_name"], log["notes"]):
+                            emit(piece)
+                            text += piece
+                except TimeoutError:
+                    suggestion = suggestion_engine.deadline_exceeded(log["illness_name"])
+                else:
+                    text = text.strip()
+                    if text:
+                        await run_in_threadpool(suggestion_cache.put, key, text)
+                        suggestion = Suggestion(text, "model")
+        except (AISuggestionError, httpx.HTTPError, ValueError) as e:
+            logger.warning(f"AI suggestion stream for illness log {log['id']} failed: {e}")
+            if log["suggestion_attempts"] >= self.max_attempts:
+                suggestion = suggestion_engine.fallback(log["illness_name"])
+        finally:
+            emit(None)
+        if suggestion:
+            self.streamed += 1
+        await self._finish(log, suggestion)
+
+    async def _finish(self, log: Dict[str, Any], suggestion: Optional[Suggestion]):
+        """Store a suggestion, or retry or fail the log, and wake its waiters."""
+        if suggestion:
+            await run_in_threadpool(IllnessLogDAO.fill_suggestion, log["id"], suggestion.text, suggestion.source)
+            self.generated += 1
+        elif log["suggestion_attempts"] >= self.max_attempts:
+            await run_in_threadpool(IllnessLogDAO.fail_suggestion, log["id"])
+            self.failed += 1
+            logger.error(f"No AI suggestion for illness log {log['id']} after {log['suggestion_attempts']} attempts")
+        else:
+            delay = self.backoff(log["suggestion_attempts"])
+            await run_in_threadpool(IllnessLogDAO.schedule_suggestion_retry, log["id"], delay)
+            self.retried += 1
+            return
+        for event in self._waiters.get(log["id"], ()):
+            event.set()
+
+    async def wait(self, illness_log_id: int, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for this worker to finish the log's suggestion; False on timeout."""
+        event = asyncio.Event()
+        self._waiters.setdefault(illness_log_id, set()).add(event)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            waiters = self._waiters[illness_log_id]
+            waiters.discard(event)
+            if not waiters:
+                del self._waiters[illness_log_id]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return generation counters for this worker."""
+        return {
+            "generated": self.generated,
+            "streamed": self.streamed,
+            "retried": self.retried,
+            "failed": self.failed,
+            "in_flight": len(self._in_flight),
+        }
+
+
+# Global suggestion worker instance
+suggestion_worker = SuggestionWorker(
+    concurrency=settings.ai_suggestion_concurrency,
+    max_attempts=settings.ai_suggestion_max_attempts,
+    backoff_seconds=settings.ai_suggestion_backoff_seconds,
+    max_backoff_seconds=settings.ai_suggestion_max_backoff_seconds,
+    poll_interval=settings.ai_suggestion_poll_interval_seconds,
+    lease_seconds=settings.ai_suggestion_lease_seconds,
+)
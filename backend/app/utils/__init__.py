@@ -1,6 +1,6 @@
 """Utility modules."""
 from .jwt import create_access_token, verify_token
-from .dependencies import get_current_user
+from .dependencies import get_current_user, get_unit_of_work
 
-__all__ = ["create_access_token", "verify_token", "get_current_user"]
+__all__ = ["create_access_token", "verify_token", "get_current_user", "get_unit_of_work"]
 
@@ -0,0 +1,103 @@
+"""Background workers that claim queued rows from Postgres and process them off the request path."""
+import asyncio
+import random
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Set
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+
+class ClaimingWorker(ABC):
+    """Claims due work in batches and processes it on the event loop, a bounded number at a time.
+
+    Subclasses implement `claim(limit)` (blocking, run in the threadpool; claimed
+    rows must not be handed to another worker until they come due again) and
+    `process(item)`. Requests that queue work call `wake()` once it is committed;
+    otherwise the queue is polled every `poll_interval` seconds.
+    """
+
+    name = "background worker"
+
+    def __init__(self, concurrency: int, poll_interval: float, backoff_seconds: float, max_backoff_seconds: float):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._in_flight: Set[asyncio.Task] = set()
+
+    @abstractmethod
+    def claim(self, limit: int) -> List[Dict[str, Any]]:
+        """Claim up to `limit` due items."""
+
+    @abstractmethod
+    async def process(self, item: Dict[str, Any]):
+        """Process one claimed item."""
+
+    async def start(self):
+        """Start claiming on the running event loop (from the app lifespan)."""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop claiming and cancel work in progress; claimed rows come due again on their own."""
+        tasks = [task for task in (self._task, *self._in_flight) if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = self._loop = self._wake = None
+
+    def wake(self, delay: float = 0):
+        """Look for due work now (or in `delay` seconds) instead of at the next poll (callable from any thread)."""
+        loop, wake = self._loop, self._wake
+        if loop is not None and not loop.is_closed():
+            if delay > 0:
+                loop.call_soon_threadsafe(loop.call_later, delay, wake.set)
+            else:
+                loop.call_soon_threadsafe(wake.set)
+
+    def backoff(self, attempts: int) -> float:
+        """Delay before retrying work that has failed `attempts` times (doubling, capped, jittered)."""
+        delay = min(self.backoff_seconds * 2 ** (attempts - 1), self.max_backoff_seconds)
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _run(self):
+        while True:
+            claimed = 0
+            free = self.concurrency - len(self._in_flight)
+            if free > 0:
+                try:
+                    items = await run_in_threadpool(self.claim, free)
+                except Exception:
+                    logger.exception(f"Error claiming work for the {self.name}")
+                    items = []
+                for item in items:
+                    task = asyncio.create_task(self._process(item))
+                    self._in_flight.add(task)
+                    task.add_done_callback(self._processed)
+                claimed = len(items)
+            if not claimed:
+                # Not wait_for: on 3.11 a stop() racing its timeout can be swallowed and hang
+                try:
+                    async with asyncio.timeout(self.poll_interval):
+                        await self._wake.wait()
+                except TimeoutError:
+                    pass
+                self._wake.clear()
+
+    async def _process(self, item: Dict[str, Any]):
+        try:
+            await self.process(item)
+        except Exception:
+            # The claim runs out and the item is picked up again
+            logger.exception(f"Error in the {self.name}")
+
+    def _processed(self, task: asyncio.Task):
+        self._in_flight.discard(task)
+        if self._wake is not None:
+            self._wake.set()
@@ -0,0 +1,36 @@
+"""Helpers for batch write endpoints."""
+from typing import Any, Dict, List, Tuple, Type, TypeVar
+from pydantic import BaseModel, ValidationError
+
+M = TypeVar("M", bound=BaseModel)
+
+
+def validate_items(model: Type[M], items: List[Any]) -> Tuple[List[Tuple[int, M]], List[Dict[str, Any]]]:
+    """Validate each batch item on its own, so one malformed item does not reject the batch.
+
+    Returns the valid items with their request index, and a failed result for each
+    invalid one.
+    """
+    valid = []
+    failed = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, model.model_validate(item)))
+        except ValidationError as e:
+            failed.append({"index": index, "success": False, "error": validation_message(e)})
+    return valid, failed
+
+
+def validation_message(error: ValidationError) -> str:
+    """Flatten a pydantic ValidationError into one line, e.g. 'quantity: Input should be a valid integer'."""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc']) or 'item'}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+
+def batch_result(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Order per-item results by request index and count successes and failures."""
+    results = sorted(results, key=lambda result: result["index"])
+    succeeded = sum(1 for result in results if result["success"])
+    return {"succeeded": succeeded, "failed": len(results) - succeeded, "results": results}
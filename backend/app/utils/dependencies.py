@@ -1,14 +1,40 @@
 """FastAPI dependencies."""
+import hmac
+from typing import Optional
 from fastapi import Depends, HTTPException, status, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials, APIKeyHeader
 from app.utils.jwt import verify_token
 from app.dao.user_dao import UserDAO
+from app.database import db, UnitOfWork
+from app.cache import user_cache
+from app.config import settings
 
 security = HTTPBearer()
 api_key_header = APIKeyHeader(name="X-API-Key")
+metrics_key_header = APIKeyHeader(name="X-Metrics-Key", auto_error=False)
 
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+def get_unit_of_work():
+    """Request-scoped unit of work.
+
+    FastAPI resolves this once per request, so the auth lookup and the handler share
+    one connection and transaction. It is committed when the handler returns and
+    rolled back if it raises.
+    """
+    uow = UnitOfWork(db)
+    try:
+        yield uow
+    except Exception as e:
+        uow.release(error=e)
+        raise
+    else:
+        uow.release()
+
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    uow: UnitOfWork = Depends(get_unit_of_work),
+) -> dict:
     """Get the current authenticated user from JWT token."""
     token = credentials.credentials
     payload = verify_token(token)
@@ -30,7 +56,10 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = UserDAO.get_user_by_id(user_id)
+    # Served from the per-worker user cache; the DB (and the request's connection) is only hit on a miss
+    user = user_cache.get_or_load(
+        user_id, lambda uid: UserDAO.get_auth_user_by_id(uid, connection=uow.connection)
+    )
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -40,7 +69,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     
     return user
 
-async def get_user_by_api_key(api_key: str = Security(api_key_header)) -> dict:
+def get_user_by_api_key(api_key: str = Security(api_key_header)) -> dict:
     """Get user by API key."""
     user = UserDAO.get_user_by_api_key(api_key)
     if user is None:
@@ -50,3 +79,13 @@ async def get_user_by_api_key(api_key: str = Security(api_key_header)) -> dict:
         )
     return user
 
+
+def verify_metrics_key(key: Optional[str] = Security(metrics_key_header)):
+    """Allow /metrics only with the configured metrics key; without one the endpoint does not exist."""
+    if not settings.metrics_api_key:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if key is None or not hmac.compare_digest(key, settings.metrics_api_key):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics key",
+        )
@@ -1,4 +1,6 @@
 """JWT token utilities."""
+import hashlib
+import secrets
 from datetime import datetime, timedelta
 from typing import Optional
 from app.config import settings
@@ -18,6 +20,19 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+def create_refresh_token() -> str:
+    """Create an opaque refresh token; only its hash is stored."""
+    return secrets.token_urlsafe(32)
+
+
+def hash_refresh_token(token: str) -> str:
+    """Hash a refresh token for storage and lookup.
+
+    The token is 256 random bits, so a plain SHA-256 cannot be brute-forced; no salt or slow hash is needed.
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
 def verify_token(token: str) -> Optional[dict]:
     """Verify and decode a JWT token."""
     try:
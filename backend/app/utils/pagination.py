@@ -0,0 +1,34 @@
+"""Keyset (cursor) pagination helpers for list endpoints."""
+import json
+import base64
+from typing import Any, Callable, Dict, List, Tuple
+
+
+def encode_cursor(sort_value: Any, row_id: int) -> str:
+    """Encode the sort key of the last row on a page into an opaque cursor."""
+    if hasattr(sort_value, "isoformat"):
+        sort_value = sort_value.isoformat()
+    payload = json.dumps([sort_value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, parse_sort_value: Callable[[str], Any]) -> Tuple[Any, int]:
+    """Decode a cursor into `(sort_value, id)`; raises ValueError if it was not issued by us."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(row_id, int) or not isinstance(sort_value, str):
+            raise ValueError
+        return parse_sort_value(sort_value), row_id
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def build_page(rows: List[Dict[str, Any]], limit: int, sort_field: str) -> Dict[str, Any]:
+    """Turn up to `limit + 1` rows into a page; the extra row only signals that another page exists."""
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit and items:
+        last = items[-1]
+        next_cursor = encode_cursor(last[sort_field], last["id"])
+    return {"items": items, "next_cursor": next_cursor}
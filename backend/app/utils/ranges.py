@@ -0,0 +1,38 @@
+"""HTTP Range header parsing for file downloads."""
+from typing import Optional, Tuple
+
+
+class RangeNotSatisfiable(ValueError):
+    """The Range header asks for bytes outside the file (416)."""
+
+
+def parse_range_header(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single `bytes=` range into inclusive `(start, end)` offsets within `size` bytes.
+
+    Returns None when the whole file should be sent: no header, another unit,
+    several ranges or a malformed value (all of which a server may ignore).
+    Raises RangeNotSatisfiable if no requested byte exists.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.strip().partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    if not dash or not (first or last) or any(part and not part.isdigit() for part in (first, last)):
+        return None
+
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable(header)
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and end < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    return start, min(end, size - 1)
@@ -0,0 +1,165 @@
+"""Curated home-remedy tips for common illnesses, used when the AI model cannot answer in time."""
+import re
+from typing import Dict
+
+SEE_A_DOCTOR = "See a doctor if symptoms are severe, get worse, or do not improve within a few days."
+
+# Tips per illness, keyed by normalized name (see SuggestionCache.normalize)
+REMEDIES: Dict[str, str] = {
+    "cold": (
+        "1. Rest and keep warm.\n"
+        "2. Drink plenty of fluids such as water, warm tea or broth.\n"
+        "3. Gargle with warm salt water for a scratchy throat.\n"
+        "4. Breathe in steam from a warm shower to ease a blocked nose.\n"
+        "5. Honey in warm water or tea can soothe a cough (not for children under 1)."
+    ),
+    "flu": (
+        "1. Stay home and rest as much as possible.\n"
+        "2. Drink plenty of fluids to stay hydrated.\n"
+        "3. Keep warm and use light layers if you have chills.\n"
+        "4. Eat light, easy meals like soup when you feel hungry.\n"
+        "5. Keep away from others, and wash your hands often."
+    ),
+    "fever": (
+        "1. Rest and drink plenty of fluids.\n"
+        "2. Wear light clothing and keep the room comfortably cool.\n"
+        "3. A lukewarm (not cold) sponge bath can help you feel cooler.\n"
+        "4. Check the temperature regularly.\n"
+        "5. Get medical help for a very high fever, or any fever in a baby under 3 months."
+    ),
+    "cough": (
+        "1. Drink warm fluids such as tea with honey or broth.\n"
+        "2. Honey can soothe a cough (not for children under 1).\n"
+        "3. Use a humidifier or breathe in steam.\n"
+        "4. Raise your head with an extra pillow at night.\n"
+        "5. Avoid smoke and other irritants."
+    ),
+    "sore throat": (
+        "1. Gargle with warm salt water a few times a day.\n"
+        "2. Drink warm drinks like tea with honey, or have something cold like ice chips.\n"
+        "3. Suck on lozenges or hard candy (not for small children).\n"
+        "4. Rest your voice.\n"
+        "5. Keep the air moist with a humidifier."
+    ),
+    "headache": (
+        "1. Rest in a quiet, dark room.\n"
+        "2. Drink a glass or two of water; dehydration is a common cause.\n"
+        "3. Put a cool cloth on your forehead or a warm one on your neck.\n"
+        "4. Take a break from screens.\n"
+        "5. Eat regular meals and try to get enough sleep."
+    ),
+    "stomach ache": (
+        "1. Sip water or clear fluids slowly.\n"
+        "2. Rest, and place a warm (not hot) compress on your belly.\n"
+        "3. Eat small, bland meals like rice, toast or bananas.\n"
+        "4. Avoid fatty, spicy food, caffeine and alcohol for a while.\n"
+        "5. Peppermint or ginger tea may ease the discomfort."
+    ),
+    "diarrhea": (
+        "1. Drink plenty of fluids; an oral rehydration solution is best.\n"
+        "2. Eat bland foods like rice, bananas, toast and applesauce.\n"
+        "3. Avoid dairy, fatty food, caffeine and alcohol until it settles.\n"
+        "4. Rest.\n"
+        "5. Wash your hands well to avoid spreading it."
+    ),
+    "vomiting": (
+        "1. Wait a little, then take small sips of water or an oral rehydration solution.\n"
+        "2. Slowly add bland foods like crackers or toast once you can keep fluids down.\n"
+        "3. Rest, sitting up or lying on your side.\n"
+        "4. Avoid strong smells and heavy meals.\n"
+        "5. Ginger tea may help with nausea."
+    ),
+    "allergies": (
+        "1. Keep windows closed when pollen counts are high.\n"
+        "2. Shower and change clothes after being outdoors.\n"
+        "3. Rinse your nose with a saline spray or rinse.\n"
+        "4. Wash bedding in hot water every week.\n"
+        "5. Keep pets out of the bedroom if they set off symptoms."
+    ),
+    "sinusitis": (
+        "1. Rinse your nose with a saline spray or rinse.\n"
+        "2. Breathe in steam from a bowl of hot water or a warm shower.\n"
+        "3. Put a warm compress over your nose and cheeks.\n"
+        "4. Drink plenty of fluids and rest.\n"
+        "5. Sleep with your head slightly raised."
+    ),
+    "earache": (
+        "1. Hold a warm or cool compress against the ear.\n"
+        "2. Rest with the sore ear facing up.\n"
+        "3. Chewing gum or yawning can ease pressure.\n"
+        "4. Do not put anything inside the ear.\n"
+        "5. Children with ear pain and fever should see a doctor."
+    ),
+    "constipation": (
+        "1. Drink more water during the day.\n"
+        "2. Eat more fibre: fruit, vegetables, whole grains and prunes.\n"
+        "3. Go for a walk or get some gentle exercise.\n"
+        "4. Don't ignore the urge to go.\n"
+        "5. Keep a regular toilet routine."
+    ),
+    "sunburn": (
+        "1. Cool the skin with a cool shower or damp cloth.\n"
+        "2. Apply aloe vera or a gentle moisturiser.\n"
+        "3. Drink extra water.\n"
+        "4. Keep out of the sun until it heals, and wear loose clothing.\n"
+        "5. Don't pop any blisters."
+    ),
+    "chickenpox": (
+        "1. Keep nails short and try not to scratch.\n"
+        "2. Take lukewarm baths, with oatmeal or baking soda if you like.\n"
+        "3. Apply calamine lotion to itchy spots.\n"
+        "4. Wear loose cotton clothing.\n"
+        "5. Stay home until all spots have crusted over."
+    ),
+}
+
+# Other names people log for the illnesses above
+ALIASES: Dict[str, str] = {
+    "common cold": "cold",
+    "head cold": "cold",
+    "runny nose": "cold",
+    "influenza": "flu",
+    "high temperature": "fever",
+    "temperature": "fever",
+    "strep throat": "sore throat",
+    "pharyngitis": "sore throat",
+    "tonsillitis": "sore throat",
+    "migraine": "headache",
+    "stomachache": "stomach ache",
+    "tummy ache": "stomach ache",
+    "upset stomach": "stomach ache",
+    "diarrhoea": "diarrhea",
+    "stomach flu": "diarrhea",
+    "gastroenteritis": "diarrhea",
+    "nausea": "vomiting",
+    "hay fever": "allergies",
+    "allergy": "allergies",
+    "sinus infection": "sinusitis",
+    "ear infection": "earache",
+    "ear ache": "earache",
+    "chicken pox": "chickenpox",
+}
+
+GENERAL_TIPS = (
+    "1. Rest as much as you can.\n"
+    "2. Drink plenty of fluids.\n"
+    "3. Eat light, nourishing meals.\n"
+    "4. Keep an eye on how symptoms change."
+)
+
+
+def fallback_remedies(illness_name: str) -> str:
+    """
+    Return curated tips for an illness, normalized as by SuggestionCache.normalize.
+
+    The name is matched exactly, then by alias. Otherwise the longest known
+    name or alias found as whole words in it is used ("bad head cold" is a cold).
+    Unknown illnesses get general tips. Every answer ends with when to see a doctor.
+    """
+    names = {**{name: name for name in REMEDIES}, **ALIASES}
+    key = names.get(illness_name)
+    if key is None:
+        found = [name for name in names if re.search(rf"\b{re.escape(name)}\b", illness_name)]
+        key = names[max(found, key=len)] if found else None
+    tips = REMEDIES[key] if key else GENERAL_TIPS
+    return f"{tips}\n\n{SEE_A_DOCTOR}"
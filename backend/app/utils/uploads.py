@@ -0,0 +1,52 @@
+"""Request body size limit for upload endpoints."""
+from typing import Iterable
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+
+
+class UploadSizeLimitMiddleware:
+    """ASGI middleware that rejects request bodies over `max_size` bytes on `paths` with 413.
+
+    A declared Content-Length over the limit is rejected before the body is read.
+    Bodies without one (chunked) are counted as they arrive and the request fails
+    as soon as the limit is passed, so an oversized upload is never spooled in full.
+    """
+
+    def __init__(self, app, max_size: int, paths: Iterable[str]):
+        self.app = app
+        self.max_size = max_size
+        self.paths = set(paths)
+
+    def _too_large(self) -> str:
+        return f"File too large (max {self.max_size / (1024 * 1024):g} MB)"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_size:
+            response = JSONResponse(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                content={"detail": self._too_large()},
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_size:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=self._too_large(),
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
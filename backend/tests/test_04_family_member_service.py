@@ -83,15 +83,15 @@ def test_get_family_members_calls_dao():
     1. Mock DAO.get_family_members_by_user_id
     2. Call FamilyMemberService.get_family_members()
     3. Verify DAO is called with correct user_id
-    4. Verify returns list of family members
+    4. Verify returns a page of family members
     
     WHY:
     - Services retrieve data through DAOs
     - Need to verify correct data flows through
     
     EXPECTED RESULT:
-    - Should return a list of family members
-    - DAO should be called with user_id
+    - Should return a page with the family members and no next_cursor
+    - DAO should be called with user_id and the page size + 1
     """
     # Mock data - a list of family members
     mock_members = [
@@ -106,13 +106,14 @@ def test_get_family_members_calls_dao():
         result = FamilyMemberService.get_family_members(user_id=123)
         
         # Verify DAO was called with correct user_id
-        mock_dao.assert_called_once_with(123)
+        mock_dao.assert_called_once_with(123, limit=51, after=None, connection=None)
         
         # Verify result
-        assert isinstance(result, list)
-        assert len(result) == 2
-        assert result[0]["name"] == "John"
-        assert result[1]["name"] == "Jane"
+        assert isinstance(result["items"], list)
+        assert len(result["items"]) == 2
+        assert result["items"][0]["name"] == "John"
+        assert result["items"][1]["name"] == "Jane"
+        assert result["next_cursor"] is None
 
 
 def test_get_family_member_calls_dao():
@@ -141,7 +142,7 @@ def test_get_family_member_calls_dao():
         result = FamilyMemberService.get_family_member(user_id=123, member_id=1)
         
         # Verify DAO was called with both IDs (security: verifies user owns this member)
-        mock_dao.assert_called_once_with(1, 123)
+        mock_dao.assert_called_once_with(1, 123, connection=None)
         
         assert result["id"] == 1
         assert result["name"] == "John"
@@ -208,7 +209,7 @@ def test_delete_family_member_calls_dao():
         result = FamilyMemberService.delete_family_member(user_id=123, member_id=1)
         
         # Verify DAO was called with correct parameters
-        mock_dao.assert_called_once_with(1, 123)
+        mock_dao.assert_called_once_with(1, 123, connection=None)
         
         # Verify result
         assert result is True
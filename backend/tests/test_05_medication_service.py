@@ -3,16 +3,15 @@ TEST 5: Medication Service
 ===========================
 
 What we're testing: The MedicationService business logic
-Why: This service has interesting logic - create_or_update checks if med exists
+Why: create_or_update either creates a medication or adds to an existing one
 
 Key logic to test:
-- If medication exists → increment quantity
-- If medication doesn't exist → create new one
-- This demonstrates conditional business logic
+- Create-or-increment is a single upsert (no read-then-write race)
+- Names are unique per user, so a clashing rename is a user error
 
 The tests:
-- Create new medication
-- Update existing medication (increment quantity)
+- Create or increment medication via one upsert
+- Rename onto an existing name raises ValueError
 - Get all medications
 - Get specific medication
 - Update medication
@@ -20,81 +19,74 @@ The tests:
 """
 
 from unittest.mock import patch
+import pytest
+from psycopg2 import errors
 from app.services.medication_service import MedicationService
 from app.models.medication import MedicationCreate, MedicationUpdate
 
 
-def test_create_new_medication_when_not_exists():
+def test_create_or_update_uses_single_upsert():
     """
-    TEST 5.1: create_or_update creates new med when it doesn't exist
+    TEST 5.1: create_or_update goes through one upsert statement
     
     WHAT IT DOES:
-    1. Mock get_medication_by_name to return None (doesn't exist)
-    2. Mock create_medication to return new med
-    3. Call service.create_or_update_medication()
-    4. Verify create_medication was called (not increment)
+    1. Mock upsert_medication to return the stored med
+    2. Call service.create_or_update_medication()
+    3. Verify upsert_medication was called once with the request data
     
     WHY:
-    - Service has conditional logic - need to test both paths
-    - This path: medication doesn't exist, so CREATE it
+    - A separate "does it exist?" read followed by insert/update races:
+      two requests for the same name could both insert a duplicate
+    - The unique (user_id, lower(name)) index lets Postgres decide atomically
     
     EXPECTED RESULT:
-    - create_medication should be called
-    - increment_medication_quantity should NOT be called
-    - Should return newly created medication
+    - upsert_medication called once with name, quantity and expiration date
+    - Should return the stored medication
     """
     med_data = MedicationCreate(name="Aspirin", quantity=100, expiration_date="2025-12-31")
     mock_new_med = {"id": 1, "user_id": 123, "name": "Aspirin", "quantity": 100}
     
-    with patch('app.services.medication_service.MedicationDAO.get_medication_by_name') as mock_get:
-        with patch('app.services.medication_service.MedicationDAO.create_medication') as mock_create:
-            with patch('app.services.medication_service.db.get_connection'):
-                mock_get.return_value = None  # Medication doesn't exist
-                mock_create.return_value = mock_new_med
-                
-                result = MedicationService.create_or_update_medication(user_id=123, medication_data=med_data)
-                
-                # Verify create was called, not increment
-                mock_create.assert_called_once()
-                assert result["name"] == "Aspirin"
+    with patch('app.services.medication_service.MedicationDAO.upsert_medication') as mock_upsert:
+        mock_upsert.return_value = mock_new_med
+        
+        result = MedicationService.create_or_update_medication(user_id=123, medication_data=med_data)
+        
+        mock_upsert.assert_called_once_with(
+            user_id=123,
+            name="Aspirin",
+            quantity=100,
+            expiration_date=med_data.expiration_date,
+            connection=None,
+        )
+        assert result["name"] == "Aspirin"
 
 
-def test_update_existing_medication_increments_quantity():
+def test_update_medication_rename_to_existing_name_raises_value_error():
     """
-    TEST 5.2: create_or_update increments quantity if med exists
+    TEST 5.2: Renaming a med onto another med's name raises ValueError
     
     WHAT IT DOES:
-    1. Mock get_medication_by_name to return existing med
-    2. Mock increment_medication_quantity to return updated med
-    3. Call service.create_or_update_medication()
-    4. Verify increment_medication_quantity was called (not create)
+    1. Mock update_medication to raise a UniqueViolation (the unique index fired)
+    2. Call service.update_medication() with the clashing name
+    3. Verify a ValueError is raised
     
     WHY:
-    - This tests the OTHER path - when medication ALREADY exists
-    - Instead of creating new, we increment the quantity
-    - This is smart inventory logic - don't create duplicates
+    - Names are unique per user (case-insensitive) - a rename can collide
+    - Controllers turn ValueError into a 400 instead of a 500
     
     EXPECTED RESULT:
-    - increment_medication_quantity should be called
-    - create_medication should NOT be called
-    - Should return medication with increased quantity
+    - ValueError mentioning the medication name
     """
-    med_data = MedicationCreate(name="Aspirin", quantity=50, expiration_date="2025-12-31")
-    existing_med = {"id": 1, "user_id": 123, "name": "Aspirin", "quantity": 100}
-    updated_med = {"id": 1, "user_id": 123, "name": "Aspirin", "quantity": 150}
+    class FakeUniqueViolation(errors.UniqueViolation):
+        pass
     
-    with patch('app.services.medication_service.MedicationDAO.get_medication_by_name') as mock_get:
-        with patch('app.services.medication_service.MedicationDAO.increment_medication_quantity') as mock_increment:
-            with patch('app.services.medication_service.db.get_connection'):
-                mock_get.return_value = existing_med  # Medication EXISTS
-                mock_increment.return_value = updated_med
-                
-                result = MedicationService.create_or_update_medication(user_id=123, medication_data=med_data)
-                
-                # Verify increment was called
-                mock_increment.assert_called_once()
-                # Verify the quantity increased
-                assert result["quantity"] == 150
+    with patch('app.services.medication_service.MedicationDAO.update_medication') as mock_update:
+        mock_update.side_effect = FakeUniqueViolation()
+        
+        with pytest.raises(ValueError, match="Ibuprofen"):
+            MedicationService.update_medication(
+                user_id=123, medication_id=1, medication_data=MedicationUpdate(name="Ibuprofen")
+            )
 
 
 def test_get_medications_returns_list():
@@ -125,9 +117,9 @@ def test_get_medications_returns_list():
         
         result = MedicationService.get_medications(user_id=123)
         
-        mock_dao.assert_called_once_with(123)
-        assert len(result) == 2
-        assert result[0]["name"] == "Aspirin"
+        mock_dao.assert_called_once_with(123, limit=51, after=None, connection=None)
+        assert len(result["items"]) == 2
+        assert result["items"][0]["name"] == "Aspirin"
 
 
 def test_get_medications_returns_empty_list_when_none():
@@ -152,8 +144,9 @@ def test_get_medications_returns_empty_list_when_none():
         
         result = MedicationService.get_medications(user_id=999)
         
-        assert isinstance(result, list)
-        assert len(result) == 0
+        assert isinstance(result["items"], list)
+        assert len(result["items"]) == 0
+        assert result["next_cursor"] is None
 
 
 def test_get_medication_returns_specific_med():
@@ -182,7 +175,7 @@ def test_get_medication_returns_specific_med():
         result = MedicationService.get_medication(user_id=123, medication_id=1)
         
         # Verify DAO called with both IDs for security
-        mock_dao.assert_called_once_with(1, 123)
+        mock_dao.assert_called_once_with(1, 123, connection=None)
         assert result["id"] == 1
         assert result["name"] == "Aspirin"
 
@@ -240,7 +233,7 @@ def test_delete_medication_calls_dao():
         
         result = MedicationService.delete_medication(user_id=123, medication_id=1)
         
-        mock_dao.assert_called_once_with(1, 123)
+        mock_dao.assert_called_once_with(1, 123, connection=None)
         assert result is True
 
 
@@ -6,10 +6,8 @@ What we're testing: The MedicationUsageService business logic
 Why: This service has important validation and business rules
 
 Key logic to test:
-- Verify family member exists and belongs to user
-- Verify medication exists and belongs to user
-- Check sufficient quantity before logging usage
-- Decrease medication quantity after logging
+- Ownership, quantity check, decrement and insert happen in one atomic DAO call
+- When nothing was logged, report why (family member, medication, quantity)
 - Handle various error cases
 
 The tests:
@@ -17,7 +15,7 @@ The tests:
 - Fail when family member not found
 - Fail when medication not found
 - Fail when insufficient quantity
-- Fail when user doesn't own resources (security)
+- Run on the caller's connection
 - Get usage logs
 """
 
@@ -29,26 +27,22 @@ import pytest
 
 def test_log_usage_success_happy_path():
     """
-    TEST 6.1: log_usage successfully logs usage and decreases quantity
+    TEST 6.1: log_usage logs usage and decreases quantity in one DAO call
     
     WHAT IT DOES:
-    1. Mock all DAO calls to return valid data
+    1. Mock the atomic DAO call to return the created usage log
     2. Call service.log_usage() with valid data
     3. Verify:
-       - Family member verified
-       - Medication verified
-       - Quantity check passed
-       - Usage log created
-       - Medication quantity decreased
+       - The atomic DAO call received user_id (ownership check) and quantity
+       - No diagnostic query was needed
     
     WHY:
-    - This is the happy path - everything works correctly
-    - Need to verify all steps happen in order
+    - This is the happy path - one round trip checks ownership,
+      decrements inventory and inserts the log
     
     EXPECTED RESULT:
     - Should return usage log
-    - Medication quantity should decrease
-    - No errors raised
+    - get_usage_preconditions should not be called
     """
     usage_data = MedicationUsageCreate(
         family_member_id=1,
@@ -56,31 +50,25 @@ def test_log_usage_success_happy_path():
         quantity_used=10
     )
     
-    family_member = {"id": 1, "user_id": 123, "name": "John"}
-    medication = {"id": 1, "user_id": 123, "name": "Aspirin", "quantity": 100}
     usage_log = {"id": 1, "family_member_id": 1, "medication_id": 1, "quantity_used": 10}
-    updated_med = {"id": 1, "quantity": 90}  # 100 - 10
     
-    with patch('app.dao.family_member_dao.FamilyMemberDAO.get_family_member_by_id') as mock_family:
-        with patch('app.dao.medication_dao.MedicationDAO.get_medication_by_id') as mock_med:
-            with patch('app.dao.medication_usage_dao.MedicationUsageDAO.create_usage_log') as mock_log:
-                with patch('app.dao.medication_dao.MedicationDAO.update_medication') as mock_update:
-                    with patch('app.services.medication_usage_service.db.get_connection'):
-                        mock_family.return_value = family_member
-                        mock_med.return_value = medication
-                        mock_log.return_value = usage_log
-                        mock_update.return_value = updated_med
-                        
-                        result = MedicationUsageService.log_usage(user_id=123, usage_data=usage_data)
-                        
-                        # Verify all steps were called
-                        mock_family.assert_called_once()
-                        mock_med.assert_called_once()
-                        mock_log.assert_called_once()
-                        mock_update.assert_called_once()
-                        
-                        # Verify result
-                        assert result["quantity_used"] == 10
+    with patch('app.dao.medication_usage_dao.MedicationUsageDAO.create_usage_log_and_decrement') as mock_log:
+        with patch('app.dao.medication_usage_dao.MedicationUsageDAO.get_usage_preconditions') as mock_check:
+            mock_log.return_value = usage_log
+            
+            result = MedicationUsageService.log_usage(user_id=123, usage_data=usage_data)
+            
+            mock_log.assert_called_once_with(
+                user_id=123,
+                family_member_id=1,
+                medication_id=1,
+                quantity_used=10,
+                connection=None,
+            )
+            mock_check.assert_not_called()
+            
+            # Verify result
+            assert result["quantity_used"] == 10
 
 
 def test_log_usage_fails_family_member_not_found():
@@ -88,9 +76,10 @@ def test_log_usage_fails_family_member_not_found():
     TEST 6.2: log_usage raises error when family member not found
     
     WHAT IT DOES:
-    1. Mock DAO to return None for family member
-    2. Call service.log_usage()
-    3. Expect ValueError exception
+    1. Mock the atomic DAO call to log nothing
+    2. Mock the diagnostic query to report the family member missing
+    3. Call service.log_usage()
+    4. Expect ValueError exception
     
     WHY:
     - Security: verify user owns the family member
@@ -99,7 +88,6 @@ def test_log_usage_fails_family_member_not_found():
     EXPECTED RESULT:
     - Should raise ValueError
     - Message should mention family member not found
-    - No database operations should proceed
     """
     usage_data = MedicationUsageCreate(
         family_member_id=999,  # Doesn't exist
@@ -107,9 +95,10 @@ def test_log_usage_fails_family_member_not_found():
         quantity_used=10
     )
     
-    with patch('app.dao.family_member_dao.FamilyMemberDAO.get_family_member_by_id') as mock_family:
-        with patch('app.services.medication_usage_service.db.get_connection'):
-            mock_family.return_value = None  # Not found
+    with patch('app.dao.medication_usage_dao.MedicationUsageDAO.create_usage_log_and_decrement') as mock_log:
+        with patch('app.dao.medication_usage_dao.MedicationUsageDAO.get_usage_preconditions') as mock_check:
+            mock_log.return_value = None  # Nothing logged
+            mock_check.return_value = {"family_member_found": False, "available_quantity": 100}
             
             with pytest.raises(ValueError) as exc_info:
                 MedicationUsageService.log_usage(user_id=123, usage_data=usage_data)
@@ -122,8 +111,8 @@ def test_log_usage_fails_medication_not_found():
     TEST 6.3: log_usage raises error when medication not found
     
     WHAT IT DOES:
-    1. Mock family member found
-    2. Mock medication not found
+    1. Mock the atomic DAO call to log nothing
+    2. Mock the diagnostic query: family member found, medication missing
     3. Call service.log_usage()
     4. Expect ValueError exception
     
@@ -141,18 +130,15 @@ def test_log_usage_fails_medication_not_found():
         quantity_used=10
     )
     
-    family_member = {"id": 1, "user_id": 123, "name": "John"}
-    
-    with patch('app.dao.family_member_dao.FamilyMemberDAO.get_family_member_by_id') as mock_family:
-        with patch('app.dao.medication_dao.MedicationDAO.get_medication_by_id') as mock_med:
-            with patch('app.services.medication_usage_service.db.get_connection'):
-                mock_family.return_value = family_member
-                mock_med.return_value = None  # Not found
-                
-                with pytest.raises(ValueError) as exc_info:
-                    MedicationUsageService.log_usage(user_id=123, usage_data=usage_data)
-                
-                assert "Medication not found" in str(exc_info.value)
+    with patch('app.dao.medication_usage_dao.MedicationUsageDAO.create_usage_log_and_decrement') as mock_log:
+        with patch('app.dao.medication_usage_dao.MedicationUsageDAO.get_usage_preconditions') as mock_check:
+            mock_log.return_value = None
+            mock_check.return_value = {"family_member_found": True, "available_quantity": None}
+            
+            with pytest.raises(ValueError) as exc_info:
+                MedicationUsageService.log_usage(user_id=123, usage_data=usage_data)
+            
+            assert "Medication not found" in str(exc_info.value)
 
 
 def test_log_usage_fails_insufficient_quantity():
@@ -160,8 +146,8 @@ def test_log_usage_fails_insufficient_quantity():
     TEST 6.4: log_usage raises error when quantity insufficient
     
     WHAT IT DOES:
-    1. Mock family member and medication found
-    2. Medication has quantity=10 but trying to use 20
+    1. Mock the atomic DAO call to log nothing (quantity >= check failed)
+    2. Diagnostic query: medication has quantity=10 but trying to use 20
     3. Call service.log_usage()
     4. Expect ValueError exception
     
@@ -172,7 +158,6 @@ def test_log_usage_fails_insufficient_quantity():
     EXPECTED RESULT:
     - Should raise ValueError
     - Message should show available vs requested
-    - Should NOT decrease quantity or create log
     """
     usage_data = MedicationUsageCreate(
         family_member_id=1,
@@ -180,65 +165,51 @@ def test_log_usage_fails_insufficient_quantity():
         quantity_used=20  # Request more than available
     )
     
-    family_member = {"id": 1, "user_id": 123, "name": "John"}
-    medication = {"id": 1, "user_id": 123, "quantity": 10}  # Only 10 available
-    
-    with patch('app.dao.family_member_dao.FamilyMemberDAO.get_family_member_by_id') as mock_family:
-        with patch('app.dao.medication_dao.MedicationDAO.get_medication_by_id') as mock_med:
-            with patch('app.services.medication_usage_service.db.get_connection'):
-                mock_family.return_value = family_member
-                mock_med.return_value = medication
-                
-                with pytest.raises(ValueError) as exc_info:
-                    MedicationUsageService.log_usage(user_id=123, usage_data=usage_data)
-                
-                assert "Insufficient quantity" in str(exc_info.value)
-                assert "Available: 10" in str(exc_info.value)
-                assert "Requested: 20" in str(exc_info.value)
+    with patch('app.dao.medication_usage_dao.MedicationUsageDAO.create_usage_log_and_decrement') as mock_log:
+        with patch('app.dao.medication_usage_dao.MedicationUsageDAO.get_usage_preconditions') as mock_check:
+            mock_log.return_value = None
+            mock_check.return_value = {"family_member_found": True, "available_quantity": 10}  # Only 10 available
+            
+            with pytest.raises(ValueError) as exc_info:
+                MedicationUsageService.log_usage(user_id=123, usage_data=usage_data)
+            
+            assert "Insufficient quantity" in str(exc_info.value)
+            assert "Available: 10" in str(exc_info.value)
+            assert "Requested: 20" in str(exc_info.value)
 
 
-def test_log_usage_fails_when_update_fails():
+def test_log_usage_uses_provided_connection():
     """
-    TEST 6.5: log_usage raises error when quantity update fails
+    TEST 6.5: log_usage runs on the caller's connection
     
     WHAT IT DOES:
-    1. All validations pass
-    2. Usage log created successfully
-    3. But medication update fails (returns None)
-    4. Expect Exception
+    1. Pass a connection (the request's unit of work) to log_usage
+    2. Make the atomic DAO call fail so the diagnostic query also runs
+    3. Verify both DAO calls received that connection
     
     WHY:
-    - Should fail gracefully if database update fails
-    - Transaction should be rolled back
+    - The ownership checks and the write must share the request transaction
     
     EXPECTED RESULT:
-    - Should raise Exception
-    - Should mention update failure
+    - Both DAO calls get connection=conn
     """
     usage_data = MedicationUsageCreate(
         family_member_id=1,
         medication_id=1,
         quantity_used=10
     )
+    conn = object()
     
-    family_member = {"id": 1, "user_id": 123}
-    medication = {"id": 1, "user_id": 123, "quantity": 100}
-    usage_log = {"id": 1, "quantity_used": 10}
-    
-    with patch('app.dao.family_member_dao.FamilyMemberDAO.get_family_member_by_id') as mock_family:
-        with patch('app.dao.medication_dao.MedicationDAO.get_medication_by_id') as mock_med:
-            with patch('app.dao.medication_usage_dao.MedicationUsageDAO.create_usage_log') as mock_log:
-                with patch('app.dao.medication_dao.MedicationDAO.update_medication') as mock_update:
-                    with patch('app.services.medication_usage_service.db.get_connection'):
-                        mock_family.return_value = family_member
-                        mock_med.return_value = medication
-                        mock_log.return_value = usage_log
-                        mock_update.return_value = None  # Update failed
-                        
-                        with pytest.raises(Exception) as exc_info:
-                            MedicationUsageService.log_usage(user_id=123, usage_data=usage_data)
-                        
-                        assert "Failed to update medication quantity" in str(exc_info.value)
+    with patch('app.dao.medication_usage_dao.MedicationUsageDAO.create_usage_log_and_decrement') as mock_log:
+        with patch('app.dao.medication_usage_dao.MedicationUsageDAO.get_usage_preconditions') as mock_check:
+            mock_log.return_value = None
+            mock_check.return_value = {"family_member_found": True, "available_quantity": 5}
+            
+            with pytest.raises(ValueError):
+                MedicationUsageService.log_usage(user_id=123, usage_data=usage_data, connection=conn)
+            
+            assert mock_log.call_args.kwargs["connection"] is conn
+            assert mock_check.call_args.kwargs["connection"] is conn
 
 
 def test_get_usage_logs_returns_list():
@@ -268,8 +239,10 @@ def test_get_usage_logs_returns_list():
         
         result = MedicationUsageService.get_usage_logs(user_id=123)
         
-        mock_dao.assert_called_once_with(123)
-        assert len(result) == 2
+        mock_dao.assert_called_once_with(
+            123, limit=51, after=None, start_date=None, end_date=None, connection=None
+        )
+        assert len(result["items"]) == 2
 
 
 def test_get_usage_logs_returns_empty_when_none():
@@ -293,5 +266,6 @@ def test_get_usage_logs_returns_empty_when_none():
         
         result = MedicationUsageService.get_usage_logs(user_id=999)
         
-        assert isinstance(result, list)
-        assert len(result) == 0
+        assert isinstance(result["items"], list)
+        assert len(result["items"]) == 0
+        assert result["next_cursor"] is None
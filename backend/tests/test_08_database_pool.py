@@ -0,0 +1,230 @@
+"""
+TEST 8: Database Connection Pool
+=================================
+
+What we're testing: The ConnectionPool behind app.database.Database
+Why: Every DAO call borrows a connection from the pool - if the pool leaks,
+hands out dead connections or blocks forever, every endpoint breaks
+
+Key concept: MOCKING psycopg2.connect
+- We replace psycopg2.connect with a factory of fake connections
+- No real database is needed, we only test the pooling logic
+
+The tests:
+- Connections are reused instead of reopened
+- Exhausted pool raises PoolTimeoutError after the wait timeout
+- Connections older than max_lifetime are recycled
+- Broken connections are replaced on checkout
+- Database.get_connection returns connections to the pool
+"""
+
+from unittest.mock import MagicMock, patch
+from psycopg2 import extensions
+import pytest
+from app.database import ConnectionPool, Database, PoolTimeoutError
+
+
+def make_fake_connection(*args, **kwargs):
+    """Create a fake psycopg2 connection that looks open and idle."""
+    conn = MagicMock()
+    conn.closed = 0
+    conn.get_transaction_status.return_value = extensions.TRANSACTION_STATUS_IDLE
+    return conn
+
+
+def test_pool_reuses_connections():
+    """
+    TEST 8.1: Returned connections are handed out again
+
+    WHAT IT DOES:
+    1. Create a pool with min_size=0
+    2. Check out and return a connection twice
+    3. Verify psycopg2.connect was only called once
+
+    WHY:
+    - Avoiding a TCP + auth handshake per query is the whole point of the pool
+
+    EXPECTED RESULT:
+    - Same connection object both times
+    - Only one physical connect
+    """
+    with patch('app.database.psycopg2.connect', side_effect=make_fake_connection) as mock_connect:
+        pool = ConnectionPool("postgresql://test", min_size=0, max_size=2)
+
+        first = pool.getconn()
+        pool.putconn(first)
+        second = pool.getconn()
+
+        assert first is second
+        assert mock_connect.call_count == 1
+
+
+def test_pool_times_out_when_exhausted():
+    """
+    TEST 8.2: Exhausted pool raises PoolTimeoutError
+
+    WHAT IT DOES:
+    1. Create a pool with max_size=1 and a tiny wait timeout
+    2. Check out the only connection
+    3. Try to check out another one
+
+    WHY:
+    - Requests must fail fast instead of hanging when Postgres is saturated
+
+    EXPECTED RESULT:
+    - PoolTimeoutError is raised
+    """
+    with patch('app.database.psycopg2.connect', side_effect=make_fake_connection):
+        pool = ConnectionPool("postgresql://test", min_size=0, max_size=1, timeout=0.05)
+        pool.getconn()
+
+        with pytest.raises(PoolTimeoutError):
+            pool.getconn()
+
+
+def test_pool_recycles_expired_connections():
+    """
+    TEST 8.3: Connections past max_lifetime are closed and replaced
+
+    WHAT IT DOES:
+    1. Create a pool with max_lifetime=0.01 seconds
+    2. Check out a connection, wait, return it
+    3. Check out again
+
+    WHY:
+    - Long-lived connections accumulate server-side memory and survive failovers
+
+    EXPECTED RESULT:
+    - The old connection is closed
+    - A new connection is returned
+    """
+    with patch('app.database.psycopg2.connect', side_effect=make_fake_connection) as mock_connect:
+        pool = ConnectionPool("postgresql://test", min_size=0, max_size=1, max_lifetime=0.01)
+
+        first = pool.getconn()
+        import time
+        time.sleep(0.02)
+        pool.putconn(first)
+        second = pool.getconn()
+
+        first.close.assert_called_once()
+        assert second is not first
+        assert mock_connect.call_count == 2
+
+
+def test_pool_replaces_broken_connection_on_checkout():
+    """
+    TEST 8.4: Connections that fail the health check are replaced
+
+    WHAT IT DOES:
+    1. Create a pool that pings every idle connection (health_check_interval=0)
+    2. Make the idle connection's ping raise an error
+    3. Check out a connection
+
+    WHY:
+    - Postgres restarts or idle timeouts leave dead sockets in the pool
+
+    EXPECTED RESULT:
+    - The dead connection is discarded
+    - A fresh connection is returned
+    """
+    with patch('app.database.psycopg2.connect', side_effect=make_fake_connection):
+        pool = ConnectionPool("postgresql://test", min_size=1, max_size=1, health_check_interval=0)
+        dead = pool._idle[0]
+        dead.cursor.return_value.__enter__.return_value.execute.side_effect = Exception("server closed the connection")
+
+        conn = pool.getconn()
+
+        assert conn is not dead
+        dead.close.assert_called_once()
+        assert pool.stats()["size"] == 1
+
+
+def test_get_connection_returns_connection_to_pool():
+    """
+    TEST 8.5: Database.get_connection commits and releases the connection
+
+    WHAT IT DOES:
+    1. Use Database.get_connection() in a with block
+    2. Verify commit was called and the connection is idle again
+
+    WHY:
+    - DAOs rely on get_connection/get_cursor without knowing about the pool
+
+    EXPECTED RESULT:
+    - commit() called once
+    - Pool reports the connection as idle
+    """
+    with patch('app.database.psycopg2.connect', side_effect=make_fake_connection):
+        database = Database()
+
+        with database.get_connection() as conn:
+            assert database.pool.stats()["in_use"] == 1
+
+        conn.commit.assert_called_once()
+        assert database.pool.stats()["in_use"] == 0
+        database.close()
+
+
+def test_unit_of_work_is_lazy_and_shared():
+    """
+    TEST 8.6: UnitOfWork borrows one connection on first use and reuses it
+
+    WHAT IT DOES:
+    1. Create a UnitOfWork and verify nothing is borrowed yet
+    2. Access .connection twice
+    3. Release it
+
+    WHY:
+    - The auth dependency and the handler share the request's connection
+    - Requests that never touch the database must not occupy a pool slot
+
+    EXPECTED RESULT:
+    - No connection before first access
+    - Both accesses return the same connection
+    - release() commits and returns it to the pool
+    """
+    from app.database import UnitOfWork
+
+    with patch('app.database.psycopg2.connect', side_effect=make_fake_connection):
+        database = Database()
+        uow = UnitOfWork(database)
+        assert database.pool.stats()["in_use"] == 0
+
+        first = uow.connection
+        second = uow.connection
+        assert first is second
+        assert database.pool.stats()["in_use"] == 1
+
+        uow.release()
+        first.commit.assert_called_once()
+        assert database.pool.stats()["in_use"] == 0
+        database.close()
+
+
+def test_unit_of_work_rolls_back_on_error():
+    """
+    TEST 8.7: UnitOfWork rolls back when released with an error
+
+    WHAT IT DOES:
+    1. Borrow the request connection
+    2. Release it with an exception (as the request dependency does when the handler fails)
+
+    WHY:
+    - A failed request must not leave half-written data behind
+
+    EXPECTED RESULT:
+    - rollback() called, commit() not called
+    """
+    from app.database import UnitOfWork
+
+    with patch('app.database.psycopg2.connect', side_effect=make_fake_connection):
+        database = Database()
+        uow = UnitOfWork(database)
+        conn = uow.connection
+
+        uow.release(error=ValueError("Insufficient quantity"))
+
+        conn.rollback.assert_called()
+        conn.commit.assert_not_called()
+        database.close()
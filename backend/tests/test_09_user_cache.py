@@ -0,0 +1,227 @@
+"""
+TEST 9: Authenticated User Cache
+=================================
+
+What we're testing: The per-worker user cache used by get_current_user
+Why: Every protected endpoint resolves the current user - caching it removes
+one database round trip per request, but a stale or leaky cache would be a
+security problem
+
+The tests:
+- Second lookup is served from the cache
+- Only whitelisted fields are cached (no OAuth tokens)
+- Entries expire after the TTL
+- UserDAO updates invalidate the entry
+- get_current_user uses the cache
+- Invalidation waits for the update to commit (requires PostgreSQL)
+"""
+
+import os
+import time
+from unittest.mock import MagicMock, patch
+import pytest
+from fastapi.security import HTTPAuthorizationCredentials
+from app.cache import UserCache, user_cache
+from app.dao.user_dao import UserDAO
+from app.utils.dependencies import get_current_user
+from app.utils.jwt import create_access_token
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+def test_second_lookup_is_a_cache_hit():
+    """
+    TEST 9.1: The loader only runs on the first lookup
+
+    WHAT IT DOES:
+    1. Look up the same user twice with a mock loader
+    2. Check the loader was called once and the counters
+
+    WHY:
+    - The point of the cache is skipping the users query
+
+    EXPECTED RESULT:
+    - Loader called once
+    - 1 hit, 1 miss
+    """
+    cache = UserCache(max_size=10, ttl=60)
+    loader = MagicMock(return_value={"id": 1, "email": "a@example.com", "name": "A", "drive_folder_id": None})
+
+    cache.get_or_load(1, loader)
+    user = cache.get_or_load(1, loader)
+
+    loader.assert_called_once_with(1)
+    assert user["email"] == "a@example.com"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_does_not_keep_oauth_tokens():
+    """
+    TEST 9.2: Only the fields handlers read are cached
+
+    WHAT IT DOES:
+    1. Load a user row that includes Google tokens
+    2. Inspect the returned/cached user
+
+    WHY:
+    - OAuth tokens must not linger in process memory or leak into handlers
+
+    EXPECTED RESULT:
+    - Token columns are not present
+    """
+    cache = UserCache(max_size=10, ttl=60)
+    loader = MagicMock(return_value={
+        "id": 1, "email": "a@example.com", "name": "A", "drive_folder_id": "folder",
+        "google_oauth_token": "secret", "google_refresh_token": "secret",
+    })
+
+    user = cache.get_or_load(1, loader)
+
+    assert set(user.keys()) == {"id", "email", "name", "drive_folder_id", "lifeline_calendar_id"}
+
+
+def test_cache_entries_expire():
+    """
+    TEST 9.3: Entries are reloaded after the TTL
+
+    WHAT IT DOES:
+    1. Create a cache with a tiny TTL
+    2. Look up, wait, look up again
+
+    WHY:
+    - Changes made by other workers must become visible eventually
+
+    EXPECTED RESULT:
+    - Loader called twice
+    """
+    cache = UserCache(max_size=10, ttl=0.01)
+    loader = MagicMock(return_value={"id": 1, "email": "a@example.com"})
+
+    cache.get_or_load(1, loader)
+    time.sleep(0.02)
+    cache.get_or_load(1, loader)
+
+    assert loader.call_count == 2
+
+
+def test_update_drive_folder_id_invalidates_cache():
+    """
+    TEST 9.4: UserDAO.update_drive_folder_id drops the cached user
+
+    WHAT IT DOES:
+    1. Put a user into the global cache
+    2. Call UserDAO.update_drive_folder_id with a mocked cursor
+    3. Look the user up again
+
+    WHY:
+    - Handlers must see the new drive_folder_id right after login provisioning
+
+    EXPECTED RESULT:
+    - The second lookup is a miss and reloads the user
+    """
+    user_cache.clear()
+    loader = MagicMock(return_value={"id": 7, "email": "a@example.com", "drive_folder_id": "old"})
+    user_cache.get_or_load(7, loader)
+
+    with patch('app.dao.user_dao.db.get_cursor') as mock_cursor:
+        mock_cursor.return_value.__enter__.return_value.rowcount = 1
+        UserDAO.update_drive_folder_id(7, "new")
+
+    user_cache.get_or_load(7, loader)
+
+    assert loader.call_count == 2
+    user_cache.clear()
+
+
+def test_get_current_user_uses_cache():
+    """
+    TEST 9.5: get_current_user only queries the database once per user
+
+    WHAT IT DOES:
+    1. Mock UserDAO.get_auth_user_by_id
+    2. Resolve the current user twice with the same valid token
+
+    WHY:
+    - Every protected endpoint runs get_current_user
+
+    EXPECTED RESULT:
+    - DAO called once
+    - Both calls return the user
+    """
+    user_cache.clear()
+    token = create_access_token({"sub": "42"})
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    uow = MagicMock()
+
+    with patch('app.utils.dependencies.UserDAO.get_auth_user_by_id') as mock_dao:
+        mock_dao.return_value = {"id": 42, "email": "a@example.com", "name": "A", "drive_folder_id": None}
+
+        first = get_current_user(credentials=credentials, uow=uow)
+        second = get_current_user(credentials=credentials, uow=uow)
+
+        mock_dao.assert_called_once()
+        assert first["id"] == 42
+        assert second["id"] == 42
+    user_cache.clear()
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+def test_invalidation_waits_for_commit():
+    """
+    TEST 9.6: A user cached while an update is uncommitted does not stay stale
+
+    WHAT IT DOES:
+    1. Update a user's drive_folder_id on a pooled-style connection, without committing
+    2. Meanwhile, look the user up from another connection (still sees the old folder)
+    3. Commit, then look the user up again
+
+    WHY:
+    - Invalidating inside the transaction let a concurrent lookup re-cache the old
+      row until the TTL ran out
+
+    EXPECTED RESULT:
+    - The lookup during the transaction gets the old folder
+    - The lookup after the commit reloads and gets the new one
+    - Rolled-back updates invalidate nothing
+    """
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+    from app.database import HookedConnection
+
+    writer = psycopg2.connect(TEST_DATABASE_URL, connection_factory=HookedConnection, cursor_factory=RealDictCursor)
+    reader = psycopg2.connect(TEST_DATABASE_URL, cursor_factory=RealDictCursor)
+    with writer.cursor() as cursor:
+        cursor.execute("INSERT INTO users (email, name, drive_folder_id) VALUES (%s, %s, 'old') RETURNING id",
+                       (f"cache-{time.time_ns()}@test.local", "Cache Test"))
+        user_id = cursor.fetchone()["id"]
+    writer.commit()
+
+    def load(uid):
+        user = UserDAO.get_auth_user_by_id(uid, connection=reader)
+        reader.commit()
+        return user
+
+    user_cache.clear()
+    try:
+        UserDAO.update_drive_folder_id(user_id, "new", connection=writer)
+        during = user_cache.get_or_load(user_id, load)
+        writer.commit()
+        after = user_cache.get_or_load(user_id, load)
+
+        UserDAO.update_drive_folder_id(user_id, "rolled back", connection=writer)
+        writer.rollback()
+        misses = user_cache.stats()["misses"]
+        cached = user_cache.get_or_load(user_id, load)
+
+        assert during["drive_folder_id"] == "old"
+        assert after["drive_folder_id"] == "new"
+        assert cached["drive_folder_id"] == "new"
+        assert user_cache.stats()["misses"] == misses
+    finally:
+        user_cache.clear()
+        with writer.cursor() as cursor:
+            cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
+        writer.commit()
+        writer.close()
+        reader.close()
@@ -0,0 +1,147 @@
+"""
+TEST 11: Keyset Pagination
+===========================
+
+What we're testing: Cursor pagination on the list endpoints
+Why: Usage and illness history grows forever - list endpoints must return
+bounded pages and let the client continue exactly where it stopped
+
+Key concept: KEYSET PAGINATION
+- Rows are ordered by (sort column, id)
+- The cursor is the (sort column, id) of the last row on the page
+- The next page is "everything after that key", so no OFFSET scan is needed
+
+The tests:
+- Cursors round-trip the sort key and id
+- Tampered cursors are rejected
+- next_cursor is only set when there is another page
+- Services decode the cursor and ask the DAO for one extra row
+- Endpoints enforce the max page size and reject bad cursors
+"""
+
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+import pytest
+from app.main import app
+from app.config import settings
+from app.utils.dependencies import get_current_user, get_unit_of_work
+from app.utils.pagination import encode_cursor, decode_cursor, build_page
+from app.services.medication_usage_service import MedicationUsageService
+
+
+def test_cursor_round_trip():
+    """
+    TEST 11.1: A cursor decodes back to the sort key and id it was built from
+
+    WHAT IT DOES:
+    1. Encode a (used_at, id) pair
+    2. Decode it with datetime.fromisoformat
+
+    WHY:
+    - The DAO compares (used_at, id) against the decoded values
+
+    EXPECTED RESULT:
+    - Same datetime and id come back
+    """
+    used_at = datetime(2025, 3, 14, 9, 26, 53, 589793)
+
+    cursor = encode_cursor(used_at, 42)
+
+    assert decode_cursor(cursor, datetime.fromisoformat) == (used_at, 42)
+
+
+def test_tampered_cursor_is_rejected():
+    """
+    TEST 11.2: Cursors we did not issue raise ValueError
+
+    WHAT IT DOES:
+    1. Decode garbage, and a valid cursor whose sort key has the wrong type
+
+    WHY:
+    - A bad cursor is a client error (400), not a database error (500)
+
+    EXPECTED RESULT:
+    - ValueError("Invalid cursor") both times
+    """
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor("not-a-cursor", datetime.fromisoformat)
+
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(encode_cursor("Aspirin", 1), datetime.fromisoformat)
+
+
+def test_build_page_sets_next_cursor_only_when_more_rows():
+    """
+    TEST 11.3: next_cursor points at the last returned row, or is None on the last page
+
+    WHAT IT DOES:
+    1. Build a page of 2 from 3 rows (the DAO fetched limit + 1)
+    2. Build a page of 2 from 2 rows
+
+    EXPECTED RESULT:
+    - First page has 2 items and a cursor for the 2nd row
+    - Second call has no next_cursor
+    """
+    rows = [
+        {"id": 3, "name": "Aspirin"},
+        {"id": 1, "name": "Ibuprofen"},
+        {"id": 2, "name": "Paracetamol"},
+    ]
+
+    page = build_page(rows, 2, "name")
+    last_page = build_page(rows[:2], 2, "name")
+
+    assert [item["id"] for item in page["items"]] == [3, 1]
+    assert decode_cursor(page["next_cursor"], str) == ("Ibuprofen", 1)
+    assert last_page["next_cursor"] is None
+
+
+def test_service_passes_decoded_cursor_to_dao():
+    """
+    TEST 11.4: get_usage_logs decodes the cursor and over-fetches by one row
+
+    WHAT IT DOES:
+    1. Call get_usage_logs with a cursor and limit=10
+    2. Check what the DAO was asked for
+
+    EXPECTED RESULT:
+    - DAO called with limit=11 and after=(used_at, id)
+    """
+    used_at = datetime(2025, 1, 1, 12, 0)
+
+    with patch('app.services.medication_usage_service.MedicationUsageDAO.get_usage_logs_by_user_id') as mock_dao:
+        mock_dao.return_value = []
+
+        MedicationUsageService.get_usage_logs(user_id=123, limit=10, cursor=encode_cursor(used_at, 7))
+
+        mock_dao.assert_called_once_with(
+            123, limit=11, after=(used_at, 7), start_date=None, end_date=None, connection=None
+        )
+
+
+def test_list_endpoint_validates_limit_and_cursor(client):
+    """
+    TEST 11.5: List endpoints reject oversized pages and bad cursors
+
+    WHAT IT DOES:
+    1. Override auth and the unit of work (no database needed)
+    2. Ask for more than pagination_max_limit rows
+    3. Send a tampered cursor
+
+    WHY:
+    - The max page size is what keeps memory and latency flat
+
+    EXPECTED RESULT:
+    - 422 for the oversized limit
+    - 400 for the bad cursor
+    """
+    app.dependency_overrides[get_current_user] = lambda: {"id": 123}
+    app.dependency_overrides[get_unit_of_work] = lambda: MagicMock()
+    try:
+        too_big = client.get("/medication-usage", params={"limit": settings.pagination_max_limit + 1})
+        bad_cursor = client.get("/illness-logs", params={"cursor": "not-a-cursor"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert too_big.status_code == 422
+    assert bad_cursor.status_code == 400
@@ -0,0 +1,302 @@
+"""
+TEST 13: Batch Write Endpoints
+===============================
+
+What we're testing: The /batch endpoints for family members, medications and usage logs
+Why: Onboarding a household or logging a morning round of doses used to take one
+request (and one transaction) per row - batches do it in one round trip
+
+Key concept: PER-ITEM RESULTS
+- The whole batch runs in one transaction with multi-row statements
+- Usage items are checked in order, against the inventory the earlier items left
+- An item that fails is reported with the same error log_usage would raise,
+  and does not stop the others
+- Items are validated one by one, so a malformed item fails only itself
+
+The tests:
+- Usage batches check inventory item by item, in order
+- Usage batches report unknown family members and medications per item
+- Medication batches combine items naming the same medication
+- Medication batches match names the way the unique index does (requires PostgreSQL)
+- Family member batches return results in input order
+- A malformed item is reported at its index while the others are written
+- Endpoints reject empty and oversized batches
+"""
+
+import os
+import time
+from unittest.mock import MagicMock, patch
+import pytest
+from app.main import app
+from app.config import settings
+from app.utils.dependencies import get_current_user, get_unit_of_work
+from app.models.family_member import FamilyMemberCreate
+from app.models.medication import MedicationCreate
+from app.models.medication_usage import MedicationUsageCreate
+from app.services.family_member_service import FamilyMemberService
+from app.services.medication_service import MedicationService
+from app.services.medication_usage_service import MedicationUsageService
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+def locked_targets(quantity):
+    """One family member (id 1) and one medication (id 10) with `quantity` units."""
+    return {
+        "family_members": {1: {"id": 1, "name": "Alice"}},
+        "medications": {10: {"id": 10, "name": "Ibuprofen", "quantity": quantity}},
+    }
+
+
+def test_usage_batch_checks_inventory_in_order():
+    """
+    TEST 13.1: Each usage sees the inventory left by the usages before it
+
+    WHAT IT DOES:
+    1. Lock a medication with 3 units
+    2. Log usages of 2, 2 and 1 units in one batch
+
+    WHY:
+    - Checking every item against the starting quantity would oversell
+
+    EXPECTED RESULT:
+    - Items 0 and 2 succeed, item 1 fails with "Available: 1, Requested: 2"
+    - Only the successful items are written
+    """
+    usages = [
+        MedicationUsageCreate(family_member_id=1, medication_id=10, quantity_used=quantity)
+        for quantity in (2, 2, 1)
+    ]
+
+    with patch('app.services.medication_usage_service.MedicationUsageDAO') as mock_dao:
+        mock_dao.lock_usage_batch_targets.return_value = locked_targets(3)
+        mock_dao.create_usage_logs_and_decrement.return_value = [{"id": 100}, {"id": 101}]
+
+        result = MedicationUsageService.log_usage_batch(123, usages, connection=MagicMock())
+
+        written = mock_dao.create_usage_logs_and_decrement.call_args[0][1]
+        assert [usage["quantity_used"] for usage in written] == [2, 1]
+
+    assert result["succeeded"] == 2
+    assert result["failed"] == 1
+    assert [item["success"] for item in result["results"]] == [True, False, True]
+    assert result["results"][1]["error"] == "Insufficient quantity. Available: 1, Requested: 2"
+    assert result["results"][2]["item"]["id"] == 101
+    assert result["results"][2]["item"]["medication_name"] == "Ibuprofen"
+    assert result["results"][2]["item"]["family_member_name"] == "Alice"
+
+
+def test_usage_batch_reports_unknown_targets_per_item():
+    """
+    TEST 13.2: Foreign family members and medications fail only their own item
+
+    WHAT IT DOES:
+    1. Log a valid usage, one for an unknown family member, one for an unknown medication
+
+    EXPECTED RESULT:
+    - Same error messages as log_usage
+    - The valid usage is still written
+    """
+    usages = [
+        MedicationUsageCreate(family_member_id=1, medication_id=10),
+        MedicationUsageCreate(family_member_id=2, medication_id=10),
+        MedicationUsageCreate(family_member_id=1, medication_id=20),
+    ]
+
+    with patch('app.services.medication_usage_service.MedicationUsageDAO') as mock_dao:
+        mock_dao.lock_usage_batch_targets.return_value = locked_targets(5)
+        mock_dao.create_usage_logs_and_decrement.return_value = [{"id": 100}]
+
+        result = MedicationUsageService.log_usage_batch(123, usages, connection=MagicMock())
+
+    assert [item.get("error") for item in result["results"]] == [
+        None,
+        "Family member not found or does not belong to user",
+        "Medication not found or does not belong to user",
+    ]
+
+
+def test_medication_batch_combines_same_name_items():
+    """
+    TEST 13.3: Every item reports the medication the upsert put it in
+
+    WHAT IT DOES:
+    1. Send "Aspirin" x10, "Ibuprofen" x3 and "ASPIRIN" x1
+    2. The DAO answers one row per item, tagged with the item's position
+
+    WHY:
+    - Matching rows back by name in Python disagrees with PostgreSQL's LOWER for
+      some non-ASCII names
+
+    EXPECTED RESULT:
+    - The DAO gets all three items (it combines them, with the same LOWER as the index)
+    - Both Aspirin items report the same medication, in input order
+    """
+    medications = [
+        MedicationCreate(name="Aspirin", quantity=10),
+        MedicationCreate(name="Ibuprofen", quantity=3),
+        MedicationCreate(name="ASPIRIN", quantity=1),
+    ]
+
+    with patch('app.services.medication_service.MedicationDAO.upsert_medications') as mock_dao:
+        mock_dao.return_value = [
+            {"ordinal": 2, "id": 1, "name": "Aspirin", "quantity": 16},
+            {"ordinal": 0, "id": 1, "name": "Aspirin", "quantity": 16},
+            {"ordinal": 1, "id": 2, "name": "Ibuprofen", "quantity": 3},
+        ]
+
+        result = MedicationService.create_or_update_medications(123, medications)
+
+        upserted = mock_dao.call_args[0][1]
+        assert [(item["name"], item["quantity"]) for item in upserted] == [("Aspirin", 10), ("Ibuprofen", 3), ("ASPIRIN", 1)]
+
+    assert result["succeeded"] == 3
+    assert [item["item"]["id"] for item in result["results"]] == [1, 2, 1]
+    assert "ordinal" not in result["results"][0]["item"]
+
+
+def test_family_member_batch_keeps_input_order():
+    """
+    TEST 13.4: Created family members come back in the order they were sent
+
+    WHAT IT DOES:
+    1. Create two family members in one batch
+
+    EXPECTED RESULT:
+    - One DAO call with both members
+    - Result indexes match the input positions
+    """
+    members = [FamilyMemberCreate(name="Alice"), FamilyMemberCreate(name="Bob")]
+
+    with patch('app.services.family_member_service.FamilyMemberDAO.create_family_members') as mock_dao:
+        mock_dao.return_value = [{"id": 7, "name": "Alice"}, {"id": 8, "name": "Bob"}]
+
+        result = FamilyMemberService.create_family_members(123, members)
+
+        mock_dao.assert_called_once()
+
+    assert [(item["index"], item["item"]["name"]) for item in result["results"]] == [(0, "Alice"), (1, "Bob")]
+
+
+def test_batch_reports_malformed_items_by_index(client):
+    """
+    TEST 13.5: A malformed item fails on its own instead of rejecting the batch
+
+    WHAT IT DOES:
+    1. Override auth and the unit of work (no database needed)
+    2. Post three medications, the middle one with a non-numeric quantity
+
+    WHY:
+    - Validating the whole list up front returned 422 for every item because of one
+
+    EXPECTED RESULT:
+    - 200, with the middle item failed at index 1 naming the bad field
+    - Only the two valid items reach the upsert, and map back to indexes 0 and 2
+    """
+    items = [
+        {"name": "Aspirin", "quantity": 10},
+        {"name": "Ibuprofen", "quantity": "lots"},
+        {"name": "Paracetamol", "quantity": 2},
+    ]
+    app.dependency_overrides[get_current_user] = lambda: {"id": 123}
+    app.dependency_overrides[get_unit_of_work] = lambda: MagicMock()
+    try:
+        with patch('app.services.medication_service.MedicationDAO.upsert_medications') as mock_dao:
+            mock_dao.return_value = [
+                {"ordinal": 1, "id": 2, "user_id": 123, "name": "Paracetamol", "quantity": 2,
+                 "expiration_date": None, "created_at": "2026-01-01T00:00:00", "updated_at": "2026-01-01T00:00:00"},
+                {"ordinal": 0, "id": 1, "user_id": 123, "name": "Aspirin", "quantity": 10,
+                 "expiration_date": None, "created_at": "2026-01-01T00:00:00", "updated_at": "2026-01-01T00:00:00"},
+            ]
+            response = client.post("/medications/batch", json={"items": items})
+            upserted = mock_dao.call_args[0][1]
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [item["name"] for item in upserted] == ["Aspirin", "Paracetamol"]
+    assert (body["succeeded"], body["failed"]) == (2, 1)
+    results = body["results"]
+    assert [(result["index"], result["success"]) for result in results] == [(0, True), (1, False), (2, True)]
+    assert results[1]["error"].startswith("quantity:")
+    assert [results[0]["item"]["name"], results[2]["item"]["name"]] == ["Aspirin", "Paracetamol"]
+
+
+def test_batch_endpoints_reject_empty_and_oversized_batches(client):
+    """
+    TEST 13.6: Batches must contain between 1 and batch_max_items items
+
+    WHAT IT DOES:
+    1. Override auth and the unit of work (no database needed)
+    2. Post an empty batch and one item over the limit
+
+    WHY:
+    - The limit bounds how long one request holds row locks
+
+    EXPECTED RESULT:
+    - 422 both times
+    """
+    item = {"family_member_id": 1, "medication_id": 10}
+    app.dependency_overrides[get_current_user] = lambda: {"id": 123}
+    app.dependency_overrides[get_unit_of_work] = lambda: MagicMock()
+    try:
+        empty = client.post("/medication-usage/batch", json={"items": []})
+        too_big = client.post("/medication-usage/batch", json={"items": [item] * (settings.batch_max_items + 1)})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert empty.status_code == 422
+    assert too_big.status_code == 422
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+def test_medication_batch_matches_names_like_postgres():
+    """
+    TEST 13.7: Names are combined and matched with PostgreSQL's LOWER, not Python's
+
+    WHAT IT DOES:
+    1. Batch "Aspirin", "ASPIRIN", "Äspirin", "äspirin", "Straße", "STRASSE",
+       "İbuprofen" and "ibuprofen" for a throwaway user
+    2. Send the same batch again
+
+    WHY:
+    - For non-ASCII names str.lower() and LOWER() can disagree (depending on the
+      database collation), which raised KeyError or hit the same row twice in one
+      ON CONFLICT statement
+
+    EXPECTED RESULT:
+    - No error; every item reports the medication LOWER(name) finds for it
+    - Aspirin was combined to 2 units, then 4
+    """
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+
+    conn = psycopg2.connect(TEST_DATABASE_URL, cursor_factory=RealDictCursor)
+    with conn.cursor() as cursor:
+        cursor.execute("INSERT INTO users (email, name) VALUES (%s, %s) RETURNING id",
+                       (f"meds-{time.time_ns()}@test.local", "Medication Test"))
+        user_id = cursor.fetchone()["id"]
+    conn.commit()
+
+    names = ["Aspirin", "ASPIRIN", "Äspirin", "äspirin", "Straße", "STRASSE", "İbuprofen", "ibuprofen"]
+    try:
+        batch = [MedicationCreate(name=name, quantity=1) for name in names]
+        MedicationService.create_or_update_medications(user_id, batch, connection=conn)
+        result = MedicationService.create_or_update_medications(user_id, batch, connection=conn)
+
+        with conn.cursor() as cursor:
+            expected = []
+            for name in names:
+                cursor.execute("SELECT id FROM medications WHERE user_id = %s AND LOWER(name) = LOWER(%s)",
+                               (user_id, name))
+                expected.append(cursor.fetchone()["id"])
+        assert result["succeeded"] == len(names)
+        assert [item["item"]["id"] for item in result["results"]] == expected
+        assert result["results"][0]["item"]["quantity"] == 4
+    finally:
+        conn.rollback()
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
+        conn.commit()
+        conn.close()
@@ -0,0 +1,244 @@
+"""
+TEST 14: Google Credentials Cache
+==================================
+
+What we're testing: GoogleCredentialsService and the per-worker credentials cache
+Why: Every Drive and Calendar call used to query user_google_credentials, and
+concurrent calls for an expiring token each hit Google's token endpoint and raced
+to write the result back
+
+Key concept: SINGLE-FLIGHT REFRESH
+- Within a worker, one thread per user loads/refreshes; the others wait for it
+- Across workers, a Postgres advisory lock serializes the refresh, and the
+  waiting workers re-read the token the first one stored
+
+The tests:
+- Fresh credentials are served from the cache
+- Concurrent calls for an expiring token refresh it once
+- A token refreshed by another worker is not refreshed again
+- GoogleCredentialsDAO writes invalidate the entry
+- Several worker processes refresh once between them (requires PostgreSQL)
+"""
+
+import os
+import time
+import threading
+import multiprocessing
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+import pytest
+from google.oauth2.credentials import Credentials
+from app.cache import GoogleCredentialsCache, google_credentials_cache
+from app.dao.google_credentials_dao import GoogleCredentialsDAO
+from app.database import db
+from app.services.google_credentials_service import GoogleCredentialsService
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+def creds_row(expires_in, access_token="old-token"):
+    """A user_google_credentials row whose access token expires in `expires_in` seconds."""
+    return {
+        "user_id": 1,
+        "access_token": access_token,
+        "refresh_token": "refresh-token",
+        "token_expiry": datetime.utcnow() + timedelta(seconds=expires_in),
+    }
+
+
+def fake_refresh(self, request):
+    """Stand-in for Credentials.refresh: slow enough for callers to pile up."""
+    time.sleep(0.05)
+    self.token = "new-token"
+    self.expiry = datetime.utcnow() + timedelta(hours=1)
+
+
+def test_fresh_credentials_are_cached():
+    """
+    TEST 14.1: The loader only runs while the cached token is fresh
+
+    WHAT IT DOES:
+    1. Load credentials valid for an hour twice
+    2. Load credentials that expire inside the refresh margin twice
+
+    WHY:
+    - Entries live until their token expires, not for a fixed TTL
+
+    EXPECTED RESULT:
+    - Fresh: loader called once
+    - Expiring: loader called every time
+    """
+    cache = GoogleCredentialsCache(max_size=10, refresh_margin=300)
+    fresh = MagicMock(return_value=creds_row(3600))
+    expiring = MagicMock(return_value=creds_row(60))
+
+    cache.get_or_load(1, fresh)
+    cache.get_or_load(1, fresh)
+    cache.get_or_load(2, expiring)
+    cache.get_or_load(2, expiring)
+
+    assert fresh.call_count == 1
+    assert expiring.call_count == 2
+
+
+def test_concurrent_calls_refresh_once():
+    """
+    TEST 14.2: Eight threads asking for an expired token cause one refresh
+
+    WHAT IT DOES:
+    1. Mock the DAO to return an expired token, and Google's refresh
+    2. Call get_credentials from 8 threads at once
+
+    WHY:
+    - A dashboard load calls Drive and Calendar in parallel
+
+    EXPECTED RESULT:
+    - Credentials.refresh called once
+    - Every thread gets the new token
+    """
+    tokens = []
+    start = threading.Barrier(8)
+
+    def worker():
+        start.wait()
+        tokens.append(GoogleCredentialsService.get_credentials(1).token)
+
+    with patch('app.services.google_credentials_service.google_credentials_cache',
+               GoogleCredentialsCache(max_size=10, refresh_margin=300)), \
+            patch('app.services.google_credentials_service.db'), \
+            patch('app.services.google_credentials_service.GoogleCredentialsDAO') as mock_dao, \
+            patch.object(Credentials, 'refresh', autospec=True, side_effect=fake_refresh) as mock_refresh:
+        mock_dao.get_credentials_by_user_id.return_value = creds_row(-60)
+        mock_dao.update_refreshed_token.side_effect = lambda **kwargs: {
+            **creds_row(3600), "access_token": kwargs["access_token"], "token_expiry": kwargs["token_expiry"],
+        }
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert mock_refresh.call_count == 1
+        mock_dao.lock_for_refresh.assert_called_once()
+    assert tokens == ["new-token"] * 8
+
+
+def test_token_refreshed_by_another_worker_is_reused():
+    """
+    TEST 14.3: After waiting for the advisory lock, a fresh token in the database wins
+
+    WHAT IT DOES:
+    1. First read returns an expired token; the read under the lock returns a fresh one
+    2. Call get_credentials
+
+    EXPECTED RESULT:
+    - No call to Google's token endpoint
+    - The other worker's token is returned
+    """
+    with patch('app.services.google_credentials_service.google_credentials_cache',
+               GoogleCredentialsCache(max_size=10, refresh_margin=300)), \
+            patch('app.services.google_credentials_service.db'), \
+            patch('app.services.google_credentials_service.GoogleCredentialsDAO') as mock_dao, \
+            patch.object(Credentials, 'refresh', autospec=True) as mock_refresh:
+        mock_dao.get_credentials_by_user_id.side_effect = [creds_row(-60), creds_row(3600, "other-worker-token")]
+
+        credentials = GoogleCredentialsService.get_credentials(1)
+
+        mock_refresh.assert_not_called()
+    assert credentials.token == "other-worker-token"
+
+
+def test_credentials_writes_invalidate_cache():
+    """
+    TEST 14.4: GoogleCredentialsDAO.create_or_update_credentials drops the cached entry
+
+    WHAT IT DOES:
+    1. Put credentials into the global cache
+    2. Store new credentials (e.g. after logging in again) with a mocked cursor
+    3. Look the credentials up again
+
+    EXPECTED RESULT:
+    - The second lookup reloads
+    """
+    google_credentials_cache.clear()
+    loader = MagicMock(return_value=creds_row(3600))
+    google_credentials_cache.get_or_load(1, loader)
+
+    with patch('app.dao.google_credentials_dao.db.get_cursor'):
+        GoogleCredentialsDAO.create_or_update_credentials(1, "a", "r", datetime.utcnow())
+
+    google_credentials_cache.get_or_load(1, loader)
+
+    assert loader.call_count == 2
+    google_credentials_cache.clear()
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+def test_workers_refresh_once_between_them():
+    """
+    TEST 14.5: Four worker processes with four threads each refresh an expired token once
+
+    WHAT IT DOES:
+    1. Store an expired token for a throwaway user in the test database
+    2. Fork 4 processes (own cache and pool each, like gunicorn workers)
+    3. Call get_credentials from 4 threads in each
+
+    WHY:
+    - The in-process lock cannot see other workers; the advisory lock can
+
+    EXPECTED RESULT:
+    - One refresh in total
+    - Every call gets the refreshed token
+    """
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+
+    conn = psycopg2.connect(TEST_DATABASE_URL, cursor_factory=RealDictCursor)
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO users (email, name) VALUES (%s, %s) RETURNING id",
+            (f"credentials-{time.time_ns()}@test.local", "Credentials Test"),
+        )
+        user_id = cursor.fetchone()["id"]
+    conn.commit()
+    ctx = multiprocessing.get_context("fork")
+    refreshes = ctx.Value("i", 0)
+
+    def counting_refresh(self, request):
+        with refreshes.get_lock():
+            refreshes.value += 1
+        fake_refresh(self, request)
+
+    def worker():
+        tokens = []
+        threads = [
+            threading.Thread(target=lambda: tokens.append(GoogleCredentialsService.get_credentials(user_id).token))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        os._exit(0 if tokens == ["new-token"] * 4 else 1)
+
+    try:
+        GoogleCredentialsDAO.create_or_update_credentials(
+            user_id, "old-token", "refresh-token", datetime.utcnow() - timedelta(minutes=1), connection=conn
+        )
+        conn.commit()
+        with patch.object(db, 'connection_string', TEST_DATABASE_URL), \
+                patch.object(Credentials, 'refresh', counting_refresh):
+            processes = [ctx.Process(target=worker) for _ in range(4)]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+
+        assert [process.exitcode for process in processes] == [0] * 4
+        assert refreshes.value == 1
+    finally:
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
+        conn.commit()
+        conn.close()
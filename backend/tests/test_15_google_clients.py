@@ -0,0 +1,174 @@
+"""
+TEST 15: Google API Client Factory
+===================================
+
+What we're testing: GoogleClientFactory, which hands out reusable Drive/Calendar/OAuth2 clients
+Why: build() parsed a large discovery document and opened a new HTTPS connection
+on every Drive and Calendar call
+
+Key concept: CHECK OUT / RETURN
+- A client (service object + keep-alive connection) is used by one caller at a time
+- Returned clients are pooled per (user, API); idle pools live in an LRU
+
+The tests:
+- Discovery documents are read once per process
+- A returned client is reused, with the caller's current credentials
+- Concurrent callers never share a client
+- Evicted and broken clients have their connections closed
+- Per-call overhead of build() vs. the factory (printed with -s)
+"""
+
+import time
+from unittest.mock import patch
+import pytest
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.errors import HttpError
+from app.google_clients import GoogleClientFactory
+
+
+def make_factory(max_size=10, pool_size=4):
+    return GoogleClientFactory(max_size=max_size, pool_size=pool_size, timeout=30)
+
+
+def test_discovery_document_read_once():
+    """
+    TEST 15.1: The bundled discovery document is read from disk once
+
+    WHAT IT DOES:
+    1. Check out Drive clients for three different users
+
+    EXPECTED RESULT:
+    - get_static_doc called once
+    """
+    factory = make_factory()
+
+    with patch('app.google_clients.get_static_doc', wraps=get_static_doc) as mock_read:
+        for user_id in (1, 2, 3):
+            with factory.service("drive", "v3", Credentials(token="t"), user_id=user_id):
+                pass
+
+        mock_read.assert_called_once_with("drive", "v3")
+
+
+def test_returned_client_is_reused_with_current_credentials():
+    """
+    TEST 15.2: The second checkout gets the same client, authorized with the new token
+
+    WHAT IT DOES:
+    1. Check out and return a client with token "old"
+    2. Check out again with token "new"
+
+    WHY:
+    - Pooled clients must not keep using a token the credentials cache has replaced
+
+    EXPECTED RESULT:
+    - Same service object, now carrying the "new" credentials
+    - 1 miss, 1 hit
+    """
+    factory = make_factory()
+
+    with factory.service("drive", "v3", Credentials(token="old"), user_id=1) as first:
+        pass
+    with factory.service("drive", "v3", Credentials(token="new"), user_id=1) as second:
+        token = second._service._http.credentials.token
+
+    assert second is first
+    assert token == "new"
+    assert factory.stats()["hits"] == 1
+    assert factory.stats()["misses"] == 1
+
+
+def test_concurrent_checkouts_get_separate_clients():
+    """
+    TEST 15.3: A client that is checked out is not handed to anyone else
+
+    WHAT IT DOES:
+    1. Check out two Drive clients for the same user without returning the first
+
+    WHY:
+    - httplib2 connections are not thread-safe
+
+    EXPECTED RESULT:
+    - Two different service objects, both pooled afterwards
+    """
+    factory = make_factory()
+    credentials = Credentials(token="t")
+
+    with factory.service("drive", "v3", credentials, user_id=1) as first:
+        with factory.service("drive", "v3", credentials, user_id=1) as second:
+            assert second is not first
+
+    assert factory.stats()["idle_clients"] == 2
+
+
+def test_evicted_and_broken_clients_are_closed():
+    """
+    TEST 15.4: Connections are closed when a pool is evicted or a call fails oddly
+
+    WHAT IT DOES:
+    1. With room for one (user, API) pool, use clients for user 1 then user 2
+    2. Raise a non-HTTP error inside a checkout
+    3. Raise an HttpError inside a checkout
+
+    EXPECTED RESULT:
+    - User 1's connection is closed on eviction
+    - The client that raised a non-HTTP error is closed and not pooled
+    - The client that got an API error response is pooled again, and the error propagates
+    """
+    factory = make_factory(max_size=1)
+    credentials = Credentials(token="t")
+
+    with factory.service("drive", "v3", credentials, user_id=1) as evicted:
+        pass
+    with patch.object(evicted._service._http.http, 'close') as mock_close:
+        with factory.service("drive", "v3", credentials, user_id=2):
+            pass
+        mock_close.assert_called_once()
+
+    with pytest.raises(RuntimeError):
+        with factory.service("drive", "v3", credentials, user_id=2) as broken:
+            raise RuntimeError("connection reset")
+    with factory.service("drive", "v3", credentials, user_id=2) as replacement:
+        assert replacement is not broken
+
+    with pytest.raises(HttpError):
+        with factory.service("drive", "v3", credentials, user_id=2) as client:
+            raise HttpError(resp=type("Resp", (), {"status": 404, "reason": "Not Found"})(), content=b"")
+    with factory.service("drive", "v3", credentials, user_id=2) as again:
+        assert again is client
+
+
+def test_per_call_overhead_vs_build():
+    """
+    TEST 15.5: Benchmark build() per call against the factory
+
+    WHAT IT DOES:
+    1. Build a Drive client and prepare a files().list request 50 times with build()
+    2. Do the same through the factory
+    3. Print the per-call cost of both (no network involved)
+
+    EXPECTED RESULT:
+    - The factory is at least 5x cheaper per call
+    """
+    factory = make_factory()
+    credentials = Credentials(token="t")
+    calls = 50
+
+    began = time.perf_counter()
+    for _ in range(calls):
+        build("drive", "v3", credentials=credentials, cache_discovery=False).files().list(q="trashed=false")
+    build_seconds = (time.perf_counter() - began) / calls
+
+    began = time.perf_counter()
+    for _ in range(calls):
+        with factory.service("drive", "v3", credentials, user_id=1) as service:
+            service.files().list(q="trashed=false")
+    factory_seconds = (time.perf_counter() - began) / calls
+
+    print(
+        f"\nbuild() per call: {build_seconds * 1000:.2f} ms"
+        f"\nfactory per call: {factory_seconds * 1000:.3f} ms"
+    )
+    assert factory_seconds * 5 < build_seconds
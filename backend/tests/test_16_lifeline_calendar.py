@@ -0,0 +1,186 @@
+"""
+TEST 16: Stored LIFELINE Calendar ID
+=====================================
+
+What we're testing: How GoogleCalendarService resolves the user's LIFELINE calendar
+Why: Every calendar request used to page through calendarList() to find the
+calendar by name, and two first-time requests could each create one
+
+Key concept: RESOLVE ONCE, REDISCOVER ON 404
+- The calendar ID is stored on the user (like drive_folder_id) and served from the user cache
+- Finding/creating the calendar is serialized per user with an advisory lock
+- A stored ID that Google no longer knows (404) is forgotten and resolved again
+
+The tests:
+- A stored calendar ID is used without listing calendars
+- A 404 on the stored calendar triggers one rediscovery and a retry
+- A calendar stored while waiting for the lock is reused
+- Concurrent first-time calls create one calendar (requires PostgreSQL)
+"""
+
+import os
+import time
+import threading
+from unittest.mock import MagicMock, patch
+import pytest
+from googleapiclient.errors import HttpError
+from app.cache import user_cache
+from app.database import db
+from app.services.google_calendar_service import GoogleCalendarService
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+def not_found():
+    return HttpError(resp=type("Resp", (), {"status": 404, "reason": "Not Found"})(), content=b"")
+
+
+def test_stored_calendar_id_skips_calendar_list():
+    """
+    TEST 16.1: create_event goes straight to the stored calendar
+
+    WHAT IT DOES:
+    1. Serve a user with lifeline_calendar_id from the user cache
+    2. Create an event
+
+    EXPECTED RESULT:
+    - The event is inserted into the stored calendar
+    - No calendar search or creation
+    """
+    service = MagicMock()
+    with patch('app.services.google_calendar_service.GoogleCalendarService.get_credentials'), \
+            patch('app.services.google_calendar_service.user_cache.get_or_load',
+                  return_value={"id": 1, "lifeline_calendar_id": "stored-calendar"}), \
+            patch('app.services.google_calendar_service.google_clients.service') as mock_service, \
+            patch('app.services.google_calendar_service.GoogleCalendarService._search_or_create_calendar') as mock_search:
+        mock_service.return_value.__enter__.return_value = service
+
+        GoogleCalendarService.create_event(1, "Checkup", MagicMock(), MagicMock())
+
+        mock_search.assert_not_called()
+    assert service.events().insert.call_args.kwargs["calendarId"] == "stored-calendar"
+
+
+def test_missing_calendar_is_rediscovered_once():
+    """
+    TEST 16.2: A 404 on the stored calendar forgets it, resolves it again and retries
+
+    WHAT IT DOES:
+    1. Stored calendar "deleted-calendar"; Google answers 404 for it
+    2. Rediscovery finds "new-calendar"
+
+    WHY:
+    - The user may have deleted the calendar in Google Calendar
+
+    EXPECTED RESULT:
+    - The stale ID is cleared (only if it is still the stored one)
+    - The call is retried against "new-calendar"
+    """
+    calls = []
+
+    def insert(service, calendar_id):
+        calls.append(calendar_id)
+        if calendar_id == "deleted-calendar":
+            raise not_found()
+        return {"id": "event"}
+
+    with patch('app.services.google_calendar_service.user_cache.get_or_load',
+               return_value={"id": 1, "lifeline_calendar_id": "deleted-calendar"}), \
+            patch('app.services.google_calendar_service.google_clients.service'), \
+            patch('app.services.google_calendar_service.UserDAO') as mock_dao, \
+            patch('app.services.google_calendar_service.GoogleCalendarService.find_or_create_lifeline_calendar',
+                  return_value="new-calendar"):
+
+        result = GoogleCalendarService._call_lifeline_calendar(1, MagicMock(), insert)
+
+        mock_dao.clear_lifeline_calendar_id.assert_called_once_with(1, "deleted-calendar")
+    assert calls == ["deleted-calendar", "new-calendar"]
+    assert result == {"id": "event"}
+
+
+def test_calendar_stored_while_waiting_is_reused():
+    """
+    TEST 16.3: find_or_create_lifeline_calendar re-reads the user under the lock
+
+    WHAT IT DOES:
+    1. The read after taking the advisory lock returns a calendar ID
+    2. Call find_or_create_lifeline_calendar
+
+    EXPECTED RESULT:
+    - That ID is returned without searching or creating
+    """
+    with patch('app.services.google_calendar_service.db'), \
+            patch('app.services.google_calendar_service.UserDAO') as mock_dao, \
+            patch('app.services.google_calendar_service.GoogleCalendarService._search_or_create_calendar') as mock_search:
+        mock_dao.get_auth_user_by_id.return_value = {"id": 1, "lifeline_calendar_id": "created-meanwhile"}
+
+        calendar_id = GoogleCalendarService.find_or_create_lifeline_calendar(1, MagicMock())
+
+        mock_dao.lock_lifeline_calendar.assert_called_once()
+        mock_search.assert_not_called()
+    assert calendar_id == "created-meanwhile"
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+def test_concurrent_first_calls_create_one_calendar():
+    """
+    TEST 16.4: Eight concurrent first-time requests create a single calendar
+
+    WHAT IT DOES:
+    1. Create a throwaway user without a calendar ID in the test database
+    2. Resolve the calendar from 8 threads at once (Google search/create is mocked and slow)
+
+    EXPECTED RESULT:
+    - One search/create
+    - Every thread gets the same ID, and it is stored on the user
+    """
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+
+    conn = psycopg2.connect(TEST_DATABASE_URL, cursor_factory=RealDictCursor)
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO users (email, name) VALUES (%s, %s) RETURNING id",
+            (f"calendar-{time.time_ns()}@test.local", "Calendar Test"),
+        )
+        user_id = cursor.fetchone()["id"]
+    conn.commit()
+
+    created = []
+    calendar_ids = []
+    start = threading.Barrier(8)
+
+    def search_or_create(uid, credentials):
+        time.sleep(0.05)
+        created.append(uid)
+        return f"calendar-{len(created)}"
+
+    def worker():
+        start.wait()
+        calendar_ids.append(GoogleCalendarService.get_lifeline_calendar_id(user_id, MagicMock()))
+
+    db.close()
+    user_cache.clear()
+    try:
+        with patch.object(db, 'connection_string', TEST_DATABASE_URL), \
+                patch('app.services.google_calendar_service.GoogleCalendarService._search_or_create_calendar',
+                      side_effect=search_or_create):
+            threads = [threading.Thread(target=worker) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            db.close()
+
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT lifeline_calendar_id FROM users WHERE id = %s", (user_id,))
+            stored = cursor.fetchone()["lifeline_calendar_id"]
+        assert len(created) == 1
+        assert calendar_ids == ["calendar-1"] * 8
+        assert stored == "calendar-1"
+    finally:
+        user_cache.clear()
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
+        conn.commit()
+        conn.close()
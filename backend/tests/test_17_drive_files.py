@@ -0,0 +1,326 @@
+"""
+TEST 17: Drive File Listing
+============================
+
+What we're testing: How GoogleDriveService lists the 'LifeLine Records' folder
+Why: The listing asked Google for at most 100 files on every request, ignored
+nextPageToken (files past the first 100 never showed up) and could not sort,
+filter or paginate
+
+Key concept: LOCAL COPY + CHANGES API
+- File metadata is kept in drive_files and listed from Postgres (keyset pages)
+- A stored Changes API page token brings it up to date, usually with one request
+- Uploads and deletes write through to the table
+- Concurrent syncs race on the page token; only the one that moves it applies its changes
+
+The tests:
+- Changes are applied: new/updated files upserted, removed/trashed/moved-out files deleted
+- A sync that loses the page-token race applies nothing
+- An invalid page token falls back to a full listing that follows nextPageToken
+- Follow-up pages and recently synced first pages don't call Google
+- Full sync, changes, sort, filters and pagination end to end (requires PostgreSQL)
+- /drive/files answers with the same items/next_cursor page as the other list endpoints
+"""
+
+import os
+import time
+from datetime import date
+from unittest.mock import MagicMock, patch
+import pytest
+from googleapiclient.errors import HttpError
+from app.cache import user_cache
+from app.main import app
+from app.utils.dependencies import get_current_user, get_unit_of_work
+from app.database import db
+from app.services.google_drive_service import GoogleDriveService
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+def drive_file(file_id, name=None, mime_type="application/pdf", modified="2026-03-01T10:00:00.000Z",
+               parents=("folder",), **extra):
+    """A Drive file resource as returned by files().list / changes().list."""
+    return {
+        "id": file_id,
+        "name": name or f"{file_id}.pdf",
+        "mimeType": mime_type,
+        "size": "1024",
+        "createdTime": "2026-01-01T10:00:00.000Z",
+        "modifiedTime": modified,
+        "parents": list(parents),
+        **extra,
+    }
+
+
+def mock_drive(mock_clients):
+    """Make google_clients.service() hand out one MagicMock Drive service."""
+    service = MagicMock()
+    mock_clients.service.return_value.__enter__.return_value = service
+    return service
+
+
+def test_changes_are_applied_to_the_folder():
+    """
+    TEST 17.1: A changes poll upserts files in the folder and deletes the rest
+
+    WHAT IT DOES:
+    1. Two pages of changes: a new file, an updated file, a removed file,
+       a trashed file and a file moved to another folder
+    2. Apply them from page token "10"
+
+    EXPECTED RESULT:
+    - The page token moves from "10" to the newStartPageToken "12"
+    - New and updated files are upserted, the other three deleted
+    """
+    with patch('app.services.google_drive_service.google_clients') as mock_clients, \
+            patch('app.services.google_drive_service.db'), \
+            patch('app.services.google_drive_service.DriveFileDAO') as mock_dao:
+        service = mock_drive(mock_clients)
+        service.changes().list().execute.side_effect = [
+            {"nextPageToken": "11", "changes": [
+                {"fileId": "new", "file": drive_file("new")},
+                {"fileId": "updated", "file": drive_file("updated", name="Renamed.pdf")},
+                {"fileId": "removed", "removed": True},
+            ]},
+            {"newStartPageToken": "12", "changes": [
+                {"fileId": "trashed", "file": drive_file("trashed", trashed=True)},
+                {"fileId": "moved", "file": drive_file("moved", parents=("elsewhere",))},
+            ]},
+        ]
+        mock_dao.advance_page_token.return_value = True
+
+        GoogleDriveService._apply_changes(1, MagicMock(), "folder", "10")
+
+        assert mock_dao.advance_page_token.call_args.args[:3] == (1, "10", "12")
+        upserted = mock_dao.upsert_files.call_args.args[1]
+        deleted = mock_dao.delete_files.call_args.args[1]
+    assert sorted(row["file_id"] for row in upserted) == ["new", "updated"]
+    assert sorted(deleted) == ["moved", "removed", "trashed"]
+
+
+def test_sync_that_loses_the_race_applies_nothing():
+    """
+    TEST 17.2: If another request already moved the page token, the changes are dropped
+
+    WHAT IT DOES:
+    1. advance_page_token reports that the token was moved by someone else
+    2. Apply a change
+
+    WHY:
+    - Both requests fetched the same changes; applying them twice could
+      resurrect a file deleted in between
+
+    EXPECTED RESULT:
+    - No upserts or deletes
+    """
+    with patch('app.services.google_drive_service.google_clients') as mock_clients, \
+            patch('app.services.google_drive_service.db'), \
+            patch('app.services.google_drive_service.DriveFileDAO') as mock_dao:
+        service = mock_drive(mock_clients)
+        service.changes().list().execute.return_value = {
+            "newStartPageToken": "11", "changes": [{"fileId": "new", "file": drive_file("new")}],
+        }
+        mock_dao.advance_page_token.return_value = False
+
+        GoogleDriveService._apply_changes(1, MagicMock(), "folder", "10")
+
+        mock_dao.upsert_files.assert_not_called()
+        mock_dao.delete_files.assert_not_called()
+
+
+def test_invalid_page_token_falls_back_to_full_listing():
+    """
+    TEST 17.3: Google rejecting the page token triggers a full listing of the folder
+
+    WHAT IT DOES:
+    1. changes().list answers 410 for the stored token
+    2. The folder listing has two pages (nextPageToken)
+
+    EXPECTED RESULT:
+    - Files from both pages are kept, every other row of the user is deleted
+    - The new start page token replaces the rejected one
+    """
+    gone = HttpError(resp=type("Resp", (), {"status": 410, "reason": "Gone"})(), content=b"")
+    second_page = MagicMock()
+    second_page.execute.return_value = {"files": [drive_file("c")]}
+
+    with patch('app.services.google_drive_service.google_clients') as mock_clients, \
+            patch('app.services.google_drive_service.db'), \
+            patch('app.services.google_drive_service.DriveFileDAO') as mock_dao:
+        service = mock_drive(mock_clients)
+        service.changes().list().execute.side_effect = gone
+        service.changes().getStartPageToken().execute.return_value = {"startPageToken": "50"}
+        service.files().list().execute.return_value = {"nextPageToken": "p2", "files": [drive_file("a"), drive_file("b")]}
+        service.files().list_next.side_effect = [second_page, None]
+        mock_dao.advance_page_token.return_value = True
+
+        GoogleDriveService.sync_files(1, MagicMock(), "folder", {"page_token": "stale"})
+
+        assert mock_dao.advance_page_token.call_args.args[:3] == (1, "stale", "50")
+        assert sorted(mock_dao.delete_files_except.call_args.args[1]) == ["a", "b", "c"]
+        assert len(mock_dao.upsert_files.call_args.args[1]) == 3
+
+
+def test_listing_without_sync_does_not_call_google():
+    """
+    TEST 17.4: Only a first page that is due for a sync talks to Google
+
+    WHAT IT DOES:
+    1. Request a follow-up page (cursor given)
+    2. Request a first page synced 5 seconds ago
+
+    EXPECTED RESULT:
+    - sync_files is not called
+    - Rows come back in Drive's file shape
+    """
+    row = {
+        "id": 7, "file_id": "abc", "name": "Scan.pdf", "mime_type": "application/pdf", "size": 10,
+        "created_time": GoogleDriveService._parse_drive_time("2026-01-01T10:00:00.000Z"),
+        "modified_time": GoogleDriveService._parse_drive_time("2026-03-01T10:00:00.000Z"),
+    }
+    with patch('app.services.google_drive_service.GoogleDriveService.get_credentials'), \
+            patch('app.services.google_drive_service.user_cache.get_or_load',
+                  return_value={"id": 1, "drive_folder_id": "folder"}), \
+            patch('app.services.google_drive_service.GoogleDriveService.sync_files') as mock_sync, \
+            patch('app.services.google_drive_service.DriveFileDAO') as mock_dao:
+        mock_dao.get_sync_state.return_value = {"page_token": "10", "age_seconds": 5.0}
+        mock_dao.get_files_by_user_id.return_value = [row]
+
+        GoogleDriveService.list_files(1, limit=10, after=(row["modified_time"], 8))
+        page = GoogleDriveService.list_files(1, limit=10)
+
+        mock_sync.assert_not_called()
+    assert page["items"] == [{
+        "id": "abc", "name": "Scan.pdf", "mimeType": "application/pdf", "size": 10,
+        "createdTime": "2026-01-01T10:00:00.000Z", "modifiedTime": "2026-03-01T10:00:00.000Z",
+    }]
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+def test_sync_and_list_end_to_end():
+    """
+    TEST 17.5: Full sync, a changes poll, sorting, filtering and paging against PostgreSQL
+
+    WHAT IT DOES:
+    1. Create a throwaway user with a Drive folder in the test database
+    2. List once: no page token yet, so the folder (two Drive pages) is listed in full
+    3. Page through the result two files at a time
+    4. Let the sync go stale, then list again with pending changes
+    5. Filter by MIME type and date, and sort by name
+
+    EXPECTED RESULT:
+    - All files across Drive pages are listed, newest modified first, without duplicates
+    - The changes poll adds, updates and removes rows
+    - Filters and sort orders are applied by Postgres
+    """
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+
+    conn = psycopg2.connect(TEST_DATABASE_URL, cursor_factory=RealDictCursor)
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO users (email, name, drive_folder_id) VALUES (%s, %s, %s) RETURNING id",
+            (f"drive-{time.time_ns()}@test.local", "Drive Test", "folder"),
+        )
+        user_id = cursor.fetchone()["id"]
+    conn.commit()
+
+    second_page = MagicMock()
+    second_page.execute.return_value = {"files": [
+        drive_file("d", modified="2026-03-04T10:00:00.000Z"),
+        drive_file("e", mime_type="image/png", modified="2026-03-05T10:00:00.000Z"),
+    ]}
+
+    def list_all():
+        files, after = [], None
+        while True:
+            page = GoogleDriveService.list_files(user_id, limit=2, after=after)
+            files.extend(file["id"] for file in page["items"])
+            if not page["next_cursor"]:
+                return files
+            after = GoogleDriveService.parse_cursor(page["next_cursor"], "modified_time")
+
+    db.close()
+    user_cache.clear()
+    try:
+        with patch.object(db, 'connection_string', TEST_DATABASE_URL), \
+                patch('app.services.google_drive_service.GoogleDriveService.get_credentials'), \
+                patch('app.services.google_drive_service.google_clients') as mock_clients:
+            service = mock_drive(mock_clients)
+            service.changes().getStartPageToken().execute.return_value = {"startPageToken": "100"}
+            service.files().list().execute.return_value = {"nextPageToken": "p2", "files": [
+                drive_file("a", modified="2026-03-01T10:00:00.000Z"),
+                drive_file("b", modified="2026-03-02T10:00:00.000Z"),
+                drive_file("c", modified="2026-03-03T10:00:00.000Z"),
+            ]}
+            service.files().list_next.side_effect = [second_page, None]
+
+            assert list_all() == ["e", "d", "c", "b", "a"]
+
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "UPDATE drive_sync_state SET synced_at = synced_at - INTERVAL '1 hour' WHERE user_id = %s",
+                    (user_id,),
+                )
+            conn.commit()
+            service.changes().list().execute.return_value = {"newStartPageToken": "101", "changes": [
+                {"fileId": "f", "file": drive_file("f", modified="2026-03-06T10:00:00.000Z")},
+                {"fileId": "a", "file": drive_file("a", modified="2026-03-07T10:00:00.000Z")},
+                {"fileId": "c", "removed": True},
+            ]}
+
+            assert list_all() == ["a", "f", "e", "d", "b"]
+
+            images = GoogleDriveService.list_files(user_id, mime_type="image/png")
+            recent = GoogleDriveService.list_files(user_id, start_date=date(2026, 3, 5), end_date=date(2026, 3, 6))
+            by_name = GoogleDriveService.list_files(user_id, sort="name", limit=3)
+            next_by_name = GoogleDriveService.list_files(
+                user_id, sort="name", after=GoogleDriveService.parse_cursor(by_name["next_cursor"], "name")
+            )
+            db.close()
+
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT page_token FROM drive_sync_state WHERE user_id = %s", (user_id,))
+            assert cursor.fetchone()["page_token"] == "101"
+        assert [file["id"] for file in images["items"]] == ["e"]
+        assert [file["id"] for file in recent["items"]] == ["f", "e"]
+        assert [file["id"] for file in by_name["items"] + next_by_name["items"]] == ["a", "b", "d", "e", "f"]
+    finally:
+        user_cache.clear()
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
+        conn.commit()
+        conn.close()
+
+
+def test_drive_files_endpoint_returns_a_page(client):
+    """
+    TEST 17.6: GET /drive/files uses the shared Page envelope
+
+    WHAT IT DOES:
+    1. List files with the service mocked to return a page with a next cursor
+    2. List files for a user without Google credentials
+
+    EXPECTED RESULT:
+    - items/next_cursor like every other list endpoint, plus connected=true
+    - Without credentials: an empty page with connected=false and the reason
+    """
+    file = {"id": "a", "name": "Scan.pdf", "mimeType": "application/pdf", "size": 11,
+            "createdTime": "2026-03-01T10:00:00.000Z", "modifiedTime": "2026-03-01T10:00:00.000Z"}
+    app.dependency_overrides[get_current_user] = lambda: {"id": 1, "email": "user@test.local"}
+    app.dependency_overrides[get_unit_of_work] = lambda: MagicMock()
+    try:
+        with patch('app.controllers.google_drive.GoogleDriveService.list_files') as list_files:
+            list_files.return_value = {"items": [file], "next_cursor": "next"}
+            connected = client.get("/drive/files")
+            list_files.side_effect = ValueError("Google credentials not found. Please authenticate first.")
+            disconnected = client.get("/drive/files")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert connected.status_code == 200
+    assert connected.json() == {"items": [file], "next_cursor": "next", "connected": True, "message": None}
+    assert disconnected.json()["items"] == []
+    assert disconnected.json()["next_cursor"] is None
+    assert disconnected.json()["connected"] is False
+    assert "credentials" in disconnected.json()["message"]
@@ -0,0 +1,236 @@
+"""
+TEST 18: Streaming Drive Uploads
+=================================
+
+What we're testing: The /drive/upload pipeline (size limit, Drive upload, n8n handoff)
+Why: The upload was read into memory twice (once discarded, once for n8n), the
+Drive upload read up to 100 MB per chunk, and n8n got a multipart body built in
+memory - a 50 MB scan cost well over 100 MB of RAM per request
+
+Key concept: STREAM FROM THE SPOOLED FILE
+- Starlette spools the upload to disk past 1 MB
+- Drive gets it in fixed-size resumable chunks, n8n in small reads of a
+  streamed multipart body - both from that file
+- Bodies over the limit are rejected before (or while) they are received
+
+The tests:
+- Oversized bodies get 413, with or without Content-Length
+- The streamed n8n body is a valid multipart/form-data request
+- Drive upload memory does not grow with file size (printed with -s)
+- n8n handoff memory does not grow with file size (printed with -s)
+"""
+
+import os
+import json
+import asyncio
+import tempfile
+import tracemalloc
+from contextlib import contextmanager
+from email.parser import BytesParser
+from email.policy import HTTP
+from unittest.mock import patch
+import httpx
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build_from_document
+from googleapiclient.http import HttpMockSequence
+from app.google_clients import google_clients
+from app.services.google_drive_service import GoogleDriveService
+from app.services.n8n_service import N8NService, _MultipartFileBody
+from app.utils.uploads import UploadSizeLimitMiddleware
+
+CHUNK_SIZE = 256 * 1024
+
+
+def spooled_file(size):
+    """A file on disk with `size` bytes, like Starlette's spooled upload past 1 MB."""
+    file = tempfile.TemporaryFile()
+    block = os.urandom(64 * 1024)
+    for _ in range(size // len(block)):
+        file.write(block)
+    file.seek(0)
+    return file
+
+
+def peak_memory(call):
+    """Peak Python memory allocated while `call` runs, in bytes."""
+    tracemalloc.start()
+    try:
+        call()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_oversized_uploads_are_rejected():
+    """
+    TEST 18.1: UploadSizeLimitMiddleware answers 413 for bodies over the limit
+
+    WHAT IT DOES:
+    1. POST 2 KB with Content-Length to an endpoint limited to 1 KB
+    2. POST 2 KB chunked (no Content-Length)
+    3. POST 500 bytes
+
+    EXPECTED RESULT:
+    - 413 for both oversized bodies; the endpoint never sees them
+    - The small upload goes through
+    """
+    app = FastAPI()
+    received = []
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        received.append(len(await file.read()))
+        return {"ok": True}
+
+    app.add_middleware(UploadSizeLimitMiddleware, max_size=1024, paths=["/upload"])
+    client = TestClient(app)
+
+    declared = client.post("/upload", files={"file": ("a.bin", b"x" * 2048)})
+
+    body = _MultipartFileBody({}, "file", "b.bin", spooled_file(0), "application/octet-stream")
+    chunked = client.post(
+        "/upload",
+        content=(chunk for chunk in [body.read(1000), b"x" * 2048]),
+        headers={"Content-Type": body.content_type},
+    )
+
+    small = client.post("/upload", files={"file": ("c.bin", b"x" * 500)})
+
+    assert declared.status_code == 413
+    assert chunked.status_code == 413
+    assert small.status_code == 200
+    assert received == [500]
+
+
+def test_streamed_multipart_body_is_valid():
+    """
+    TEST 18.2: _MultipartFileBody produces the same form data requests would
+
+    WHAT IT DOES:
+    1. Stream fields and a file (with a quote in its name) through _MultipartFileBody
+    2. Parse the result as multipart/form-data
+
+    EXPECTED RESULT:
+    - len() matches the bytes produced
+    - Fields, file name, content type and file bytes round-trip
+    """
+    file = tempfile.TemporaryFile()
+    file.write(b"%PDF-1.4 scan" * 1000)
+    body = _MultipartFileBody({"user_id": "7", "user_email": "a@b.c"}, "file", 'lab "results".pdf', file, "application/pdf")
+
+    raw = body.read()
+    message = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {body.content_type}\r\n\r\n".encode() + raw)
+    parts = {part.get_param("name", header="content-disposition"): part for part in message.iter_parts()}
+
+    assert len(body) == len(raw)
+    assert parts["user_id"].get_content() == "7"
+    assert parts["user_email"].get_content() == "a@b.c"
+    assert parts["file"].get_filename() == "lab %22results%22.pdf"
+    assert parts["file"].get_content_type() == "application/pdf"
+    assert parts["file"].get_payload(decode=True) == b"%PDF-1.4 scan" * 1000
+
+
+def drive_upload_responses(size):
+    """Resumable upload as Drive answers it: session URI, 308 per chunk, the file at the end."""
+    responses = [({"status": "200", "location": "https://upload.example/session"}, b"")]
+    for end in range(CHUNK_SIZE, size, CHUNK_SIZE):
+        responses.append(({"status": "308", "range": f"bytes=0-{end - 1}"}, b""))
+    responses.append(({"status": "200"}, json.dumps({
+        "id": "file-id", "name": "scan.pdf", "mimeType": "application/pdf", "size": str(size),
+        "createdTime": "2026-03-01T10:00:00.000Z", "modifiedTime": "2026-03-01T10:00:00.000Z",
+    }).encode()))
+    return responses
+
+
+def drive_upload(size):
+    """Prepare a `size`-byte upload through GoogleDriveService.upload_file against a mocked Drive.
+
+    Returns the upload as a callable, so the client and file are created outside the measurement.
+    """
+    file = spooled_file(size)
+    http = HttpMockSequence(drive_upload_responses(size))
+    service = build_from_document(google_clients.discovery_document("drive", "v3"), http=http)
+
+    @contextmanager
+    def drive(*args, **kwargs):
+        yield service
+
+    def upload():
+        with patch('app.services.google_drive_service.GoogleDriveService.get_credentials',
+                   return_value=Credentials(token="t")), \
+                patch('app.services.google_drive_service.GoogleDriveService._get_drive_folder_id',
+                      return_value="folder"), \
+                patch('app.services.google_drive_service.google_clients.service', drive), \
+                patch('app.services.google_drive_service.DriveFileDAO'), \
+                patch('app.services.google_drive_service.N8NService'), \
+                patch('app.services.google_drive_service.db'), \
+                patch('app.services.google_drive_service.settings.drive_upload_chunk_size', CHUNK_SIZE):
+            uploaded = GoogleDriveService.upload_file(1, file, "scan.pdf", "application/pdf")
+        assert uploaded["size"] == str(size)
+        assert not http._iterable, "not every chunk was sent"
+    return upload
+
+
+def test_drive_upload_memory_is_bounded():
+    """
+    TEST 18.3: Uploading a 4x larger file to Drive does not need more memory
+
+    WHAT IT DOES:
+    1. Upload 2 MB and 8 MB files (256 KB chunks) through upload_file,
+       against a mocked resumable upload session
+    2. Measure peak Python allocations of each
+
+    EXPECTED RESULT:
+    - Every chunk is sent
+    - Peak memory stays within a few chunks for both sizes
+    """
+    small = peak_memory(drive_upload(2 * 1024 * 1024))
+    large = peak_memory(drive_upload(8 * 1024 * 1024))
+
+    print(f"\nDrive upload peak: 2 MB file {small / 1024:.0f} KB, 8 MB file {large / 1024:.0f} KB")
+    assert large < 4 * CHUNK_SIZE
+    assert large < small * 1.5
+
+
+def send_to_n8n(size):
+    """Send `size` bytes through N8NService.send_file_summary, reading the body like a socket would."""
+    sent = []
+
+    class Transport(httpx.AsyncBaseTransport):
+        # Unlike httpx.MockTransport, consumes the body chunk by chunk instead of reading it whole
+        async def handle_async_request(self, request):
+            assert request.headers["Content-Type"].startswith("multipart/form-data")
+            received = 0
+            async for chunk in request.stream:
+                received += len(chunk)
+            sent.append(received)
+            return httpx.Response(200)
+
+    async def send():
+        async with httpx.AsyncClient(transport=Transport()) as client:
+            await N8NService.send_file_summary(client, "a@b.c", 1, "scan.pdf", spooled_file(size), "application/pdf")
+
+    asyncio.run(send())
+    assert sent[0] > size
+
+
+def test_n8n_handoff_memory_is_bounded():
+    """
+    TEST 18.4: Sending a 4x larger file to n8n does not need more memory
+
+    WHAT IT DOES:
+    1. Send 2 MB and 8 MB files through send_file_summary
+    2. Measure peak Python allocations of each
+
+    EXPECTED RESULT:
+    - The whole body is sent
+    - Peak memory stays well under the file size for both
+    """
+    small = peak_memory(lambda: send_to_n8n(2 * 1024 * 1024))
+    large = peak_memory(lambda: send_to_n8n(8 * 1024 * 1024))
+
+    print(f"\nn8n handoff peak: 2 MB file {small / 1024:.0f} KB, 8 MB file {large / 1024:.0f} KB")
+    assert large < 4 * _MultipartFileBody.CHUNK_SIZE
+    assert large < small * 1.5
@@ -0,0 +1,247 @@
+"""
+TEST 19: Streaming Drive Downloads
+===================================
+
+What we're testing: GET /drive/files/{file_id}/content and the Range header
+Why: download_file collected the whole file in a BytesIO (with blocking I/O in
+an async function), and no endpoint exposed it
+
+Key concept: RANGED CHUNKS
+- Drive metadata gives Content-Length and the ETag (md5Checksum) up front
+- The body is fetched from Drive in drive_download_chunk_size ranged requests
+  and passed to the client as each one arrives
+- A client Range (e.g. resuming a download, seeking in a PDF) only fetches those bytes
+
+The tests:
+- Range header parsing
+- A full download: 200, headers, one Drive request per chunk
+- Partial downloads: 206 / If-Range / 416
+- Files outside the folder and Google Docs are not served
+- Memory does not grow with file size (printed with -s)
+"""
+
+import os
+import tempfile
+import tracemalloc
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+import pytest
+from app.main import app
+from app.services.google_drive_service import GoogleDriveService
+from app.utils.dependencies import get_current_user, get_unit_of_work
+from app.utils.ranges import parse_range_header, RangeNotSatisfiable
+
+CONTENT = os.urandom(2500)
+
+
+class FakeDrive:
+    """Drive service stand-in: files().get() returns metadata, get_media() serves the requested range."""
+
+    def __init__(self, read, size):
+        self.read = read
+        self.ranges = []
+        self.metadata = {
+            "id": "file-id", "name": "Lab results.pdf", "mimeType": "application/pdf", "size": str(size),
+            "md5Checksum": "abc123", "modifiedTime": "2026-03-01T10:00:00.000Z", "parents": ["folder"],
+        }
+
+    def files(self):
+        return self
+
+    def get(self, fileId, fields):
+        return MagicMock(execute=MagicMock(return_value=dict(self.metadata)))
+
+    def get_media(self, fileId):
+        drive = self
+        request = MagicMock(headers={})
+
+        def execute():
+            start, end = map(int, request.headers["range"].removeprefix("bytes=").split("-"))
+            drive.ranges.append((start, end))
+            return drive.read(start, end)
+        request.execute = execute
+        return request
+
+
+@contextmanager
+def fake_drive(drive, chunk_size=1000):
+    @contextmanager
+    def service(*args, **kwargs):
+        yield drive
+
+    with patch('app.services.google_drive_service.GoogleDriveService.get_credentials'), \
+            patch('app.services.google_drive_service.GoogleDriveService._get_drive_folder_id', return_value="folder"), \
+            patch('app.services.google_drive_service.google_clients.service', service), \
+            patch('app.services.google_drive_service.settings.drive_download_chunk_size', chunk_size):
+        yield
+
+
+@pytest.fixture
+def authed_client(client):
+    app.dependency_overrides[get_current_user] = lambda: {"id": 1}
+    app.dependency_overrides[get_unit_of_work] = lambda: MagicMock()
+    yield client
+    app.dependency_overrides.clear()
+
+
+def content_drive(**metadata):
+    drive = FakeDrive(lambda start, end: CONTENT[start:end + 1], len(CONTENT))
+    drive.metadata.update(metadata)
+    return drive
+
+
+def test_parse_range_header():
+    """
+    TEST 19.1: parse_range_header handles the forms browsers and download tools send
+
+    EXPECTED RESULT:
+    - Explicit, open-ended and suffix ranges resolve to inclusive offsets, clamped to the file
+    - No header, other units, multiple or malformed ranges mean "send everything"
+    - Ranges starting past the end are not satisfiable
+    """
+    assert parse_range_header("bytes=0-99", 1000) == (0, 99)
+    assert parse_range_header("bytes=900-", 1000) == (900, 999)
+    assert parse_range_header("bytes=-100", 1000) == (900, 999)
+    assert parse_range_header("bytes=-5000", 1000) == (0, 999)
+    assert parse_range_header("bytes=500-5000", 1000) == (500, 999)
+
+    for ignored in (None, "", "items=0-1", "bytes=0-1,5-6", "bytes=abc", "bytes=5-1", "bytes=-"):
+        assert parse_range_header(ignored, 1000) is None
+
+    for unsatisfiable in ("bytes=1000-", "bytes=-0"):
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range_header(unsatisfiable, 1000)
+
+
+def test_full_download_streams_chunks(authed_client):
+    """
+    TEST 19.2: Without a Range the whole file is streamed, one Drive request per chunk
+
+    WHAT IT DOES:
+    1. Download a 2500-byte file with 1000-byte chunks
+
+    EXPECTED RESULT:
+    - 200 with the file's bytes
+    - Content-Length, ETag (from md5Checksum), Accept-Ranges and Content-Type from the metadata
+    - Drive asked for 0-999, 1000-1999, 2000-2499
+    """
+    drive = content_drive()
+    with fake_drive(drive):
+        response = authed_client.get("/drive/files/file-id/content")
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["content-length"] == "2500"
+    assert response.headers["etag"] == '"abc123"'
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-type"] == "application/pdf"
+    assert response.headers["content-disposition"] == "inline; filename*=utf-8''Lab%20results.pdf"
+    assert drive.ranges == [(0, 999), (1000, 1999), (2000, 2499)]
+
+
+def test_partial_downloads(authed_client):
+    """
+    TEST 19.3: Range requests fetch and return only the requested bytes
+
+    WHAT IT DOES:
+    1. Request bytes=1500-1799
+    2. Request the last 100 bytes with a matching If-Range
+    3. Request a range with an outdated If-Range
+    4. Request a range past the end
+
+    EXPECTED RESULT:
+    - 206 with Content-Range; Drive is only asked for those bytes
+    - 206 for the suffix range
+    - 200 with the whole file when If-Range does not match
+    - 416 with Content-Range: bytes */2500
+    """
+    drive = content_drive()
+    with fake_drive(drive):
+        partial = authed_client.get("/drive/files/file-id/content", headers={"Range": "bytes=1500-1799"})
+        ranges = list(drive.ranges)
+        suffix = authed_client.get("/drive/files/file-id/content",
+                                   headers={"Range": "bytes=-100", "If-Range": '"abc123"'})
+        changed = authed_client.get("/drive/files/file-id/content",
+                                    headers={"Range": "bytes=-100", "If-Range": '"old-version"'})
+        beyond = authed_client.get("/drive/files/file-id/content", headers={"Range": "bytes=2500-"})
+
+    assert partial.status_code == 206
+    assert partial.content == CONTENT[1500:1800]
+    assert partial.headers["content-range"] == "bytes 1500-1799/2500"
+    assert partial.headers["content-length"] == "300"
+    assert ranges == [(1500, 1799)]
+    assert suffix.status_code == 206
+    assert suffix.content == CONTENT[-100:]
+    assert changed.status_code == 200
+    assert changed.content == CONTENT
+    assert beyond.status_code == 416
+    assert beyond.headers["content-range"] == "bytes */2500"
+
+
+def test_only_folder_files_with_content_are_served(authed_client):
+    """
+    TEST 19.4: Files outside 'LifeLine Records' and Google Docs are not downloaded
+
+    EXPECTED RESULT:
+    - 404 for a file in another folder, without fetching content
+    - 400 for a Google Doc (no size, nothing to download)
+    """
+    elsewhere = content_drive(parents=["other-folder"])
+    with fake_drive(elsewhere):
+        not_found = authed_client.get("/drive/files/file-id/content")
+
+    doc = content_drive(mimeType="application/vnd.google-apps.document")
+    del doc.metadata["size"], doc.metadata["md5Checksum"]
+    with fake_drive(doc):
+        not_downloadable = authed_client.get("/drive/files/file-id/content")
+
+    assert not_found.status_code == 404
+    assert elsewhere.ranges == []
+    assert not_downloadable.status_code == 400
+
+
+def stream_file(size, chunk_size):
+    """Prepare streaming a `size`-byte file from disk through iter_file_content; returns it as a callable."""
+    file = tempfile.TemporaryFile()
+    block = os.urandom(64 * 1024)
+    for _ in range(size // len(block)):
+        file.write(block)
+
+    def read(start, end):
+        file.seek(start)
+        return file.read(end - start + 1)
+
+    drive = FakeDrive(read, size)
+
+    def stream():
+        with fake_drive(drive, chunk_size):
+            received = sum(len(chunk) for chunk in GoogleDriveService.iter_file_content(1, "file-id", 0, size - 1))
+        assert received == size
+    return stream
+
+
+def test_download_memory_is_bounded():
+    """
+    TEST 19.5: Streaming a 4x larger file does not need more memory
+
+    WHAT IT DOES:
+    1. Stream 2 MB and 8 MB files in 256 KB chunks through iter_file_content
+    2. Measure peak Python allocations of each
+
+    EXPECTED RESULT:
+    - Peak memory stays within a few chunks for both sizes
+    """
+    chunk_size = 256 * 1024
+    peaks = []
+    for size in (2 * 1024 * 1024, 8 * 1024 * 1024):
+        stream = stream_file(size, chunk_size)
+        tracemalloc.start()
+        try:
+            stream()
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+
+    print(f"\nDownload peak: 2 MB file {peaks[0] / 1024:.0f} KB, 8 MB file {peaks[1] / 1024:.0f} KB")
+    assert peaks[1] < 3 * chunk_size
+    assert peaks[1] < peaks[0] * 1.5
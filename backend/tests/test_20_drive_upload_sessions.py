@@ -0,0 +1,244 @@
+"""
+TEST 20: Direct-to-Drive Upload Sessions
+=========================================
+
+What we're testing: POST /drive/upload-sessions and /drive/upload-sessions/{id}/complete
+Why: Every document went browser -> API worker -> Drive, paying the bandwidth
+twice and holding a worker for the whole transfer
+
+Key concept: RESUMABLE SESSION URI
+- The API opens a Drive resumable upload session (metadata only) and hands its URI
+  to the browser
+- The browser PUTs the bytes straight to that URI, without our JWT
+- /complete asks Drive for the session status (`Content-Range: bytes */size`),
+  records the file and queues the n8n summary exactly once
+
+The tests:
+- Opening a session sends the folder, size and Origin to Drive
+- Completing before the bytes arrived is rejected
+- The full browser flow records the file and queues its summary once
+- Sizes over the upload limit are rejected
+"""
+
+import json
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock, patch
+import pytest
+import requests
+from google.oauth2.credentials import Credentials
+from app.config import settings
+from app.main import app
+from app.utils.dependencies import get_current_user, get_unit_of_work
+
+CONTENT = b"%PDF-1.4 lab results" * 500
+
+
+class FakeDriveUpload(BaseHTTPRequestHandler):
+    """Drive's resumable upload endpoint: POST opens a session, PUT uploads or queries its status."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        drive = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        session_id = len(drive.sessions) + 1
+        drive.sessions[session_id] = {
+            "metadata": body, "headers": dict(self.headers), "query": self.path.partition("?")[2], "content": None,
+        }
+        self.send_response(200)
+        self.send_header("Location", f"http://127.0.0.1:{drive.server_port}/session/{session_id}")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_PUT(self):
+        session = self.server.sessions[int(self.path.rsplit("/", 1)[1])]
+        length = int(self.headers.get("Content-Length", 0))
+        data = self.rfile.read(length) if length else b""
+        if not self.headers.get("Content-Range", "").startswith("bytes */"):
+            session["content"] = data
+        elif session["content"] is None:
+            self.send_response(308)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        file = {
+            "id": "file-id", "name": session["metadata"]["name"], "mimeType": session["metadata"]["mimeType"],
+            "size": str(len(session["content"])),
+            "createdTime": "2026-03-01T10:00:00.000Z", "modifiedTime": "2026-03-01T10:00:00.000Z",
+        }
+        payload = json.dumps(file).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class FakeSessionDAO:
+    """In-memory DriveUploadSessionDAO."""
+
+    def __init__(self):
+        self.rows = {}
+
+    def create_session(self, user_id, session_uri, file_name, mime_type, size):
+        row = {
+            "id": len(self.rows) + 1, "user_id": user_id, "session_uri": session_uri, "file_name": file_name,
+            "mime_type": mime_type, "size": size, "file_id": None,
+            "created_at": datetime(2026, 3, 1, 10, 0), "completed_at": None,
+        }
+        self.rows[row["id"]] = row
+        return dict(row)
+
+    def get_session(self, session_id, user_id):
+        row = self.rows.get(session_id)
+        return dict(row) if row and row["user_id"] == user_id else None
+
+    def complete_session(self, session_id, user_id, file_id, connection=None):
+        row = self.rows[session_id]
+        if row["completed_at"] is not None:
+            return None
+        row.update(file_id=file_id, completed_at=datetime(2026, 3, 1, 10, 5))
+        return dict(row)
+
+
+@pytest.fixture
+def fake_drive():
+    """FIXTURE: A local fake Drive upload endpoint, with the service pointed at it."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeDriveUpload)
+    server.sessions = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    sessions = FakeSessionDAO()
+    with patch.object(settings, "google_drive_upload_url", f"http://127.0.0.1:{server.server_port}/upload"), \
+            patch('app.services.google_drive_service.GoogleDriveService.get_credentials',
+                  return_value=Credentials(token="t")), \
+            patch('app.services.google_drive_service.GoogleDriveService._get_drive_folder_id',
+                  return_value="folder"), \
+            patch('app.services.google_drive_service.DriveUploadSessionDAO', sessions), \
+            patch('app.services.google_drive_service.db'), \
+            patch('app.services.google_drive_service.N8NService') as n8n, \
+            patch('app.services.google_drive_service.DriveFileDAO') as drive_files:
+        server.drive_files = drive_files
+        server.n8n = n8n
+        yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def authed_client(client):
+    app.dependency_overrides[get_current_user] = lambda: {"id": 1, "email": "user@test.local"}
+    app.dependency_overrides[get_unit_of_work] = lambda: MagicMock()
+    yield client
+    app.dependency_overrides.clear()
+
+
+def open_session(client, size=len(CONTENT)):
+    return client.post(
+        "/drive/upload-sessions",
+        json={"file_name": "Lab results.pdf", "mime_type": "application/pdf", "size": size},
+        headers={"Origin": "http://localhost:5173"},
+    )
+
+
+def test_open_upload_session(fake_drive, authed_client):
+    """
+    TEST 20.1: Opening a session creates a resumable upload in the user's folder
+
+    WHAT IT DOES:
+    1. POST /drive/upload-sessions for a PDF
+
+    EXPECTED RESULT:
+    - 201 with the session id and the Drive session URI as upload_url
+    - Drive was asked for a resumable upload into the 'LifeLine Records' folder,
+      with the declared type, size and the browser's Origin
+    """
+    response = open_session(authed_client)
+
+    assert response.status_code == 201
+    session = response.json()
+    assert session["id"] == 1
+    assert session["upload_url"] == f"http://127.0.0.1:{fake_drive.server_port}/session/1"
+    assert session["size"] == len(CONTENT)
+
+    opened = fake_drive.sessions[1]
+    assert "uploadType=resumable" in opened["query"]
+    assert opened["metadata"] == {"name": "Lab results.pdf", "mimeType": "application/pdf", "parents": ["folder"]}
+    assert opened["headers"]["X-Upload-Content-Length"] == str(len(CONTENT))
+    assert opened["headers"]["X-Upload-Content-Type"] == "application/pdf"
+    assert opened["headers"]["Origin"] == "http://localhost:5173"
+
+
+def test_complete_before_upload_is_rejected(fake_drive, authed_client):
+    """
+    TEST 20.2: /complete only succeeds once Drive has the whole file
+
+    WHAT IT DOES:
+    1. Open a session and complete it without uploading anything
+    2. Complete a session that does not exist
+
+    EXPECTED RESULT:
+    - 400 while Drive still answers 308 (incomplete); nothing is recorded
+    - 404 for the unknown session
+    """
+    open_session(authed_client)
+    early = authed_client.post("/drive/upload-sessions/1/complete")
+    unknown = authed_client.post("/drive/upload-sessions/99/complete")
+
+    assert early.status_code == 400
+    assert unknown.status_code == 404
+    fake_drive.n8n.enqueue_file_summary.assert_not_called()
+    fake_drive.drive_files.upsert_files.assert_not_called()
+
+
+def test_browser_upload_flow(fake_drive, authed_client):
+    """
+    TEST 20.3: Open, PUT from the browser, complete - and complete again
+
+    WHAT IT DOES:
+    1. Open a session
+    2. PUT the bytes straight to upload_url (no JWT, as the browser would)
+    3. Complete the session twice
+
+    EXPECTED RESULT:
+    - Drive got the bytes from the "browser", not from the API
+    - The file is recorded in drive_files and returned
+    - The summary is queued once; the second completion does not queue it again
+    """
+    session = open_session(authed_client).json()
+    uploaded = requests.put(session["upload_url"], data=CONTENT, timeout=5)
+
+    first = authed_client.post(f"/drive/upload-sessions/{session['id']}/complete")
+    second = authed_client.post(f"/drive/upload-sessions/{session['id']}/complete")
+
+    assert uploaded.status_code == 200
+    assert fake_drive.sessions[1]["content"] == CONTENT
+    assert first.status_code == 200
+    assert first.json()["file"]["id"] == "file-id"
+    assert first.json()["file"]["size"] == str(len(CONTENT))
+    assert second.status_code == 200
+    assert second.json()["file"]["id"] == "file-id"
+
+    rows = fake_drive.drive_files.upsert_files.call_args.args[1]
+    assert rows[0]["file_id"] == "file-id"
+    fake_drive.n8n.enqueue_file_summary.assert_called_once()
+    user_id, queued = fake_drive.n8n.enqueue_file_summary.call_args.args
+    assert (user_id, queued["id"], queued["name"]) == (1, "file-id", "Lab results.pdf")
+
+
+def test_oversized_session_is_rejected(fake_drive, authed_client):
+    """
+    TEST 20.4: The upload limit applies to upload sessions too
+
+    EXPECTED RESULT:
+    - 422 for a declared size over UPLOAD_MAX_SIZE_BYTES; no Drive session is opened
+    """
+    response = open_session(authed_client, size=settings.upload_max_size_bytes + 1)
+
+    assert response.status_code == 422
+    assert fake_drive.sessions == {}
@@ -0,0 +1,367 @@
+"""
+TEST 21: n8n Summary Outbox
+============================
+
+What we're testing: How uploaded files reach the n8n summary workflow
+Why: The upload handler called n8n with a blocking requests.post (10 s timeout)
+inside an async endpoint - the response waited on n8n, the event loop was
+blocked, and a failed call was logged and the summary lost
+
+Key concept: TRANSACTIONAL OUTBOX
+- The upload writes an n8n_outbox row; that's all the request waits for
+- A dispatcher in each worker claims due rows (SKIP LOCKED + lease) and delivers
+  them over one pooled httpx client, a bounded number at a time
+- Failures are retried with exponential backoff; after max_attempts the row is
+  dead-lettered instead of dropped
+
+The tests:
+- /drive/upload queues the summary instead of calling n8n
+- The upload records the file and queues its summary in one transaction, with a local copy
+- An n8n restart only delays the summary
+- Failures back off exponentially and end in the dead-letter state
+- No more than `concurrency` deliveries are in flight
+- Claiming, leases, retries and dead letters against PostgreSQL (requires PostgreSQL)
+- A queued file with a local copy is sent from it, not Drive, and the copy removed
+"""
+
+import io
+import os
+import time
+import asyncio
+from unittest.mock import MagicMock, patch
+import httpx
+import pytest
+from app.main import app
+from app.n8n_outbox import N8NOutboxDispatcher
+from app.dao.n8n_outbox_dao import N8NOutboxDAO
+from app.http_clients import RetryBudget, UpstreamClient
+from app.services.google_drive_service import GoogleDriveService
+from app.utils.dependencies import get_current_user, get_unit_of_work
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+class FakeOutbox:
+    """In-memory N8NOutboxDAO: every pending entry not currently claimed is due."""
+
+    def __init__(self, count, content_path=None):
+        self.entries = {
+            entry_id: {
+                "id": entry_id, "user_id": 1, "user_email": "user@test.local", "file_id": f"file-{entry_id}",
+                "file_name": f"Scan {entry_id}.pdf", "mime_type": "application/pdf", "size": 11,
+                "content_path": content_path, "status": "pending", "attempts": 0, "claimed": False,
+                "last_error": None,
+            }
+            for entry_id in range(1, count + 1)
+        }
+        self.retry_delays = []
+
+    def claim_due(self, limit, lease_seconds):
+        due = [e for e in self.entries.values() if e["status"] == "pending" and not e["claimed"]][:limit]
+        for entry in due:
+            entry["attempts"] += 1
+            entry["claimed"] = True
+        return [dict(entry) for entry in due]
+
+    def mark_sent(self, entry_id):
+        self.entries[entry_id].update(status="sent", claimed=False)
+
+    def schedule_retry(self, entry_id, error, delay_seconds):
+        self.entries[entry_id].update(last_error=error, claimed=False)
+        self.retry_delays.append(delay_seconds)
+
+    def mark_dead(self, entry_id, error):
+        self.entries[entry_id].update(status="dead", last_error=error, claimed=False)
+
+
+def dispatcher(**overrides):
+    options = dict(concurrency=4, max_attempts=5, backoff_seconds=10, max_backoff_seconds=60,
+                   poll_interval=0.01, lease_seconds=300)
+    options.update(overrides)
+    return N8NOutboxDispatcher(**options)
+
+
+def run_dispatcher(outbox, transport, until, drive=None, **overrides):
+    """Run a dispatcher against `outbox` and an n8n served by `transport` until `until()` holds."""
+    n8n = dispatcher(**overrides)
+    # Retries are left to the outbox (see test 24 for the client's own)
+    client = UpstreamClient("n8n", timeout=5, connect_timeout=5, max_connections=n8n.concurrency,
+                            keepalive_expiry=60, max_retries=0, retry_budget=RetryBudget(0.1, 10))
+
+    async def run():
+        await client.start(transport)
+        await n8n.start(client)
+        try:
+            for _ in range(500):
+                if until():
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await n8n.stop()
+            await client.stop()
+
+    drive = drive or MagicMock(side_effect=lambda user_id, file_id, size: io.BytesIO(b"%PDF-1.4 .."))
+    with patch('app.n8n_outbox.N8NOutboxDAO', outbox), \
+            patch('app.n8n_outbox.GoogleDriveService.spool_file_content', drive):
+        asyncio.run(run())
+    return n8n
+
+
+def test_upload_queues_the_summary(client):
+    """
+    TEST 21.1: /drive/upload answers without waiting on n8n
+
+    WHAT IT DOES:
+    1. Upload a file with Drive mocked and n8n unreachable
+
+    EXPECTED RESULT:
+    - 200 as soon as the file is in Drive (upload_file queues the summary, see 21.2)
+    - The dispatcher is woken
+    """
+    uploaded = {"id": "file-id", "name": "scan.pdf", "mimeType": "application/pdf", "size": "11"}
+    app.dependency_overrides[get_current_user] = lambda: {"id": 1, "email": "user@test.local"}
+    app.dependency_overrides[get_unit_of_work] = lambda: MagicMock()
+    try:
+        with patch('app.controllers.google_drive.GoogleDriveService.upload_file', return_value=uploaded) as upload, \
+                patch('app.controllers.google_drive.n8n_outbox') as outbox:
+            response = client.post("/drive/upload", files={"file": ("scan.pdf", b"%PDF-1.4 ..", "application/pdf")})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.json()["file"] == uploaded
+    assert upload.call_args.kwargs["user_id"] == 1
+    outbox.wake.assert_called_once()
+
+
+def test_upload_queues_in_the_same_transaction(tmp_path):
+    """
+    TEST 21.2: The file record and its summary are written in one transaction
+
+    WHAT IT DOES:
+    1. Upload a file through GoogleDriveService.upload_file with Drive and the DAOs mocked
+
+    EXPECTED RESULT:
+    - drive_files and n8n_outbox are written on the same connection, the outbox last
+    - The outbox entry points at a local copy of the uploaded bytes in the spool directory
+    """
+    uploaded = {"id": "file-id", "name": "scan.pdf", "mimeType": "application/pdf", "size": "11",
+                "createdTime": "2026-03-01T10:00:00.000Z", "modifiedTime": "2026-03-01T10:00:00.000Z"}
+    drive = MagicMock()
+    drive.__enter__.return_value.files().create().execute.return_value = uploaded
+    calls = MagicMock()
+    connection = calls.db.get_connection.return_value.__enter__.return_value
+    with patch('app.services.google_drive_service.GoogleDriveService.get_credentials', return_value=MagicMock()), \
+            patch('app.services.google_drive_service.GoogleDriveService._get_drive_folder_id', return_value="folder"), \
+            patch('app.services.google_drive_service.google_clients.service', return_value=drive), \
+            patch('app.services.google_drive_service.db', calls.db), \
+            patch('app.services.google_drive_service.DriveFileDAO', calls.drive_files), \
+            patch('app.services.n8n_service.N8NOutboxDAO', calls.outbox), \
+            patch('app.services.n8n_service.settings.n8n_outbox_spool_dir', str(tmp_path)):
+        GoogleDriveService.upload_file(1, io.BytesIO(b"%PDF-1.4 .."), "scan.pdf", "application/pdf")
+
+    writes = [name for name, args, kwargs in calls.mock_calls if name in
+              ("drive_files.upsert_files", "outbox.enqueue_file_summary")]
+    assert writes == ["drive_files.upsert_files", "outbox.enqueue_file_summary"]
+    assert calls.drive_files.upsert_files.call_args.kwargs["connection"] is connection
+    enqueue = calls.outbox.enqueue_file_summary.call_args
+    assert enqueue.kwargs["connection"] is connection
+    with open(enqueue.kwargs["content_path"], "rb") as copy:
+        assert copy.read() == b"%PDF-1.4 .."
+    assert os.path.dirname(enqueue.kwargs["content_path"]) == str(tmp_path)
+
+
+def test_n8n_restart_delays_the_summary():
+    """
+    TEST 21.3: Deliveries that fail while n8n restarts are retried until it is back
+
+    WHAT IT DOES:
+    1. n8n refuses connections twice, then accepts
+    2. Run the dispatcher on one queued summary (retries due immediately)
+
+    EXPECTED RESULT:
+    - The summary is delivered on the third attempt, as multipart with the file
+    - Two retries were scheduled; nothing was dead-lettered
+    """
+    outbox = FakeOutbox(1)
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if len(requests) <= 2:
+            raise httpx.ConnectError("Connection refused")
+        return httpx.Response(200)
+
+    n8n = run_dispatcher(outbox, httpx.MockTransport(handler), lambda: outbox.entries[1]["status"] != "pending")
+
+    assert outbox.entries[1]["status"] == "sent"
+    assert outbox.entries[1]["attempts"] == 3
+    assert n8n.stats() == {"sent": 1, "retried": 2, "dead": 0, "in_flight": 0}
+    body = requests[-1].content
+    assert requests[-1].headers["Authorization"].startswith("Bearer ")
+    assert b'filename="Scan 1.pdf"' in body and b"%PDF-1.4 .." in body
+
+
+def test_failures_back_off_and_dead_letter():
+    """
+    TEST 21.4: A summary n8n keeps rejecting backs off exponentially, then is dead-lettered
+
+    WHAT IT DOES:
+    1. n8n answers 503 to everything
+    2. Run the dispatcher with max_attempts=5, backoff 10 s doubling, capped at 60 s
+
+    EXPECTED RESULT:
+    - Retries scheduled after ~10, ~20, ~40 and ~60 (capped) seconds, jittered down by at most half
+    - After the 5th attempt the entry is dead, with the last error kept
+    """
+    outbox = FakeOutbox(1)
+    n8n = run_dispatcher(outbox, httpx.MockTransport(lambda request: httpx.Response(503)),
+                         lambda: outbox.entries[1]["status"] != "pending")
+
+    assert outbox.entries[1]["status"] == "dead"
+    assert outbox.entries[1]["attempts"] == 5
+    assert "503" in outbox.entries[1]["last_error"]
+    for delay, cap in zip(outbox.retry_delays, (10, 20, 40, 60)):
+        assert cap / 2 <= delay <= cap
+    assert len(outbox.retry_delays) == 4
+    assert n8n.stats()["dead"] == 1
+
+
+def test_deliveries_are_bounded():
+    """
+    TEST 21.5: At most `concurrency` summaries are sent at once
+
+    WHAT IT DOES:
+    1. Queue 10 summaries; n8n takes 50 ms per request
+    2. Run the dispatcher with concurrency=3
+
+    EXPECTED RESULT:
+    - All 10 are delivered
+    - Never more than 3 requests in flight, and the slots are used (3 at once)
+    """
+    outbox = FakeOutbox(10)
+    in_flight = peak = 0
+
+    class SlowN8N(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.05)
+            in_flight -= 1
+            return httpx.Response(200)
+
+    run_dispatcher(outbox, SlowN8N(), lambda: all(entry["status"] == "sent" for entry in outbox.entries.values()),
+                   concurrency=3)
+
+    assert all(entry["status"] == "sent" for entry in outbox.entries.values())
+    assert peak == 3
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+def test_outbox_claims_against_postgres():
+    """
+    TEST 21.6: Claiming, leasing, retrying and dead-lettering in PostgreSQL
+
+    WHAT IT DOES:
+    1. Queue three summaries for a throwaway user
+    2. Claim two in each of two concurrent transactions
+    3. Claim again after both commit (everything is leased)
+    4. Retry one immediately, dead-letter one, mark one sent; claim again
+
+    EXPECTED RESULT:
+    - The concurrent claims get disjoint entries (SKIP LOCKED), with the user's email
+    - Leased entries are not claimed again
+    - Only the retried entry comes back, on its second attempt
+    """
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+
+    first = psycopg2.connect(TEST_DATABASE_URL, cursor_factory=RealDictCursor)
+    second = psycopg2.connect(TEST_DATABASE_URL, cursor_factory=RealDictCursor)
+    email = f"outbox-{time.time_ns()}@test.local"
+    with first.cursor() as cursor:
+        cursor.execute("INSERT INTO users (email, name) VALUES (%s, %s) RETURNING id", (email, "Outbox Test"))
+        user_id = cursor.fetchone()["id"]
+    first.commit()
+
+    try:
+        queued = [
+            N8NOutboxDAO.enqueue_file_summary(user_id, f"file-{n}", f"Scan {n}.pdf", "application/pdf", 1024,
+                                              connection=first)["id"]
+            for n in range(3)
+        ]
+        with first.cursor() as cursor:
+            # Due before anything else in the table, so these are claimed first
+            cursor.execute("UPDATE n8n_outbox SET next_attempt_at = '2000-01-01' WHERE user_id = %s", (user_id,))
+        first.commit()
+
+        def ours(entries):
+            return [entry for entry in entries if entry["id"] in queued]
+
+        claimed_first = N8NOutboxDAO.claim_due(2, 300, connection=first)
+        claimed_second = N8NOutboxDAO.claim_due(2, 300, connection=second)
+        first.commit()
+        second.commit()
+        leased = ours(N8NOutboxDAO.claim_due(10, 300, connection=first))
+
+        retried, dead, sent = queued
+        N8NOutboxDAO.schedule_retry(retried, "ConnectError: refused", 0, connection=first)
+        N8NOutboxDAO.mark_dead(dead, "HTTPStatusError: 400", connection=first)
+        N8NOutboxDAO.mark_sent(sent, connection=first)
+        first.commit()
+        again = ours(N8NOutboxDAO.claim_due(10, 300, connection=first))
+        first.commit()
+
+        assert [entry["id"] for entry in claimed_first] == queued[:2]
+        assert [entry["id"] for entry in claimed_second[:1]] == queued[2:]
+        assert claimed_first[0]["user_email"] == email
+        assert claimed_first[0]["content_path"] is None
+        assert leased == []
+        assert [(entry["id"], entry["attempts"]) for entry in again] == [(retried, 2)]
+        with first.cursor() as cursor:
+            cursor.execute("SELECT id, status, last_error FROM n8n_outbox WHERE user_id = %s ORDER BY id", (user_id,))
+            rows = {row["id"]: row for row in cursor.fetchall()}
+        assert rows[dead]["status"] == "dead" and rows[dead]["last_error"] == "HTTPStatusError: 400"
+        assert rows[sent]["status"] == "sent"
+    finally:
+        first.rollback()
+        second.rollback()
+        with first.cursor() as cursor:
+            cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
+        first.commit()
+        first.close()
+        second.close()
+
+
+def test_local_copy_is_sent_and_removed(tmp_path):
+    """
+    TEST 21.7: A file uploaded through the API is sent from its local copy
+
+    WHAT IT DOES:
+    1. Queue a summary whose entry has a local copy, and one whose copy is gone
+    2. Run the dispatcher
+
+    EXPECTED RESULT:
+    - The first is sent from the local copy; Drive is only asked for the second
+    - Both are delivered and the local copy is deleted
+    """
+    copy = tmp_path / "summary-1"
+    copy.write_bytes(b"%PDF-1.4 local")
+    outbox = FakeOutbox(2, content_path=str(copy))
+    outbox.entries[2]["content_path"] = str(tmp_path / "summary-2")
+    bodies = []
+
+    def handler(request):
+        bodies.append(request.content)
+        return httpx.Response(200)
+
+    drive = MagicMock(side_effect=lambda user_id, file_id, size: io.BytesIO(b"%PDF-1.4 drive"))
+    run_dispatcher(outbox, httpx.MockTransport(handler),
+                   lambda: all(entry["status"] == "sent" for entry in outbox.entries.values()), drive=drive)
+
+    assert all(entry["status"] == "sent" for entry in outbox.entries.values())
+    drive.assert_called_once_with(1, "file-2", 11)
+    assert any(b"%PDF-1.4 local" in body for body in bodies)
+    assert any(b"%PDF-1.4 drive" in body for body in bodies)
+    assert not copy.exists()
@@ -0,0 +1,392 @@
+"""
+TEST 22: Background AI Suggestions for Illness Logs
+====================================================
+
+What we're testing: How an illness log gets its AI home-remedy suggestion
+Why: POST /illness-logs awaited the HuggingFace call before inserting the row,
+so creating a log took as long as the model (up to its 30 s timeout)
+
+Key concept: DEFERRED FILL-IN
+- The log is inserted with suggestion_status 'pending' and returned right away
+- A suggestion worker claims pending logs (SKIP LOCKED + lease) and fills in
+  ai_suggestion; failures back off, and after max_attempts the status is 'failed'
+- Clients poll the log or wait on GET /illness-logs/{id}/suggestion/events,
+  which is woken by the worker as soon as the suggestion is stored
+
+The tests:
+- Creating a log returns it pending without calling the model
+- The worker fills suggestions, retries with backoff, then gives up
+- The events stream ends as soon as the worker stores the suggestion
+- The events stream gives up after its timeout
+- The events endpoint only serves the caller's own logs
+- Claiming, leases and the status transitions against PostgreSQL (requires PostgreSQL)
+"""
+
+import os
+import time
+import asyncio
+import json
+from datetime import date, datetime
+from unittest.mock import MagicMock, patch
+import pytest
+from app.main import app
+from app.config import settings
+from app.dao.illness_log_dao import IllnessLogDAO
+from app.services.illness_log_service import IllnessLogService
+from app.suggestion_worker import SuggestionWorker
+from app.utils.dependencies import get_current_user, get_unit_of_work
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+class FakeIllnessLogs:
+    """In-memory IllnessLogDAO for the suggestion worker: every pending log not currently claimed is due."""
+
+    def __init__(self, names):
+        self.logs = {
+            log_id: {
+                "id": log_id, "user_id": 1, "family_member_id": 1, "family_member_name": "Alice",
+                "illness_name": name, "start_date": date(2026, 3, 1), "end_date": None, "notes": None,
+                "ai_suggestion": None, "suggestion_status": "pending", "suggestion_source": None,
+                "suggestion_attempts": 0,
+                "claimed": False, "created_at": datetime(2026, 3, 1), "updated_at": datetime(2026, 3, 1),
+            }
+            for log_id, name in enumerate(names, start=1)
+        }
+        self.retry_delays = []
+
+    def claim_pending_suggestions(self, limit, lease_seconds):
+        due = [log for log in self.logs.values() if log["suggestion_status"] == "pending" and not log["claimed"]]
+        for log in due[:limit]:
+            log["suggestion_attempts"] += 1
+            log["claimed"] = True
+        return [dict(log) for log in due[:limit]]
+
+    def fill_suggestion(self, illness_log_id, ai_suggestion, suggestion_source):
+        self.logs[illness_log_id].update(ai_suggestion=ai_suggestion, suggestion_source=suggestion_source,
+                                         suggestion_status="ready", claimed=False)
+        return True
+
+    def schedule_suggestion_retry(self, illness_log_id, delay_seconds):
+        self.logs[illness_log_id]["claimed"] = False
+        self.retry_delays.append(delay_seconds)
+
+    def fail_suggestion(self, illness_log_id):
+        self.logs[illness_log_id].update(suggestion_status="failed", claimed=False)
+
+    def get_illness_log_by_id(self, illness_log_id, user_id):
+        log = self.logs.get(illness_log_id)
+        return dict(log) if log and log["user_id"] == user_id else None
+
+
+def worker(**overrides):
+    options = dict(concurrency=4, max_attempts=3, backoff_seconds=30, max_backoff_seconds=600,
+                   poll_interval=0.01, lease_seconds=120)
+    options.update(overrides)
+    return SuggestionWorker(**options)
+
+
+def empty_cache():
+    """A suggestion cache that never hits (see test 23 for the cache itself)."""
+    return MagicMock(get=MagicMock(return_value=None))
+
+
+async def home_remedies(illness_name, notes=None, **alternate):
+    """The model answers for a cold and fails for everything else."""
+    return "1. Rest\n2. Drink fluids" if illness_name == "Cold" else None
+
+
+def test_create_returns_pending_log(client):
+    """
+    TEST 22.1: Creating an illness log does not wait for the model
+
+    WHAT IT DOES:
+    1. POST /illness-logs with the AI suggestion feature on
+
+    EXPECTED RESULT:
+    - 201 with suggestion_status 'pending' and no suggestion yet
+    - The model was not called; the log was committed and the worker woken
+    """
+    created = {
+        "id": 7, "family_member_id": 1, "illness_name": "Cold", "start_date": date(2026, 3, 1),
+        "end_date": None, "notes": None, "ai_suggestion": None, "suggestion_status": "pending",
+        "created_at": datetime(2026, 3, 1), "updated_at": datetime(2026, 3, 1),
+    }
+    uow = MagicMock()
+    app.dependency_overrides[get_current_user] = lambda: {"id": 1, "email": "user@test.local"}
+    app.dependency_overrides[get_unit_of_work] = lambda: uow
+    try:
+        with patch.object(settings, "feature_ai_illness_suggestions_enabled", True), \
+                patch('app.services.illness_log_service.FamilyMemberDAO') as family_members, \
+                patch('app.services.illness_log_service.IllnessLogDAO') as illness_logs, \
+                patch('app.suggestion_engine.AISuggestionService.get_home_remedies') as model, \
+                patch('app.controllers.illness_logs.suggestion_worker') as suggestions:
+            family_members.get_family_member_by_id.return_value = {"id": 1, "name": "Alice"}
+            illness_logs.create_illness_log.return_value = created
+            response = client.post("/illness-logs", json={
+                "family_member_id": 1, "illness_name": "Cold", "start_date": "2026-03-01",
+            })
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 201
+    assert response.json()["suggestion_status"] == "pending"
+    assert response.json()["ai_suggestion"] is None
+    assert illness_logs.create_illness_log.call_args.kwargs["suggestion_status"] == "pending"
+    model.assert_not_called()
+    uow.release.assert_called_once()
+    suggestions.wake.assert_called_once()
+
+
+def test_worker_fills_retries_and_gives_up():
+    """
+    TEST 22.2: The worker fills what the model answers and retries the rest with backoff
+
+    WHAT IT DOES:
+    1. Queue a 'Cold' (the model answers) and a 'Rare thing' (the model fails)
+    2. Run the worker with max_attempts=3, backoff 30 s doubling (retries due immediately)
+       and the fallback table disabled (see test 25 for the fallback)
+
+    EXPECTED RESULT:
+    - The cold's suggestion is stored after one attempt, as from the model
+    - The other log is retried after ~30 s and ~60 s, jittered down by at most half,
+      and marked 'failed' after the 3rd attempt
+    """
+    logs = FakeIllnessLogs(["Cold", "Rare thing"])
+    suggestions = worker()
+
+    async def run():
+        await suggestions.start()
+        try:
+            for _ in range(500):
+                if all(log["suggestion_status"] != "pending" for log in logs.logs.values()):
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await suggestions.stop()
+
+    with patch('app.suggestion_worker.IllnessLogDAO', logs), \
+            patch('app.suggestion_engine.AISuggestionService.get_home_remedies', side_effect=home_remedies), \
+            patch('app.suggestion_engine.suggestion_cache', empty_cache()), \
+            patch('app.suggestion_worker.suggestion_engine.fallback_enabled', False):
+        asyncio.run(run())
+
+    cold, rare = logs.logs[1], logs.logs[2]
+    assert (cold["suggestion_status"], cold["suggestion_attempts"]) == ("ready", 1)
+    assert cold["suggestion_source"] == "model"
+    assert cold["ai_suggestion"] == "1. Rest\n2. Drink fluids"
+    assert (rare["suggestion_status"], rare["suggestion_attempts"]) == ("failed", 3)
+    assert len(logs.retry_delays) == 2
+    for delay, cap in zip(logs.retry_delays, (30, 60)):
+        assert cap / 2 <= delay <= cap
+    assert suggestions.stats() == {"generated": 1, "streamed": 0, "retried": 2, "failed": 1, "in_flight": 0}
+
+
+def collect_events(logs, suggestions, log_id, during=None):
+    """Read the events stream for `log_id` to the end, running `during()` alongside it."""
+
+    async def run():
+        events = []
+        started = time.monotonic()
+        stream = IllnessLogService.suggestion_events(1, logs.get_illness_log_by_id(log_id, 1))
+        side = asyncio.create_task(during()) if during else None
+        async for event in stream:
+            events.append(event)
+        if side:
+            await side
+        return events, time.monotonic() - started
+
+    with patch('app.services.illness_log_service.IllnessLogDAO', logs), \
+            patch('app.services.illness_log_service.suggestion_worker', suggestions):
+        return asyncio.run(run())
+
+
+def test_events_end_when_the_suggestion_is_stored():
+    """
+    TEST 22.3: The events stream is woken by the worker, not by polling
+
+    WHAT IT DOES:
+    1. Open the events stream for a pending log (re-read fallback every 30 s)
+    2. Let the worker generate the suggestion 50 ms later
+
+    EXPECTED RESULT:
+    - A keep-alive comment, then one `suggestion` event with the stored text and its source
+    - The stream ends right after the worker stores it, long before the fallback re-read
+    """
+    logs = FakeIllnessLogs(["Cold"])
+    suggestions = worker()
+
+    async def generate():
+        await asyncio.sleep(0.05)
+        await suggestions.process(logs.claim_pending_suggestions(1, 120)[0])
+
+    with patch.object(settings, "ai_suggestion_events_poll_seconds", 30), \
+            patch('app.suggestion_worker.IllnessLogDAO', logs), \
+            patch('app.suggestion_engine.AISuggestionService.get_home_remedies', side_effect=home_remedies), \
+            patch('app.suggestion_engine.suggestion_cache', empty_cache()):
+        events, elapsed = collect_events(logs, suggestions, 1, during=generate)
+
+    assert events[0] == ": waiting\n\n"
+    assert events[-1].startswith("event: suggestion\ndata: ")
+    data = json.loads(events[-1].split("data: ", 1)[1])
+    assert data == {"id": 1, "suggestion_status": "ready", "suggestion_source": "model",
+                    "ai_suggestion": "1. Rest\n2. Drink fluids"}
+    assert elapsed < 5
+
+
+def test_events_give_up_after_the_timeout():
+    """
+    TEST 22.4: A suggestion that never arrives does not hold the stream open
+
+    WHAT IT DOES:
+    1. Open the events stream for a pending log nobody generates, with a 200 ms timeout
+
+    EXPECTED RESULT:
+    - The stream ends after about the timeout with a `suggestion` event still 'pending'
+    """
+    logs = FakeIllnessLogs(["Cold"])
+
+    with patch.object(settings, "ai_suggestion_events_timeout_seconds", 0.2), \
+            patch.object(settings, "ai_suggestion_events_poll_seconds", 0.05):
+        events, elapsed = collect_events(logs, worker(), 1)
+
+    data = json.loads(events[-1].split("data: ", 1)[1])
+    assert data["suggestion_status"] == "pending"
+    assert 0.2 <= elapsed < 2
+
+
+def test_events_endpoint_checks_ownership(client):
+    """
+    TEST 22.5: GET /illness-logs/{id}/suggestion/events only streams the caller's logs
+
+    WHAT IT DOES:
+    1. Ask for the events of a log that belongs to user 1, as user 1 and as user 2
+
+    EXPECTED RESULT:
+    - User 1 gets text/event-stream with the (already ready) suggestion
+    - User 2 gets 404, like for a log that does not exist
+    """
+    logs = FakeIllnessLogs(["Cold"])
+    logs.logs[1].update(suggestion_status="ready", ai_suggestion="Rest")
+    app.dependency_overrides[get_unit_of_work] = lambda: MagicMock()
+    try:
+        with patch('app.services.illness_log_service.IllnessLogDAO.get_illness_log_by_id',
+                   side_effect=lambda log_id, user_id, connection=None: logs.get_illness_log_by_id(log_id, user_id)):
+            app.dependency_overrides[get_current_user] = lambda: {"id": 1, "email": "owner@test.local"}
+            owner = client.get("/illness-logs/1/suggestion/events")
+            app.dependency_overrides[get_current_user] = lambda: {"id": 2, "email": "other@test.local"}
+            other = client.get("/illness-logs/1/suggestion/events")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert owner.status_code == 200
+    assert owner.headers["content-type"].startswith("text/event-stream")
+    assert '"ai_suggestion": "Rest"' in owner.text
+    assert other.status_code == 404
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+def test_suggestion_claims_against_postgres():
+    """
+    TEST 22.6: Claiming, leasing, retrying and the status transitions in PostgreSQL
+
+    WHAT IT DOES:
+    1. Create three pending logs (and one without a suggestion) for a throwaway user
+    2. Claim two in each of two concurrent transactions, then claim again
+    3. Retry one immediately and one after an hour, fill one; claim again
+    4. Edit the retried log's suggestion by hand, then try to fill and fail it
+
+    EXPECTED RESULT:
+    - The concurrent claims get disjoint logs (SKIP LOCKED); leased logs are not claimed again
+    - Only the log retried immediately comes back, on its second attempt; the
+      other is due an hour out
+    - The filled log is 'ready'; the hand-edited suggestion is not overwritten
+    """
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+
+    first = psycopg2.connect(TEST_DATABASE_URL, cursor_factory=RealDictCursor)
+    second = psycopg2.connect(TEST_DATABASE_URL, cursor_factory=RealDictCursor)
+    with first.cursor() as cursor:
+        cursor.execute("INSERT INTO users (email, name) VALUES (%s, %s) RETURNING id",
+                       (f"suggestions-{time.time_ns()}@test.local", "Suggestion Test"))
+        user_id = cursor.fetchone()["id"]
+        cursor.execute("INSERT INTO family_members (user_id, name) VALUES (%s, 'Alice') RETURNING id", (user_id,))
+        family_member_id = cursor.fetchone()["id"]
+    first.commit()
+
+    try:
+        pending = [
+            IllnessLogDAO.create_illness_log(user_id, family_member_id, name, date(2026, 3, 1),
+                                             suggestion_status="pending", connection=first)
+            for name in ("Cold", "Flu", "Fever")
+        ]
+        plain = IllnessLogDAO.create_illness_log(user_id, family_member_id, "Sprain", date(2026, 3, 1),
+                                                 connection=first)
+        queued = [log["id"] for log in pending]
+        with first.cursor() as cursor:
+            # Due before anything else in the table, so these are claimed first
+            cursor.execute("""
+                UPDATE illness_logs SET suggestion_next_attempt_at = '2000-01-01'
+                WHERE user_id = %s AND suggestion_status = 'pending'
+            """, (user_id,))
+        first.commit()
+
+        def ours(logs):
+            return [log for log in logs if log["id"] in queued]
+
+        claimed_first = IllnessLogDAO.claim_pending_suggestions(2, 120, connection=first)
+        claimed_second = IllnessLogDAO.claim_pending_suggestions(2, 120, connection=second)
+        first.commit()
+        second.commit()
+        leased = ours(IllnessLogDAO.claim_pending_suggestions(10, 120, connection=first))
+
+        retried, later, filled = queued
+        IllnessLogDAO.schedule_suggestion_retry(retried, 0, connection=first)
+        IllnessLogDAO.schedule_suggestion_retry(later, 3600, connection=first)
+        stored = IllnessLogDAO.fill_suggestion(filled, "Rest and fluids", "cache", connection=first)
+        first.commit()
+        again = ours(IllnessLogDAO.claim_pending_suggestions(10, 120, connection=first))
+        with first.cursor() as cursor:
+            cursor.execute("""
+                SELECT suggestion_next_attempt_at > NOW() + INTERVAL '59 minutes' AS backed_off
+                FROM illness_logs WHERE id = %s
+            """, (later,))
+            backed_off = cursor.fetchone()["backed_off"]
+        first.commit()
+
+        IllnessLogDAO.update_illness_log(retried, user_id, ai_suggestion="Ask the doctor", connection=first)
+        overwritten = IllnessLogDAO.fill_suggestion(retried, "Model text", "model", connection=first)
+        IllnessLogDAO.fail_suggestion(retried, connection=first)
+        IllnessLogDAO.fail_suggestion(later, connection=first)
+        first.commit()
+
+        assert [log["suggestion_status"] for log in pending] == ["pending"] * 3
+        assert plain["suggestion_status"] == "none"
+        assert [log["id"] for log in claimed_first] == queued[:2]
+        assert [log["id"] for log in claimed_second[:1]] == queued[2:]
+        assert claimed_first[0]["illness_name"] == "Cold"
+        assert leased == []
+        assert [(log["id"], log["suggestion_attempts"]) for log in again] == [(retried, 2)]
+        assert backed_off is True
+        assert stored is True and overwritten is False
+        with first.cursor() as cursor:
+            cursor.execute("""
+                SELECT id, suggestion_status, suggestion_source, ai_suggestion, suggestion_next_attempt_at
+                FROM illness_logs WHERE user_id = %s
+            """, (user_id,))
+            rows = {row["id"]: row for row in cursor.fetchall()}
+        assert (rows[filled]["suggestion_status"], rows[filled]["ai_suggestion"]) == ("ready", "Rest and fluids")
+        assert rows[filled]["suggestion_source"] == "cache"
+        assert (rows[retried]["suggestion_status"], rows[retried]["ai_suggestion"]) == ("ready", "Ask the doctor")
+        assert rows[retried]["suggestion_source"] == "user"
+        assert rows[later]["suggestion_status"] == "failed"
+        assert rows[later]["suggestion_next_attempt_at"] is None
+    finally:
+        first.rollback()
+        second.rollback()
+        with first.cursor() as cursor:
+            cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
+        first.commit()
+        first.close()
+        second.close()
@@ -0,0 +1,279 @@
+"""
+TEST 23: AI Suggestion Cache
+============================
+
+What we're testing: Suggestions are reused for illnesses families log over and over
+Why: Every illness log cost a HuggingFace request, even though "cold", "flu" and
+"fever" with the same (or no) notes get the same suggestion - each one paid the
+model's latency and used up the HF rate limit
+
+Key concept: TWO-TIER CACHE
+- The key is the normalized illness name, a digest of the normalized notes, the
+  model and the prompt version - changing the model or prompt misses
+- An in-process LRU answers first; on a miss the shared ai_suggestion_cache
+  table does, so one worker's suggestion serves every worker
+- Entries expire after the TTL in both tiers; hits, table hits and misses are counted
+
+The tests:
+- Equivalent names and notes share a key; other notes, models and prompts don't
+- A cached suggestion skips the model call in the worker
+- A suggestion stored by one worker is served to another from the table
+- Expired entries miss in both tiers
+- A failing table degrades to the in-process cache
+- Reading, replacing and expiring entries against PostgreSQL (requires PostgreSQL)
+- Writes delete expired rows, a bounded batch at a time (requires PostgreSQL)
+"""
+
+import os
+import time
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+import pytest
+from app.dao.ai_suggestion_cache_dao import AISuggestionCacheDAO
+from app.services.ai_suggestion_service import AISuggestionService
+from app.suggestion_cache import SuggestionCache
+from tests.test_22_illness_suggestions import FakeIllnessLogs, worker
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+class FakeSuggestionTable:
+    """In-memory AISuggestionCacheDAO."""
+
+    def __init__(self):
+        self.rows = {}
+        self.reads = 0
+
+    def get_suggestion(self, illness_name, notes_digest, model, prompt_version):
+        self.reads += 1
+        row = self.rows.get((illness_name, notes_digest, model, prompt_version))
+        if row is None or row[1] <= time.monotonic():
+            return None
+        return {"suggestion": row[0], "ttl_seconds": row[1] - time.monotonic()}
+
+    def put_suggestion(self, illness_name, notes_digest, model, prompt_version, suggestion, ttl_seconds):
+        self.rows[(illness_name, notes_digest, model, prompt_version)] = (suggestion, time.monotonic() + ttl_seconds)
+
+
+def test_equivalent_requests_share_a_key():
+    """
+    TEST 23.1: The key ignores case, spacing and trailing punctuation, but not content
+
+    EXPECTED RESULT:
+    - "Cold" and "  cold. " share a key; so do notes differing only in case and spacing
+    - No notes and empty notes share a key
+    - Other notes, another model and another prompt version get other keys
+    """
+    key = SuggestionCache.key("Cold", "Runny nose,  mild fever", "model", 1)
+
+    assert SuggestionCache.key("  cold. ", "runny NOSE, mild fever", "model", 1) == key
+    assert SuggestionCache.key("Cold", None, "model", 1) == SuggestionCache.key("cold", "  ", "model", 1)
+    assert SuggestionCache.key("Cold", "High fever", "model", 1) != key
+    assert SuggestionCache.key("Cold", "Runny nose, mild fever", "other-model", 1) != key
+    assert SuggestionCache.key("Cold", "Runny nose, mild fever", "model", 2) != key
+    assert key.illness_name == "cold"
+    assert len(key.notes_digest) == 64
+
+
+def test_cache_hit_skips_the_model():
+    """
+    TEST 23.2: The worker only asks the model for suggestions it has not seen
+
+    WHAT IT DOES:
+    1. Queue "Cold", "cold " and "Flu" (one at a time)
+    2. Run the suggestion worker with an empty cache
+
+    EXPECTED RESULT:
+    - The model is called for "Cold" and "Flu" only
+    - All three logs get a suggestion; the second cold is an in-process hit, recorded as from the cache
+    """
+    logs = FakeIllnessLogs(["Cold", "cold ", "Flu"])
+    table = FakeSuggestionTable()
+    cache = SuggestionCache(max_size=16, ttl=60)
+    model = AsyncMock(side_effect=lambda illness_name, notes=None, **alternate: f"Remedies for {illness_name}")
+    suggestions = worker(concurrency=1)
+
+    async def run():
+        await suggestions.start()
+        try:
+            for _ in range(500):
+                if all(log["suggestion_status"] != "pending" for log in logs.logs.values()):
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await suggestions.stop()
+
+    with patch('app.suggestion_worker.IllnessLogDAO', logs), \
+            patch('app.suggestion_engine.AISuggestionService.get_home_remedies', model), \
+            patch('app.suggestion_engine.suggestion_cache', cache), \
+            patch('app.suggestion_cache.AISuggestionCacheDAO', table):
+        asyncio.run(run())
+
+    assert [call.kwargs["illness_name"] for call in model.call_args_list] == ["Cold", "Flu"]
+    assert [log["ai_suggestion"] for log in logs.logs.values()] == [
+        "Remedies for Cold", "Remedies for Cold", "Remedies for Flu"]
+    assert [log["suggestion_source"] for log in logs.logs.values()] == ["model", "cache", "model"]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_table_is_shared_between_workers():
+    """
+    TEST 23.3: A suggestion one worker stored is served to another from the table
+
+    WHAT IT DOES:
+    1. Worker A caches a suggestion
+    2. Worker B (its own in-process LRU) looks it up twice
+
+    EXPECTED RESULT:
+    - B's first lookup is a table hit, its second an in-process hit
+    - The hit rate counts both
+    """
+    table = FakeSuggestionTable()
+    key = AISuggestionService.cache_key("Flu", "Aches")
+    with patch('app.suggestion_cache.AISuggestionCacheDAO', table):
+        SuggestionCache(max_size=16, ttl=60).put(key, "1. Rest")
+        other = SuggestionCache(max_size=16, ttl=60)
+        first = other.get(key)
+        second = other.get(key)
+
+    assert first == second == "1. Rest"
+    assert table.reads == 1
+    assert other.stats() == {"hits": 1, "db_hits": 1, "misses": 0, "hit_rate": 1.0, "size": 1, "max_size": 16}
+
+
+def test_entries_expire():
+    """
+    TEST 23.4: Suggestions are not served past the TTL
+
+    WHAT IT DOES:
+    1. Cache a suggestion with a 50 ms TTL, read it, wait 100 ms, read again
+
+    EXPECTED RESULT:
+    - The first read hits, the second misses in both tiers
+    """
+    table = FakeSuggestionTable()
+    cache = SuggestionCache(max_size=16, ttl=0.05)
+    key = AISuggestionService.cache_key("Fever")
+    with patch('app.suggestion_cache.AISuggestionCacheDAO', table):
+        cache.put(key, "1. Fluids")
+        fresh = cache.get(key)
+        time.sleep(0.1)
+        stale = cache.get(key)
+
+    assert fresh == "1. Fluids"
+    assert stale is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_failing_table_degrades_to_memory():
+    """
+    TEST 23.5: Suggestions still work while the cache table is unavailable
+
+    EXPECTED RESULT:
+    - A failing read is a miss, not an error
+    - A failing write still caches the suggestion in-process
+    """
+    table = MagicMock()
+    table.get_suggestion.side_effect = RuntimeError("database unavailable")
+    table.put_suggestion.side_effect = RuntimeError("database unavailable")
+    cache = SuggestionCache(max_size=16, ttl=60)
+    key = AISuggestionService.cache_key("Cough")
+    with patch('app.suggestion_cache.AISuggestionCacheDAO', table):
+        missed = cache.get(key)
+        cache.put(key, "1. Honey tea")
+        hit = cache.get(key)
+
+    assert missed is None
+    assert hit == "1. Honey tea"
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+def test_suggestion_cache_against_postgres():
+    """
+    TEST 23.6: Storing, replacing and expiring cached suggestions in PostgreSQL
+
+    WHAT IT DOES:
+    1. Store a suggestion, replace it, read it back
+    2. Store another one that has already expired
+
+    EXPECTED RESULT:
+    - The replacement is returned, with close to the full TTL left
+    - The expired one is not returned
+    """
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+
+    conn = psycopg2.connect(TEST_DATABASE_URL, cursor_factory=RealDictCursor)
+    model = f"test-model-{time.time_ns()}"
+    try:
+        AISuggestionCacheDAO.put_suggestion("cold", "", model, 1, "1. Rest", 3600, connection=conn)
+        AISuggestionCacheDAO.put_suggestion("cold", "", model, 1, "1. Rest\n2. Fluids", 3600, connection=conn)
+        AISuggestionCacheDAO.put_suggestion("flu", "", model, 1, "1. Sleep", -1, connection=conn)
+
+        cold = AISuggestionCacheDAO.get_suggestion("cold", "", model, 1, connection=conn)
+        flu = AISuggestionCacheDAO.get_suggestion("flu", "", model, 1, connection=conn)
+        other_prompt = AISuggestionCacheDAO.get_suggestion("cold", "", model, 2, connection=conn)
+
+        assert cold["suggestion"] == "1. Rest\n2. Fluids"
+        assert 3500 < cold["ttl_seconds"] <= 3600
+        assert flu is None
+        assert other_prompt is None
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+def test_writes_purge_expired_rows():
+    """
+    TEST 23.7: Storing a suggestion deletes expired rows, a bounded batch at a time
+
+    WHAT IT DOES:
+    1. Store a live row, then insert three expired rows for a model nobody asks for any more
+    2. Store a suggestion with PURGE_BATCH_SIZE set to 2, then store another
+
+    WHY:
+    - Keys for an old model or prompt version are never read or replaced again, so
+      without a purge their rows would stay in the table forever
+
+    EXPECTED RESULT:
+    - The first write deletes the two oldest expired rows, the second the last one
+    - The live row and the stored suggestions are kept
+    """
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+
+    conn = psycopg2.connect(TEST_DATABASE_URL, cursor_factory=RealDictCursor)
+    model = f"test-model-{time.time_ns()}"
+    try:
+        AISuggestionCacheDAO.put_suggestion("live", "", model, 1, "1. Rest", 3600, connection=conn)
+        with conn.cursor() as cursor:
+            # Rows other tests left behind would be purged first; start from none
+            cursor.execute("DELETE FROM ai_suggestion_cache WHERE expires_at <= NOW()")
+            cursor.execute("""
+                INSERT INTO ai_suggestion_cache (illness_name, notes_digest, model, prompt_version, suggestion, expires_at)
+                SELECT 'illness ' || i, '', %s, 0, 'Old prompt', NOW() - i * INTERVAL '1 day'
+                FROM generate_series(1, 3) i
+            """, (f"{model}-old",))
+
+        def old_rows():
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT illness_name FROM ai_suggestion_cache WHERE model = %s ORDER BY illness_name
+                """, (f"{model}-old",))
+                return [row["illness_name"] for row in cursor.fetchall()]
+
+        with patch.object(AISuggestionCacheDAO, "PURGE_BATCH_SIZE", 2):
+            AISuggestionCacheDAO.put_suggestion("cold", "", model, 1, "1. Fluids", 3600, connection=conn)
+            after_first = old_rows()
+            AISuggestionCacheDAO.put_suggestion("flu", "", model, 1, "1. Sleep", 3600, connection=conn)
+            after_second = old_rows()
+
+        assert after_first == ["illness 1"]
+        assert after_second == []
+        for illness in ("live", "cold", "flu"):
+            assert AISuggestionCacheDAO.get_suggestion(illness, "", model, 1, connection=conn) is not None
+    finally:
+        conn.rollback()
+        conn.close()
@@ -0,0 +1,224 @@
+"""
+TEST 24: Pooled Upstream HTTP Clients
+=====================================
+
+What we're testing: The shared HTTP clients for HuggingFace and n8n
+Why: AISuggestionService opened a new httpx.AsyncClient for every illness log,
+paying a new TCP (and TLS) handshake per suggestion, with no limits on
+connections or retries
+
+Key concept: ONE POOL PER UPSTREAM
+- The app lifespan opens one keep-alive httpx.AsyncClient per upstream per worker
+  (HTTP/2 when h2 is installed), with its own connection limit and timeouts
+- Requests that never reached the upstream, and configured statuses (429/5xx for
+  HuggingFace), are retried - but only within a retry budget that grows with
+  the number of requests, so retries cannot multiply load on a failing upstream
+- Latency percentiles and connections opened per request are counted
+
+The tests:
+- Sequential requests reuse one connection
+- AI suggestions go over the shared client, not a client per call
+- Retryable failures are retried, others are not
+- The retry budget stops retries once it is spent
+"""
+
+import json
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+import httpx
+import pytest
+from app.http_clients import HTTPClients, RetryBudget, UpstreamClient
+from app.services.ai_suggestion_service import AISuggestionService
+
+
+class FakeUpstream(BaseHTTPRequestHandler):
+    """A keep-alive HTTP/1.1 server that answers every POST with the next queued status (then 200)."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        server.requests += 1
+        status = server.statuses.pop(0) if server.statuses else 200
+        payload = json.dumps({"choices": [{"message": {"content": "<think></think>1. **Rest**"}}]}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def upstream():
+    """FIXTURE: A local fake upstream on a free port."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeUpstream)
+    server.requests = 0
+    server.statuses = []
+    server.url = f"http://127.0.0.1:{server.server_port}/v1/chat/completions"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def upstream_client(max_retries=2, budget=None, retry_statuses=(503,)):
+    return UpstreamClient("test", timeout=5, connect_timeout=1, max_connections=4, keepalive_expiry=60,
+                          max_retries=max_retries, retry_budget=budget or RetryBudget(0.1, 10),
+                          retry_statuses=retry_statuses)
+
+
+def run(client, calls, transport=None):
+    """Start `client`, await `calls()` and close it again."""
+
+    async def main():
+        await client.start(transport)
+        try:
+            return await calls()
+        finally:
+            await client.stop()
+
+    return asyncio.run(main())
+
+
+def test_connections_are_reused(upstream):
+    """
+    TEST 24.1: Sequential requests to an upstream share one connection
+
+    WHAT IT DOES:
+    1. Send 5 requests one after another through one UpstreamClient
+
+    EXPECTED RESULT:
+    - All succeed; one TCP connection was opened (reuse rate 80%)
+    - Latency percentiles are reported
+    """
+    client = upstream_client()
+
+    async def calls():
+        return [(await client.request("POST", upstream.url, json={})).status_code for _ in range(5)]
+
+    statuses = run(client, calls)
+
+    stats = client.stats()
+    assert statuses == [200] * 5
+    assert stats["requests"] == 5
+    assert stats["connections_opened"] == 1
+    assert stats["connection_reuse_rate"] == pytest.approx(0.8)
+    assert stats["latency_p95_ms"] is not None
+
+
+def test_suggestions_use_the_shared_client(upstream):
+    """
+    TEST 24.2: AI suggestions reuse the HuggingFace pool instead of a client per call
+
+    WHAT IT DOES:
+    1. Point AISuggestionService at the fake upstream over a started shared client
+    2. Ask for three suggestions
+
+    EXPECTED RESULT:
+    - Three suggestions (think tags and markdown stripped)
+    - Three requests over one connection
+    """
+    client = upstream_client()
+    clients = HTTPClients(huggingface=client, n8n=upstream_client())
+
+    async def calls():
+        return [await AISuggestionService.get_home_remedies(name) for name in ("Cold", "Flu", "Fever")]
+
+    with patch('app.services.ai_suggestion_service.http_clients', clients), \
+            patch.object(AISuggestionService, "HUGGINGFACE_API_URL", upstream.url):
+        suggestions = run(client, calls)
+
+    assert suggestions == ["1. Rest"] * 3
+    assert upstream.requests == 3
+    assert client.stats()["connections_opened"] == 1
+
+
+def test_retryable_failures_are_retried(upstream):
+    """
+    TEST 24.3: Connect errors and configured statuses are retried, nothing else
+
+    WHAT IT DOES:
+    1. The upstream answers 503, then 200
+    2. The upstream answers 500 (not configured as retryable)
+    3. Connections are refused twice, then accepted (mock transport)
+
+    EXPECTED RESULT:
+    - 503 is retried once and the 200 returned
+    - 500 is returned without a retry
+    - The refused request succeeds on its third attempt
+    """
+    upstream.statuses = [503]
+    client = upstream_client()
+
+    async def calls():
+        first = await client.request("POST", upstream.url, json={})
+        upstream.statuses.append(500)
+        second = await client.request("POST", upstream.url, json={})
+        return [first.status_code, second.status_code]
+
+    with patch.object(UpstreamClient, "RETRY_BACKOFF_SECONDS", 0):
+        statuses = run(client, calls)
+    assert statuses == [200, 500]
+    assert upstream.requests == 3
+    assert client.stats()["retries"] == 1
+
+    attempts = []
+
+    def refuse_twice(request):
+        attempts.append(request)
+        if len(attempts) <= 2:
+            raise httpx.ConnectError("Connection refused")
+        return httpx.Response(200)
+
+    refused = upstream_client()
+    with patch.object(UpstreamClient, "RETRY_BACKOFF_SECONDS", 0):
+        response = run(refused, lambda: refused.request("POST", "http://n8n.test/webhook"),
+                       transport=httpx.MockTransport(refuse_twice))
+    assert response.status_code == 200
+    assert len(attempts) == 3
+    assert refused.stats()["retries"] == 2
+
+
+def test_retry_budget_limits_retries():
+    """
+    TEST 24.4: Once the retry budget is spent, failures are returned instead of retried
+
+    WHAT IT DOES:
+    1. An upstream that always answers 503; a budget of 2 retries earning 0.1 per request
+    2. Send 4 requests, each allowed 2 retries
+
+    EXPECTED RESULT:
+    - Only 2 retries in total, both by the first request; the other 3 requests have their retry denied
+    - Every request still returns the 503
+    """
+    client = upstream_client(budget=RetryBudget(0.1, 2))
+
+    async def calls():
+        return [(await client.request("POST", "http://hf.test/v1")).status_code for _ in range(4)]
+
+    with patch.object(UpstreamClient, "RETRY_BACKOFF_SECONDS", 0):
+        statuses = run(client, calls, transport=httpx.MockTransport(lambda request: httpx.Response(503)))
+
+    stats = client.stats()
+    assert statuses == [503] * 4
+    assert stats["retries"] == 2
+    assert stats["retries_denied"] == 3
+    assert stats["requests"] == 6
+
+
+def test_client_must_be_started():
+    """
+    TEST 24.5: Using an upstream client outside the lifespan fails loudly
+
+    EXPECTED RESULT:
+    - RuntimeError naming the upstream, instead of an unpooled client being made
+    """
+    with pytest.raises(RuntimeError, match="test HTTP client is not started"):
+        asyncio.run(upstream_client().request("POST", "http://hf.test/v1"))
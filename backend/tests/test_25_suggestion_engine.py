@@ -0,0 +1,245 @@
+"""
+TEST 25: Hedged AI Suggestions with a Deadline and a Fallback
+=============================================================
+
+What we're testing: How the suggestion engine keeps a slow model off the tail
+Why: A suggestion waited for one HuggingFace request for as long as it took
+(up to the client timeout, then retries), so a slow or overloaded model meant
+minutes without a suggestion, and a failing one meant none at all
+
+Key concept: HEDGE, DEADLINE, FALLBACK
+- If the model has not answered within the HuggingFace client's p95 latency,
+  a second request goes to an alternate model/endpoint; the first answer wins
+  and the other request is cancelled
+- Past a per-request deadline (or when the last attempt fails) the curated
+  local table answers instead of nobody
+- The illness log records where its suggestion came from: model, cache,
+  fallback or user
+
+The tests:
+- A hedged request wins over a slow primary, which is cancelled
+- A hedge answer is cached under the hedge model, not the primary's
+- The hedge waits for the client's p95 once it has enough samples
+- A failing primary is hedged right away
+- The deadline answers from the fallback table (or not at all when disabled)
+- The fallback table matches names, aliases and words, else gives general tips
+- The worker records the fallback on a log's last attempt
+"""
+
+import asyncio
+from collections import deque
+from unittest.mock import patch
+import pytest
+from app.http_clients import http_clients
+from app.services.ai_suggestion_service import AISuggestionService
+from app.suggestion_cache import SuggestionCache
+from app.suggestion_engine import SuggestionEngine
+from app.utils.remedies import GENERAL_TIPS, REMEDIES, SEE_A_DOCTOR, fallback_remedies
+from tests.test_22_illness_suggestions import FakeIllnessLogs, empty_cache, worker
+from tests.test_23_suggestion_cache import FakeSuggestionTable
+
+
+class FakeModels:
+    """AISuggestionService for a primary and a hedge model, each answering after a delay (None fails)."""
+
+    def __init__(self, primary=(0, "Primary tips"), hedge=(0, "Hedge tips")):
+        self.primary = primary
+        self.hedge = hedge
+        self.cancelled = []
+
+    async def get_home_remedies(self, illness_name, notes=None, model=None, url=None):
+        delay, text = self.primary if model is None else self.hedge
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(model or "primary")
+            raise
+        return text
+
+
+def suggest(models, engine, illness_name="Cold", **kwargs):
+    with patch('app.suggestion_engine.AISuggestionService.get_home_remedies', side_effect=models.get_home_remedies), \
+            patch('app.suggestion_engine.suggestion_cache', empty_cache()):
+        return asyncio.run(engine.suggest(illness_name, **kwargs))
+
+
+def engine(**overrides):
+    options = dict(deadline=2, hedge_after=0.05, hedge_model="alternate")
+    options.update(overrides)
+    return SuggestionEngine(**options)
+
+
+def test_hedge_wins_over_a_slow_primary():
+    """
+    TEST 25.1: A primary slower than the hedge delay is raced by the alternate model
+
+    WHAT IT DOES:
+    1. The primary takes 1 s, the alternate answers at once; hedge after 50 ms
+
+    EXPECTED RESULT:
+    - The alternate's answer is returned as from the model, well before 1 s
+    - The primary request is cancelled; one hedge, one hedge win
+    """
+    models = FakeModels(primary=(1, "Primary tips"))
+    hedged = engine()
+
+    suggestion = suggest(models, hedged)
+
+    assert suggestion == ("Hedge tips", "model")
+    assert models.cancelled == ["primary"]
+    assert hedged.stats() == {"model": 1, "cache": 0, "fallback": 0,
+                              "hedged": 1, "hedge_wins": 1, "deadlines_exceeded": 0}
+
+
+def test_hedge_answer_is_cached_under_the_hedge_model():
+    """
+    TEST 25.2: A suggestion the alternate model wrote is not served as the primary model's
+
+    WHAT IT DOES:
+    1. The hedge wins for 'Cold' (primary takes 1 s); the answer is cached
+    2. Ask again for 'Cold' while the primary model answers at once
+
+    EXPECTED RESULT:
+    - The answer is stored under the alternate model's key only
+    - The second request misses the cache and gets the primary model's answer
+    """
+    cache = SuggestionCache(max_size=16, ttl=60)
+    table = FakeSuggestionTable()
+    hedged = engine()
+
+    def ask(models):
+        with patch('app.suggestion_engine.AISuggestionService.get_home_remedies',
+                   side_effect=models.get_home_remedies), \
+                patch('app.suggestion_engine.suggestion_cache', cache), \
+                patch('app.suggestion_cache.AISuggestionCacheDAO', table):
+            return asyncio.run(hedged.suggest("Cold"))
+
+    first = ask(FakeModels(primary=(1, "Primary tips")))
+    second = ask(FakeModels(primary=(0, "Primary tips")))
+
+    assert first == ("Hedge tips", "model")
+    assert second == ("Primary tips", "model")
+    assert ("cold", AISuggestionService.cache_key("Cold").notes_digest, "alternate",
+            AISuggestionService.PROMPT_VERSION) in table.rows
+    assert cache.stats()["hits"] == 0
+
+
+def test_hedge_waits_for_the_p95():
+    """
+    TEST 25.3: The hedge delay follows the HuggingFace client's latency
+
+    EXPECTED RESULT:
+    - Fewer than MIN_LATENCY_SAMPLES requests: the configured hedge_after
+    - Enough requests: their p95
+    - A primary answering within the delay is never hedged
+    """
+    hedged = engine(hedge_after=0.5)
+    few = deque([0.1] * (SuggestionEngine.MIN_LATENCY_SAMPLES - 1))
+    enough = deque([0.1] * 19 + [0.3] * 2)
+
+    with patch.object(http_clients.huggingface, "_latencies", few):
+        assert hedged.hedge_delay() == 0.5
+    with patch.object(http_clients.huggingface, "_latencies", enough):
+        assert hedged.hedge_delay() == pytest.approx(0.3)
+
+    suggestion = suggest(FakeModels(primary=(0.01, "Primary tips")), hedged)
+    assert suggestion == ("Primary tips", "model")
+    assert hedged.stats()["hedged"] == 0
+
+
+def test_failing_primary_is_hedged_at_once():
+    """
+    TEST 25.4: A primary that fails does not wait for the hedge delay
+
+    WHAT IT DOES:
+    1. The primary fails at once; hedge after 5 s
+    2. Both fail, on a normal attempt and on the last one
+
+    EXPECTED RESULT:
+    - The alternate answers right away
+    - Both failing: None, unless it is the last attempt - then the fallback table
+    """
+    models = FakeModels(primary=(0, None))
+    hedged = engine(hedge_after=5, deadline=10)
+
+    assert suggest(models, hedged) == ("Hedge tips", "model")
+
+    models = FakeModels(primary=(0, None), hedge=(0, None))
+    assert suggest(models, hedged) is None
+    assert suggest(models, hedged, fallback_on_error=True) == (fallback_remedies("cold"), "fallback")
+
+
+def test_deadline_answers_from_the_fallback():
+    """
+    TEST 25.5: A model that does not answer within the deadline is replaced by the fallback table
+
+    WHAT IT DOES:
+    1. Primary and alternate both take 5 s; deadline 200 ms
+    2. The same with the fallback disabled
+
+    EXPECTED RESULT:
+    - The cold's curated tips, as from the fallback, after about the deadline
+    - Both requests cancelled; the exceeded deadline is counted
+    - With the fallback disabled, None
+    """
+    models = FakeModels(primary=(5, "Primary tips"), hedge=(5, "Hedge tips"))
+    bounded = engine(deadline=0.2)
+
+    suggestion = suggest(models, bounded, illness_name="Cold")
+
+    assert suggestion == (f"{REMEDIES['cold']}\n\n{SEE_A_DOCTOR}", "fallback")
+    assert sorted(models.cancelled) == ["alternate", "primary"]
+    assert bounded.stats()["deadlines_exceeded"] == 1
+    assert suggest(models, engine(deadline=0.2, fallback_enabled=False)) is None
+
+
+def test_fallback_table_matching():
+    """
+    TEST 25.6: The fallback finds the closest curated entry
+
+    EXPECTED RESULT:
+    - Exact names and aliases match; so does a known name inside a longer one
+    - The longest match wins ("stomach flu" is not "flu")
+    - Unknown illnesses get general tips; every answer says when to see a doctor
+    """
+    assert fallback_remedies("flu").startswith(REMEDIES["flu"])
+    assert fallback_remedies("influenza").startswith(REMEDIES["flu"])
+    assert fallback_remedies("bad head cold").startswith(REMEDIES["cold"])
+    assert fallback_remedies("stomach flu").startswith(REMEDIES["diarrhea"])
+    assert fallback_remedies("rare thing") == f"{GENERAL_TIPS}\n\n{SEE_A_DOCTOR}"
+
+
+def test_worker_records_the_fallback():
+    """
+    TEST 25.7: A log whose model calls keep failing gets the fallback on its last attempt
+
+    WHAT IT DOES:
+    1. Queue a 'Sore throat' the model never answers, with max_attempts=2
+
+    EXPECTED RESULT:
+    - One retry, then the curated tips are stored, 'ready', with source 'fallback'
+    """
+    logs = FakeIllnessLogs(["Sore throat"])
+    suggestions = worker(max_attempts=2)
+
+    async def run():
+        await suggestions.start()
+        try:
+            for _ in range(500):
+                if logs.logs[1]["suggestion_status"] != "pending":
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await suggestions.stop()
+
+    with patch('app.suggestion_worker.IllnessLogDAO', logs), \
+            patch('app.suggestion_engine.AISuggestionService.get_home_remedies',
+                  side_effect=FakeModels(primary=(0, None), hedge=(0, None)).get_home_remedies), \
+            patch('app.suggestion_engine.suggestion_cache', empty_cache()), \
+            patch.object(logs, "schedule_suggestion_retry", wraps=logs.schedule_suggestion_retry) as retry:
+        asyncio.run(run())
+
+    log = logs.logs[1]
+    assert (log["suggestion_status"], log["suggestion_source"]) == ("ready", "fallback")
+    assert log["ai_suggestion"] == fallback_remedies("sore throat")
+    assert retry.call_count == 1
@@ -0,0 +1,439 @@
+"""
+TEST 26: Token-Streamed AI Suggestions
+======================================
+
+What we're testing: GET /illness-logs/{id}/suggestion/stream
+Why: Users waited for the whole completion (and the worker's claim) before
+seeing any of the suggestion; the model can stream it token by token
+
+Key concept: STREAM, THEN STORE
+- A new pending log waits AI_SUGGESTION_STREAM_GRACE_SECONDS before the worker
+  takes it; a stream opened in that time claims it like a worker would
+- The model is asked with `stream: true` and every piece is sent as a `token`
+  event as soon as it arrives, with think tags and markdown removed
+  incrementally (a marker may be split between pieces)
+- The generation runs as one of the suggestion worker's tasks: the final text
+  is stored in ai_suggestion (and cached) even if the client disconnects, and
+  a failed stream is retried like a failed attempt
+- The stream ends with the same `suggestion` event as the events endpoint
+
+The tests:
+- Cleaning split across pieces gives the same text as cleaning the whole answer
+- Pieces arrive as the fake SSE server sends them, long before it is done
+- Error statuses and streams cut short raise
+- A claimed log streams tokens, then the stored suggestion
+- A log a worker already has is only waited for
+- A disconnected client's suggestion is still stored
+- A failed stream is retried, and answered from the fallback on the last attempt
+- A stream that trickles past the deadline is answered from the fallback
+- The stream endpoint only serves the caller's own logs
+- Claiming for a stream against PostgreSQL (requires PostgreSQL)
+"""
+
+import os
+import json
+import time
+import asyncio
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock, patch
+import pytest
+from app.main import app
+from app.config import settings
+from app.dao.illness_log_dao import IllnessLogDAO
+from app.http_clients import HTTPClients, RetryBudget, UpstreamClient
+from app.services.ai_suggestion_service import AISuggestionError, AISuggestionService, SuggestionCleaner
+from app.services.illness_log_service import IllnessLogService
+from app.utils.dependencies import get_current_user, get_unit_of_work
+from app.suggestion_engine import suggestion_engine
+from app.utils.remedies import fallback_remedies
+from tests.test_22_illness_suggestions import FakeIllnessLogs, empty_cache, worker
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+ANSWER = ["<think>", "\n</th", "ink>\n1. *", "*Rest*", "*\n2. Drink ", "fluids"]
+
+
+class FakeChatStream(BaseHTTPRequestHandler):
+    """An OpenAI-compatible chat completions endpoint streaming `server.pieces`, `server.delay` apart."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        server.bodies.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+        self.send_response(server.status)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for piece in server.pieces:
+            chunk = {"choices": [{"index": 0, "delta": {"content": piece}}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+            time.sleep(server.delay)
+        if server.done:
+            self.wfile.write(b"data: [DONE]\n\n")
+
+
+@pytest.fixture
+def model():
+    """FIXTURE: A local fake streaming model on a free port."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeChatStream)
+    server.bodies = []
+    server.pieces = ANSWER
+    server.delay = 0
+    server.status = 200
+    server.done = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class FakeStreamLogs(FakeIllnessLogs):
+    """FakeIllnessLogs that streams can claim."""
+
+    def claim_suggestion(self, illness_log_id, user_id, lease_seconds):
+        log = self.logs.get(illness_log_id)
+        if not log or log["user_id"] != user_id or log["suggestion_status"] != "pending" or log["claimed"]:
+            return None
+        log["suggestion_attempts"] += 1
+        log["claimed"] = True
+        return dict(log)
+
+
+def with_model(model, calls):
+    """Run `calls()` with AISuggestionService streaming from the fake model over a started client."""
+    client = UpstreamClient("test", timeout=5, connect_timeout=1, max_connections=4, keepalive_expiry=60,
+                            max_retries=0, retry_budget=RetryBudget(0.1, 10))
+
+    async def main():
+        await client.start()
+        try:
+            return await calls()
+        finally:
+            await client.stop()
+
+    url = f"http://127.0.0.1:{model.server_port}/v1/chat/completions"
+    with patch('app.services.ai_suggestion_service.http_clients', HTTPClients(huggingface=client, n8n=client)), \
+            patch.object(AISuggestionService, "HUGGINGFACE_API_URL", url):
+        return asyncio.run(main())
+
+
+def stream_events(model, logs, suggestions, log_id=1, cache=None):
+    """Read the token stream for `log_id` to the end."""
+
+    async def calls():
+        log = logs.get_illness_log_by_id(log_id, 1)
+        return [event async for event in IllnessLogService.stream_suggestion(1, log)]
+
+    with patch('app.services.illness_log_service.IllnessLogDAO', logs), \
+            patch('app.services.illness_log_service.suggestion_worker', suggestions), \
+            patch('app.suggestion_worker.IllnessLogDAO', logs), \
+            patch('app.suggestion_worker.suggestion_cache', cache or empty_cache()):
+        return with_model(model, calls)
+
+
+def parse(events):
+    """(event name, data) for every event, skipping keep-alive comments."""
+    parsed = []
+    for event in events:
+        if event.startswith("event: "):
+            name, data = event.strip().split("\n")
+            parsed.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return parsed
+
+
+def test_cleaning_split_markers():
+    """
+    TEST 26.1: Think tags and markdown split between pieces are still removed
+
+    EXPECTED RESULT:
+    - Streaming ANSWER through the cleaner gives the text get_home_remedies would
+    - A marker prefix that never completes is not lost
+    """
+    cleaner = SuggestionCleaner()
+    text = "".join(cleaner.feed(piece) for piece in ANSWER) + cleaner.flush()
+    assert text == "1. Rest\n2. Drink fluids"
+
+    cleaner = SuggestionCleaner()
+    assert cleaner.feed("Use < 2 spoons *") == "Use < 2 spoons "
+    assert cleaner.flush() == "*"
+
+
+def test_pieces_arrive_before_the_answer_is_done(model):
+    """
+    TEST 26.2: stream_home_remedies yields each piece as the model sends it
+
+    WHAT IT DOES:
+    1. The fake model sends 6 pieces 150 ms apart
+
+    EXPECTED RESULT:
+    - The first text arrives in well under the ~900 ms the whole answer takes
+    - The request asked for `stream: true`; the pieces join to the cleaned answer
+    """
+    model.delay = 0.15
+
+    async def calls():
+        started = time.monotonic()
+        arrivals = []
+        async for piece in AISuggestionService.stream_home_remedies("Cold"):
+            arrivals.append((time.monotonic() - started, piece))
+        return arrivals, time.monotonic() - started
+
+    arrivals, elapsed = with_model(model, calls)
+
+    assert arrivals[0][0] < 0.5 < elapsed
+    assert model.bodies[0]["stream"] is True
+    assert "".join(piece for _, piece in arrivals) == "1. Rest\n2. Drink fluids"
+
+
+def test_failed_streams_raise(model):
+    """
+    TEST 26.3: An error status, or a stream that ends without [DONE], raises AISuggestionError
+
+    EXPECTED RESULT:
+    - 500: AISuggestionError naming the status
+    - Cut short: AISuggestionError after the pieces that did arrive
+    """
+
+    async def calls():
+        pieces = []
+        async for piece in AISuggestionService.stream_home_remedies("Cold"):
+            pieces.append(piece)
+        return pieces
+
+    model.status = 500
+    with pytest.raises(AISuggestionError, match="500"):
+        with_model(model, calls)
+
+    model.status = 200
+    model.done = False
+    with pytest.raises(AISuggestionError, match="ended early"):
+        with_model(model, calls)
+
+
+def test_stream_sends_tokens_then_the_stored_suggestion(model):
+    """
+    TEST 26.4: A pending log nobody has claimed is generated for the stream
+
+    EXPECTED RESULT:
+    - `token` events with the cleaned pieces, then one `suggestion` event
+    - The suggestion is stored as from the model, and cached
+    """
+    logs = FakeStreamLogs(["Cold"])
+    cache = empty_cache()
+    suggestions = worker()
+
+    events = parse(stream_events(model, logs, suggestions, cache=cache))
+
+    tokens = [data["text"] for name, data in events if name == "token"]
+    assert len(tokens) > 1
+    assert "".join(tokens) == "1. Rest\n2. Drink fluids"
+    assert events[-1] == ("suggestion", {"id": 1, "suggestion_status": "ready", "suggestion_source": "model",
+                                         "ai_suggestion": "1. Rest\n2. Drink fluids"})
+    assert logs.logs[1]["suggestion_attempts"] == 1
+    cache.put.assert_called_once()
+    assert suggestions.stats()["streamed"] == 1
+
+
+def test_claimed_log_is_waited_for(model):
+    """
+    TEST 26.5: A log the worker already claimed is not generated twice
+
+    WHAT IT DOES:
+    1. Claim the log as a worker would, open the stream, fill the log 50 ms later
+
+    EXPECTED RESULT:
+    - No `token` events and no model request; the `suggestion` event once it is filled
+    """
+    logs = FakeStreamLogs(["Cold"])
+    logs.claim_pending_suggestions(1, 120)
+    suggestions = worker()
+
+    async def fill():
+        await asyncio.sleep(0.05)
+        await suggestions._finish(logs.logs[1], MagicMock(text="Rest", source="model"))
+
+    async def calls():
+        side = asyncio.create_task(fill())
+        events = [event async for event in IllnessLogService.stream_suggestion(1, logs.get_illness_log_by_id(1, 1))]
+        await side
+        return events
+
+    with patch('app.services.illness_log_service.IllnessLogDAO', logs), \
+            patch('app.services.illness_log_service.suggestion_worker', suggestions), \
+            patch('app.suggestion_worker.IllnessLogDAO', logs):
+        events = parse(with_model(model, calls))
+
+    assert [name for name, _ in events] == ["suggestion"]
+    assert events[0][1]["ai_suggestion"] == "Rest"
+    assert model.bodies == []
+
+
+def test_disconnected_stream_still_stores(model):
+    """
+    TEST 26.6: A client that leaves after the first token does not lose the suggestion
+
+    EXPECTED RESULT:
+    - The stream is closed after one `token` event
+    - The whole suggestion is stored anyway
+    """
+    logs = FakeStreamLogs(["Cold"])
+    model.delay = 0.05
+    suggestions = worker()
+
+    async def calls():
+        stream = IllnessLogService.stream_suggestion(1, logs.get_illness_log_by_id(1, 1))
+        first = await stream.__anext__()
+        await stream.aclose()
+        for _ in range(200):
+            if logs.logs[1]["suggestion_status"] == "ready":
+                break
+            await asyncio.sleep(0.01)
+        return first
+
+    with patch('app.services.illness_log_service.IllnessLogDAO', logs), \
+            patch('app.services.illness_log_service.suggestion_worker', suggestions), \
+            patch('app.suggestion_worker.IllnessLogDAO', logs), \
+            patch('app.suggestion_worker.suggestion_cache', empty_cache()):
+        first = with_model(model, calls)
+
+    assert first.startswith("event: token\n")
+    assert logs.logs[1]["ai_suggestion"] == "1. Rest\n2. Drink fluids"
+
+
+def test_failed_stream_is_retried_then_falls_back(model):
+    """
+    TEST 26.7: A failed stream counts as a failed attempt
+
+    WHAT IT DOES:
+    1. The model answers 500; stream a log on its first attempt (events timeout 200 ms)
+    2. The same on the log's last attempt
+
+    EXPECTED RESULT:
+    - First: no tokens, a retry is scheduled and the `suggestion` event is still 'pending'
+    - Last: the fallback table's tips are stored, with source 'fallback'
+    """
+    model.status = 500
+    logs = FakeStreamLogs(["Sore throat"])
+
+    with patch.object(settings, "ai_suggestion_events_timeout_seconds", 0.2), \
+            patch.object(settings, "ai_suggestion_events_poll_seconds", 0.05):
+        events = parse(stream_events(model, logs, worker()))
+    assert [name for name, _ in events] == ["suggestion"]
+    assert events[0][1]["suggestion_status"] == "pending"
+    assert len(logs.retry_delays) == 1
+
+    logs.logs[1]["suggestion_attempts"] = 2
+    events = parse(stream_events(model, logs, worker()))
+    assert events[-1][1]["suggestion_source"] == "fallback"
+    assert logs.logs[1]["ai_suggestion"] == fallback_remedies("sore throat")
+
+
+def test_slow_stream_is_bounded_by_the_deadline(model):
+    """
+    TEST 26.8: A model that keeps trickling tokens does not hold the stream past the deadline
+
+    WHAT IT DOES:
+    1. The model sends 40 pieces 50 ms apart (each read well within the client timeout)
+    2. Stream a log with a 300 ms deadline
+
+    EXPECTED RESULT:
+    - Some tokens arrive, then the stream ends after about the deadline, not 2 s
+    - The fallback table's tips are stored, with source 'fallback'; the exceeded deadline is counted
+    """
+    model.pieces = ["1. Rest "] * 40
+    model.delay = 0.05
+    logs = FakeStreamLogs(["Sore throat"])
+    exceeded = suggestion_engine.deadlines_exceeded
+
+    with patch.object(suggestion_engine, "deadline", 0.3):
+        started = time.monotonic()
+        events = parse(stream_events(model, logs, worker()))
+        elapsed = time.monotonic() - started
+
+    assert [name for name, _ in events].count("token") >= 1
+    assert elapsed < 1.5
+    assert events[-1][1]["suggestion_source"] == "fallback"
+    assert logs.logs[1]["ai_suggestion"] == fallback_remedies("sore throat")
+    assert suggestion_engine.deadlines_exceeded == exceeded + 1
+
+
+def test_stream_endpoint_checks_ownership(client):
+    """
+    TEST 26.9: GET /illness-logs/{id}/suggestion/stream only streams the caller's logs
+
+    EXPECTED RESULT:
+    - The owner gets text/event-stream with the (already ready) suggestion, no tokens
+    - Anyone else gets 404
+    """
+    logs = FakeStreamLogs(["Cold"])
+    logs.logs[1].update(suggestion_status="ready", ai_suggestion="Rest")
+    app.dependency_overrides[get_unit_of_work] = lambda: MagicMock()
+    try:
+        with patch('app.services.illness_log_service.IllnessLogDAO.get_illness_log_by_id',
+                   side_effect=lambda log_id, user_id, connection=None: logs.get_illness_log_by_id(log_id, user_id)):
+            app.dependency_overrides[get_current_user] = lambda: {"id": 1, "email": "owner@test.local"}
+            owner = client.get("/illness-logs/1/suggestion/stream")
+            app.dependency_overrides[get_current_user] = lambda: {"id": 2, "email": "other@test.local"}
+            other = client.get("/illness-logs/1/suggestion/stream")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert owner.status_code == 200
+    assert owner.headers["content-type"].startswith("text/event-stream")
+    assert "event: token" not in owner.text
+    assert '"ai_suggestion": "Rest"' in owner.text
+    assert other.status_code == 404
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+def test_stream_claims_against_postgres():
+    """
+    TEST 26.10: Streams claim new logs inside the grace period, and never a worker's
+
+    WHAT IT DOES:
+    1. Create a pending log due in an hour (grace period), and one already due
+    2. Claim the first for a stream; let the worker claim the second, then try it for a stream
+
+    EXPECTED RESULT:
+    - The first is claimed (attempt 1) for its owner's stream only, and only once
+    - The worker claims the due log; a stream cannot take it from the worker
+    """
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+
+    conn = psycopg2.connect(TEST_DATABASE_URL, cursor_factory=RealDictCursor)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("INSERT INTO users (email, name) VALUES (%s, %s) RETURNING id",
+                           (f"stream-{time.time_ns()}@test.local", "Stream Test"))
+            user_id = cursor.fetchone()["id"]
+            cursor.execute("INSERT INTO family_members (user_id, name) VALUES (%s, 'Alice') RETURNING id",
+                           (user_id,))
+            family_member_id = cursor.fetchone()["id"]
+
+        streamed = IllnessLogDAO.create_illness_log(
+            user_id, family_member_id, "Cold", date(2026, 3, 1), suggestion_status="pending",
+            suggestion_delay_seconds=3600, connection=conn)["id"]
+        worked = IllnessLogDAO.create_illness_log(
+            user_id, family_member_id, "Flu", date(2026, 3, 1), suggestion_status="pending", connection=conn)["id"]
+        with conn.cursor() as cursor:
+            # Due before anything else in the table, so the worker claims it first
+            cursor.execute("UPDATE illness_logs SET suggestion_next_attempt_at = '2000-01-01' WHERE id = %s",
+                           (worked,))
+
+        assert IllnessLogDAO.claim_suggestion(streamed, user_id + 1, 120, connection=conn) is None
+        claim = IllnessLogDAO.claim_suggestion(streamed, user_id, 120, connection=conn)
+        assert (claim["illness_name"], claim["suggestion_attempts"]) == ("Cold", 1)
+        assert IllnessLogDAO.claim_suggestion(streamed, user_id, 120, connection=conn) is None
+
+        claimed = IllnessLogDAO.claim_pending_suggestions(1, 120, connection=conn)
+        assert [log["id"] for log in claimed] == [worked]
+        assert IllnessLogDAO.claim_suggestion(worked, user_id, 120, connection=conn) is None
+    finally:
+        conn.rollback()
+        conn.close()
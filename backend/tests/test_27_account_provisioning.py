@@ -0,0 +1,300 @@
+"""
+TEST 27: Account Provisioning off the Login Path
+================================================
+
+What we're testing: What the Google OAuth callback waits for
+Why: The callback searched or created the Drive folder and the LIFELINE
+calendar one after the other, inside the transaction that stored the user,
+so every login took several seconds while holding a database connection
+
+Key concept: RETURN ONCE THE USER EXISTS
+- The token exchange, userinfo and the user/credentials upsert stay on the
+  critical path; the transaction covers only those DB writes
+- The Drive folder and LIFELINE calendar are found or created concurrently in
+  a bounded thread pool after the JWT is issued
+- Both jobs are idempotent (advisory lock per user, no-op once stored), and
+  a request that needs the folder before its job finished provisions it itself
+
+The tests:
+- Login returns before provisioning, which runs concurrently after the commit
+- A failing job does not fail the login or the other job
+- The pool runs at most max_workers jobs at a time
+- A Drive request that beats provisioning finds or creates the folder itself
+- A folder stored while waiting for the lock is reused
+- Concurrent provisioning and Drive requests create one folder (requires PostgreSQL)
+"""
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+import pytest
+from app.account_provisioning import AccountProvisioner
+from app.cache import user_cache
+from app.database import db
+from app.services.auth_service import AuthService
+from app.services.google_drive_service import GoogleDriveService
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+@contextmanager
+def login_patches(provisioner, events, drive, calendar):
+    """Patch Google and the DAOs around AuthService.handle_google_callback, recording `events`."""
+
+    @contextmanager
+    def get_connection(connection=None):
+        events.append("transaction")
+        yield MagicMock()
+        events.append("commit")
+
+    flow = MagicMock()
+    flow.credentials = MagicMock(token="access", refresh_token="refresh", expiry=None)
+    oauth2 = MagicMock()
+    oauth2.userinfo().get().execute.return_value = {"email": "alice@test.local", "name": "Alice", "id": "g-1"}
+    google = MagicMock()
+    google.service.return_value.__enter__.return_value = oauth2
+
+    with patch('app.services.auth_service.Flow') as flow_class, \
+            patch('app.services.auth_service.google_clients', google), \
+            patch('app.services.auth_service.db') as mock_db, \
+            patch('app.services.auth_service.UserDAO') as users, \
+            patch('app.services.auth_service.GoogleCredentialsDAO'), \
+            patch('app.services.auth_service.RefreshTokenDAO'), \
+            patch('app.services.auth_service.account_provisioner', provisioner), \
+            patch('app.services.auth_service.GoogleDriveService.find_or_create_app_folder', side_effect=drive), \
+            patch('app.services.auth_service.GoogleCalendarService.find_or_create_lifeline_calendar',
+                  side_effect=calendar):
+        flow_class.from_client_config.return_value = flow
+        mock_db.get_connection.side_effect = get_connection
+        users.get_user_by_email.return_value = None
+        users.create_user.return_value = {"id": 7, "email": "alice@test.local"}
+        users.get_user_by_id.return_value = {"id": 7, "email": "alice@test.local", "drive_folder_id": None}
+        yield
+
+
+def wait_for_jobs(provisioner):
+    """Record the futures of every provision() call; the returned list is filled as logins run."""
+    futures = []
+    provision = provisioner.provision
+
+    def recording(*args, **kwargs):
+        started = provision(*args, **kwargs)
+        futures.extend(started)
+        return started
+
+    provisioner.provision = recording
+    return futures
+
+
+def test_login_returns_before_provisioning():
+    """
+    TEST 27.1: The JWT does not wait for the Drive folder or the calendar
+
+    WHAT IT DOES:
+    1. Log a new user in; each provisioning job takes 300 ms and waits for the other to start
+
+    EXPECTED RESULT:
+    - The callback returns a token in well under 300 ms
+    - Both jobs start after the transaction committed, and run at the same time
+    """
+    events = []
+    both_started = threading.Barrier(2, timeout=2)
+
+    def job(name):
+        def run(user_id, credentials):
+            events.append(f"{name} started")
+            both_started.wait()
+            time.sleep(0.3)
+            return f"{name}-id"
+        return run
+
+    provisioner = AccountProvisioner(max_workers=2)
+    futures = wait_for_jobs(provisioner)
+    with login_patches(provisioner, events, job("folder"), job("calendar")):
+        started = time.monotonic()
+        result = AuthService.handle_google_callback("code")
+        elapsed = time.monotonic() - started
+        results = [future.result(timeout=5) for future in futures]
+    provisioner.shutdown()
+
+    assert result["access_token"]
+    assert result["user"]["id"] == 7
+    assert elapsed < 0.3
+    assert events[:2] == ["transaction", "commit"]
+    assert sorted(events[2:]) == ["calendar started", "folder started"]
+    assert results == ["folder-id", "calendar-id"]
+    assert provisioner.stats() == {"submitted": 2, "completed": 2, "failed": 0}
+
+
+def test_failing_job_does_not_fail_login():
+    """
+    TEST 27.2: Provisioning errors are logged, not raised
+
+    EXPECTED RESULT:
+    - The login succeeds although Drive fails
+    - The calendar is still set up; one job completed, one failed
+    """
+    calendars = []
+
+    def drive(user_id, credentials):
+        raise RuntimeError("Drive unavailable")
+
+    def calendar(user_id, credentials):
+        calendars.append(user_id)
+        return "calendar-id"
+
+    provisioner = AccountProvisioner(max_workers=2)
+    futures = wait_for_jobs(provisioner)
+    with login_patches(provisioner, [], drive, calendar):
+        result = AuthService.handle_google_callback("code")
+        results = [future.result(timeout=5) for future in futures]
+    provisioner.shutdown()
+
+    assert result["access_token"]
+    assert calendars == [7]
+    assert results == [None, "calendar-id"]
+    assert provisioner.stats() == {"submitted": 2, "completed": 1, "failed": 1}
+
+
+def test_pool_is_bounded():
+    """
+    TEST 27.3: At most max_workers jobs run at once
+
+    WHAT IT DOES:
+    1. Provision 3 users (6 jobs of 50 ms) with max_workers=2
+
+    EXPECTED RESULT:
+    - Every job runs; never more than 2 at the same time
+    """
+    lock = threading.Lock()
+    running = []
+    peak = []
+
+    def job(user_id, credentials):
+        with lock:
+            running.append(user_id)
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(user_id)
+        return "id"
+
+    provisioner = AccountProvisioner(max_workers=2)
+    futures = [future for user_id in (1, 2, 3)
+               for future in provisioner.provision(user_id, MagicMock(), {"folder": job, "calendar": job})]
+    results = [future.result(timeout=5) for future in futures]
+    provisioner.shutdown()
+
+    assert results == ["id"] * 6
+    assert max(peak) == 2
+
+
+def test_drive_request_provisions_missing_folder():
+    """
+    TEST 27.4: A Drive request right after the first login does not fail
+
+    WHAT IT DOES:
+    1. The user has no drive_folder_id yet (provisioning still running)
+    2. Resolve the folder as a Drive request does
+
+    EXPECTED RESULT:
+    - The folder is found or created on the spot instead of raising
+    """
+    with patch('app.services.google_drive_service.user_cache') as cache, \
+            patch('app.services.google_drive_service.GoogleDriveService.find_or_create_app_folder',
+                  return_value="new-folder") as find_or_create:
+        cache.get_or_load.return_value = {"id": 7, "drive_folder_id": None}
+        folder_id = GoogleDriveService._get_drive_folder_id(7)
+
+    assert folder_id == "new-folder"
+    find_or_create.assert_called_once_with(7)
+
+
+def test_folder_stored_while_waiting_is_reused():
+    """
+    TEST 27.5: find_or_create_app_folder re-reads the user under the lock
+
+    EXPECTED RESULT:
+    - A folder ID stored meanwhile is returned without searching Drive
+    """
+    with patch('app.services.google_drive_service.db'), \
+            patch('app.services.google_drive_service.UserDAO') as mock_dao, \
+            patch('app.services.google_drive_service.GoogleDriveService._search_or_create_folder') as mock_search:
+        mock_dao.get_auth_user_by_id.return_value = {"id": 1, "drive_folder_id": "created-meanwhile"}
+
+        folder_id = GoogleDriveService.find_or_create_app_folder(1, MagicMock())
+
+        mock_dao.lock_drive_folder.assert_called_once()
+        mock_search.assert_not_called()
+    assert folder_id == "created-meanwhile"
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+def test_concurrent_provisioning_creates_one_folder():
+    """
+    TEST 27.6: Login provisioning racing Drive requests creates a single folder
+
+    WHAT IT DOES:
+    1. Create a throwaway user without a folder in the test database
+    2. Run the provisioning job and 7 Drive folder lookups at once (Drive search/create is mocked and slow)
+
+    EXPECTED RESULT:
+    - One search/create; everyone gets the same ID, and it is stored on the user
+    """
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+
+    conn = psycopg2.connect(TEST_DATABASE_URL, cursor_factory=RealDictCursor)
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO users (email, name) VALUES (%s, %s) RETURNING id",
+            (f"provisioning-{time.time_ns()}@test.local", "Provisioning Test"),
+        )
+        user_id = cursor.fetchone()["id"]
+    conn.commit()
+
+    created = []
+    folder_ids = []
+    start = threading.Barrier(8)
+
+    def search_or_create(uid, credentials):
+        time.sleep(0.05)
+        created.append(uid)
+        return f"folder-{len(created)}"
+
+    def request():
+        start.wait()
+        folder_ids.append(GoogleDriveService._get_drive_folder_id(user_id))
+
+    def provision():
+        start.wait()
+        folder_ids.append(GoogleDriveService.find_or_create_app_folder(user_id, MagicMock()))
+
+    db.close()
+    user_cache.clear()
+    try:
+        with patch.object(db, 'connection_string', TEST_DATABASE_URL), \
+                patch('app.services.google_drive_service.GoogleDriveService.get_credentials', return_value=MagicMock()), \
+                patch('app.services.google_drive_service.GoogleDriveService._search_or_create_folder',
+                      side_effect=search_or_create):
+            threads = [threading.Thread(target=provision)] + [threading.Thread(target=request) for _ in range(7)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            db.close()
+
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT drive_folder_id FROM users WHERE id = %s", (user_id,))
+            stored = cursor.fetchone()["drive_folder_id"]
+        assert len(created) == 1
+        assert folder_ids == ["folder-1"] * 8
+        assert stored == "folder-1"
+    finally:
+        user_cache.clear()
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
+        conn.commit()
+        conn.close()
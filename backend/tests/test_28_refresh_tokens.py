@@ -0,0 +1,326 @@
+"""
+TEST 28: Rotating Refresh Tokens
+================================
+
+What we're testing: POST /auth/refresh and the refresh tokens issued at login
+Why: Access tokens expire after JWT_ACCESS_TOKEN_EXPIRE_MINUTES, and the only
+way to get a new one was /auth/callback - the full Google consent, token
+exchange and user upsert, our most expensive endpoint
+
+Key concept: ROTATION WITH REUSE DETECTION
+- Login returns a random refresh token; only its SHA-256 hash is stored, in a
+  new token family
+- /auth/refresh finds the token by its hash (one indexed statement), marks it
+  rotated and returns a new access token and a new refresh token of the same
+  family - no Google calls
+- Within JWT_REFRESH_TOKEN_REUSE_GRACE_SECONDS of its rotation a token still
+  works: tabs sharing it, or requests that got a 401 together, refresh at once
+- A rotated token presented later has leaked or been replayed: the whole
+  family is revoked, so the thief's and the user's current tokens stop working
+
+The tests:
+- Refresh tokens are random; the stored hash is not the token
+- Login returns a refresh token and stores its hash in a new family
+- Refreshing rotates the token and mints an access token for the user
+- Refreshes of the same token arriving together all succeed
+- Reusing a rotated token after the grace window revokes its family
+- Unknown and expired tokens are rejected without revoking anything
+- Rotation, reuse and concurrent refreshes against PostgreSQL (requires PostgreSQL)
+"""
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+import pytest
+from app.config import settings
+from app.dao.refresh_token_dao import RefreshTokenDAO
+from app.database import db
+from app.services.auth_service import AuthService, InvalidRefreshTokenError
+from app.utils.jwt import create_refresh_token, hash_refresh_token, verify_token
+from tests.test_27_account_provisioning import login_patches
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+class FakeRefreshTokens:
+    """In-memory RefreshTokenDAO."""
+
+    def __init__(self):
+        self.tokens = {}
+
+    def create_token(self, user_id, token_hash, family_id, ttl_seconds, connection=None):
+        self.tokens[token_hash] = {"user_id": user_id, "family_id": family_id,
+                                   "expires_at": datetime.now() + timedelta(seconds=ttl_seconds),
+                                   "rotated_at": None, "revoked_at": None}
+
+    def rotate_token(self, token_hash, grace_seconds, connection=None):
+        token = self.tokens.get(token_hash)
+        if not token or token["revoked_at"] or token["expires_at"] <= datetime.now():
+            return None
+        if token["rotated_at"] and token["rotated_at"] <= datetime.now() - timedelta(seconds=grace_seconds):
+            return None
+        token["rotated_at"] = token["rotated_at"] or datetime.now()
+        return {"user_id": token["user_id"], "family_id": token["family_id"]}
+
+    def get_token(self, token_hash, connection=None):
+        return self.tokens.get(token_hash)
+
+    def revoke_family(self, family_id, connection=None):
+        family = [t for t in self.tokens.values() if t["family_id"] == family_id and not t["revoked_at"]]
+        for token in family:
+            token["revoked_at"] = datetime.now()
+        return len(family)
+
+    def delete_expired_tokens(self, user_id, connection=None):
+        expired = [h for h, t in self.tokens.items() if t["user_id"] == user_id and t["expires_at"] <= datetime.now()]
+        for token_hash in expired:
+            del self.tokens[token_hash]
+        return len(expired)
+
+
+@contextmanager
+def refresh_patches(tokens):
+    """Patch the transaction and RefreshTokenDAO used by AuthService."""
+
+    @contextmanager
+    def get_connection(connection=None):
+        yield MagicMock()
+
+    with patch('app.services.auth_service.db') as mock_db, \
+            patch('app.services.auth_service.RefreshTokenDAO', tokens):
+        mock_db.get_connection.side_effect = get_connection
+        yield
+
+
+def issue(tokens, user_id=7, family_id="family-1"):
+    """Issue a refresh token the way login does."""
+    with refresh_patches(tokens):
+        return AuthService._issue_refresh_token(user_id, family_id, connection=MagicMock())
+
+
+def test_refresh_tokens_are_random_and_stored_hashed():
+    """
+    TEST 28.1: Only a hash of the random token is stored
+
+    EXPECTED RESULT:
+    - Two tokens differ and carry at least 256 bits (43 url-safe characters)
+    - The hash is a 64-character hex SHA-256, stable for the same token, not the token itself
+    """
+    first, second = create_refresh_token(), create_refresh_token()
+
+    assert first != second
+    assert len(first) >= 43
+    assert hash_refresh_token(first) == hash_refresh_token(first)
+    assert len(hash_refresh_token(first)) == 64
+    assert hash_refresh_token(first) != first
+
+
+def test_login_returns_a_refresh_token():
+    """
+    TEST 28.2: The OAuth callback starts a token family
+
+    WHAT IT DOES:
+    1. Log a new user in twice
+
+    EXPECTED RESULT:
+    - Each login returns a refresh token whose hash (not the token) is stored for the user
+    - Each login has its own family
+    """
+    tokens = FakeRefreshTokens()
+    with login_patches(MagicMock(), [], None, None), \
+            patch('app.services.auth_service.RefreshTokenDAO', tokens):
+        first = AuthService.handle_google_callback("code")
+        second = AuthService.handle_google_callback("code")
+
+    stored = tokens.tokens[hash_refresh_token(first["refresh_token"])]
+    assert first["refresh_token"] not in tokens.tokens
+    assert stored["user_id"] == 7
+    assert tokens.tokens[hash_refresh_token(second["refresh_token"])]["family_id"] != stored["family_id"]
+
+
+def test_refresh_rotates_the_token(client):
+    """
+    TEST 28.3: POST /auth/refresh trades a refresh token for new tokens
+
+    WHAT IT DOES:
+    1. Issue a refresh token for user 7
+    2. Refresh with it, then with the token that came back
+
+    EXPECTED RESULT:
+    - 200 with an access token for user 7 and a new refresh token, both times
+    - The new refresh token is in the same family; the presented one is rotated
+    """
+    tokens = FakeRefreshTokens()
+    refresh_token = issue(tokens)
+
+    with refresh_patches(tokens):
+        first = client.post("/auth/refresh", json={"refresh_token": refresh_token})
+        second = client.post("/auth/refresh", json={"refresh_token": first.json()["refresh_token"]})
+
+    assert first.status_code == second.status_code == 200
+    assert verify_token(first.json()["access_token"])["sub"] == "7"
+    assert first.json()["token_type"] == "bearer"
+    assert first.json()["refresh_token"] != refresh_token
+    assert tokens.tokens[hash_refresh_token(refresh_token)]["rotated_at"] is not None
+    assert tokens.tokens[hash_refresh_token(second.json()["refresh_token"])]["family_id"] == "family-1"
+
+
+def test_concurrent_refreshes_are_not_reuse(client):
+    """
+    TEST 28.4: Two refreshes of the same token arriving together both succeed
+
+    WHAT IT DOES:
+    1. Two tabs share a refresh token; both refresh with it at the same time
+    2. Each tab refreshes again with the token it got back
+
+    EXPECTED RESULT:
+    - Both get 200, with different refresh tokens of the same family
+    - Nothing is revoked, and both new tokens work
+    """
+    tokens = FakeRefreshTokens()
+    shared = issue(tokens)
+
+    with refresh_patches(tokens):
+        first_tab = client.post("/auth/refresh", json={"refresh_token": shared})
+        second_tab = client.post("/auth/refresh", json={"refresh_token": shared})
+        again = [client.post("/auth/refresh", json={"refresh_token": tab.json()["refresh_token"]})
+                 for tab in (first_tab, second_tab)]
+
+    assert first_tab.status_code == second_tab.status_code == 200
+    assert first_tab.json()["refresh_token"] != second_tab.json()["refresh_token"]
+    assert [response.status_code for response in again] == [200, 200]
+    assert {t["family_id"] for t in tokens.tokens.values()} == {"family-1"}
+    assert not any(t["revoked_at"] for t in tokens.tokens.values())
+
+
+def test_reuse_revokes_the_family(client):
+    """
+    TEST 28.5: A rotated token presented after the grace window signs that login out
+
+    WHAT IT DOES:
+    1. Refresh once (the legitimate client now holds the new token)
+    2. Once the grace window has passed, present the old token again (an attacker replaying it)
+    3. The legitimate client refreshes with its new token
+
+    EXPECTED RESULT:
+    - The replay gets 401
+    - Every token of the family is revoked, so the new token gets 401 too
+    - Another login's family is untouched
+    """
+    tokens = FakeRefreshTokens()
+    stolen = issue(tokens)
+    other_login = issue(tokens, family_id="family-2")
+
+    with refresh_patches(tokens):
+        current = client.post("/auth/refresh", json={"refresh_token": stolen}).json()["refresh_token"]
+        tokens.tokens[hash_refresh_token(stolen)]["rotated_at"] -= timedelta(
+            seconds=settings.jwt_refresh_token_reuse_grace_seconds + 1)
+        replay = client.post("/auth/refresh", json={"refresh_token": stolen})
+        legitimate = client.post("/auth/refresh", json={"refresh_token": current})
+        other = client.post("/auth/refresh", json={"refresh_token": other_login})
+
+    assert replay.status_code == 401
+    assert legitimate.status_code == 401
+    assert other.status_code == 200
+    assert all(t["revoked_at"] for t in tokens.tokens.values() if t["family_id"] == "family-1")
+
+
+def test_unknown_and_expired_tokens_are_rejected():
+    """
+    TEST 28.6: Tokens that were never rotated are rejected without revoking anything
+
+    EXPECTED RESULT:
+    - An unknown token and an expired one raise InvalidRefreshTokenError
+    - No token is revoked
+    """
+    tokens = FakeRefreshTokens()
+    live = issue(tokens)
+    expired = issue(tokens)
+    tokens.tokens[hash_refresh_token(expired)]["expires_at"] = datetime.now() - timedelta(seconds=1)
+
+    with refresh_patches(tokens):
+        with pytest.raises(InvalidRefreshTokenError):
+            AuthService.refresh_access_token("not-a-token")
+        with pytest.raises(InvalidRefreshTokenError):
+            AuthService.refresh_access_token(expired)
+
+    assert not any(t["revoked_at"] for t in tokens.tokens.values())
+    assert tokens.tokens[hash_refresh_token(live)]["rotated_at"] is None
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+def test_refresh_tokens_against_postgres():
+    """
+    TEST 28.7: Rotation, reuse detection and concurrent refreshes in PostgreSQL
+
+    WHAT IT DOES:
+    1. Create a throwaway user and issue a refresh token
+    2. Refresh it from 8 threads at once
+    3. With the grace window over, replay the original
+
+    EXPECTED RESULT:
+    - All 8 concurrent refreshes succeed, each with its own new token
+    - The replay is rejected and revokes the family, so the new tokens are rejected too
+    - Login drops the user's expired tokens
+    """
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+
+    conn = psycopg2.connect(TEST_DATABASE_URL, cursor_factory=RealDictCursor)
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO users (email, name) VALUES (%s, %s) RETURNING id",
+            (f"refresh-{time.time_ns()}@test.local", "Refresh Test"),
+        )
+        user_id = cursor.fetchone()["id"]
+    conn.commit()
+
+    results = []
+    start = threading.Barrier(8)
+
+    def refresh(token):
+        start.wait()
+        try:
+            results.append(AuthService.refresh_access_token(token))
+        except InvalidRefreshTokenError:
+            results.append(None)
+
+    db.close()
+    try:
+        with patch.object(db, 'connection_string', TEST_DATABASE_URL):
+            with db.get_connection() as c:
+                RefreshTokenDAO.create_token(user_id, hash_refresh_token("expired"), "00000000-0000-0000-0000-000000000001",
+                                             -1, connection=c)
+                original = AuthService._issue_refresh_token(user_id, "00000000-0000-0000-0000-000000000002",
+                                                            connection=c)
+                assert RefreshTokenDAO.get_token(hash_refresh_token("expired"), connection=c) is None
+
+            threads = [threading.Thread(target=refresh, args=(original,)) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            assert all(results) and len(results) == 8
+            assert len({result["refresh_token"] for result in results}) == 8
+            assert verify_token(results[0]["access_token"])["sub"] == str(user_id)
+
+            with patch.object(settings, "jwt_refresh_token_reuse_grace_seconds", 0):
+                with pytest.raises(InvalidRefreshTokenError):
+                    AuthService.refresh_access_token(original)
+            with pytest.raises(InvalidRefreshTokenError):
+                AuthService.refresh_access_token(results[0]["refresh_token"])
+            db.close()
+
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) AS live FROM refresh_tokens WHERE user_id = %s AND revoked_at IS NULL",
+                           (user_id,))
+            assert cursor.fetchone()["live"] == 0
+    finally:
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
+        conn.commit()
+        conn.close()
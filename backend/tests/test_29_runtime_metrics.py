@@ -0,0 +1,87 @@
+"""
+TEST 29: Runtime Metrics Endpoint
+=================================
+
+What we're testing: GET /metrics, the runtime counters of the answering worker
+Why: Pool occupancy, cache hit rates and upstream latency and connection reuse
+were only logged at shutdown, so a slow or saturated worker could not be
+inspected while it was running
+
+Key concept: A KEYED, OPT-IN ENDPOINT
+- The endpoint serves the same stats() every singleton logs at shutdown
+- It answers only requests carrying METRICS_API_KEY in X-Metrics-Key, and
+  does not exist (404) while no key is configured
+- Counters are per worker process; the response's pid says which one answered
+
+The tests:
+- Without a configured key the endpoint is off
+- A missing or wrong key is rejected
+- With the key, every component's counters are served as they are now
+"""
+
+from unittest.mock import patch
+from app.config import settings
+from app.cache import user_cache
+
+
+def test_metrics_endpoint_is_off_without_a_key(client):
+    """
+    TEST 29.1: /metrics answers 404 while METRICS_API_KEY is unset
+
+    WHY:
+    - Internals should not be public on deployments that never configured a key
+
+    EXPECTED RESULT:
+    - 404, even when a key header is sent
+    """
+    with patch.object(settings, "metrics_api_key", None):
+        response = client.get("/metrics", headers={"X-Metrics-Key": "anything"})
+
+    assert response.status_code == 404
+
+
+def test_metrics_endpoint_rejects_missing_and_wrong_keys(client):
+    """
+    TEST 29.2: Requests without the configured key are rejected
+
+    EXPECTED RESULT:
+    - 401 without the header and with a wrong key
+    """
+    with patch.object(settings, "metrics_api_key", "metrics-secret"):
+        missing = client.get("/metrics")
+        wrong = client.get("/metrics", headers={"X-Metrics-Key": "guess"})
+
+    assert missing.status_code == 401
+    assert wrong.status_code == 401
+
+
+def test_metrics_endpoint_serves_live_counters(client):
+    """
+    TEST 29.3: With the key, every component's current counters are returned
+
+    WHAT IT DOES:
+    1. Load a user into the user cache, then read it again (one miss, one hit)
+    2. Fetch /metrics with the configured key
+
+    EXPECTED RESULT:
+    - 200 with the pool, upstream, cache and background job sections
+    - Upstream counters include latency and connection reuse per upstream
+    - The user cache section already counts the hit (no restart needed)
+    """
+    user_cache.clear()
+    user_cache.get_or_load(123, lambda uid: {"id": uid})
+    user_cache.get_or_load(123, lambda uid: {"id": uid})
+    try:
+        with patch.object(settings, "metrics_api_key", "metrics-secret"):
+            response = client.get("/metrics", headers={"X-Metrics-Key": "metrics-secret"})
+    finally:
+        user_cache.clear()
+
+    assert response.status_code == 200
+    data = response.json()
+    for section in ("pid", "database_pool", "upstream_http", "user_cache", "google_credentials_cache",
+                    "google_clients", "suggestion_cache", "suggestion_engine", "suggestion_worker",
+                    "n8n_outbox", "account_provisioning"):
+        assert section in data
+    assert {"latency_p95_ms", "connection_reuse_rate"} <= set(data["upstream_http"]["huggingface"])
+    assert (data["user_cache"]["hits"], data["user_cache"]["misses"]) == (1, 1)
@@ -11,7 +11,8 @@ create table users
     google_refresh_token text,
     created_at           timestamp default CURRENT_TIMESTAMP,
     updated_at           timestamp default CURRENT_TIMESTAMP,
-    drive_folder_id      varchar
+    drive_folder_id      varchar,
+    lifeline_calendar_id varchar
 );
 
 create table family_members
@@ -30,8 +31,11 @@ create table family_members
     health_notes  text
 );
 
-create index idx_family_members_user_id
-    on family_members (user_id);
+alter table family_members
+    add constraint uq_family_members_id_user_id unique (id, user_id);
+
+create index idx_family_members_user_id_created_at
+    on family_members (user_id asc, created_at desc, id desc);
 
 create table medications
 (
@@ -47,8 +51,11 @@ create table medications
     updated_at      timestamp default CURRENT_TIMESTAMP
 );
 
-create index idx_medications_user_id
-    on medications (user_id);
+create index idx_medications_user_id_name
+    on medications (user_id, name, id);
+
+create unique index idx_medications_user_id_lower_name
+    on medications (user_id, lower(name));
 
 create table medication_usage
 (
@@ -63,11 +70,18 @@ create table medication_usage
     used_at          timestamp default CURRENT_TIMESTAMP,
     quantity_used    integer   default 1 not null,
     created_at       timestamp default CURRENT_TIMESTAMP,
-    updated_at       timestamp default CURRENT_TIMESTAMP
+    updated_at       timestamp default CURRENT_TIMESTAMP,
+    user_id          integer             not null,
+    constraint fk_medication_usage_family_member_owner
+        foreign key (family_member_id, user_id) references family_members (id, user_id)
+            on update cascade on delete cascade
 );
 
-create index idx_medication_usage_family_member_id
-    on medication_usage (family_member_id);
+create index idx_medication_usage_user_id_used_at
+    on medication_usage (user_id asc, used_at desc, id desc);
+
+create index idx_medication_usage_family_member_used_at
+    on medication_usage (family_member_id asc, used_at desc, id desc);
 
 create index idx_medication_usage_medication_id
     on medication_usage (medication_id);
@@ -105,6 +119,9 @@ create table n8n_chat_histories
     message    jsonb        not null
 );
 
+create index idx_n8n_chat_histories_session_id
+    on n8n_chat_histories (session_id, id);
+
 create table illness_logs
 (
     id               serial
@@ -118,13 +135,151 @@ create table illness_logs
     notes            text,
     created_at       timestamp default CURRENT_TIMESTAMP,
     updated_at       timestamp default CURRENT_TIMESTAMP,
-    ai_suggestion    text
+    ai_suggestion    text,
+    user_id          integer      not null,
+    suggestion_status          varchar(16) default 'none'::character varying not null
+        constraint illness_logs_suggestion_status_check
+            check ((suggestion_status)::text = ANY
+                   ((ARRAY ['none'::character varying, 'pending'::character varying, 'ready'::character varying, 'failed'::character varying])::text[])),
+    suggestion_attempts        integer     default 0 not null,
+    suggestion_next_attempt_at timestamp,
+    suggestion_source          varchar(16)
+        constraint illness_logs_suggestion_source_check
+            check ((suggestion_source)::text = ANY
+                   ((ARRAY ['model'::character varying, 'cache'::character varying, 'fallback'::character varying, 'user'::character varying])::text[])),
+    constraint fk_illness_logs_family_member_owner
+        foreign key (family_member_id, user_id) references family_members (id, user_id)
+            on update cascade on delete cascade
 );
 
-create index idx_illness_logs_family_member_id
-    on illness_logs (family_member_id);
+create index idx_illness_logs_user_id_start_date
+    on illness_logs (user_id asc, start_date desc, id desc);
+
+create index idx_illness_logs_family_member_start_date
+    on illness_logs (family_member_id asc, start_date desc, id desc);
 
 create index idx_illness_logs_start_date
     on illness_logs (start_date);
 
+create index idx_illness_logs_pending_suggestion
+    on illness_logs (suggestion_next_attempt_at, id)
+    where ((suggestion_status)::text = 'pending'::text);
+
+create table drive_files
+(
+    id            serial
+        primary key,
+    user_id       integer      not null
+        references users
+            on delete cascade,
+    file_id       varchar      not null,
+    name          varchar      not null,
+    mime_type     varchar(255) not null,
+    size          bigint,
+    created_time  timestamp    not null,
+    modified_time timestamp    not null,
+    synced_at     timestamp default CURRENT_TIMESTAMP,
+    constraint uq_drive_files_user_id_file_id
+        unique (user_id, file_id)
+);
+
+create index idx_drive_files_user_id_modified_time
+    on drive_files (user_id asc, modified_time desc, id desc);
+
+create index idx_drive_files_user_id_created_time
+    on drive_files (user_id asc, created_time desc, id desc);
+
+create index idx_drive_files_user_id_name
+    on drive_files (user_id, name, id);
+
+create table drive_sync_state
+(
+    user_id    integer not null
+        primary key
+        references users
+            on delete cascade,
+    page_token varchar not null,
+    synced_at  timestamp default CURRENT_TIMESTAMP
+);
+
+create table drive_upload_sessions
+(
+    id           serial
+        primary key,
+    user_id      integer      not null
+        references users
+            on delete cascade,
+    session_uri  text         not null,
+    file_name    varchar      not null,
+    mime_type    varchar(255) not null,
+    size         bigint       not null,
+    file_id      varchar,
+    created_at   timestamp default CURRENT_TIMESTAMP,
+    completed_at timestamp
+);
+
+create table n8n_outbox
+(
+    id              serial
+        primary key,
+    user_id         integer      not null
+        references users
+            on delete cascade,
+    file_id         varchar      not null,
+    file_name       varchar      not null,
+    mime_type       varchar(255) not null,
+    size            bigint       not null,
+    content_path    varchar,
+    status          varchar(16)  default 'pending'::character varying not null
+        constraint n8n_outbox_status_check
+            check ((status)::text = ANY
+                   ((ARRAY ['pending'::character varying, 'sent'::character varying, 'dead'::character varying])::text[])),
+    attempts        integer      default 0 not null,
+    next_attempt_at timestamp    default CURRENT_TIMESTAMP not null,
+    last_error      text,
+    created_at      timestamp default CURRENT_TIMESTAMP,
+    sent_at         timestamp
+);
+
+create index idx_n8n_outbox_pending_next_attempt_at
+    on n8n_outbox (next_attempt_at, id)
+    where ((status)::text = 'pending'::text);
+
+create table ai_suggestion_cache
+(
+    illness_name   varchar(255) not null,
+    notes_digest   varchar(64)  not null,
+    model          varchar(255) not null,
+    prompt_version integer      not null,
+    suggestion     text         not null,
+    created_at     timestamp default CURRENT_TIMESTAMP,
+    expires_at     timestamp    not null,
+    primary key (illness_name, notes_digest, model, prompt_version)
+);
+
+create index idx_ai_suggestion_cache_expires_at
+    on ai_suggestion_cache (expires_at);
+
+create table refresh_tokens
+(
+    id         serial
+        primary key,
+    user_id    integer     not null
+        references users
+            on delete cascade,
+    token_hash varchar(64) not null,
+    family_id  uuid        not null,
+    created_at timestamp default CURRENT_TIMESTAMP,
+    expires_at timestamp   not null,
+    rotated_at timestamp,
+    revoked_at timestamp
+);
+
+create unique index idx_refresh_tokens_token_hash
+    on refresh_tokens (token_hash);
+
+create index idx_refresh_tokens_family_id
+    on refresh_tokens (family_id);
 
+create index idx_refresh_tokens_user_id
+    on refresh_tokens (user_id);
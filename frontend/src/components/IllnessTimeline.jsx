@@ -3,6 +3,8 @@ import { illnessLogsService } from '../services/illnessLogs'
 import { FiThermometer, FiTrash2, FiFilter, FiChevronDown, FiChevronUp } from 'react-icons/fi'
 import './IllnessTimeline.css'
 
+const SUGGESTION_POLL_MS = 3000
+
 const IllnessTimeline = forwardRef(function IllnessTimeline({ familyMembers, aiSuggestionsEnabled = true }, ref) {
   const [logs, setLogs] = useState([])
   const [loading, setLoading] = useState(true)
@@ -28,6 +30,22 @@ const IllnessTimeline = forwardRef(function IllnessTimeline({ familyMembers, aiS
     loadLogs()
   }, [loadLogs])
 
+  // Suggestions are generated in the background; refresh logs that are still pending
+  const pendingIds = logs.filter(log => log.suggestion_status === 'pending').map(log => log.id).join(',')
+  useEffect(() => {
+    if (!aiSuggestionsEnabled || !pendingIds) return
+    const timer = setInterval(async () => {
+      const updated = await Promise.all(
+        pendingIds.split(',').map(id => illnessLogsService.getById(id).catch(() => null))
+      )
+      const ready = updated.filter(log => log && log.suggestion_status !== 'pending')
+      if (ready.length > 0) {
+        setLogs(prev => prev.map(log => ready.find(r => r.id === log.id) || log))
+      }
+    }, SUGGESTION_POLL_MS)
+    return () => clearInterval(timer)
+  }, [pendingIds, aiSuggestionsEnabled])
+
   useImperativeHandle(ref, () => ({
     refresh: loadLogs
   }))
@@ -173,6 +191,8 @@ const IllnessTimeline = forwardRef(function IllnessTimeline({ familyMembers, aiS
                             >
                               {expandedRows.has(log.id) ? <FiChevronUp /> : <FiChevronDown />}
                             </button>
+                          ) : log.suggestion_status === 'pending' ? (
+                            <span className="no-suggestion" title="Generating suggestions...">…</span>
                           ) : (
                             <span className="no-suggestion">-</span>
                           )}
@@ -18,13 +18,60 @@ api.interceptors.request.use((config) => {
   return config
 })
 
+// Tabs share the refresh token in localStorage, so refreshes are serialized across tabs
+function withRefreshLock(callback) {
+  return navigator.locks ? navigator.locks.request('lifeline-token-refresh', callback) : callback()
+}
+
+// One refresh at a time: concurrent 401s wait for the same new token, since a refresh token works only once
+let refreshing = null
+
+function refreshAccessToken() {
+  if (!refreshing) {
+    const seen = localStorage.getItem('refreshToken')
+    refreshing = withRefreshLock(async () => {
+      // Another tab refreshed while this one waited for the lock: use its tokens
+      const refreshToken = localStorage.getItem('refreshToken')
+      if (!refreshToken) {
+        throw new Error('No refresh token')
+      }
+      if (refreshToken !== seen) {
+        return localStorage.getItem('token')
+      }
+      const response = await axios.post(`${API_BASE_URL}/auth/refresh`, { refresh_token: refreshToken })
+      localStorage.setItem('token', response.data.access_token)
+      localStorage.setItem('refreshToken', response.data.refresh_token)
+      return response.data.access_token
+    }).finally(() => {
+      refreshing = null
+    })
+  }
+  return refreshing
+}
+
 // Handle 401 responses
 api.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error) => {
     // Only clear token for actual JWT auth errors, not Google API errors
     if (error.response?.status === 401) {
       const url = error.config?.url || ''
+
+      // An expired access token is renewed with the refresh token and the request retried once
+      if (!error.config._retried && !url.startsWith('/auth/')) {
+        try {
+          const token = await refreshAccessToken()
+          error.config._retried = true
+          error.config.headers.Authorization = `Bearer ${token}`
+          return api(error.config)
+        } catch {
+          // The refresh token expired or was revoked: sign in again
+          localStorage.removeItem('token')
+          localStorage.removeItem('refreshToken')
+          window.location.href = '/login'
+          return Promise.reject(error)
+        }
+      }
       
       // Check if this is a Google API endpoint
       const isGoogleEndpoint = url.includes('/drive') || url.includes('/calendar')
@@ -32,6 +79,7 @@ api.interceptors.response.use(
       // Only logout if it's NOT a Google endpoint and IS a LifeLine endpoint
       if (!isGoogleEndpoint) {
         localStorage.removeItem('token')
+        localStorage.removeItem('refreshToken')
         window.location.href = '/login'
       }
     }
@@ -39,5 +87,17 @@ api.interceptors.response.use(
   }
 )
 
+// List endpoints are keyset-paginated ({ items, next_cursor }); follow next_cursor until the last page
+export async function getAllPages(url, params = {}) {
+  const items = []
+  let cursor = null
+  do {
+    const response = await api.get(url, { params: { ...params, limit: 200, ...(cursor ? { cursor } : {}) } })
+    items.push(...response.data.items)
+    cursor = response.data.next_cursor
+  } while (cursor)
+  return items
+}
+
 export default api
 
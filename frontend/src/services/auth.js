@@ -10,6 +10,7 @@ export const authService = {
     const response = await api.post('/auth/callback', { code })
     if (response.data.access_token) {
       localStorage.setItem('token', response.data.access_token)
+      localStorage.setItem('refreshToken', response.data.refresh_token)
       if (response.data.user) {
         localStorage.setItem('userId', response.data.user.id)
         localStorage.setItem('userEmail', response.data.user.email)
@@ -1,9 +1,8 @@
-import api from './api'
+import api, { getAllPages } from './api'
 
 export const familyMembersService = {
   async getAll() {
-    const response = await api.get('/family-members')
-    return response.data
+    return getAllPages('/family-members')
   },
 
   async create(data) {
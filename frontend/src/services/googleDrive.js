@@ -1,19 +1,33 @@
 import api from './api'
 
 export const googleDriveService = {
+  // Same paging as getAllPages, but the Drive listing also reports whether Google is connected
   async listFiles() {
-    const response = await api.get('/drive/files')
-    return response.data
+    const files = []
+    let cursor = null
+    let data
+    do {
+      const response = await api.get('/drive/files', { params: { limit: 200, ...(cursor ? { cursor } : {}) } })
+      data = response.data
+      files.push(...(data.items || []))
+      cursor = data.next_cursor
+    } while (cursor)
+    return { ...data, files }
   },
 
+  // The browser PUTs the file straight to Drive; the API only opens and completes the session
   async uploadFile(file) {
-    const formData = new FormData()
-    formData.append('file', file)
-    const response = await api.post('/drive/upload', formData, {
-      headers: {
-        'Content-Type': 'multipart/form-data',
-      },
+    const { data: session } = await api.post('/drive/upload-sessions', {
+      file_name: file.name,
+      mime_type: file.type || 'application/octet-stream',
+      size: file.size,
     })
+    // The session URI is its own credential, so no Authorization header
+    const upload = await fetch(session.upload_url, { method: 'PUT', body: file })
+    if (!upload.ok) {
+      throw new Error(`Upload to Google Drive failed (${upload.status})`)
+    }
+    const response = await api.post(`/drive/upload-sessions/${session.id}/complete`)
     return response.data
   },
 
@@ -1,10 +1,9 @@
-import api from './api'
+import api, { getAllPages } from './api'
 
 export const illnessLogsService = {
   async getAll(familyMemberId = null) {
     const params = familyMemberId ? { family_member_id: familyMemberId } : {}
-    const response = await api.get('/illness-logs', { params })
-    return response.data
+    return getAllPages('/illness-logs', params)
   },
 
   async getById(id) {
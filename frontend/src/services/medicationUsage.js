@@ -1,4 +1,4 @@
-import api from './api'
+import api, { getAllPages } from './api'
 
 export const medicationUsageService = {
   async logUsage(data) {
@@ -6,9 +6,9 @@ export const medicationUsageService = {
     return response.data
   },
 
+  // All usage logs, newest first
   async getAll() {
-    const response = await api.get('/medication-usage')
-    return response.data
+    return getAllPages('/medication-usage')
   },
 }
 
@@ -1,9 +1,8 @@
-import api from './api'
+import api, { getAllPages } from './api'
 
 export const medicationsService = {
   async getAll() {
-    const response = await api.get('/medications')
-    return response.data
+    return getAllPages('/medications')
   },
 
   async create(data) {
@@ -23,6 +23,7 @@ export const auth = {
 
   logout() {
     localStorage.removeItem('token')
+    localStorage.removeItem('refreshToken')
     localStorage.removeItem('userId')
     localStorage.removeItem('userEmail')
   }